@@ -1,12 +1,16 @@
 """GTFS metadata and download endpoints"""
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 import os
 import time
 from pathlib import Path
 
 from app.db.supabase_client import get_supabase
+from app.services.gtfs_checkpoint import checkpoint_status
+from app.services.ios_db_delta import VERSION_PATTERN, VERSIONS_DIR, resolve_update
+from app.services.ios_db_packs import read_packs_manifest
+from app.services.ios_db_variants import read_manifest
 from app.models.routes import GTFSMetadataResponse
+from app.utils.file_responses import file_response
 from app.utils.logging import get_logger
 from supabase import Client
 
@@ -15,6 +19,7 @@ router = APIRouter()
 
 VAR_DIR = Path(os.getenv("VAR_DIR", Path(__file__).resolve().parents[3] / "var")).resolve()
 GTFS_DB_PATH = VAR_DIR / "data" / "gtfs.db"
+GTFS_PACKS_DIR = VAR_DIR / "data" / "packs"
 
 @router.get("/version")
 async def get_gtfs_version(
@@ -51,8 +56,12 @@ async def get_gtfs_version(
         raise HTTPException(status_code=500, detail=f"Failed to fetch GTFS version: {str(e)}")
 
 @router.get("/download")
-async def download_gtfs_db():
-    """Download iOS SQLite database (streams file, does not load to memory)"""
+async def download_gtfs_db(request: Request):
+    """Download iOS SQLite database (streams file, does not load to memory).
+
+    Serves the precompressed zstd/gzip variant the client accepts, resumes with
+    Range/If-Range, and answers If-None-Match with 304 (ETag from the manifest's SHA-256).
+    """
     start_time = time.time()
 
     # Path to iOS SQLite file
@@ -62,20 +71,128 @@ async def download_gtfs_db():
         logger.error("gtfs_db_not_found", path=str(db_path))
         raise HTTPException(status_code=404, detail="iOS SQLite not generated yet")
 
+    manifest = read_manifest(str(db_path))
+    response = file_response(request, db_path, manifest, "application/x-sqlite3", "gtfs.db")
+
     # Get file size for logging
     file_size_mb = db_path.stat().st_size / 1024 / 1024
     duration_ms = int((time.time() - start_time) * 1000)
 
     logger.info("gtfs_download_requested",
                file_size_mb=round(file_size_mb, 2),
+               status_code=response.status_code,
+               content_encoding=response.headers.get("content-encoding", "identity"),
+               content_range=response.headers.get("content-range"),
+               manifest=manifest is not None,
                duration_ms=duration_ms)
 
-    # Stream file to client (FileResponse handles chunking automatically)
-    return FileResponse(
-        path=str(db_path),
-        media_type="application/x-sqlite3",
-        filename="gtfs.db",
-        headers={
-            "Content-Disposition": "attachment; filename=gtfs.db"
-        }
+    return response
+
+@router.get("/manifest")
+async def get_gtfs_manifest():
+    """SHA-256 manifest of the current gtfs.db and its precompressed variants"""
+    manifest = read_manifest(str(GTFS_DB_PATH)) if GTFS_DB_PATH.exists() else None
+    if manifest is None:
+        logger.warning("gtfs_manifest_not_found", path=str(GTFS_DB_PATH))
+        raise HTTPException(status_code=404, detail="No published iOS SQLite manifest")
+
+    return {
+        "data": manifest,
+        "meta": {}
+    }
+
+@router.get("/delta")
+async def download_gtfs_delta(
+    request: Request,
+    from_version: str = Query(..., alias="from", pattern=VERSION_PATTERN, description="Client's metadata.bundle_version")
+):
+    """Update a client's gtfs.db: delta from its version, or the full file as fallback.
+
+    X-GTFS-Update tells the client what it got: "current" (204, nothing to do),
+    "delta" (apply with ATTACH, see ios_db_delta) or "full" (replace gtfs.db; when the
+    version is unknown, the delta was not buildable or is too large). Both are served
+    like /download (precompressed variants, Range, If-None-Match).
+    """
+    db_path = GTFS_DB_PATH
+    if not db_path.exists():
+        logger.error("gtfs_db_not_found", path=str(db_path))
+        raise HTTPException(status_code=404, detail="iOS SQLite not generated yet")
+
+    update = resolve_update(from_version, str(db_path), VERSIONS_DIR)
+    headers = {"X-GTFS-Update": update["kind"], "X-GTFS-Version": update["to_version"] or ""}
+
+    logger.info("gtfs_delta_requested",
+               from_version=from_version,
+               to_version=update["to_version"],
+               kind=update["kind"],
+               reason=update["reason"])
+
+    if update["kind"] == "current":
+        return Response(status_code=204, headers=headers)
+    if update["kind"] == "delta":
+        delta_path = Path(update["path"])
+        return file_response(
+            request, delta_path, read_manifest(str(delta_path)), "application/x-sqlite3",
+            f"gtfs-{from_version}-{update['to_version']}.delta.db", headers
+        )
+
+    headers["X-GTFS-Fallback-Reason"] = update["reason"]
+    return file_response(request, db_path, read_manifest(str(db_path)), "application/x-sqlite3", "gtfs.db", headers)
+
+@router.get("/packs")
+async def get_gtfs_packs():
+    """Core and per-mode offline packs: file, version and SHA-256 of each, plus the
+    assembly schema (mode_tables, views; see ios_db_packs). Clients re-download a pack
+    when its version differs from the one they hold."""
+    manifest = read_packs_manifest(str(GTFS_PACKS_DIR))
+    if manifest is None:
+        logger.warning("gtfs_packs_manifest_not_found", path=str(GTFS_PACKS_DIR))
+        raise HTTPException(status_code=404, detail="No published offline packs")
+
+    return {
+        "data": manifest,
+        "meta": {}
+    }
+
+@router.get("/packs/{name}")
+async def download_gtfs_pack(request: Request, name: str):
+    """Download one offline pack (served like /download: variants, Range, If-None-Match)"""
+    manifest = read_packs_manifest(str(GTFS_PACKS_DIR))
+    pack = (manifest or {}).get("packs", {}).get(name)
+    if pack is None:
+        logger.warning("gtfs_pack_not_found", pack=name)
+        raise HTTPException(status_code=404, detail=f"Unknown offline pack: {name}")
+
+    pack_path = GTFS_PACKS_DIR / pack["file"]
+    if not pack_path.exists():
+        logger.error("gtfs_pack_file_missing", pack=name, path=str(pack_path))
+        raise HTTPException(status_code=404, detail=f"Offline pack not available: {name}")
+
+    headers = {"X-GTFS-Pack-Version": pack["version"]}
+    response = file_response(
+        request, pack_path, read_manifest(str(pack_path)), "application/x-sqlite3", pack["file"], headers
     )
+    logger.info("gtfs_pack_download_requested",
+               pack=name,
+               version=pack["version"],
+               status_code=response.status_code,
+               content_encoding=response.headers.get("content-encoding", "identity"))
+    return response
+
+@router.get("/sync/status")
+async def get_gtfs_sync_status():
+    """Static sync checkpoint state (stages done, per-table batch progress)"""
+    checkpoints = checkpoint_status()
+    current = checkpoints[0] if checkpoints else None
+
+    logger.info("gtfs_sync_status_fetched",
+               checkpoints=len(checkpoints),
+               status=current["status"] if current else None)
+
+    return {
+        "data": {
+            "current": current,
+            "checkpoints": checkpoints
+        },
+        "meta": {}
+    }
@@ -4,6 +4,8 @@ Uses Pydantic Settings for validation and type safety.
 Required variables must be present in .env.local or environment.
 """
 
+from typing import Dict, Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import HttpUrl, Field
 
@@ -15,6 +17,7 @@ class Settings(BaseSettings):
     SUPABASE_URL: HttpUrl = Field(..., description="Supabase project URL")
     SUPABASE_ANON_KEY: str = Field(..., min_length=1)
     SUPABASE_SERVICE_KEY: str = Field(..., min_length=1)
+    DATABASE_URL: Optional[str] = Field(default=None, description="Direct Postgres connection string (COPY loader backend)")
 
     # Redis
     REDIS_URL: str = Field(..., description="Redis connection URL (Railway public URL)")
@@ -27,6 +30,38 @@ class Settings(BaseSettings):
     SERVER_PORT: int = Field(default=8000)
     LOG_LEVEL: str = Field(default="INFO")
 
+    # GTFS static sync
+    GTFS_CONDITIONAL_DOWNLOADS: bool = Field(default=True, description="Send ETag/Last-Modified conditional requests and skip unchanged feeds")
+    GTFS_DOWNLOAD_CONCURRENCY: int = Field(default=4, ge=1, description="Feeds downloaded in parallel over one pooled session")
+    GTFS_DOWNLOAD_RATE_PER_SEC: float = Field(default=4.0, gt=0, le=5, description="Request starts per second across all download workers (NSW limit: 5)")
+    GTFS_INCREMENTAL_SYNC: bool = Field(default=True, description="Write only rows changed since the previous load snapshot")
+    GTFS_SYNC_CHECKPOINTS: bool = Field(default=True, description="Persist parse output and per-batch load progress so an interrupted sync resumes")
+    GTFS_SHADOW_LOAD: bool = Field(default=False, description="Bulk-load into gtfs_staging, validate, then atomically swap into public")
+    GTFS_SHADOW_DEFER_INDEXES: bool = Field(default=True, description="Build staging indexes/FKs after bulk load instead of before")
+    GTFS_LOADER_BACKEND: Literal["postgrest", "copy"] = Field(default="postgrest", description="postgrest = JSON batch upserts, copy = Postgres COPY FROM STDIN")
+    GTFS_LOAD_PARALLELISM: int = Field(default=4, ge=1, description="Concurrent PostgREST batches per table")
+    GTFS_LOAD_TABLE_PARALLELISM: Dict[str, int] = Field(default_factory=dict, description='Per-table overrides, JSON e.g. {"pattern_stops": 8}')
+    GTFS_LOAD_MAX_RETRIES: int = Field(default=5, ge=0, description="Retries per batch for transient write failures")
+    GTFS_IOS_DB_IN_SYNC: bool = Field(default=True, description="Generate the iOS gtfs.db from the parse output at the end of each static sync")
+    GTFS_IOS_STOP_DEPARTURES: bool = Field(default=False, description="Add the precomputed stop_departures table to the iOS gtfs.db")
+    GTFS_IOS_PACKS: bool = Field(default=False, description="Also split each iOS gtfs.db into a core pack and per-mode packs (var/data/packs) for partial downloads")
+    GTFS_IOS_INSERT_CHUNK_ROWS: int = Field(default=10000, ge=1, description="Rows per executemany chunk while streaming tables into the iOS gtfs.db (bounds generator memory)")
+    GTFS_QUERY_GATE: bool = Field(default=True, description="Benchmark the app's offline queries on each new gtfs.db against the bundle it replaces; fail generation on regressions")
+    GTFS_QUERY_GATE_MAX_REGRESSION: float = Field(default=0.5, gt=0, description="Allowed p50/p99 growth per offline query, as a fraction of the previous bundle's")
+    GTFS_QUERY_GATE_MIN_MS: float = Field(default=2.0, ge=0, description="Latency growth (ms) below which an offline query never counts as regressed")
+    GTFS_QUERY_GATE_SAMPLES: int = Field(default=20, ge=1, description="Stops/trips sampled per offline query in the gate")
+    GTFS_EXPORT_PAGE_SIZE: int = Field(default=1000, ge=1, le=1000, description="Rows per keyset page when the iOS generator exports tables from Supabase (PostgREST max-rows)")
+    GTFS_EXPORT_PARALLELISM: int = Field(default=4, ge=1, le=16, description="Key ranges of one table exported concurrently for the iOS generator")
+    GTFS_BUNDLE_VERSIONS_KEEP: int = Field(default=5, ge=1, description="iOS bundle versions archived under var/data/versions; clients on any of them get a delta")
+    GTFS_DELTA_MAX_RATIO: float = Field(default=0.5, gt=0, le=1, description="Largest bundle delta served, as a share of the full gtfs.db size (larger → full download)")
+    GTFS_ARCHIVE_KEEP: int = Field(default=3, ge=1, description="Archived table versions kept for rollback after a shadow swap")
+    GTFS_FREQUENCY_COMPRESSION: bool = Field(default=False, description="Store constant-headway trip runs as trip_frequencies blocks (needs migration 20251127090000)")
+    GTFS_TRIP_OFFSET_DELTAS: bool = Field(default=False, description="Store per-trip offset deltas against pattern median offsets (needs migration 20251128090000)")
+    GTFS_STREAMING_STOP_TIMES: bool = Field(default=True, description="Aggregate stop_times.txt in chunks instead of loading it whole")
+    GTFS_STOP_TIMES_CHUNK_ROWS: int = Field(default=250_000, ge=1000, description="Rows per stop_times.txt read in streaming mode")
+    GTFS_PARSE_MEMORY_BUDGET_MB: int = Field(default=768, ge=64, description="RSS target while streaming stop_times; chunks shrink above it")
+    GTFS_PROFILE_CAPTURE: Literal["off", "tracemalloc", "cprofile"] = Field(default="off", description="Optional static sync profile capture written to var/profiles/")
+
     model_config = SettingsConfigDict(
         env_file=".env.local",
         env_file_encoding="utf-8",
@@ -0,0 +1,11 @@
+import psycopg
+from app.config import settings
+
+def get_postgres_connection() -> psycopg.Connection:
+    """Open a direct Postgres connection (COPY bulk loads; bypasses PostgREST).
+
+    Not a singleton: bulk loads own their connection and close it when done.
+    """
+    if not settings.DATABASE_URL:
+        raise ValueError("DATABASE_URL must be set for the COPY loader backend")
+    return psycopg.connect(settings.DATABASE_URL, autocommit=False)
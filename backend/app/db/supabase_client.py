@@ -1,8 +1,13 @@
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from app.config import settings
 
-# Global singleton
+# Global singletons
 _supabase_client: Client | None = None
+_supabase_staging_client: Client | None = None
+
+# Shadow-load staging schema (must be exposed in Supabase API settings)
+STAGING_SCHEMA = "gtfs_staging"
 
 def get_supabase() -> Client:
     """Get Supabase client singleton (for FastAPI Depends())"""
@@ -14,6 +19,17 @@ def get_supabase() -> Client:
         )
     return _supabase_client
 
+def get_supabase_staging() -> Client:
+    """Get Supabase client bound to the gtfs_staging schema (shadow loads only)"""
+    global _supabase_staging_client
+    if _supabase_staging_client is None:
+        _supabase_staging_client = create_client(
+            supabase_url=str(settings.SUPABASE_URL),
+            supabase_key=settings.SUPABASE_SERVICE_KEY,
+            options=ClientOptions(schema=STAGING_SCHEMA)
+        )
+    return _supabase_staging_client
+
 async def test_supabase_connection() -> bool:
     """Test Supabase connection (call during startup)"""
     try:
@@ -0,0 +1,270 @@
+"""Bounded-concurrency PostgREST batch writer for GTFS static loads.
+
+Writes one table's rows through the Supabase client with:
+- Up to N batches in flight (per-table parallelism, GTFS_LOAD_PARALLELISM / _TABLE_PARALLELISM)
+- Retries for transient failures (timeouts, connection resets, 5xx/429, serialization
+  failures, deadlocks) with full-jitter exponential backoff. Plain inserts (shadow
+  staging) are not idempotent: a batch that timed out may have committed, so they are
+  only retried on errors that guarantee it was not applied (is_unapplied_error)
+- Adaptive batch size: initial size from payload bytes per row, then grown/shrunk based on
+  observed request latency
+
+Tables are still written one at a time by the caller (LOAD_ORDER), so FK order holds:
+every batch of a parent table completes before any batch of a child table starts.
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from postgrest.exceptions import APIError
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Batch sizing bounds (rows). PostgREST handles ~1000-row JSON batches comfortably.
+MIN_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 5000
+DEFAULT_BATCH_SIZE = 1000
+
+# Target request payload and latency used to adapt batch size
+TARGET_PAYLOAD_BYTES = 1024 * 1024  # 1MB
+TARGET_LATENCY_MS = 2000
+
+# Retry policy
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+
+# PostgREST/Postgres error codes worth retrying (connection, overload, lock conflicts)
+TRANSIENT_ERROR_CODES = {
+    "40001",     # serialization_failure
+    "40P01",     # deadlock_detected
+    "57014",     # query_canceled (statement timeout)
+    "53300",     # too_many_connections
+    "08000", "08001", "08003", "08006",  # connection exceptions
+    "PGRST000", "PGRST001", "PGRST002",  # PostgREST cannot reach / lost DB connection
+    "429", "500", "502", "503", "504",
+}
+
+# Transient codes where the batch was not applied (rolled back, or never reached
+# Postgres); the only failures plain inserts are retried on
+UNAPPLIED_ERROR_CODES = {
+    "40001",     # serialization_failure (transaction rolled back)
+    "40P01",     # deadlock_detected (transaction rolled back)
+    "57014",     # query_canceled (statement timeout; transaction rolled back)
+    "53300",     # too_many_connections
+    "08001", "08004",  # could not establish connection / connection rejected
+    "PGRST000", "PGRST001", "PGRST002",  # PostgREST cannot reach the DB / schema cache
+    "429",
+}
+
+
+class BatchWriteError(Exception):
+    """Raised when a batch still fails after all retries."""
+
+
+def write_batches(
+    client,
+    table_name: str,
+    rows: List[Dict[str, Any]],
+    upsert: bool = True,
+    parallelism: int = 1,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    initial_batch_size: int = DEFAULT_BATCH_SIZE,
+    on_batch_committed: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """Write rows in concurrent, retried, adaptively-sized batches.
+
+    Args:
+        client: Supabase client (live or staging schema)
+        table_name: Target table
+        rows: Cleaned rows (consistent keys)
+        upsert: Use upsert (ON CONFLICT merge) instead of insert
+        parallelism: Max batches in flight
+        max_retries: Retries per batch for transient failures (plain inserts: only
+                     failures that leave the batch unapplied, see is_unapplied_error)
+        initial_batch_size: Upper bound for the first batch size
+        on_batch_committed: Called with (row offset, row count) after each batch commits
+                            (from worker threads; used for resumable-sync checkpoints)
+
+    Returns:
+        Dict with rows_written, batches, retries, final_batch_size, avg_latency_ms,
+        write_ms, rows_per_sec, parallelism
+
+    Raises:
+        BatchWriteError: If a batch fails permanently (in-flight batches are drained first)
+    """
+    start_time = time.time()
+    total_rows = len(rows)
+    parallelism = max(1, parallelism)
+    sizer = _BatchSizer(_initial_batch_size(rows, initial_batch_size))
+
+    state = {"rows_written": 0, "batches": 0, "retries": 0, "latency_ms_total": 0}
+    lock = threading.Lock()
+    retryable = is_transient_error if upsert else is_unapplied_error
+
+    def send(batch_num: int, offset: int, batch: List[Dict[str, Any]]) -> None:
+        attempt = 0
+        while True:
+            request_start = time.time()
+            try:
+                query = client.table(table_name)
+                query = query.upsert(batch) if upsert else query.insert(batch)
+                query.execute()
+            except Exception as e:
+                if attempt >= max_retries or not retryable(e):
+                    logger.error(
+                        "gtfs_batch_insert_failed",
+                        table=table_name,
+                        batch_num=batch_num,
+                        batch_size=len(batch),
+                        attempts=attempt + 1,
+                        error=str(e),
+                        error_type=type(e).__name__
+                    )
+                    raise BatchWriteError(
+                        f"{table_name} batch {batch_num} failed after {attempt + 1} attempts: {e}"
+                    ) from e
+
+                attempt += 1
+                sizer.on_failure()
+                delay = backoff_delay(attempt)
+                with lock:
+                    state["retries"] += 1
+                logger.warning(
+                    "gtfs_batch_retry",
+                    table=table_name,
+                    batch_num=batch_num,
+                    attempt=attempt,
+                    delay_ms=int(delay * 1000),
+                    error=str(e),
+                    error_type=type(e).__name__
+                )
+                time.sleep(delay)
+                continue
+
+            latency_ms = int((time.time() - request_start) * 1000)
+            sizer.on_success(latency_ms)
+            with lock:
+                state["rows_written"] += len(batch)
+                state["batches"] += 1
+                state["latency_ms_total"] += latency_ms
+                progress = state["rows_written"]
+
+            if on_batch_committed is not None:
+                on_batch_committed(offset, len(batch))
+
+            logger.info(
+                "gtfs_batch_inserted",
+                table=table_name,
+                batch_num=batch_num,
+                batch_size=len(batch),
+                latency_ms=latency_ms,
+                total_progress=progress,
+                progress_pct=round(progress / total_rows * 100, 1) if total_rows else 100.0
+            )
+            return
+
+    offset = 0
+    batch_num = 0
+    in_flight = set()
+    failure = None
+
+    with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix=f"gtfs-{table_name}") as executor:
+        while (offset < total_rows and failure is None) or in_flight:
+            while offset < total_rows and failure is None and len(in_flight) < parallelism:
+                size = sizer.size
+                in_flight.add(executor.submit(send, batch_num, offset, rows[offset:offset + size]))
+                offset += size
+                batch_num += 1
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None and failure is None:
+                    failure = error
+
+    if failure is not None:
+        raise failure
+
+    write_ms = int((time.time() - start_time) * 1000)
+    batches = state["batches"]
+
+    return {
+        "rows_written": state["rows_written"],
+        "batches": batches,
+        "retries": state["retries"],
+        "final_batch_size": sizer.size,
+        "avg_latency_ms": int(state["latency_ms_total"] / batches) if batches else 0,
+        "parallelism": parallelism,
+        "write_ms": write_ms,
+        "rows_per_sec": int(state["rows_written"] / (write_ms / 1000)) if write_ms > 0 else state["rows_written"],
+    }
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Classify an exception from a PostgREST write as retryable."""
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+    if isinstance(error, APIError):
+        return str(error.code) in TRANSIENT_ERROR_CODES
+    return False
+
+
+def is_unapplied_error(error: Exception) -> bool:
+    """Classify a PostgREST write failure as retryable without risking a duplicate write.
+
+    Timeouts and dropped connections after the request was sent are excluded: the batch
+    may have committed before the response was lost.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, APIError):
+        return str(error.code) in UNAPPLIED_ERROR_CODES
+    return False
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^(attempt-1)))."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+    return random.uniform(0, ceiling)
+
+
+def _initial_batch_size(rows: List[Dict[str, Any]], upper_bound: int) -> int:
+    """Pick a starting batch size that keeps the JSON payload near TARGET_PAYLOAD_BYTES."""
+    if not rows:
+        return upper_bound
+    sample = rows[:min(len(rows), 200)]
+    bytes_per_row = max(1, len(json.dumps(sample, default=str)) // len(sample))
+    by_payload = TARGET_PAYLOAD_BYTES // bytes_per_row
+    return max(MIN_BATCH_SIZE, min(upper_bound, MAX_BATCH_SIZE, by_payload))
+
+
+class _BatchSizer:
+    """Thread-safe adaptive batch size (AIMD-style on request latency)."""
+
+    def __init__(self, initial: int):
+        self._size = initial
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        with self._lock:
+            return self._size
+
+    def on_success(self, latency_ms: int) -> None:
+        with self._lock:
+            if latency_ms > TARGET_LATENCY_MS:
+                self._size = max(MIN_BATCH_SIZE, self._size // 2)
+            elif latency_ms < TARGET_LATENCY_MS // 2:
+                self._size = min(MAX_BATCH_SIZE, int(self._size * 1.25))
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self._size = max(MIN_BATCH_SIZE, self._size // 2)
@@ -0,0 +1,416 @@
+"""Resumable GTFS static sync checkpoints.
+
+A checkpoint belongs to one set of downloaded feeds: its key is derived from the per-mode
+ZIP SHA-256s in the download manifest, so a rerun against the same feeds finds it and a
+new feed version starts a fresh one. Layout (var/data/gtfs-checkpoints/<key>/):
+
+- state.json: stages completed (parse, shadow prepare/swap, ...) and per-table progress
+  (rows total, committed row ranges, batches committed, deletes applied)
+- parsed.json.gz: parse stage output, so a resumed run skips parsing
+
+Tables are written from a deterministic row order (same parse output, same snapshot
+diff), so committed row ranges identify exactly which rows are in the database. Batches
+commit out of order under parallel writes; a resume restarts from the end of the
+contiguous committed prefix (the watermark). Rows past it may be written twice, which is
+harmless for upserts; shadow loads (plain inserts) reload a partial table instead.
+
+Usage:
+    checkpoint = SyncCheckpoint.open(feed_hashes(manifest), load_mode="incremental")
+    data = checkpoint.load_parse_output() or parse_gtfs(...)
+    skip = checkpoint.start_table("trips", len(rows))
+    write_batches(..., rows[skip:], on_batch_committed=checkpoint.batch_callback("trips", skip))
+    checkpoint.complete_table("trips")
+    checkpoint.finish()
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils.logging import VAR_DIR, get_logger
+
+logger = get_logger(__name__)
+
+CHECKPOINT_DIR = VAR_DIR / "data" / "gtfs-checkpoints"
+STATE_FILENAME = "state.json"
+PARSE_OUTPUT_FILENAME = "parsed.json.gz"
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+# Checkpoint key digest size (hex chars)
+CHECKPOINT_KEY_LENGTH = 16
+
+# Parse output fields held as tuples (SMALLINT[] columns, see gtfs_offset_deltas); JSON
+# returns them as lists, which the loaders would encode as JSONB
+TUPLE_FIELDS = {"trips": ["offset_deltas"], "trip_frequencies": ["offset_deltas"]}
+
+
+def checkpoint_key(feeds: Dict[str, Optional[str]]) -> str:
+    """Derive the checkpoint key from per-mode feed hashes.
+
+    Args:
+        feeds: mode → ZIP SHA-256 (see nsw_gtfs_downloader.feed_hashes)
+
+    Returns:
+        Hex digest identifying this set of feeds
+    """
+    canonical = json.dumps(feeds, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:CHECKPOINT_KEY_LENGTH]
+
+
+class SyncCheckpoint:
+    """Stage and per-batch progress of one static sync (thread-safe).
+
+    With persist=False the same bookkeeping happens in memory only, so the pipeline code
+    is identical whether checkpoints are enabled or not.
+    """
+
+    def __init__(self, key: str, feeds: Dict[str, Optional[str]], load_mode: str,
+                 root: Path = CHECKPOINT_DIR, persist: bool = True):
+        self.key = key
+        self.path = Path(root) / key
+        self.persist = persist
+        self._lock = threading.Lock()
+
+        state = self._read_state() if persist else None
+        self.resumed = state is not None and state.get("status") == "in_progress"
+        if not self.resumed:
+            state = _new_state(key, feeds, load_mode)
+        elif state.get("load_mode") != load_mode:
+            # Parse output is still valid; table progress belongs to a different write path
+            logger.info("gtfs_checkpoint_mode_changed", key=key, previous=state.get("load_mode"), load_mode=load_mode)
+            state["load_mode"] = load_mode
+            state["tables"] = {}
+            state["stages"] = {k: v for k, v in state["stages"].items() if k == "parse"}
+        self.state = state
+
+        if self.resumed:
+            logger.info(
+                "gtfs_checkpoint_resumed",
+                key=key,
+                stages=sorted(state["stages"]),
+                tables_complete=[t for t, p in state["tables"].items() if p.get("complete")]
+            )
+
+    @classmethod
+    def open(cls, feeds: Dict[str, Optional[str]], load_mode: str,
+             root: Path = CHECKPOINT_DIR, persist: bool = True) -> "SyncCheckpoint":
+        """Open (or start) the checkpoint for these feeds.
+
+        Args:
+            feeds: mode → ZIP SHA-256 of the downloaded feeds
+            load_mode: "full", "incremental" or "shadow"; progress from another mode is dropped
+            root: Checkpoint directory (default: var/data/gtfs-checkpoints)
+            persist: Write state to disk (False: in-memory bookkeeping only)
+        """
+        return cls(checkpoint_key(feeds), feeds, load_mode, root=root, persist=persist)
+
+    # Stages
+
+    def stage_done(self, name: str) -> bool:
+        return name in self.state["stages"]
+
+    def stage_info(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.state["stages"].get(name)
+
+    def complete_stage(self, name: str, **info: Any) -> None:
+        with self._lock:
+            self.state["stages"][name] = dict(info, completed_at=_now())
+            self._save()
+
+    def save_parse_output(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        """Persist the parse stage output and mark the stage complete."""
+        if self.persist:
+            self.path.mkdir(parents=True, exist_ok=True)
+            output_path = self.path / PARSE_OUTPUT_FILENAME
+            tmp_path = output_path.with_suffix(".tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(data, f, separators=(",", ":"), default=_json_default)
+            os.replace(tmp_path, output_path)
+        self.complete_stage("parse", rows={table: len(rows) for table, rows in data.items() if rows is not None})
+
+    def load_parse_output(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Parse output saved by an interrupted run with the same feeds, if any."""
+        output_path = self.path / PARSE_OUTPUT_FILENAME
+        if not self.persist or not self.stage_done("parse") or not output_path.exists():
+            return None
+        try:
+            with gzip.open(output_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("gtfs_checkpoint_parse_output_unreadable", key=self.key, error=str(e))
+            return None
+        _restore_tuples(data)
+        logger.info("gtfs_checkpoint_parse_output_loaded", key=self.key, tables=len(data))
+        return data
+
+    # Tables
+
+    def table_progress(self, table_name: str) -> Dict[str, Any]:
+        return self.state["tables"].get(table_name, {})
+
+    def table_complete(self, table_name: str) -> bool:
+        return bool(self.table_progress(table_name).get("complete"))
+
+    def start_table(self, table_name: str, rows_total: int) -> int:
+        """Begin (or resume) writing a table.
+
+        Args:
+            table_name: Table being written
+            rows_total: Rows this run will write to it (upserts or staging inserts)
+
+        Returns:
+            Rows to skip: rows_total if the table is complete, else the committed watermark
+            (0 when the recorded progress was for a different row count)
+        """
+        with self._lock:
+            progress = self.state["tables"].get(table_name)
+            if progress is None or progress["rows_total"] != rows_total:
+                if progress is not None:
+                    logger.warning(
+                        "gtfs_checkpoint_table_reset",
+                        table=table_name,
+                        recorded_rows=progress["rows_total"],
+                        rows_total=rows_total
+                    )
+                progress = {
+                    "rows_total": rows_total,
+                    "committed": [],
+                    "batches_committed": 0,
+                    "complete": False,
+                    "deletes_applied": False,
+                }
+                self.state["tables"][table_name] = progress
+                self._save()
+
+            if progress["complete"]:
+                return rows_total
+            return _watermark(progress["committed"])
+
+    def reset_table(self, table_name: str) -> None:
+        """Forget a table's committed batches (it is being reloaded from scratch)."""
+        with self._lock:
+            progress = self.state["tables"].get(table_name)
+            if progress is not None:
+                progress.update(committed=[], batches_committed=0, complete=False)
+                self._save()
+
+    def batch_committed(self, table_name: str, offset: int, count: int) -> None:
+        """Record rows [offset, offset + count) of a table as committed."""
+        with self._lock:
+            progress = self.state["tables"][table_name]
+            progress["committed"] = _merge_range(progress["committed"], offset, offset + count)
+            progress["batches_committed"] += 1
+            self._save()
+
+    def batch_callback(self, table_name: str, base_offset: int = 0) -> Callable[[int, int], None]:
+        """on_batch_committed callback for a write that starts at base_offset."""
+        def committed(offset: int, count: int) -> None:
+            self.batch_committed(table_name, base_offset + offset, count)
+        return committed
+
+    def complete_table(self, table_name: str) -> None:
+        with self._lock:
+            progress = self.state["tables"][table_name]
+            progress["complete"] = True
+            progress["committed"] = [[0, progress["rows_total"]]] if progress["rows_total"] else []
+            self._save()
+
+    def deletes_applied(self, table_name: str) -> bool:
+        return bool(self.table_progress(table_name).get("deletes_applied"))
+
+    def complete_deletes(self, table_name: str) -> None:
+        with self._lock:
+            self.state["tables"][table_name]["deletes_applied"] = True
+            self._save()
+
+    def reset_load(self) -> None:
+        """Drop load progress (tables and load stages), keeping the parse output."""
+        with self._lock:
+            self.state["tables"] = {}
+            self.state["stages"] = {k: v for k, v in self.state["stages"].items() if k == "parse"}
+            self._save()
+
+    # Lifecycle
+
+    def finish(self, **info: Any) -> None:
+        """Mark the sync complete and drop the stage outputs (state is kept for status)."""
+        with self._lock:
+            self.state["status"] = "complete"
+            self.state["finished_at"] = _now()
+            self.state.update(info)
+            self._save()
+        if self.persist:
+            (self.path / PARSE_OUTPUT_FILENAME).unlink(missing_ok=True)
+            prune_checkpoints(keep=self.key, root=self.path.parent)
+        logger.info("gtfs_checkpoint_finished", key=self.key)
+
+    def fail(self, error: str) -> None:
+        """Record the failure; progress stays resumable."""
+        with self._lock:
+            self.state["last_error"] = error
+            self.state["failed_at"] = _now()
+            self._save()
+
+    def summary(self) -> Dict[str, Any]:
+        """Status view of this checkpoint (see checkpoint_status)."""
+        with self._lock:
+            return _summarize(self.state)
+
+    def _read_state(self) -> Optional[Dict[str, Any]]:
+        state_path = self.path / STATE_FILENAME
+        if not state_path.exists():
+            return None
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("gtfs_checkpoint_unreadable", key=self.key, error=str(e))
+            return None
+        if state.get("format_version") != CHECKPOINT_FORMAT_VERSION:
+            return None
+        return state
+
+    def _save(self) -> None:
+        """Write state.json atomically (caller holds the lock)."""
+        if not self.persist:
+            return
+        self.state["updated_at"] = _now()
+        self.path.mkdir(parents=True, exist_ok=True)
+        state_path = self.path / STATE_FILENAME
+        tmp_path = state_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, separators=(",", ":"))
+        os.replace(tmp_path, state_path)
+
+
+def checkpoint_status(root: Path = CHECKPOINT_DIR) -> List[Dict[str, Any]]:
+    """Summaries of all checkpoints on disk, most recently updated first.
+
+    Args:
+        root: Checkpoint directory (default: var/data/gtfs-checkpoints)
+
+    Returns:
+        List of dicts with key, status, load_mode, feeds, stages, tables (per-table
+        rows_total, rows_committed, batches_committed, complete, deletes_applied),
+        updated_at, last_error
+    """
+    root = Path(root)
+    if not root.exists():
+        return []
+
+    summaries = []
+    for state_path in root.glob(f"*/{STATE_FILENAME}"):
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summaries.append(_summarize(state))
+    return sorted(summaries, key=lambda s: s.get("updated_at") or "", reverse=True)
+
+
+def prune_checkpoints(keep: Optional[str] = None, root: Path = CHECKPOINT_DIR) -> List[str]:
+    """Delete every checkpoint directory except `keep`.
+
+    Returns:
+        Keys removed
+    """
+    root = Path(root)
+    if not root.exists():
+        return []
+    removed = []
+    for path in root.iterdir():
+        if path.is_dir() and path.name != keep:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path.name)
+    if removed:
+        logger.info("gtfs_checkpoints_pruned", removed=removed)
+    return removed
+
+
+def _new_state(key: str, feeds: Dict[str, Optional[str]], load_mode: str) -> Dict[str, Any]:
+    return {
+        "format_version": CHECKPOINT_FORMAT_VERSION,
+        "key": key,
+        "feeds": feeds,
+        "load_mode": load_mode,
+        "status": "in_progress",
+        "created_at": _now(),
+        "updated_at": None,
+        "stages": {},
+        "tables": {},
+    }
+
+
+def _summarize(state: Dict[str, Any]) -> Dict[str, Any]:
+    tables = {}
+    for table_name, progress in state.get("tables", {}).items():
+        committed = progress.get("committed", [])
+        tables[table_name] = {
+            "rows_total": progress.get("rows_total", 0),
+            "rows_committed": sum(end - start for start, end in committed),
+            "resume_offset": _watermark(committed),
+            "batches_committed": progress.get("batches_committed", 0),
+            "complete": progress.get("complete", False),
+            "deletes_applied": progress.get("deletes_applied", False),
+        }
+    return {
+        "key": state.get("key"),
+        "status": state.get("status"),
+        "load_mode": state.get("load_mode"),
+        "feeds": state.get("feeds", {}),
+        "stages": sorted(state.get("stages", {})),
+        "tables": tables,
+        "created_at": state.get("created_at"),
+        "updated_at": state.get("updated_at"),
+        "finished_at": state.get("finished_at"),
+        "last_error": state.get("last_error"),
+    }
+
+
+def _merge_range(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Insert [start, end) into sorted, non-overlapping ranges, merging neighbours."""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def _watermark(ranges: List[List[int]]) -> int:
+    """End of the committed prefix [0, n)."""
+    if ranges and ranges[0][0] == 0:
+        return ranges[0][1]
+    return 0
+
+
+def _restore_tuples(data: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Turn TUPLE_FIELDS lists back into (interned) tuples, in place."""
+    interned = {}
+    for table, fields in TUPLE_FIELDS.items():
+        for row in data.get(table) or []:
+            for field in fields:
+                value = row.get(field)
+                if isinstance(value, list):
+                    value = tuple(value)
+                    row[field] = interned.setdefault(value, value)
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars from pandas records
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,209 @@
+"""Postgres COPY bulk loader for GTFS static tables.
+
+Alternative to PostgREST JSON batch upserts (GTFS_LOADER_BACKEND=copy). Streams each table
+to Postgres with COPY FROM STDIN (CSV), encoding rows chunk by chunk instead of building
+JSON payloads.
+
+Write modes:
+- upsert=True: COPY into a temp table, then INSERT ... SELECT ... ON CONFLICT (pk) DO UPDATE
+  (live tables; same semantics as the PostgREST upsert path)
+- upsert=False: COPY straight into the target (empty gtfs_staging tables in shadow loads)
+
+Accepts DataFrames (to_csv per chunk) or iterables of dicts (csv.writer per row).
+"""
+
+import csv
+import io
+import json
+import math
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rows encoded per COPY write (bounds the CSV buffer held in memory)
+COPY_CHUNK_ROWS = 50_000
+
+# NULL marker for COPY CSV; keeps NULL distinct from empty string (trip_headsign = '')
+NULL_MARKER = "\\N"
+
+
+def copy_table(
+    conn,
+    table_name: str,
+    rows: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+    columns: List[str],
+    pk_columns: Optional[List[str]] = None,
+    schema: str = "public",
+    upsert: bool = True
+) -> Dict[str, Any]:
+    """Stream one table to Postgres with COPY FROM STDIN.
+
+    Commits on success, rolls back on failure.
+
+    Args:
+        conn: psycopg connection (see app.db.postgres_client.get_postgres_connection)
+        table_name: Target table
+        rows: DataFrame or iterable of row dicts
+        columns: Columns to load (in COPY order)
+        pk_columns: Primary key columns (required when upsert=True)
+        schema: Target schema (public, or gtfs_staging for shadow loads)
+        upsert: Merge via temp table + ON CONFLICT instead of plain COPY
+
+    Returns:
+        Dict with rows, bytes, duration_ms, rows_per_sec
+
+    Raises:
+        ValueError: If upsert requested without pk_columns
+    """
+    if upsert and not pk_columns:
+        raise ValueError(f"copy_table({table_name}): upsert requires pk_columns")
+
+    start_time = time.time()
+    target = f"{_ident(schema)}.{_ident(table_name)}"
+    column_list = ", ".join(_ident(c) for c in columns)
+    copy_target = _ident(f"_copy_{table_name}") if upsert else target
+
+    total_rows = 0
+    total_bytes = 0
+
+    try:
+        with conn.cursor() as cur:
+            if upsert:
+                cur.execute(
+                    f"CREATE TEMP TABLE {copy_target} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+
+            copy_sql = f"COPY {copy_target} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')"
+            with cur.copy(copy_sql) as copy:
+                for chunk, chunk_rows in _iter_csv_chunks(rows, columns):
+                    payload = chunk.encode("utf-8")
+                    copy.write(payload)
+                    total_rows += chunk_rows
+                    total_bytes += len(payload)
+
+            if upsert:
+                cur.execute(_merge_sql(target, copy_target, columns, pk_columns))
+
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.error(
+            "gtfs_copy_failed",
+            table=table_name,
+            schema=schema,
+            rows_sent=total_rows,
+            error=str(e),
+            error_type=type(e).__name__
+        )
+        raise
+
+    duration_ms = int((time.time() - start_time) * 1000)
+    rows_per_sec = int(total_rows / (duration_ms / 1000)) if duration_ms > 0 else total_rows
+
+    logger.info(
+        "gtfs_copy_complete",
+        table=table_name,
+        schema=schema,
+        rows=total_rows,
+        size_mb=round(total_bytes / 1024 / 1024, 2),
+        duration_ms=duration_ms,
+        rows_per_sec=rows_per_sec
+    )
+
+    return {
+        "rows": total_rows,
+        "bytes": total_bytes,
+        "duration_ms": duration_ms,
+        "rows_per_sec": rows_per_sec,
+    }
+
+
+def _merge_sql(target: str, source: str, columns: List[str], pk_columns: List[str]) -> str:
+    """Build INSERT ... SELECT ... ON CONFLICT merge from the temp table into the target."""
+    column_list = ", ".join(_ident(c) for c in columns)
+    conflict_list = ", ".join(_ident(c) for c in pk_columns)
+    update_cols = [c for c in columns if c not in pk_columns]
+
+    if update_cols:
+        assignments = ", ".join(f"{_ident(c)} = EXCLUDED.{_ident(c)}" for c in update_cols)
+        conflict_action = f"DO UPDATE SET {assignments}"
+    else:
+        conflict_action = "DO NOTHING"
+
+    return (
+        f"INSERT INTO {target} ({column_list}) "
+        f"SELECT {column_list} FROM {source} "
+        f"ON CONFLICT ({conflict_list}) {conflict_action}"
+    )
+
+
+def _iter_csv_chunks(
+    rows: Union[pd.DataFrame, Iterable[Dict[str, Any]]],
+    columns: List[str]
+) -> Iterator[tuple]:
+    """Encode rows as COPY CSV text, COPY_CHUNK_ROWS at a time.
+
+    Yields:
+        (csv_text, row_count) tuples
+    """
+    if isinstance(rows, pd.DataFrame):
+        frame = _normalize_frame(rows, columns)
+        for start in range(0, len(frame), COPY_CHUNK_ROWS):
+            chunk = frame.iloc[start:start + COPY_CHUNK_ROWS]
+            yield chunk.to_csv(header=False, index=False, na_rep=NULL_MARKER), len(chunk)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    chunk_rows = 0
+
+    for row in rows:
+        writer.writerow([_csv_value(row.get(c)) for c in columns])
+        chunk_rows += 1
+        if chunk_rows >= COPY_CHUNK_ROWS:
+            yield buffer.getvalue(), chunk_rows
+            buffer.seek(0)
+            buffer.truncate()
+            chunk_rows = 0
+
+    if chunk_rows:
+        yield buffer.getvalue(), chunk_rows
+
+
+def _normalize_frame(frame: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Select COPY columns; render integral float columns (NaN-widened ints) as integers."""
+    frame = frame.reindex(columns=columns)
+    for col in columns:
+        series = frame[col]
+        if pd.api.types.is_float_dtype(series):
+            non_null = series.dropna()
+            if len(non_null) and (non_null == non_null.round()).all():
+                frame[col] = series.astype("Int64")
+    return frame
+
+
+def _csv_value(value: Any) -> Any:
+    """Map a Python value to its COPY CSV representation."""
+    if value is None:
+        return NULL_MARKER
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return NULL_MARKER
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, tuple):  # SMALLINT[] columns (offset_deltas)
+        return "{" + ",".join(str(int(v)) for v in value) + "}"
+    if isinstance(value, (list, dict)):  # JSONB columns (trip_frequencies)
+        return json.dumps(value)
+    if hasattr(value, "item"):  # numpy scalar
+        return value.item()
+    return value
+
+
+def _ident(name: str) -> str:
+    """Quote a SQL identifier."""
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,255 @@
+"""GTFS dataset diffing for incremental static sync.
+
+Compares a freshly parsed (and cleaned) dataset against the snapshot of the previous
+successful load, producing per-table inserts, updates and deletes keyed by primary key.
+
+Snapshot format: one gzipped JSON file holding, per table, {primary key → row hash}.
+Only hashes are stored, so the snapshot stays small even for ~700K pattern_stops rows.
+
+Usage:
+    previous = load_snapshot()
+    diff = diff_table("trips", cleaned_rows, previous["tables"].get("trips"))
+    ...apply diff["upserts"] / diff["deletes"]...
+    save_snapshot(new_hashes, feed_version)
+"""
+
+import gzip
+import json
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+VAR_DIR = Path(os.getenv("VAR_DIR", Path(__file__).resolve().parent.parent.parent / "var")).resolve()
+DEFAULT_SNAPSHOT_PATH = VAR_DIR / "data" / "gtfs-snapshot.json.gz"
+
+# Primary key columns per Supabase table (see schemas/migrations/001_initial_schema.sql)
+TABLE_PRIMARY_KEYS = {
+    "agencies": ["agency_id"],
+    "routes": ["route_id"],
+    "stops": ["stop_id"],
+    "calendar": ["service_id"],
+    "calendar_dates": ["service_id", "date"],
+    "patterns": ["pattern_id"],
+    "pattern_stops": ["pattern_id", "stop_sequence"],
+    "trips": ["trip_id"],
+    "trip_frequencies": ["frequency_id"],
+}
+
+# Separator for composite keys in snapshot (unit separator never appears in GTFS IDs)
+KEY_SEPARATOR = "\x1f"
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def row_key(table_name: str, row: Dict[str, Any]) -> str:
+    """Build the snapshot key for a row from its primary key columns.
+
+    Args:
+        table_name: Supabase table name
+        row: Cleaned row dict
+
+    Returns:
+        Primary key values joined with KEY_SEPARATOR
+    """
+    return KEY_SEPARATOR.join(str(row.get(col)) for col in TABLE_PRIMARY_KEYS[table_name])
+
+
+def split_key(table_name: str, key: str) -> Dict[str, str]:
+    """Inverse of row_key: map a snapshot key back to primary key columns.
+
+    Args:
+        table_name: Supabase table name
+        key: Snapshot key
+
+    Returns:
+        Dict of primary key column → value (as text)
+    """
+    return dict(zip(TABLE_PRIMARY_KEYS[table_name], key.split(KEY_SEPARATOR)))
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    """Hash a cleaned row's full content (order-independent on keys).
+
+    Args:
+        row: Cleaned row dict
+
+    Returns:
+        16-char hex digest
+    """
+    payload = json.dumps(row, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def hash_table(table_name: str, rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Hash every row of a table keyed by primary key.
+
+    Args:
+        table_name: Supabase table name
+        rows: Cleaned rows
+
+    Returns:
+        Dict of primary key → row hash
+    """
+    return {row_key(table_name, row): row_hash(row) for row in rows}
+
+
+def diff_table(
+    table_name: str,
+    rows: List[Dict[str, Any]],
+    previous_hashes: Optional[Dict[str, str]]
+) -> Dict[str, Any]:
+    """Compute the delta between new rows and the previous snapshot of a table.
+
+    With no previous snapshot, every row is treated as an insert and nothing is deleted.
+
+    Args:
+        table_name: Supabase table name
+        rows: Cleaned rows for the new dataset
+        previous_hashes: Previous snapshot (primary key → row hash), or None
+
+    Returns:
+        Dict with keys:
+            upserts: rows to insert or update
+            deletes: primary keys (as column dicts) no longer present
+            hashes: new snapshot for this table
+            inserts/updates/unchanged: counts
+    """
+    new_hashes = {}
+    upserts = []
+    inserts = 0
+    updates = 0
+
+    previous_hashes = previous_hashes or {}
+
+    for row in rows:
+        key = row_key(table_name, row)
+        digest = row_hash(row)
+        new_hashes[key] = digest
+
+        old_digest = previous_hashes.get(key)
+        if old_digest is None:
+            inserts += 1
+            upserts.append(row)
+        elif old_digest != digest:
+            updates += 1
+            upserts.append(row)
+
+    deletes = [split_key(table_name, key) for key in previous_hashes.keys() - new_hashes.keys()]
+
+    return {
+        "upserts": upserts,
+        "deletes": deletes,
+        "hashes": new_hashes,
+        "inserts": inserts,
+        "updates": updates,
+        "unchanged": len(new_hashes) - inserts - updates,
+    }
+
+
+def load_snapshot(path: str = str(DEFAULT_SNAPSHOT_PATH)) -> Optional[Dict[str, Any]]:
+    """Load the previous load's snapshot.
+
+    Args:
+        path: Snapshot file path (default: var/data/gtfs-snapshot.json.gz)
+
+    Returns:
+        Dict with keys feed_version, tables (table → {key → hash}), feeds (mode → ZIP SHA-256);
+        None if missing or unreadable
+    """
+    snapshot_path = Path(path)
+    if not snapshot_path.exists():
+        logger.info("gtfs_snapshot_missing", path=path)
+        return None
+
+    try:
+        with gzip.open(snapshot_path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("gtfs_snapshot_unreadable", path=path, error=str(e))
+        return None
+
+    if snapshot.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        logger.warning(
+            "gtfs_snapshot_format_mismatch",
+            path=path,
+            found=snapshot.get("format_version"),
+            expected=SNAPSHOT_FORMAT_VERSION
+        )
+        return None
+
+    logger.info(
+        "gtfs_snapshot_loaded",
+        path=path,
+        feed_version=snapshot.get("feed_version"),
+        tables={t: len(h) for t, h in snapshot.get("tables", {}).items()}
+    )
+    return snapshot
+
+
+def save_snapshot(
+    table_hashes: Dict[str, Dict[str, str]],
+    feed_version: str,
+    path: str = str(DEFAULT_SNAPSHOT_PATH),
+    feed_hashes: Optional[Dict[str, Optional[str]]] = None
+) -> None:
+    """Persist the snapshot of a successful load (atomic write via temp file + rename).
+
+    Args:
+        table_hashes: Table → {primary key → row hash}
+        feed_version: Feed version the snapshot describes
+        path: Snapshot file path
+        feed_hashes: Mode → SHA-256 of the source ZIPs (lets the next sync skip unchanged feeds)
+    """
+    snapshot_path = Path(path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_suffix(snapshot_path.suffix + ".tmp")
+
+    snapshot = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "feed_version": feed_version,
+        "tables": table_hashes,
+        "feeds": feed_hashes or {},
+    }
+
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, snapshot_path)
+
+    logger.info(
+        "gtfs_snapshot_saved",
+        path=str(snapshot_path),
+        feed_version=feed_version,
+        size_mb=round(snapshot_path.stat().st_size / 1024 / 1024, 2)
+    )
+
+
+def group_deletes(table_name: str, deletes: List[Dict[str, str]]) -> List[Tuple[Dict[str, str], str, List[str]]]:
+    """Group primary keys for batched deletes.
+
+    Single-column keys become one group; composite keys are grouped by all but the last
+    column so each group can be deleted with eq(...) filters plus one in_(...) filter.
+
+    Args:
+        table_name: Supabase table name
+        deletes: Primary keys as column dicts
+
+    Returns:
+        List of (eq_filters, in_column, in_values)
+    """
+    pk_cols = TABLE_PRIMARY_KEYS[table_name]
+    last_col = pk_cols[-1]
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+
+    for key in deletes:
+        prefix = tuple(key[col] for col in pk_cols[:-1])
+        groups.setdefault(prefix, []).append(key[last_col])
+
+    return [
+        (dict(zip(pk_cols[:-1], prefix)), last_col, values)
+        for prefix, values in groups.items()
+    ]
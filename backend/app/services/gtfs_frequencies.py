@@ -0,0 +1,187 @@
+"""Headway (frequency) compression of trips within a pattern.
+
+Trips of one pattern that share every attribute except trip_id/start time (service_id,
+headsign, direction, ...) and depart at a constant headway are stored as one frequency
+block instead of one trips row each:
+
+    {"frequency_id": "F…", "pattern_id": ..., "service_id": ..., (shared trip fields),
+     "start_time_secs": 21600, "end_time_secs": 25200, "headway_secs": 600,
+     "trip_ids": ["t1", "t2", ...],           # one per slot, in departure order
+     "exceptions": {"3": 23460}}               # slot → actual start, if off the headway
+
+Slot k departs at start_time_secs + k * headway_secs unless exceptions holds its actual
+start. Exceptions are interior slots shifted by less than half a headway (at most
+MAX_EXCEPTION_SHIFT_SECS), so every departure stays within [start_time_secs,
+end_time_secs] and in slot order. Trips that don't fit a block stay ordinary trips.
+
+Trip IDs are kept (GTFS-RT delays are keyed by trip_id), so expansion is lossless:
+expand_frequencies(compress_trips(trips)["frequencies"]) + remaining trips == trips.
+Readers expand on the fly: the departures SQL (generate_series over the block),
+get_trip_details (frequency_trip) and the iOS generator (expand_frequencies).
+"""
+
+import hashlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Shortest run stored as a block (shorter runs save little over plain rows)
+MIN_FREQUENCY_TRIPS = 4
+
+# Largest shift of an interior trip from its headway slot stored as an exception
+MAX_EXCEPTION_SHIFT_SECS = 180
+
+# Blocks may hold at most this share of exception slots (otherwise not really regular)
+MAX_EXCEPTION_SHARE = 0.25
+
+# Block columns that are not shared trip attributes
+BLOCK_FIELDS = ["frequency_id", "start_time_secs", "end_time_secs", "headway_secs", "trip_ids", "exceptions"]
+
+# Frequency ID digest size (bytes); derived from the block's first trip_id
+FREQUENCY_ID_DIGEST_BYTES = 8
+
+
+def compress_trips(trips: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold constant-headway runs of trips into frequency blocks.
+
+    Args:
+        trips: Trip rows as produced by _extract_patterns (trip_id, pattern_id,
+               service_id, start_time_secs, ...)
+
+    Returns:
+        Dict with trips (rows not in any block, original order), frequencies (blocks)
+        and stats (trips_in, trips_out, blocks, trips_compressed, exceptions)
+    """
+    groups = defaultdict(list)
+    for index, trip in enumerate(trips):
+        groups[_shared_key(trip)].append(index)
+
+    compressed = set()
+    frequencies = []
+    for indexes in groups.values():
+        if len(indexes) < MIN_FREQUENCY_TRIPS:
+            continue
+        ordered = sorted(indexes, key=lambda i: (trips[i]["start_time_secs"], trips[i]["trip_id"]))
+        for run, exceptions, headway in _find_runs([trips[i]["start_time_secs"] for i in ordered]):
+            members = [trips[ordered[i]] for i in run]
+            frequencies.append(_block(members, headway, exceptions))
+            compressed.update(ordered[i] for i in run)
+
+    remaining = [trip for index, trip in enumerate(trips) if index not in compressed]
+    stats = {
+        "trips_in": len(trips),
+        "trips_out": len(remaining),
+        "blocks": len(frequencies),
+        "trips_compressed": len(compressed),
+        "exceptions": sum(len(block["exceptions"]) for block in frequencies),
+    }
+    logger.info("frequency_compression_complete", **stats)
+    return {"trips": remaining, "frequencies": frequencies, "stats": stats}
+
+
+def expand_frequency(block: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Trip rows of one block (shared fields + trip_id + start_time_secs)."""
+    shared = {k: v for k, v in block.items() if k not in BLOCK_FIELDS}
+    exceptions = block.get("exceptions") or {}
+    return [
+        {**shared, "trip_id": trip_id, "start_time_secs": _slot_start(block, slot, exceptions)}
+        for slot, trip_id in enumerate(block["trip_ids"])
+    ]
+
+
+def expand_frequencies(blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Trip rows of all blocks."""
+    return [trip for block in blocks for trip in expand_frequency(block)]
+
+
+def frequency_trip(block: Dict[str, Any], trip_id: str) -> Optional[Dict[str, Any]]:
+    """Trip row of one trip_id in a block (None if the block doesn't hold it)."""
+    try:
+        slot = block["trip_ids"].index(trip_id)
+    except ValueError:
+        return None
+    shared = {k: v for k, v in block.items() if k not in BLOCK_FIELDS}
+    start = _slot_start(block, slot, block.get("exceptions") or {})
+    return {**shared, "trip_id": trip_id, "start_time_secs": start}
+
+
+def _slot_start(block: Dict[str, Any], slot: int, exceptions: Dict[str, int]) -> int:
+    override = exceptions.get(str(slot))
+    if override is not None:
+        return int(override)
+    return int(block["start_time_secs"]) + slot * int(block["headway_secs"])
+
+
+def _shared_key(trip: Dict[str, Any]) -> tuple:
+    """Everything but trip_id/start time; NaN normalized so equal values group."""
+    return tuple(
+        (k, None if _is_missing(v) else v)
+        for k, v in sorted(trip.items())
+        if k not in ("trip_id", "start_time_secs")
+    )
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (not isinstance(value, (list, tuple, dict)) and pd.isna(value))
+
+
+def _find_runs(starts: List[int]):
+    """Yield (slot indexes, exceptions {slot: start}, headway) per block in sorted starts.
+
+    Greedy: the first two trips set the headway; later trips extend the run while they
+    sit on the next slot, or within the exception tolerance of it.
+    """
+    i = 0
+    n = len(starts)
+    while n - i >= MIN_FREQUENCY_TRIPS:
+        headway = starts[i + 1] - starts[i]
+        if headway <= 0:
+            i += 1
+            continue
+
+        tolerance = min(MAX_EXCEPTION_SHIFT_SECS, (headway - 1) // 2)
+        exceptions = {}
+        j = i + 1
+        while j < n:
+            slot = j - i
+            shift = starts[j] - (starts[i] + slot * headway)
+            if shift == 0:
+                j += 1
+            elif abs(shift) <= tolerance:
+                exceptions[slot] = starts[j]
+                j += 1
+            else:
+                break
+
+        # A block ends on a regular slot (end_time_secs bounds every departure)
+        length = j - i
+        while length - 1 in exceptions:
+            del exceptions[length - 1]
+            length -= 1
+
+        if length >= MIN_FREQUENCY_TRIPS and len(exceptions) <= MAX_EXCEPTION_SHARE * length:
+            yield list(range(i, i + length)), exceptions, headway
+            i += length
+        else:
+            i += 1
+
+
+def _block(members: List[Dict[str, Any]], headway: int, exceptions: Dict[int, int]) -> Dict[str, Any]:
+    first = members[0]
+    shared = {k: (None if _is_missing(v) else v) for k, v in first.items() if k not in ("trip_id", "start_time_secs")}
+    digest = hashlib.blake2b(str(first["trip_id"]).encode("utf-8"), digest_size=FREQUENCY_ID_DIGEST_BYTES).hexdigest()
+    start = int(first["start_time_secs"])
+    return {
+        "frequency_id": f"F{digest}",
+        **shared,
+        "start_time_secs": start,
+        "end_time_secs": start + (len(members) - 1) * headway,
+        "headway_secs": int(headway),
+        "trip_ids": [m["trip_id"] for m in members],
+        "exceptions": {str(slot): int(secs) for slot, secs in exceptions.items()},
+    }
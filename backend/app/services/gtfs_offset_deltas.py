@@ -0,0 +1,133 @@
+"""Per-trip offset deltas on top of pattern median offsets.
+
+pattern_stops stores one (median) departure offset per stop of a pattern, so peak trips
+with longer running times get approximate scheduled times. Trips whose departure offsets
+differ from the medians carry a delta per pattern stop (offset_deltas, SMALLINT[] in
+Postgres); trips that match the medians exactly carry NULL:
+
+    exact departure offset = pattern_stops.departure_offset_secs + offset_deltas[stop_index]
+
+stop_index is the 0-based position of the stop in its pattern (ordered by stop_sequence),
+so SQL reads t.offset_deltas[ps.stop_index + 1]. Arrival offsets get the same delta
+(exact whenever the trip dwells like the median trip).
+
+Deltas are int16 (±9h); larger ones are clamped and counted. encode_varint/decode_varint
+give the zigzag-varint form (most deltas fit one byte) for compact binary storage.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+
+
+def trip_departure_offsets(stop_times: pd.DataFrame) -> Dict[str, tuple]:
+    """Departure offsets of every trip, in stop_sequence order.
+
+    Args:
+        stop_times: Sorted by trip_id/stop_sequence (_prepare_stop_times) with a
+                    departure_offset column
+
+    Returns:
+        Dict of trip_id → tuple of int offsets (equal tuples are shared)
+    """
+    interned = {}
+    offsets = {}
+    grouped = stop_times.groupby("trip_id", sort=False)["departure_offset"].agg(tuple)
+    for trip_id, values in grouped.items():
+        values = tuple(int(v) for v in values)
+        offsets[trip_id] = interned.setdefault(values, values)
+    return offsets
+
+
+def attach_offset_deltas(
+    trips: List[Dict[str, Any]],
+    pattern_stops: List[Dict[str, Any]],
+    trip_offsets: Dict[str, Sequence[int]]
+) -> Dict[str, int]:
+    """Set stop_index on pattern_stops and offset_deltas on trips (in place).
+
+    Args:
+        trips: Trip rows with trip_id and pattern_id
+        pattern_stops: Pattern stop rows with departure_offset_secs (medians)
+        trip_offsets: trip_departure_offsets() output (or the streamed equivalent)
+
+    Returns:
+        Stats: trips, trips_with_deltas, delta_values, nonzero_deltas, clamped,
+        mismatched (trips whose stop count differs from their pattern's; left NULL)
+    """
+    medians = {}
+    for ps in sorted(pattern_stops, key=lambda row: (row["pattern_id"], row["stop_sequence"])):
+        pattern_medians = medians.setdefault(ps["pattern_id"], [])
+        ps["stop_index"] = len(pattern_medians)
+        pattern_medians.append(ps["departure_offset_secs"])
+
+    stats = {"trips": len(trips), "trips_with_deltas": 0, "delta_values": 0, "nonzero_deltas": 0, "clamped": 0, "mismatched": 0}
+    interned = {}
+    for trip in trips:
+        trip["offset_deltas"] = None
+        offsets = trip_offsets.get(trip["trip_id"])
+        pattern_medians = medians.get(trip.get("pattern_id"))
+        if offsets is None or pattern_medians is None:
+            continue
+        if len(offsets) != len(pattern_medians):
+            stats["mismatched"] += 1
+            continue
+
+        deltas = [offset - median for offset, median in zip(offsets, pattern_medians)]
+        nonzero = sum(1 for d in deltas if d)
+        if not nonzero:
+            continue
+
+        clamped = tuple(min(INT16_MAX, max(INT16_MIN, d)) for d in deltas)
+        stats["clamped"] += sum(1 for d, c in zip(deltas, clamped) if d != c)
+        trip["offset_deltas"] = interned.setdefault(clamped, clamped)
+        stats["trips_with_deltas"] += 1
+        stats["delta_values"] += len(clamped)
+        stats["nonzero_deltas"] += nonzero
+
+    if stats["clamped"]:
+        logger.warning("offset_deltas_clamped", clamped=stats["clamped"])
+    if stats["mismatched"]:
+        logger.warning("offset_deltas_pattern_mismatch", trips=stats["mismatched"])
+    logger.info("offset_deltas_attached", **stats)
+    return stats
+
+
+def offset_delta(deltas: Optional[Sequence[int]], stop_index: Optional[int]) -> int:
+    """Delta of one pattern stop (0 when the trip runs to the medians)."""
+    if not deltas or stop_index is None or stop_index >= len(deltas):
+        return 0
+    return int(deltas[stop_index])
+
+
+def encode_varint(deltas: Iterable[int]) -> bytes:
+    """Zigzag LEB128 encoding (|delta| < 64 → 1 byte, < 8192 → 2 bytes)."""
+    out = bytearray()
+    for delta in deltas:
+        value = (delta << 1) ^ (delta >> 63)
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data: bytes) -> tuple:
+    """Inverse of encode_varint."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((value >> 1) ^ -(value & 1))
+        value = shift = 0
+    return tuple(values)
@@ -8,16 +8,33 @@ Key operations:
 - Optionally merge additional coverage feeds for stop/route coverage
 - Sydney bbox filtering: lat [-34.5, -33.3], lon [150.5, 151.5]
 - Pattern extraction: trips with same stop_sequence → pattern_id
+- Pattern IDs: content-derived hash of (route, direction, stop sequence), stable across syncs
 - Offset calculation: median arrival/departure offset from trip start
+- Streaming mode: stop_times.txt read in chunks and aggregated per trip (bounded memory),
+  producing the same patterns/pattern_stops/trips as the in-memory path
+- Feed files are read straight from {mode}/gtfs.zip (no extraction); each member's CRC is
+  verified as it is read. Directories holding extracted *.txt files are still supported.
+- Frequency compression (optional): constant-headway runs of trips within a pattern are
+  returned as trip_frequencies blocks instead of trips rows (see gtfs_frequencies)
+- Offset deltas (optional): trips whose departure offsets differ from the pattern medians
+  carry per-stop deltas, so scheduled times stay exact (see gtfs_offset_deltas)
 """
 
+import gc
 import time
+import hashlib
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 import pandas as pd
 import numpy as np
 
+from app.config import settings
+from app.services.gtfs_frequencies import compress_trips
+from app.services.gtfs_offset_deltas import attach_offset_deltas, trip_departure_offsets
 from app.utils.logging import get_logger
+from app.utils.profiling import current_rss_mb, profile_stage
 
 logger = get_logger(__name__)
 
@@ -48,6 +65,22 @@ COVERAGE_EXTRA_DIRS = [
     "regionbuses",
 ]
 
+# Pattern ID digest size (bytes). 8 bytes → 16 hex chars; collision odds are negligible
+# at NSW scale (~30K patterns) and collisions are still detected at extraction time.
+PATTERN_ID_DIGEST_BYTES = 8
+
+# stop_times.txt columns used for pattern extraction (streaming reads only these)
+STOP_TIMES_COLUMNS = ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"]
+
+# Streaming chunk size floor when shrinking chunks to stay under the memory budget
+MIN_STOP_TIMES_CHUNK_ROWS = 10_000
+
+# Partial aggregate rows held before compacting (groupby-sum of offset counts)
+STREAM_COMPACT_ROWS = 1_000_000
+
+# Downloaded archive inside each mode directory (read in place by _FeedFiles)
+FEED_ARCHIVE_NAME = "gtfs.zip"
+
 # Required GTFS files
 REQUIRED_FILES = [
     "agency.txt",
@@ -59,15 +92,28 @@ REQUIRED_FILES = [
 ]
 
 
-def parse_gtfs(gtfs_base_dir: str) -> Dict:
+def parse_gtfs(
+    gtfs_base_dir: str,
+    streaming: Optional[bool] = None,
+    frequency_compression: Optional[bool] = None,
+    offset_deltas: Optional[bool] = None
+) -> Dict:
     """Parse GTFS feeds from multiple mode directories.
 
     Args:
         gtfs_base_dir: Base directory containing mode subdirectories
                       (e.g., 'var/data/gtfs-downloads/')
+        streaming: Aggregate stop_times.txt in chunks instead of loading it whole
+                   (default: settings.GTFS_STREAMING_STOP_TIMES). Falls back to the
+                   in-memory path if a stop_times file is not grouped by trip_id.
+        frequency_compression: Fold constant-headway trip runs into trip_frequencies
+                               blocks (default: settings.GTFS_FREQUENCY_COMPRESSION)
+        offset_deltas: Add stop_index to pattern_stops and offset_deltas to trips
+                       (default: settings.GTFS_TRIP_OFFSET_DELTAS)
 
     Returns:
-        Dict with keys: agencies, routes, stops, patterns, pattern_stops, trips, calendar, calendar_dates
+        Dict with keys: agencies, routes, stops, patterns, pattern_stops, trips,
+        trip_frequencies, calendar, calendar_dates
         Each value is a list of dicts ready for Supabase insertion
 
     Raises:
@@ -76,16 +122,56 @@ def parse_gtfs(gtfs_base_dir: str) -> Dict:
     start_time = time.time()
     base_path = Path(gtfs_base_dir)
 
-    logger.info("gtfs_parse_start", input_dir=gtfs_base_dir, total_modes=len(MODE_DIRS))
+    if streaming is None:
+        streaming = settings.GTFS_STREAMING_STOP_TIMES
+    if frequency_compression is None:
+        frequency_compression = settings.GTFS_FREQUENCY_COMPRESSION
+    if offset_deltas is None:
+        offset_deltas = settings.GTFS_TRIP_OFFSET_DELTAS
 
-    # Step 1: Load and merge all mode feeds
-    merged_data = _load_and_merge_feeds(base_path)
+    logger.info("gtfs_parse_start", input_dir=gtfs_base_dir, total_modes=len(MODE_DIRS), streaming=streaming)
+
+    aggregates = None
+    if streaming:
+        # Step 1: Load and merge all mode feeds (stop_times left on disk)
+        merged_data = _load_and_merge_feeds(base_path, stream_stop_times=True)
+
+        # Step 1b: Stream stop_times, keeping only Sydney stops, aggregated per trip/pattern
+        sydney_stop_ids = set(_filter_stops_to_bbox(merged_data["stops"])["stop_id"])
+        try:
+            with profile_stage("stop_times_stream") as stage:
+                aggregates = _aggregate_stop_times_streaming(
+                    merged_data["stop_times_sources"],
+                    sydney_stop_ids,
+                    merged_data["trips"],
+                    chunk_rows=settings.GTFS_STOP_TIMES_CHUNK_ROWS,
+                    memory_budget_mb=settings.GTFS_PARSE_MEMORY_BUDGET_MB,
+                    keep_trip_offsets=offset_deltas
+                )
+                stage["rows"] = aggregates["stats"]["rows_read"]
+        except ValueError as e:
+            logger.warning("gtfs_streaming_fallback", reason=str(e))
+            merged_data = _load_and_merge_feeds(base_path)
+
+    else:
+        # Step 1: Load and merge all mode feeds
+        merged_data = _load_and_merge_feeds(base_path)
 
     # Step 2: Sydney filtering
-    filtered_data = _apply_sydney_filter(merged_data)
+    filtered_data = _apply_sydney_filter(
+        merged_data,
+        trip_ids_with_sydney_stops=aggregates["trip_ids"] if aggregates is not None else None
+    )
 
     # Step 3: Pattern extraction
-    patterns_data = _extract_patterns(filtered_data)
+    with profile_stage("pattern_extraction") as stage:
+        patterns_data = _extract_patterns(
+            filtered_data,
+            stop_time_aggregates=aggregates,
+            compress_frequencies=frequency_compression,
+            offset_deltas=offset_deltas
+        )
+        stage["rows"] = len(patterns_data["pattern_stops"])
 
     # Step 4: Compile output
     result = {
@@ -95,6 +181,7 @@ def parse_gtfs(gtfs_base_dir: str) -> Dict:
         "patterns": patterns_data["patterns"],
         "pattern_stops": patterns_data["pattern_stops"],
         "trips": patterns_data["trips"],
+        "trip_frequencies": patterns_data["trip_frequencies"],
         "calendar": filtered_data["calendar"],
         "calendar_dates": filtered_data.get("calendar_dates", [])
     }
@@ -107,17 +194,20 @@ def parse_gtfs(gtfs_base_dir: str) -> Dict:
         routes=len(result["routes"]),
         patterns=len(result["patterns"]),
         trips=len(result["trips"]),
+        trip_frequencies=len(result["trip_frequencies"]),
         duration_ms=duration_ms
     )
 
     return result
 
 
-def _load_and_merge_feeds(base_path: Path) -> Dict:
+def _load_and_merge_feeds(base_path: Path, stream_stop_times: bool = False) -> Dict:
     """Load GTFS CSV files from mode directories and merge.
 
     Args:
         base_path: Base directory with mode subdirectories
+        stream_stop_times: Don't read stop_times.txt; instead return "stop_times_sources"
+                           (feed files + trip_id prefix + row filters) for _aggregate_stop_times_streaming
 
     Returns:
         Dict with merged DataFrames: agencies, stops, routes, trips, stop_times, calendar, calendar_dates
@@ -131,6 +221,7 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
     all_stop_times = []
     all_calendar = []
     all_calendar_dates = []
+    stop_times_sources = []
 
     for mode in MODE_DIRS:
         mode_path = base_path / mode
@@ -139,27 +230,34 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
             logger.warning("gtfs_mode_missing", mode=mode, path=str(mode_path))
             continue
 
+        feed = _FeedFiles(mode_path)
+
         # Validate required files exist
-        missing_files = [f for f in REQUIRED_FILES if not (mode_path / f).exists()]
+        missing_files = [f for f in REQUIRED_FILES if not feed.exists(f)]
         if missing_files:
             logger.error("gtfs_missing_files", mode=mode, missing=missing_files)
             raise ValueError(f"Mode {mode} missing required files: {missing_files}")
 
         # Read CSV files
         try:
-            agencies = pd.read_csv(mode_path / "agency.txt", dtype=str)
-            stops = pd.read_csv(mode_path / "stops.txt", dtype=str)
-            routes = pd.read_csv(mode_path / "routes.txt", dtype=str)
-            trips = pd.read_csv(mode_path / "trips.txt", dtype=str)
-            stop_times = pd.read_csv(mode_path / "stop_times.txt", dtype=str)
-            calendar = pd.read_csv(mode_path / "calendar.txt", dtype=str)
+            agencies = _read_csv(feed, "agency.txt")
+            stops = _read_csv(feed, "stops.txt")
+            routes = _read_csv(feed, "routes.txt")
+            trips = _read_csv(feed, "trips.txt")
+            if stream_stop_times:
+                stop_times = None
+                source = {"feed": feed, "file": "stop_times.txt", "prefix": mode + "_"}
+                stop_times_sources.append(source)
+            else:
+                stop_times = _read_csv(feed, "stop_times.txt")
+            calendar = _read_csv(feed, "calendar.txt")
 
             # BUGFIX: Filter contaminated train platforms from lightrail feed
             # NSW lightrail endpoint incorrectly includes train platforms in stop_times
             # Filter these out to prevent light rail patterns from showing train stops
             if mode == "lightrail":
                 stops_before = len(stops)
-                st_before = len(stop_times)
+                st_before = len(stop_times) if stop_times is not None else None
 
                 # Identify contaminated stops (contain "Platform" in name, excluding genuine light rail platforms)
                 # Light rail platforms are named like "Central Grand Concourse Light Rail Platform 1"
@@ -170,7 +268,10 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
                 ]["stop_id"]
 
                 # Remove contaminated stops from stop_times
-                stop_times = stop_times[~stop_times["stop_id"].isin(contaminated_stops)]
+                if stop_times is not None:
+                    stop_times = stop_times[~stop_times["stop_id"].isin(contaminated_stops)]
+                else:
+                    source["exclude_stop_ids"] = set(contaminated_stops)
 
                 # Remove contaminated stops from stops table
                 stops = stops[~stops["stop_id"].isin(contaminated_stops)]
@@ -182,24 +283,24 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
                     stops_before=stops_before,
                     stops_after=len(stops),
                     stop_times_before=st_before,
-                    stop_times_after=len(stop_times)
+                    stop_times_after=len(stop_times) if stop_times is not None else None
                 )
 
             # Prefix IDs to avoid conflicts across modes
             trips["trip_id"] = mode + "_" + trips["trip_id"].astype(str)
-            stop_times["trip_id"] = mode + "_" + stop_times["trip_id"].astype(str)
+            if stop_times is not None:
+                stop_times["trip_id"] = mode + "_" + stop_times["trip_id"].astype(str)
+                all_stop_times.append(stop_times)
 
             all_agencies.append(agencies)
             all_stops.append(stops)
             all_routes.append(routes)
             all_trips.append(trips)
-            all_stop_times.append(stop_times)
             all_calendar.append(calendar)
 
             # calendar_dates is optional
-            calendar_dates_path = mode_path / "calendar_dates.txt"
-            if calendar_dates_path.exists():
-                calendar_dates = pd.read_csv(calendar_dates_path, dtype=str)
+            if feed.exists("calendar_dates.txt"):
+                calendar_dates = _read_csv(feed, "calendar_dates.txt")
                 all_calendar_dates.append(calendar_dates)
 
             logger.info(
@@ -208,14 +309,14 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
                 stops=len(stops),
                 routes=len(routes),
                 trips=len(trips),
-                stop_times=len(stop_times)
+                stop_times=len(stop_times) if stop_times is not None else None
             )
 
         except Exception as e:
             logger.error("gtfs_mode_load_failed", mode=mode, error=str(e), error_type=type(e).__name__)
             raise
 
-    if not all_agencies or not all_stops or not all_routes or not all_trips or not all_stop_times:
+    if not all_agencies or not all_stops or not all_routes or not all_trips or not (all_stop_times or stop_times_sources):
         logger.error("gtfs_merge_no_pattern_data")
         raise ValueError("No pattern-mode GTFS data loaded; check MODE_DIRS downloads")
 
@@ -224,7 +325,7 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
     stops_df = pd.concat(all_stops, ignore_index=True)
     routes_df = pd.concat(all_routes, ignore_index=True)
     trips_df = pd.concat(all_trips, ignore_index=True)
-    stop_times_df = pd.concat(all_stop_times, ignore_index=True)
+    stop_times_df = pd.concat(all_stop_times, ignore_index=True) if all_stop_times else None
     calendar_df = pd.concat(all_calendar, ignore_index=True)
 
     if all_calendar_dates:
@@ -249,34 +350,30 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
             continue
 
         try:
-            agencies_path = mode_path / "agency.txt"
-            stops_path = mode_path / "stops.txt"
-            routes_path = mode_path / "routes.txt"
-
-            if agencies_path.exists():
-                extra_agencies.append(pd.read_csv(agencies_path, dtype=str))
-            if stops_path.exists():
-                extra_stops.append(pd.read_csv(stops_path, dtype=str))
-            if routes_path.exists():
-                extra_routes.append(pd.read_csv(routes_path, dtype=str))
+            feed = _FeedFiles(mode_path)
+            has_agencies = feed.exists("agency.txt")
+            has_stops = feed.exists("stops.txt")
+            has_routes = feed.exists("routes.txt")
+
+            if has_agencies:
+                extra_agencies.append(_read_csv(feed, "agency.txt"))
+            if has_stops:
+                extra_stops.append(_read_csv(feed, "stops.txt"))
+            if has_routes:
+                extra_routes.append(_read_csv(feed, "routes.txt"))
 
             # Special handling for "complete" feed: merge light rail trips/stop_times/calendar
             # Filter by route_type in {0, 900} to get only light rail schedules
             if coverage_mode == "complete":
-                trips_path = mode_path / "trips.txt"
-                stop_times_path = mode_path / "stop_times.txt"
-                calendar_path = mode_path / "calendar.txt"
-                calendar_dates_path = mode_path / "calendar_dates.txt"
-
-                if trips_path.exists() and routes_path.exists():
+                if feed.exists("trips.txt") and has_routes:
                     # Load routes to identify light rail route_ids
-                    complete_routes = pd.read_csv(routes_path, dtype=str)
+                    complete_routes = _read_csv(feed, "routes.txt")
                     lr_route_ids = complete_routes[
                         complete_routes["route_type"].isin(["0", "900"])
                     ]["route_id"].unique()
 
                     # Load trips and filter to light rail routes
-                    complete_trips = pd.read_csv(trips_path, dtype=str)
+                    complete_trips = _read_csv(feed, "trips.txt")
                     lr_trips = complete_trips[complete_trips["route_id"].isin(lr_route_ids)].copy()
 
                     # Prefix trip_ids to avoid collisions with mode-specific feeds
@@ -284,9 +381,16 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
                     light_rail_trips.append(lr_trips)
 
                     # Load stop_times and filter to light rail trip_ids
-                    if stop_times_path.exists():
-                        complete_stop_times = pd.read_csv(stop_times_path, dtype=str)
-                        lr_trip_ids_original = complete_trips[complete_trips["route_id"].isin(lr_route_ids)]["trip_id"]
+                    lr_trip_ids_original = complete_trips[complete_trips["route_id"].isin(lr_route_ids)]["trip_id"]
+                    if feed.exists("stop_times.txt") and stream_stop_times:
+                        stop_times_sources.append({
+                            "feed": feed,
+                            "file": "stop_times.txt",
+                            "prefix": "complete_lr_",
+                            "include_trip_ids": set(lr_trip_ids_original),
+                        })
+                    elif feed.exists("stop_times.txt"):
+                        complete_stop_times = _read_csv(feed, "stop_times.txt")
                         lr_stop_times = complete_stop_times[complete_stop_times["trip_id"].isin(lr_trip_ids_original)].copy()
                         # Apply same prefix to stop_times trip_ids
                         lr_stop_times["trip_id"] = "complete_lr_" + lr_stop_times["trip_id"].astype(str)
@@ -294,13 +398,13 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
 
                     # Load calendar for light rail service_ids
                     lr_service_ids = lr_trips["service_id"].unique()
-                    if calendar_path.exists():
-                        complete_calendar = pd.read_csv(calendar_path, dtype=str)
+                    if feed.exists("calendar.txt"):
+                        complete_calendar = _read_csv(feed, "calendar.txt")
                         lr_calendar = complete_calendar[complete_calendar["service_id"].isin(lr_service_ids)]
                         light_rail_calendar.append(lr_calendar)
 
-                    if calendar_dates_path.exists():
-                        complete_calendar_dates = pd.read_csv(calendar_dates_path, dtype=str)
+                    if feed.exists("calendar_dates.txt"):
+                        complete_calendar_dates = _read_csv(feed, "calendar_dates.txt")
                         lr_calendar_dates = complete_calendar_dates[complete_calendar_dates["service_id"].isin(lr_service_ids)]
                         light_rail_calendar_dates.append(lr_calendar_dates)
 
@@ -315,9 +419,9 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
             logger.info(
                 "gtfs_coverage_mode_loaded",
                 mode=coverage_mode,
-                has_agencies=agencies_path.exists(),
-                has_stops=stops_path.exists(),
-                has_routes=routes_path.exists()
+                has_agencies=has_agencies,
+                has_stops=has_stops,
+                has_routes=has_routes
             )
         except Exception as e:
             # Coverage feeds are best-effort; log and continue rather than failing entire parse.
@@ -333,7 +437,7 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
     # Merge light rail trips/stop_times/calendar from complete feed
     if light_rail_trips:
         trips_df = pd.concat([trips_df] + light_rail_trips, ignore_index=True)
-    if light_rail_stop_times:
+    if light_rail_stop_times and stop_times_df is not None:
         stop_times_df = pd.concat([stop_times_df] + light_rail_stop_times, ignore_index=True)
     if light_rail_calendar:
         calendar_df = pd.concat([calendar_df] + light_rail_calendar, ignore_index=True)
@@ -355,41 +459,112 @@ def _load_and_merge_feeds(base_path: Path) -> Dict:
     if calendar_dates_df is not None:
         merged["calendar_dates"] = calendar_dates_df
 
+    if stream_stop_times:
+        merged["stop_times_sources"] = stop_times_sources
+
     logger.info(
         "gtfs_merge_complete",
         total_stops=len(merged["stops"]),
         total_routes=len(merged["routes"]),
         total_trips=len(merged["trips"]),
-        total_stop_times=len(merged["stop_times"])
+        total_stop_times=len(stop_times_df) if stop_times_df is not None else None,
+        stop_times_sources=len(stop_times_sources)
     )
 
     return merged
 
 
-def _apply_sydney_filter(data: Dict) -> Dict:
-    """Filter stops to Sydney bbox, remove trips with no Sydney stops.
+class _FeedFiles:
+    """GTFS files of one mode directory.
+
+    Members are read from {mode_path}/gtfs.zip when present (streamed, no extraction);
+    otherwise from extracted *.txt files in mode_path. Reading a ZIP member to the end
+    verifies its CRC-32 (zipfile.BadZipFile on mismatch), so parsing is the only pass
+    over the archive.
+    """
+
+    def __init__(self, mode_path: Path):
+        self.mode = mode_path.name
+        self.mode_path = mode_path
+        self.archive = mode_path / FEED_ARCHIVE_NAME
+        self.members = None
+        if self.archive.exists():
+            with zipfile.ZipFile(self.archive) as zf:
+                # Keyed by base name: some bundles nest files in a folder
+                self.members = {
+                    Path(info.filename).name: info.filename
+                    for info in zf.infolist() if not info.is_dir()
+                }
+
+    def exists(self, name: str) -> bool:
+        if self.members is not None:
+            return name in self.members
+        return (self.mode_path / name).exists()
+
+    def label(self, name: str) -> str:
+        return f"{self.mode}/{name}"
+
+    @contextmanager
+    def open(self, name: str) -> Iterator[BinaryIO]:
+        """Binary stream of one GTFS file."""
+        if self.members is None:
+            with open(self.mode_path / name, "rb") as handle:
+                yield handle
+            return
+        with zipfile.ZipFile(self.archive) as zf:
+            with zf.open(self.members[name]) as handle:
+                yield handle
+
+
+def _read_csv(feed: _FeedFiles, name: str) -> pd.DataFrame:
+    """Read a GTFS CSV file as strings, recorded as a csv_read profiling stage."""
+    with profile_stage("csv_read", file=feed.label(name)) as stage:
+        with feed.open(name) as handle:
+            frame = pd.read_csv(handle, dtype=str)
+        stage["rows"] = len(frame)
+    return frame
+
+
+def _filter_stops_to_bbox(stops_df: pd.DataFrame) -> pd.DataFrame:
+    """Return stops inside SYDNEY_BBOX (lat/lon converted to float).
 
     Args:
-        data: Dict with DataFrames (stops, routes, trips, stop_times, etc.)
+        stops_df: Merged stops DataFrame (string dtypes)
 
     Returns:
-        Dict with filtered DataFrames
+        Filtered copy with numeric stop_lat/stop_lon
     """
-    stops_before = len(data["stops"])
-
     # Convert lat/lon to float for filtering
-    stops = data["stops"].copy()
+    stops = stops_df.copy()
     stops["stop_lat"] = pd.to_numeric(stops["stop_lat"], errors="coerce")
     stops["stop_lon"] = pd.to_numeric(stops["stop_lon"], errors="coerce")
 
     # Apply bbox filter
-    sydney_stops = stops[
+    return stops[
         (stops["stop_lat"] >= SYDNEY_BBOX["lat_min"]) &
         (stops["stop_lat"] <= SYDNEY_BBOX["lat_max"]) &
         (stops["stop_lon"] >= SYDNEY_BBOX["lon_min"]) &
         (stops["stop_lon"] <= SYDNEY_BBOX["lon_max"])
     ]
 
+
+def _apply_sydney_filter(data: Dict, trip_ids_with_sydney_stops: Optional[Set[str]] = None) -> Dict:
+    """Filter stops to Sydney bbox, remove trips with no Sydney stops.
+
+    Args:
+        data: Dict with DataFrames (stops, routes, trips, stop_times, etc.)
+        trip_ids_with_sydney_stops: Precomputed by the streaming stop_times pass; when given,
+                                    data has no stop_times and none are returned
+
+    Returns:
+        Dict with filtered DataFrames
+    """
+    stops_before = len(data["stops"])
+
+    with profile_stage("bbox_filter") as stage:
+        sydney_stops = _filter_stops_to_bbox(data["stops"])
+        stage["rows"] = len(sydney_stops)
+
     stops_after = len(sydney_stops)
     reduction_pct = int((1 - stops_after / stops_before) * 100) if stops_before > 0 else 0
 
@@ -399,12 +574,17 @@ def _apply_sydney_filter(data: Dict) -> Dict:
 
     sydney_stop_ids = set(sydney_stops["stop_id"])
 
-    # Filter stop_times to only Sydney stops
-    stop_times = data["stop_times"]
-    sydney_stop_times = stop_times[stop_times["stop_id"].isin(sydney_stop_ids)]
+    if trip_ids_with_sydney_stops is None:
+        # Filter stop_times to only Sydney stops
+        stop_times = data["stop_times"]
+        sydney_stop_times = stop_times[stop_times["stop_id"].isin(sydney_stop_ids)]
+
+        # Keep trips with at least 1 Sydney stop
+        trip_ids_with_sydney_stops = set(sydney_stop_times["trip_id"].unique())
+    else:
+        # Streaming mode: stop_times were filtered to Sydney stops while aggregating
+        sydney_stop_times = None
 
-    # Keep trips with at least 1 Sydney stop
-    trip_ids_with_sydney_stops = set(sydney_stop_times["trip_id"].unique())
     trips = data["trips"]
     sydney_trips = trips[trips["trip_id"].isin(trip_ids_with_sydney_stops)]
 
@@ -432,65 +612,67 @@ def _apply_sydney_filter(data: Dict) -> Dict:
         trips_after=len(sydney_trips)
     )
 
-    # Smart deduplication: Preserve stop hierarchy
-    # Only deduplicate parent stations (location_type=1), keep ALL child platforms and orphans
-    # Rationale: Child stops (location_type=0) are unique physical locations. NSW Light Rail has
-    # orphaned platforms (parent_station=NULL) due to data quality issues - must preserve these.
-
-    # Handle empty string '' as NULL for parent_station (NSW GTFS inconsistency)
-    sydney_stops['parent_station'] = sydney_stops['parent_station'].replace('', None)
-
-    # Categorize stops by hierarchy role
-    parent_stations = sydney_stops[sydney_stops['location_type'] == '1']
-    child_stops = sydney_stops[(sydney_stops['location_type'] == '0') & sydney_stops['parent_station'].notna()]
-    orphan_stops = sydney_stops[(sydney_stops['location_type'] == '0') & sydney_stops['parent_station'].isna()]
-    other_stops = sydney_stops[~sydney_stops['location_type'].isin(['0', '1'])]
-
-    # Deduplicate within each category (same stop_id can appear in multiple feeds)
-    parent_stations_dedup = parent_stations.drop_duplicates(subset=['stop_id'], keep='first')
-    child_stops_dedup = child_stops.drop_duplicates(subset=['stop_id'], keep='first')
-    orphan_stops_dedup = orphan_stops.drop_duplicates(subset=['stop_id'], keep='first')
-    other_stops_dedup = other_stops.drop_duplicates(subset=['stop_id'], keep='first')
-
-    # Merge: deduped categories preserving hierarchy (priority order: child > orphan > parent > other)
-    sydney_stops_dedup = pd.concat([child_stops_dedup, orphan_stops_dedup, parent_stations_dedup, other_stops_dedup], ignore_index=True)
-
-    # Global deduplication by stop_id (Supabase primary key constraint)
-    # Keep first occurrence (priority: child > orphan > parent > other based on concat order)
-    sydney_stops_final = sydney_stops_dedup.drop_duplicates(subset=['stop_id'], keep='first')
-
-    logger.info(
-        "stops_smart_deduplication",
-        stops_before=len(sydney_stops),
-        stops_after=len(sydney_stops_dedup),
-        parent_stations_before=len(parent_stations),
-        parent_stations_after=len(parent_stations_dedup),
-        child_stops_before=len(child_stops),
-        child_stops_after=len(child_stops_dedup),
-        orphan_stops_before=len(orphan_stops),
-        orphan_stops_after=len(orphan_stops_dedup),
-        other_stops_before=len(other_stops),
-        other_stops_after=len(other_stops_dedup)
-    )
-
-    logger.info(
-        "stops_global_deduplication",
-        stops_after_hierarchy=len(sydney_stops_dedup),
-        stops_after_global=len(sydney_stops_final),
-        duplicates_removed=len(sydney_stops_dedup) - len(sydney_stops_final)
-    )
-
-    # Deduplicate agencies (agencies appear across multiple feeds and coverage feeds)
-    agencies_dedup = data["agencies"].drop_duplicates(subset=["agency_id"], keep="first")
-    agencies_dup_count = len(data["agencies"]) - len(agencies_dedup)
-    if agencies_dup_count > 0:
-        logger.info("agencies_deduplicated", duplicates_removed=agencies_dup_count)
-
-    # Deduplicate routes (routes may appear in multiple feeds and coverage feeds)
-    sydney_routes_dedup = sydney_routes.drop_duplicates(subset=["route_id"], keep="first")
-    routes_dup_count = len(sydney_routes) - len(sydney_routes_dedup)
-    if routes_dup_count > 0:
-        logger.info("routes_deduplicated", duplicates_removed=routes_dup_count)
+    with profile_stage("dedup") as stage:
+        # Smart deduplication: Preserve stop hierarchy
+        # Only deduplicate parent stations (location_type=1), keep ALL child platforms and orphans
+        # Rationale: Child stops (location_type=0) are unique physical locations. NSW Light Rail has
+        # orphaned platforms (parent_station=NULL) due to data quality issues - must preserve these.
+
+        # Handle empty string '' as NULL for parent_station (NSW GTFS inconsistency)
+        sydney_stops['parent_station'] = sydney_stops['parent_station'].replace('', None)
+
+        # Categorize stops by hierarchy role
+        parent_stations = sydney_stops[sydney_stops['location_type'] == '1']
+        child_stops = sydney_stops[(sydney_stops['location_type'] == '0') & sydney_stops['parent_station'].notna()]
+        orphan_stops = sydney_stops[(sydney_stops['location_type'] == '0') & sydney_stops['parent_station'].isna()]
+        other_stops = sydney_stops[~sydney_stops['location_type'].isin(['0', '1'])]
+
+        # Deduplicate within each category (same stop_id can appear in multiple feeds)
+        parent_stations_dedup = parent_stations.drop_duplicates(subset=['stop_id'], keep='first')
+        child_stops_dedup = child_stops.drop_duplicates(subset=['stop_id'], keep='first')
+        orphan_stops_dedup = orphan_stops.drop_duplicates(subset=['stop_id'], keep='first')
+        other_stops_dedup = other_stops.drop_duplicates(subset=['stop_id'], keep='first')
+
+        # Merge: deduped categories preserving hierarchy (priority order: child > orphan > parent > other)
+        sydney_stops_dedup = pd.concat([child_stops_dedup, orphan_stops_dedup, parent_stations_dedup, other_stops_dedup], ignore_index=True)
+
+        # Global deduplication by stop_id (Supabase primary key constraint)
+        # Keep first occurrence (priority: child > orphan > parent > other based on concat order)
+        sydney_stops_final = sydney_stops_dedup.drop_duplicates(subset=['stop_id'], keep='first')
+
+        logger.info(
+            "stops_smart_deduplication",
+            stops_before=len(sydney_stops),
+            stops_after=len(sydney_stops_dedup),
+            parent_stations_before=len(parent_stations),
+            parent_stations_after=len(parent_stations_dedup),
+            child_stops_before=len(child_stops),
+            child_stops_after=len(child_stops_dedup),
+            orphan_stops_before=len(orphan_stops),
+            orphan_stops_after=len(orphan_stops_dedup),
+            other_stops_before=len(other_stops),
+            other_stops_after=len(other_stops_dedup)
+        )
+
+        logger.info(
+            "stops_global_deduplication",
+            stops_after_hierarchy=len(sydney_stops_dedup),
+            stops_after_global=len(sydney_stops_final),
+            duplicates_removed=len(sydney_stops_dedup) - len(sydney_stops_final)
+        )
+
+        # Deduplicate agencies (agencies appear across multiple feeds and coverage feeds)
+        agencies_dedup = data["agencies"].drop_duplicates(subset=["agency_id"], keep="first")
+        agencies_dup_count = len(data["agencies"]) - len(agencies_dedup)
+        if agencies_dup_count > 0:
+            logger.info("agencies_deduplicated", duplicates_removed=agencies_dup_count)
+
+        # Deduplicate routes (routes may appear in multiple feeds and coverage feeds)
+        sydney_routes_dedup = sydney_routes.drop_duplicates(subset=["route_id"], keep="first")
+        routes_dup_count = len(sydney_routes) - len(sydney_routes_dedup)
+        if routes_dup_count > 0:
+            logger.info("routes_deduplicated", duplicates_removed=routes_dup_count)
+        stage["rows"] = len(sydney_stops_final)
 
     # Convert to list of dicts for easier Supabase insertion
     result = {
@@ -508,7 +690,12 @@ def _apply_sydney_filter(data: Dict) -> Dict:
     return result
 
 
-def _extract_patterns(data: Dict) -> Dict:
+def _extract_patterns(
+    data: Dict,
+    stop_time_aggregates: Optional[Dict] = None,
+    compress_frequencies: bool = False,
+    offset_deltas: bool = False
+) -> Dict:
     """Extract pattern model from trips and stop_times.
 
     Groups trips by identical stop sequences, assigns pattern_id,
@@ -516,30 +703,26 @@ def _extract_patterns(data: Dict) -> Dict:
 
     Args:
         data: Dict with trips, stop_times DataFrames
+        stop_time_aggregates: Output of _aggregate_stop_times_streaming; replaces
+                              data["stop_times"] when parsing in streaming mode
+        compress_frequencies: Move constant-headway trip runs into trip_frequencies
+                              blocks (gtfs_frequencies.compress_trips)
+        offset_deltas: Attach per-trip offset deltas against the median offsets
+                       (gtfs_offset_deltas.attach_offset_deltas); in streaming mode
+                       needs aggregates built with keep_trip_offsets
 
     Returns:
-        Dict with patterns, pattern_stops, trips lists
+        Dict with patterns, pattern_stops, trips, trip_frequencies lists
     """
     trips = data["trips"].copy()
-    stop_times = data["stop_times"].copy()
-
-    # Convert stop_sequence to int for sorting
-    stop_times["stop_sequence"] = pd.to_numeric(stop_times["stop_sequence"], errors="coerce")
-    stop_times = stop_times.sort_values(["trip_id", "stop_sequence"])
-
-    # Convert arrival/departure times to seconds for offset calculation (vectorized)
-    stop_times["arrival_time_secs"] = stop_times["arrival_time"].apply(_time_to_seconds)
-    stop_times["departure_time_secs"] = stop_times["departure_time"].apply(_time_to_seconds)
-
-    # Calculate trip start time (first stop departure)
-    trip_start_times = stop_times.groupby("trip_id")["departure_time_secs"].first()
 
-    # Create stop sequence signature for each trip using agg (faster than apply)
-    trip_sequences = (
-        stop_times.groupby("trip_id", as_index=False)["stop_id"]
-        .agg(stop_sequence_sig=lambda x: "|".join(x.astype(str)))
-        .set_index("trip_id")["stop_sequence_sig"]
-    )
+    if stop_time_aggregates is None:
+        stop_times = _prepare_stop_times(data["stop_times"].copy())
+        trip_start_times, trip_sequences = _trip_starts_and_sequences(stop_times)
+    else:
+        stop_times = None
+        trip_start_times = stop_time_aggregates["trip_start_times"]
+        trip_sequences = stop_time_aggregates["trip_sequences"]
 
     # Merge trip metadata
     trips["stop_sequence_sig"] = trips["trip_id"].map(trip_sequences)
@@ -553,8 +736,22 @@ def _extract_patterns(data: Dict) -> Dict:
         representative_trip=("trip_id", "first")
     )
 
-    # Assign pattern_id to each unique pattern
-    pattern_groups["pattern_id"] = [f"P{i:06d}" for i in range(len(pattern_groups))]
+    # Assign content-derived pattern_id to each unique pattern (stable across feed versions,
+    # so unchanged patterns keep their ID when routes are added/removed elsewhere in the feed)
+    pattern_groups["pattern_id"] = [
+        _pattern_id(route_id, direction_id, sig)
+        for route_id, direction_id, sig in zip(
+            pattern_groups["route_id"],
+            pattern_groups["direction_id"],
+            pattern_groups["stop_sequence_sig"]
+        )
+    ]
+
+    duplicate_ids = pattern_groups["pattern_id"].duplicated(keep=False)
+    if duplicate_ids.any():
+        colliding = pattern_groups.loc[duplicate_ids, "pattern_id"].unique().tolist()
+        logger.error("pattern_id_collision", pattern_ids=colliding[:10], count=len(colliding))
+        raise ValueError(f"Pattern ID hash collision detected: {colliding[:10]}")
 
     # Create patterns list
     patterns = pattern_groups[["pattern_id", "route_id", "direction_id"]].copy()
@@ -570,31 +767,36 @@ def _extract_patterns(data: Dict) -> Dict:
         for trip_id in row["pattern_trips"]:
             trip_to_pattern[trip_id] = pattern_id
 
-    # Add pattern_id to stop_times in bulk (vectorized)
-    stop_times["pattern_id"] = stop_times["trip_id"].map(trip_to_pattern)
-
-    # Add start times to stop_times for offset calculation
-    stop_times["trip_start_secs"] = stop_times["trip_id"].map(trip_start_times)
-
-    # Calculate offsets (vectorized)
-    stop_times["arrival_offset"] = (
-        stop_times["arrival_time_secs"] - stop_times["trip_start_secs"]
-    )
-    stop_times["departure_offset"] = (
-        stop_times["departure_time_secs"] - stop_times["trip_start_secs"]
-    )
-
-    # Calculate median offsets per pattern/stop_sequence (vectorized groupby)
-    # Group by (pattern_id, stop_sequence) - this is the primary key in DB
-    # If a stop appears twice in same pattern (circular routes), use first occurrence
-    pattern_stops = (
-        stop_times.groupby(["pattern_id", "stop_sequence"], as_index=False)
-        .agg({
-            "stop_id": "first",  # Use first stop_id if duplicates (shouldn't happen)
-            "arrival_offset": "median",
-            "departure_offset": "median"
-        })
-    )
+    if stop_times is not None:
+        # Add pattern_id to stop_times in bulk (vectorized)
+        stop_times["pattern_id"] = stop_times["trip_id"].map(trip_to_pattern)
+
+        # Add start times to stop_times for offset calculation
+        stop_times["trip_start_secs"] = stop_times["trip_id"].map(trip_start_times)
+
+        # Calculate offsets (vectorized)
+        stop_times["arrival_offset"] = (
+            stop_times["arrival_time_secs"] - stop_times["trip_start_secs"]
+        )
+        stop_times["departure_offset"] = (
+            stop_times["departure_time_secs"] - stop_times["trip_start_secs"]
+        )
+
+        # Calculate median offsets per pattern/stop_sequence (vectorized groupby)
+        # Group by (pattern_id, stop_sequence) - this is the primary key in DB
+        # If a stop appears twice in same pattern (circular routes), use first occurrence
+        pattern_stops = (
+            stop_times.groupby(["pattern_id", "stop_sequence"], as_index=False)
+            .agg({
+                "stop_id": "first",  # Use first stop_id if duplicates (shouldn't happen)
+                "arrival_offset": "median",
+                "departure_offset": "median"
+            })
+        )
+    else:
+        pattern_stops = _pattern_stops_from_aggregates(
+            stop_time_aggregates, set(pattern_groups["pattern_id"])
+        )
 
     # Convert to output format
     pattern_stops_list = []
@@ -629,6 +831,23 @@ def _extract_patterns(data: Dict) -> Dict:
     trips_output["start_time_secs"] = trips_output["start_time_secs"].fillna(0).astype(int)
     trips_list = trips_output.to_dict("records")
 
+    if offset_deltas:
+        with profile_stage("offset_deltas") as stage:
+            if stop_times is not None:
+                trip_offsets = trip_departure_offsets(stop_times)
+            else:
+                trip_offsets = stop_time_aggregates.get("trip_offsets") or {}
+            delta_stats = attach_offset_deltas(trips_list, pattern_stops_list, trip_offsets)
+            stage["rows"] = delta_stats["trips_with_deltas"]
+
+    trip_frequencies = []
+    if compress_frequencies:
+        with profile_stage("frequency_compression") as stage:
+            compressed = compress_trips(trips_list)
+            trips_list = compressed["trips"]
+            trip_frequencies = compressed["frequencies"]
+            stage["rows"] = compressed["stats"]["trips_compressed"]
+
     avg_stops_per_pattern = (
         len(pattern_stops_list) / len(patterns_list) if len(patterns_list) > 0 else 0
     )
@@ -637,16 +856,344 @@ def _extract_patterns(data: Dict) -> Dict:
         "pattern_extraction_complete",
         patterns=len(patterns_list),
         avg_stops_per_pattern=round(avg_stops_per_pattern, 1),
-        total_trips=len(trips_list)
+        total_trips=len(trips_list),
+        trip_frequencies=len(trip_frequencies)
     )
 
     return {
         "patterns": patterns_list,
         "pattern_stops": pattern_stops_list,
-        "trips": trips_list
+        "trips": trips_list,
+        "trip_frequencies": trip_frequencies
     }
 
 
+def _prepare_stop_times(stop_times: pd.DataFrame) -> pd.DataFrame:
+    """Sort stop_times by trip/sequence and add arrival/departure seconds.
+
+    Shared by the in-memory path (whole table) and the streaming path (one chunk
+    of complete trips at a time).
+    """
+    # Convert stop_sequence to int for sorting
+    stop_times["stop_sequence"] = pd.to_numeric(stop_times["stop_sequence"], errors="coerce")
+    stop_times = stop_times.sort_values(["trip_id", "stop_sequence"])
+
+    # Convert arrival/departure times to seconds for offset calculation (vectorized)
+    stop_times["arrival_time_secs"] = stop_times["arrival_time"].apply(_time_to_seconds)
+    stop_times["departure_time_secs"] = stop_times["departure_time"].apply(_time_to_seconds)
+    return stop_times
+
+
+def _trip_starts_and_sequences(stop_times: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
+    """Per-trip start time (first departure) and stop sequence signature.
+
+    Args:
+        stop_times: Output of _prepare_stop_times
+
+    Returns:
+        (trip_start_times, trip_sequences) Series indexed by trip_id
+    """
+    # Calculate trip start time (first stop departure)
+    trip_start_times = stop_times.groupby("trip_id")["departure_time_secs"].first()
+
+    # Create stop sequence signature for each trip using agg (faster than apply)
+    trip_sequences = (
+        stop_times.groupby("trip_id", as_index=False)["stop_id"]
+        .agg(stop_sequence_sig=lambda x: "|".join(x.astype(str)))
+        .set_index("trip_id")["stop_sequence_sig"]
+    )
+    return trip_start_times, trip_sequences
+
+
+def _aggregate_stop_times_streaming(
+    sources: List[Dict],
+    sydney_stop_ids: Set[str],
+    trips_df: pd.DataFrame,
+    chunk_rows: int,
+    memory_budget_mb: int,
+    keep_trip_offsets: bool = False
+) -> Dict:
+    """Aggregate stop_times.txt files chunk by chunk for pattern extraction.
+
+    Rows are filtered to Sydney stops as they are read. Rows of the last trip in each
+    chunk are carried into the next chunk, so every trip is aggregated from all of its
+    rows at once. Per (pattern_id, stop_sequence) only offset value counts and the
+    first stop_id are kept, which is enough to reproduce the in-memory medians exactly.
+
+    If RSS exceeds memory_budget_mb after a chunk, partial aggregates are compacted and
+    the chunk size is halved (down to MIN_STOP_TIMES_CHUNK_ROWS).
+
+    Args:
+        sources: "stop_times_sources" from _load_and_merge_feeds
+        sydney_stop_ids: stop_ids inside SYDNEY_BBOX
+        trips_df: Merged (unfiltered) trips DataFrame with prefixed trip_ids
+        chunk_rows: Initial rows per read
+        memory_budget_mb: Target peak RSS
+        keep_trip_offsets: Also keep each trip's departure offsets for offset deltas
+                           (equal offset sequences are stored once)
+
+    Returns:
+        Dict with trip_ids (trips with >= 1 Sydney stop), trip_start_times, trip_sequences,
+        trip_offsets (empty unless keep_trip_offsets), arrival_counts, departure_counts,
+        first_stops, stats
+
+    Raises:
+        ValueError: If a stop_times file is not grouped by trip_id
+    """
+    start_time = time.time()
+
+    trip_meta = trips_df.drop_duplicates(subset=["trip_id"], keep="first").set_index("trip_id")
+    trip_routes = trip_meta["route_id"]
+    trip_directions = trip_meta["direction_id"].fillna("0")
+
+    trip_ids = set()
+    trip_start_times = {}
+    trip_sequences = {}
+    trip_offsets = {}
+    offset_profiles = {}  # Interned offset tuples, like signatures
+    signatures = {}  # Interned signatures: trips sharing a pattern share one string
+    pattern_ids = {}
+
+    partial = {"arrival": [], "departure": [], "first_stops": []}
+    partial_rows = 0
+    compacted = {"arrival": None, "departure": None, "first_stops": None}
+
+    stats = {
+        "chunks": 0,
+        "rows_read": 0,
+        "rows_kept": 0,
+        "chunk_rows_initial": chunk_rows,
+        "memory_budget_mb": memory_budget_mb,
+        "peak_rss_mb": current_rss_mb(),
+    }
+
+    def compact() -> None:
+        nonlocal partial_rows
+        for kind, value_col in (("arrival", "arrival_offset"), ("departure", "departure_offset")):
+            frames = partial[kind] + ([compacted[kind]] if compacted[kind] is not None else [])
+            if frames:
+                compacted[kind] = (
+                    pd.concat(frames, ignore_index=True)
+                    .groupby(["pattern_id", "stop_sequence", value_col], as_index=False)["count"].sum()
+                )
+        frames = ([compacted["first_stops"]] if compacted["first_stops"] is not None else []) + partial["first_stops"]
+        if frames:
+            compacted["first_stops"] = _first_stops(pd.concat(frames, ignore_index=True))
+        partial.update({"arrival": [], "departure": [], "first_stops": []})
+        partial_rows = 0
+
+    def aggregate(complete: pd.DataFrame) -> None:
+        nonlocal partial_rows
+        complete = _prepare_stop_times(complete)
+        starts, sequences = _trip_starts_and_sequences(complete)
+        trip_ids.update(starts.index)
+        trip_start_times.update(starts.to_dict())
+
+        chunk_patterns = {}
+        for trip_id, sig in sequences.items():
+            sig = signatures.setdefault(sig, sig)
+            trip_sequences[trip_id] = sig
+
+            # Same grouping as _extract_patterns: trips missing from trips.txt or with
+            # no route_id never get a pattern
+            route_id = trip_routes.get(trip_id)
+            if route_id is None or pd.isna(route_id):
+                continue
+            key = (route_id, trip_directions[trip_id], sig)
+            if key not in pattern_ids:
+                pattern_ids[key] = _pattern_id(*key)
+            chunk_patterns[trip_id] = pattern_ids[key]
+
+        complete["pattern_id"] = complete["trip_id"].map(chunk_patterns)
+        complete = complete[complete["pattern_id"].notna() & complete["stop_sequence"].notna()]
+        trip_start_secs = complete["trip_id"].map(starts)
+        complete = complete.assign(
+            arrival_offset=complete["arrival_time_secs"] - trip_start_secs,
+            departure_offset=complete["departure_time_secs"] - trip_start_secs
+        )
+        if keep_trip_offsets:
+            for trip_id, offsets in trip_departure_offsets(complete).items():
+                trip_offsets[trip_id] = offset_profiles.setdefault(offsets, offsets)
+
+        for kind, value_col in (("arrival", "arrival_offset"), ("departure", "departure_offset")):
+            counts = complete.groupby(["pattern_id", "stop_sequence", value_col]).size().reset_index(name="count")
+            partial[kind].append(counts)
+            partial_rows += len(counts)
+        partial["first_stops"].append(_first_stops(complete[["pattern_id", "stop_sequence", "stop_id", "trip_id"]]))
+
+        if partial_rows >= STREAM_COMPACT_ROWS:
+            compact()
+
+    for source in sources:
+        finished_trips = set()
+        carry = None
+        previous_last_trip_id = None
+
+        with source["feed"].open(source["file"]) as handle, pd.read_csv(
+            handle,
+            dtype=str,
+            usecols=lambda column: column in STOP_TIMES_COLUMNS,
+            iterator=True
+        ) as reader:
+            while True:
+                try:
+                    chunk = reader.get_chunk(chunk_rows)
+                except StopIteration:
+                    break
+
+                stats["chunks"] += 1
+                stats["rows_read"] += len(chunk)
+
+                if "include_trip_ids" in source:
+                    chunk = chunk[chunk["trip_id"].isin(source["include_trip_ids"])]
+                if "exclude_stop_ids" in source:
+                    chunk = chunk[~chunk["stop_id"].isin(source["exclude_stop_ids"])]
+                if chunk.empty:
+                    continue
+
+                chunk_trip_ids = chunk["trip_id"]
+                runs = int((chunk_trip_ids != chunk_trip_ids.shift()).sum())
+                unique_trips = set(chunk_trip_ids.unique())
+                resumes_out_of_order = (
+                    previous_last_trip_id in unique_trips and chunk_trip_ids.iloc[0] != previous_last_trip_id
+                )
+                if runs != len(unique_trips) or resumes_out_of_order or not unique_trips.isdisjoint(finished_trips):
+                    raise ValueError(f"{source['feed'].label(source['file'])} is not grouped by trip_id; cannot stream")
+
+                last_trip_id = chunk_trip_ids.iloc[-1]
+                if previous_last_trip_id is not None and previous_last_trip_id != last_trip_id:
+                    finished_trips.add(previous_last_trip_id)
+                unique_trips.discard(last_trip_id)
+                finished_trips.update(unique_trips)
+                previous_last_trip_id = last_trip_id
+
+                chunk = chunk[chunk["stop_id"].isin(sydney_stop_ids)]
+                chunk = chunk.assign(trip_id=source["prefix"] + chunk["trip_id"])
+                if carry is not None:
+                    chunk = pd.concat([carry, chunk], ignore_index=True)
+
+                is_last_trip = chunk["trip_id"] == source["prefix"] + last_trip_id
+                carry = chunk[is_last_trip]
+                complete = chunk[~is_last_trip]
+                stats["rows_kept"] += len(complete)
+                if not complete.empty:
+                    aggregate(complete)
+                del chunk, complete
+
+                rss_mb = current_rss_mb()
+                stats["peak_rss_mb"] = max(stats["peak_rss_mb"], rss_mb)
+                if rss_mb > memory_budget_mb:
+                    compact()
+                    gc.collect()
+                    if chunk_rows > MIN_STOP_TIMES_CHUNK_ROWS:
+                        chunk_rows = max(MIN_STOP_TIMES_CHUNK_ROWS, chunk_rows // 2)
+                        logger.warning(
+                            "gtfs_stop_times_chunk_shrunk",
+                            rss_mb=rss_mb,
+                            memory_budget_mb=memory_budget_mb,
+                            chunk_rows=chunk_rows
+                        )
+
+        if carry is not None and not carry.empty:
+            stats["rows_kept"] += len(carry)
+            aggregate(carry)
+
+    compact()
+
+    stats.update({
+        "chunk_rows_final": chunk_rows,
+        "trips": len(trip_sequences),
+        "unique_sequences": len(signatures),
+        "within_budget": stats["peak_rss_mb"] <= memory_budget_mb,
+        "duration_ms": int((time.time() - start_time) * 1000),
+    })
+    logger.info("gtfs_stop_times_streamed", **stats)
+
+    return {
+        "trip_ids": trip_ids,
+        "trip_start_times": trip_start_times,
+        "trip_sequences": trip_sequences,
+        "trip_offsets": trip_offsets,
+        "arrival_counts": compacted["arrival"],
+        "departure_counts": compacted["departure"],
+        "first_stops": compacted["first_stops"],
+        "stats": stats,
+    }
+
+
+def _first_stops(frame: pd.DataFrame) -> pd.DataFrame:
+    """First stop_id per (pattern_id, stop_sequence), by trip_id order (as in the in-memory sort)."""
+    return (
+        frame.sort_values("trip_id", kind="stable")
+        .groupby(["pattern_id", "stop_sequence"], as_index=False)
+        .agg(stop_id=("stop_id", "first"), trip_id=("trip_id", "first"))
+    )
+
+
+def _pattern_stops_from_aggregates(aggregates: Dict, pattern_ids: Set[str]) -> pd.DataFrame:
+    """Build the pattern_stops frame (stop_id + median offsets) from streamed aggregates.
+
+    Args:
+        aggregates: Output of _aggregate_stop_times_streaming
+        pattern_ids: Pattern IDs assigned to Sydney trips
+
+    Returns:
+        DataFrame with pattern_id, stop_sequence, stop_id, arrival_offset, departure_offset
+    """
+    columns = ["pattern_id", "stop_sequence", "stop_id", "arrival_offset", "departure_offset"]
+    first_stops = aggregates["first_stops"]
+    if first_stops is None:
+        return pd.DataFrame(columns=columns)
+
+    keys = ["pattern_id", "stop_sequence"]
+    pattern_stops = first_stops[first_stops["pattern_id"].isin(pattern_ids)][keys + ["stop_id"]]
+    pattern_stops = pattern_stops.merge(
+        _weighted_median(aggregates["arrival_counts"], "arrival_offset"), on=keys, how="left"
+    ).merge(
+        _weighted_median(aggregates["departure_counts"], "departure_offset"), on=keys, how="left"
+    )
+    return pattern_stops.sort_values(keys, ignore_index=True)[columns]
+
+
+def _weighted_median(counts: pd.DataFrame, value_col: str) -> pd.DataFrame:
+    """Median of value_col per (pattern_id, stop_sequence) from value counts.
+
+    Matches pandas median: mean of the two middle values for even counts.
+    """
+    keys = ["pattern_id", "stop_sequence"]
+    counts = counts.sort_values(keys + [value_col], ignore_index=True)
+    grouped = counts.groupby(keys, sort=False)["count"]
+    cumulative = grouped.cumsum()
+    total = grouped.transform("sum")
+
+    # 0-based middle positions: lower = (n - 1) // 2, upper = n // 2
+    counts["lower"] = counts[value_col].where(cumulative > (total - 1) // 2)
+    counts["upper"] = counts[value_col].where(cumulative > total // 2)
+    middle = counts.groupby(keys, as_index=False).agg(lower=("lower", "first"), upper=("upper", "first"))
+    middle[value_col] = (middle["lower"] + middle["upper"]) / 2
+    return middle[keys + [value_col]]
+
+
+def _pattern_id(route_id: str, direction_id: str, stop_sequence_sig: str) -> str:
+    """Derive a stable pattern_id from pattern content.
+
+    The ID depends only on route, direction and ordered stop sequence, so the same
+    pattern gets the same ID in every feed version regardless of its position.
+
+    Args:
+        route_id: GTFS route_id
+        direction_id: GTFS direction_id (empty/NaN treated as "0")
+        stop_sequence_sig: Pipe-joined stop_ids in stop_sequence order
+
+    Returns:
+        Pattern ID like "P3f9a0c1d2e4b5a68"
+    """
+    direction = str(direction_id) if direction_id not in ("", None) and not pd.isna(direction_id) else "0"
+    key = f"{route_id}\x1f{direction}\x1f{stop_sequence_sig}".encode("utf-8")
+    digest = hashlib.blake2b(key, digest_size=PATTERN_ID_DIGEST_BYTES).hexdigest()
+    return f"P{digest}"
+
+
 def _time_to_seconds(time_str: str) -> int:
     """Convert GTFS time string (HH:MM:SS) to seconds since midnight.
 
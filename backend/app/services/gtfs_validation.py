@@ -0,0 +1,247 @@
+"""Post-load validation for GTFS static sync.
+
+Two passes replace the per-check Supabase round trips:
+- validate_dataset(): vectorized checks over the parsed dataset that was just loaded
+  (row counts, thresholds, mode coverage, light rail coverage/contamination, critical stops)
+- validate_loaded_db(): one gtfs_validate_load() RPC for what only the database knows
+  (stops row count, NULL locations left by the location trigger)
+
+Both return issues per check name; _validate_load (gtfs_static_sync) joins them in
+CHECK_ORDER, so the issue list reads the same as the original sequential checks.
+See migrations/20251126090000_add_validate_load_function.sql.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Issue order in the validation result (original check order)
+CHECK_ORDER = [
+    "row_counts",
+    "stops_count",
+    "null_locations",
+    "min_thresholds",
+    "mode_coverage",
+    "light_rail_coverage",
+    "light_rail_contamination",
+    "critical_stops",
+]
+
+# Tables whose loaded row count must match the parser
+COUNTED_TABLES = ["stops", "routes", "patterns", "trips", "trip_frequencies"]
+
+# Minimum thresholds (sanity check)
+MIN_STOPS = 10000
+MIN_ROUTES = 400
+
+# NSW uses extended route types; mode groups rather than single codes
+MODE_ROUTE_TYPES = [
+    ("rail", [2]),
+    ("bus", [3, 700, 712, 714]),
+    ("ferry", [4]),
+    ("light_rail", [0, 900]),
+    ("metro", [1, 401]),
+]
+
+# Light rail minimum coverage (Sydney has L1/L2/L3 at minimum)
+LIGHT_RAIL_ROUTE_TYPES = [0, 900]
+MIN_LIGHT_RAIL_ROUTES = 3
+MIN_LIGHT_RAIL_TRIPS = 6000
+MIN_LIGHT_RAIL_STOPS = 100
+
+# Train platforms tolerated in light rail patterns before failing
+LIGHT_RAIL_CONTAMINATION_TOLERANCE = 5
+
+# Must-exist stops (names based on NSW GTFS; update if feed naming changes)
+CRITICAL_STOP_NAMES = [
+    "Central Station",
+    "Central Grand Concourse Light Rail",
+    "Central Station, Platform 26",
+    "Davistown, Central RSL Wharf",
+]
+
+# NULL-location stop_ids logged for debugging
+NULL_LOCATION_EXAMPLES = 5
+
+
+def validate_dataset(parsed_data: Dict[str, List[Dict]], loaded_counts: Dict[str, int]) -> Dict[str, Any]:
+    """Run the dataset checks in one vectorized pass over the parsed tables.
+
+    Args:
+        parsed_data: Parsed GTFS data (as loaded)
+        loaded_counts: Row counts from the load
+
+    Returns:
+        Dict with issues (check name → list of issue strings) and light_rail
+        (routes, trips, stops counts)
+    """
+    issues = {check: [] for check in CHECK_ORDER}
+
+    # Row counts match between parser and load
+    for table in COUNTED_TABLES:
+        expected = len(parsed_data.get(table, []))
+        actual = loaded_counts.get(table, 0)
+        if expected != actual:
+            issues["row_counts"].append(f"{table}: expected {expected}, loaded {actual}")
+            logger.error("gtfs_validation_count_mismatch", table=table, expected=expected, actual=actual)
+
+    # Minimum thresholds
+    if loaded_counts.get("stops", 0) < MIN_STOPS:
+        issues["min_thresholds"].append(f"Too few stops: {loaded_counts.get('stops', 0)} < {MIN_STOPS}")
+        logger.error("gtfs_validation_threshold_failed", check="min_stops", actual=loaded_counts.get("stops", 0), threshold=MIN_STOPS)
+    if loaded_counts.get("routes", 0) < MIN_ROUTES:
+        issues["min_thresholds"].append(f"Too few routes: {loaded_counts.get('routes', 0)} < {MIN_ROUTES}")
+        logger.error("gtfs_validation_threshold_failed", check="min_routes", actual=loaded_counts.get("routes", 0), threshold=MIN_ROUTES)
+
+    routes = _frame(parsed_data, "routes", ["route_id", "route_type"])
+    route_types = pd.to_numeric(routes["route_type"], errors="coerce")
+
+    # Mode coverage: at least one route per important mode
+    present_types = set(route_types.dropna().astype(int))
+    for label, types in MODE_ROUTE_TYPES:
+        found = [t for t in types if t in present_types]
+        if found:
+            logger.info("gtfs_validation_mode_found", mode=label, route_type=found[0])
+        else:
+            issues["mode_coverage"].append(f"Missing routes for expected mode {label} (types {sorted(types)})")
+            logger.error("gtfs_validation_mode_coverage_failed", mode=label, expected_types=types)
+
+    # Light rail coverage
+    lr_route_ids = set(routes.loc[route_types.isin(LIGHT_RAIL_ROUTE_TYPES), "route_id"])
+    light_rail = {"routes": len(lr_route_ids), "trips": 0, "stops": 0}
+    if len(lr_route_ids) < MIN_LIGHT_RAIL_ROUTES:
+        issues["light_rail_coverage"].append(
+            f"Light rail routes too low: {len(lr_route_ids)} < {MIN_LIGHT_RAIL_ROUTES} (missing L2/L3?)"
+        )
+        logger.error("gtfs_validation_light_rail_routes_failed", actual=len(lr_route_ids), threshold=MIN_LIGHT_RAIL_ROUTES)
+
+    lr_pattern_stops = pd.DataFrame(columns=["pattern_id", "stop_id"])
+    if lr_route_ids:
+        trips = _frame(parsed_data, "trips", ["route_id"])
+        light_rail["trips"] = int(trips["route_id"].isin(lr_route_ids).sum())
+        # Headway-compressed trips (one block row per run)
+        light_rail["trips"] += sum(
+            len(block["trip_ids"]) for block in parsed_data.get("trip_frequencies") or []
+            if block.get("route_id") in lr_route_ids
+        )
+        if light_rail["trips"] < MIN_LIGHT_RAIL_TRIPS:
+            issues["light_rail_coverage"].append(f"Light rail trips too low: {light_rail['trips']} < {MIN_LIGHT_RAIL_TRIPS}")
+            logger.error("gtfs_validation_light_rail_trips_failed", actual=light_rail["trips"], threshold=MIN_LIGHT_RAIL_TRIPS)
+
+        patterns = _frame(parsed_data, "patterns", ["pattern_id", "route_id"])
+        lr_pattern_ids = set(patterns.loc[patterns["route_id"].isin(lr_route_ids), "pattern_id"])
+        if lr_pattern_ids:
+            pattern_stops = _frame(parsed_data, "pattern_stops", ["pattern_id", "stop_id"])
+            lr_pattern_stops = pattern_stops[pattern_stops["pattern_id"].isin(lr_pattern_ids)]
+            light_rail["stops"] = int(lr_pattern_stops["stop_id"].nunique())
+            if light_rail["stops"] < MIN_LIGHT_RAIL_STOPS:
+                issues["light_rail_coverage"].append(f"Light rail stops too low: {light_rail['stops']} < {MIN_LIGHT_RAIL_STOPS}")
+                logger.error("gtfs_validation_light_rail_stops_failed", actual=light_rail["stops"], threshold=MIN_LIGHT_RAIL_STOPS)
+
+            logger.info("gtfs_validation_light_rail_coverage", **light_rail)
+
+    # Light rail contamination: train platforms (not "Light Rail ... Platform") in light rail patterns
+    stops = _frame(parsed_data, "stops", ["stop_id", "stop_name"])
+    stop_names = stops["stop_name"].fillna("").astype(str)
+    train_platforms = set(stops.loc[
+        stop_names.str.contains("Platform", regex=False) & ~stop_names.str.contains("Light Rail", regex=False),
+        "stop_id"
+    ])
+    contamination_count = int(lr_pattern_stops["stop_id"].isin(train_platforms).sum())
+    if contamination_count > LIGHT_RAIL_CONTAMINATION_TOLERANCE:
+        issues["light_rail_contamination"].append(
+            f"Light rail patterns contaminated with {contamination_count} train platforms"
+        )
+        logger.error("gtfs_validation_light_rail_contamination", count=contamination_count)
+    elif contamination_count > 0:
+        logger.warning("gtfs_validation_light_rail_contamination_minor", count=contamination_count)
+
+    # Critical stop whitelist
+    names_present = set(stop_names)
+    for stop_name in CRITICAL_STOP_NAMES:
+        if stop_name not in names_present:
+            issues["critical_stops"].append(f"Critical stop missing: {stop_name} (no explicit stop_id)")
+            logger.error("gtfs_validation_critical_stop_missing", stop_name=stop_name, stop_id=None)
+
+    return {"issues": issues, "light_rail": light_rail, "light_rail_contamination": contamination_count}
+
+
+def validate_loaded_db(supabase, expected_stops: int) -> Dict[str, Any]:
+    """Check the loaded database with one gtfs_validate_load() call.
+
+    Falls back to the two equivalent PostgREST queries if the function is not deployed.
+
+    Args:
+        supabase: Supabase client (live schema)
+        expected_stops: Stops the load wrote
+
+    Returns:
+        Dict with issues (check name → list of issue strings), db_stops_count, null_locations
+    """
+    issues = {"stops_count": [], "null_locations": []}
+
+    try:
+        stats = supabase.rpc("gtfs_validate_load", {"p_null_examples": NULL_LOCATION_EXAMPLES}).execute().data or {}
+        db_stops_count = stats["stops_count"]
+        null_count = stats["null_locations"]
+        null_examples = stats.get("null_location_examples") or []
+    except Exception as e:
+        logger.warning("gtfs_validation_rpc_unavailable", error=str(e))
+        return _validate_loaded_db_queries(supabase, expected_stops)
+
+    issues["stops_count"] = _stops_count_issues(db_stops_count, expected_stops)
+    issues["null_locations"] = _null_location_issues(null_count, null_examples)
+    return {"issues": issues, "db_stops_count": db_stops_count, "null_locations": null_count}
+
+
+def _validate_loaded_db_queries(supabase, expected_stops: int) -> Dict[str, Any]:
+    """validate_loaded_db() via PostgREST queries (before the SQL function is deployed)."""
+    issues = {"stops_count": [], "null_locations": []}
+    db_stops_count = None
+    null_count = None
+
+    try:
+        db_stops_count = supabase.table("stops").select("stop_id", count="exact").limit(1).execute().count
+        issues["stops_count"] = _stops_count_issues(db_stops_count, expected_stops)
+    except Exception as e:
+        issues["stops_count"].append(f"Failed to query stops count: {str(e)}")
+        logger.error("gtfs_validation_query_failed", table="stops", error=str(e))
+
+    try:
+        null_locations_response = supabase.table("stops").select("stop_id").is_("location", "null").execute()
+        null_count = len(null_locations_response.data)
+        null_examples = [s["stop_id"] for s in null_locations_response.data[:NULL_LOCATION_EXAMPLES]]
+        issues["null_locations"] = _null_location_issues(null_count, null_examples)
+    except Exception as e:
+        issues["null_locations"].append(f"Failed to check NULL locations: {str(e)}")
+        logger.error("gtfs_validation_null_check_failed", error=str(e))
+
+    return {"issues": issues, "db_stops_count": db_stops_count, "null_locations": null_count}
+
+
+def _stops_count_issues(db_stops_count: int, expected_stops: int) -> List[str]:
+    if db_stops_count < expected_stops:
+        logger.error("gtfs_validation_db_count_too_low", db_count=db_stops_count, expected=expected_stops)
+        return [f"DB stops count too low: {db_stops_count} < {expected_stops}"]
+    if db_stops_count != expected_stops:
+        # Allow extra rows (e.g. pre-existing data) but log a warning for skew.
+        logger.warning("gtfs_validation_db_count_skew", db_count=db_stops_count, expected=expected_stops)
+    return []
+
+
+def _null_location_issues(null_count: int, examples: List[str]) -> List[str]:
+    if null_count > 0:
+        logger.error("gtfs_validation_null_locations", null_count=null_count)
+        logger.error("gtfs_validation_null_location_examples", stop_ids=examples)
+        return [f"Found {null_count} stops with NULL location (trigger failed)"]
+    return []
+
+
+def _frame(parsed_data: Dict[str, List[Dict]], table: str, columns: List[str]) -> pd.DataFrame:
+    """Only the needed columns of a parsed table (missing columns as None)."""
+    rows = parsed_data.get(table) or []
+    return pd.DataFrame.from_records(rows, columns=columns) if rows else pd.DataFrame(columns=columns)
@@ -0,0 +1,363 @@
+"""Row-level deltas between iOS gtfs.db versions.
+
+publish_bundle() archives each generated bundle under var/data/versions/ (keeping
+GTFS_BUNDLE_VERSIONS_KEEP), builds a delta from every retained older version to it, and
+writes precompressed variants + manifests for the bundle and each delta (ios_db_variants).
+resolve_update() picks what /gtfs/delta?from=<version> serves: nothing (up to date),
+the delta, or the full bundle when there is no delta for that version or it is not
+worth it (larger than GTFS_DELTA_MAX_RATIO of the full file).
+
+Delta format (a SQLite file; the client ATTACHes it and applies it in one transaction):
+
+    delta_info(key, value)      format, from_version, to_version
+    delta_tables(name, key_columns, deleted, upserted, row_count)
+    "d_<table>"                 keys of rows to delete (rowid + all columns if no
+                                primary key)
+    "u_<table>"                 rows to insert or replace (new and changed rows; rowid
+                                first if no primary key)
+
+Tables with a primary key apply as DELETE ... WHERE (key) IN d_ + INSERT OR REPLACE
+from u_; tables without one (FTS5, R*Tree) delete d_ rowids, then insert u_ with their
+rowids (stops_fts rowids are the app's join key to stops). row_count is the table's
+size in the target version, checked after applying.
+
+Deltas stay small because the generator keeps dictionary IDs (sid/rid/pid) stable
+across versions; a changed table schema makes versions incompatible (full download).
+"""
+
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.ios_db_generator import DEFAULT_IOS_DB_PATH
+from app.services.ios_db_variants import write_variants
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DELTA_FORMAT = "2"
+VERSIONS_DIR = DEFAULT_IOS_DB_PATH.parent / "versions"
+
+# Client-supplied versions are file name parts
+VERSION_PATTERN = r"^[0-9A-Za-z_-]{1,64}$"
+
+
+class DeltaUnavailable(Exception):
+    """Two bundles cannot be diffed (schema changed, version missing)."""
+
+
+def bundle_version(db_path: str) -> Optional[str]:
+    """metadata.bundle_version of a bundle (None for bundles built before versioning)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM metadata WHERE key = 'bundle_version'").fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def publish_bundle(
+    db_path: str = str(DEFAULT_IOS_DB_PATH),
+    versions_dir: Path = VERSIONS_DIR,
+    keep: Optional[int] = None
+) -> Dict[str, Any]:
+    """Archive a generated bundle and build deltas to it from retained older versions.
+
+    Args:
+        db_path: Generated gtfs.db
+        versions_dir: Archive directory (<version>.db, deltas/<from>__<to>.db)
+        keep: Versions retained including this one (default: GTFS_BUNDLE_VERSIONS_KEEP)
+
+    Returns:
+        Dict with version, sha256 (of the bundle), deltas ({from_version: bytes, or
+        None if not buildable}), pruned (removed versions), duration_ms
+    """
+    start_time = time.time()
+    keep = keep or settings.GTFS_BUNDLE_VERSIONS_KEEP
+    version = bundle_version(db_path)
+    if version is None:
+        logger.warning("ios_db_publish_skipped", path=db_path, reason="no_bundle_version")
+        return {"version": None, "sha256": None, "deltas": {}, "pruned": [], "duration_ms": 0}
+
+    versions_dir = Path(versions_dir)
+    deltas_dir = versions_dir / "deltas"
+    deltas_dir.mkdir(parents=True, exist_ok=True)
+    target = versions_dir / f"{version}.db"
+    shutil.copy2(db_path, target)
+
+    # Versions are UTC timestamps: name order is age order
+    older = sorted((p for p in versions_dir.glob("*.db") if p.stem != version), reverse=True)
+    retained, pruned = older[:keep - 1], older[keep - 1:]
+    for path in pruned:
+        path.unlink()
+
+    # Deltas always lead to the newest version; earlier ones (and their variants) are obsolete
+    for path in deltas_dir.iterdir():
+        path.unlink()
+
+    deltas = {}
+    for path in retained:
+        delta_path = deltas_dir / f"{path.stem}__{version}.db"
+        try:
+            deltas[path.stem] = build_delta(str(path), str(target), str(delta_path))["bytes"]
+        except DeltaUnavailable as e:
+            logger.warning("ios_db_delta_unavailable", from_version=path.stem, to_version=version, reason=str(e))
+            deltas[path.stem] = None
+            continue
+        write_variants(str(delta_path), version)
+
+    manifest = write_variants(db_path, version)
+
+    result = {
+        "version": version,
+        "sha256": manifest["identity"]["sha256"],
+        "deltas": deltas,
+        "pruned": [path.stem for path in pruned],
+        "duration_ms": int((time.time() - start_time) * 1000)
+    }
+    logger.info("ios_db_published", **result)
+    return result
+
+
+def build_delta(from_path: str, to_path: str, delta_path: str) -> Dict[str, Any]:
+    """Write the delta turning bundle from_path into to_path.
+
+    Args:
+        from_path: Older bundle
+        to_path: Newer bundle
+        delta_path: Output file (replaced if present)
+
+    Returns:
+        Dict with from_version, to_version, bytes, tables ({name: {deleted, upserted}}),
+        duration_ms
+
+    Raises:
+        DeltaUnavailable: If a bundle has no version or their table schemas differ
+    """
+    start_time = time.time()
+    from_version, to_version = bundle_version(from_path), bundle_version(to_path)
+    if not from_version or not to_version:
+        raise DeltaUnavailable("bundle without bundle_version")
+
+    if os.path.exists(delta_path):
+        os.remove(delta_path)
+    conn = sqlite3.connect(delta_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("ATTACH DATABASE ? AS old", (from_path,))
+        conn.execute("ATTACH DATABASE ? AS new", (to_path,))
+
+        tables = _data_tables(conn, "new")
+        if tables != _data_tables(conn, "old"):
+            raise DeltaUnavailable("table schema changed")
+
+        conn.execute("CREATE TABLE delta_info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.executemany("INSERT INTO delta_info VALUES (?, ?)", [
+            ("format", DELTA_FORMAT), ("from_version", from_version), ("to_version", to_version)
+        ])
+        conn.execute("""
+            CREATE TABLE delta_tables (
+                name TEXT PRIMARY KEY,
+                key_columns TEXT NOT NULL,
+                deleted INTEGER NOT NULL,
+                upserted INTEGER NOT NULL,
+                row_count INTEGER NOT NULL
+            )
+        """)
+
+        summary = {}
+        for name in tables:
+            keys = _key_columns(conn, "new", name)
+            columns = _row_columns(conn, "new", name)
+            key_list = ", ".join(_quote(k) for k in keys) if keys else columns
+            conn.execute(
+                f"CREATE TABLE {_quote('u_' + name)} AS "
+                f"SELECT {columns} FROM new.{_quote(name)} EXCEPT SELECT {columns} FROM old.{_quote(name)}"
+            )
+            conn.execute(
+                f"CREATE TABLE {_quote('d_' + name)} AS "
+                f"SELECT {key_list} FROM old.{_quote(name)} EXCEPT SELECT {key_list} FROM new.{_quote(name)}"
+            )
+            upserted = conn.execute(f"SELECT COUNT(*) FROM {_quote('u_' + name)}").fetchone()[0]
+            deleted = conn.execute(f"SELECT COUNT(*) FROM {_quote('d_' + name)}").fetchone()[0]
+            if not upserted and not deleted:
+                conn.execute(f"DROP TABLE {_quote('u_' + name)}")
+                conn.execute(f"DROP TABLE {_quote('d_' + name)}")
+                continue
+
+            row_count = conn.execute(f"SELECT COUNT(*) FROM new.{_quote(name)}").fetchone()[0]
+            conn.execute(
+                "INSERT INTO delta_tables VALUES (?, ?, ?, ?, ?)",
+                (name, ",".join(keys), deleted, upserted, row_count)
+            )
+            summary[name] = {"deleted": deleted, "upserted": upserted}
+
+        conn.commit()
+        conn.execute("DETACH DATABASE old")
+        conn.execute("DETACH DATABASE new")
+        conn.execute("VACUUM")
+    except Exception:
+        conn.close()
+        if os.path.exists(delta_path):
+            os.remove(delta_path)
+        raise
+    conn.close()
+
+    result = {
+        "from_version": from_version,
+        "to_version": to_version,
+        "bytes": os.path.getsize(delta_path),
+        "tables": summary,
+        "duration_ms": int((time.time() - start_time) * 1000)
+    }
+    logger.info(
+        "ios_db_delta_built",
+        from_version=from_version,
+        to_version=to_version,
+        bytes=result["bytes"],
+        tables=len(summary),
+        rows=sum(t["deleted"] + t["upserted"] for t in summary.values()),
+        duration_ms=result["duration_ms"]
+    )
+    return result
+
+
+def apply_delta(db_path: str, delta_path: str) -> Dict[str, Any]:
+    """Apply a delta to a bundle in place (reference for the iOS client).
+
+    Args:
+        db_path: Bundle at the delta's from_version
+        delta_path: Delta file from build_delta
+
+    Returns:
+        Dict with version (new bundle_version), rows (deleted + upserted), duration_ms
+
+    Raises:
+        DeltaUnavailable: If the bundle is not at the delta's from_version or the delta
+                          has another format
+        ValueError: If a table's row count differs from the target after applying
+    """
+    start_time = time.time()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("ATTACH DATABASE ? AS delta", (delta_path,))
+        info = dict(conn.execute("SELECT key, value FROM delta.delta_info"))
+        if info.get("format") != DELTA_FORMAT:
+            raise DeltaUnavailable(f"delta format {info.get('format')}, expected {DELTA_FORMAT}")
+        current = conn.execute("SELECT value FROM main.metadata WHERE key = 'bundle_version'").fetchone()
+        if not current or current[0] != info["from_version"]:
+            raise DeltaUnavailable(f"bundle is at {current[0] if current else None}, delta needs {info['from_version']}")
+
+        rows = 0
+        conn.execute("BEGIN")
+        try:
+            for name, key_columns, deleted, upserted, row_count in conn.execute(
+                "SELECT name, key_columns, deleted, upserted, row_count FROM delta.delta_tables"
+            ).fetchall():
+                table, removed, added = _quote(name), _quote("d_" + name), _quote("u_" + name)
+                if key_columns:
+                    keys = ", ".join(_quote(k) for k in key_columns.split(","))
+                    conn.execute(f"DELETE FROM main.{table} WHERE ({keys}) IN (SELECT {keys} FROM delta.{removed})")
+                    conn.execute(f"INSERT OR REPLACE INTO main.{table} SELECT * FROM delta.{added}")
+                else:
+                    columns = _row_columns(conn, "main", name)
+                    conn.execute(f"DELETE FROM main.{table} WHERE rowid IN (SELECT rowid FROM delta.{removed})")
+                    conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM delta.{added}")
+
+                actual = conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0]
+                if actual != row_count:
+                    raise ValueError(f"{name}: expected {row_count} rows after delta, got {actual}")
+                rows += deleted + upserted
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    result = {
+        "version": info["to_version"],
+        "rows": rows,
+        "duration_ms": int((time.time() - start_time) * 1000)
+    }
+    logger.info("ios_db_delta_applied", from_version=info["from_version"], **result)
+    return result
+
+
+def resolve_update(
+    from_version: str,
+    db_path: str = str(DEFAULT_IOS_DB_PATH),
+    versions_dir: Path = VERSIONS_DIR,
+    max_ratio: Optional[float] = None
+) -> Dict[str, Any]:
+    """Decide how a client at from_version gets the current bundle.
+
+    Args:
+        from_version: Client's metadata.bundle_version
+        db_path: Currently served gtfs.db
+        versions_dir: publish_bundle archive directory
+        max_ratio: Largest delta served, as a share of the full bundle size
+                   (default: GTFS_DELTA_MAX_RATIO)
+
+    Returns:
+        Dict with kind ("current", "delta" or "full"), to_version, path (file to
+        serve; None for current) and reason (why a full download, else None)
+    """
+    max_ratio = settings.GTFS_DELTA_MAX_RATIO if max_ratio is None else max_ratio
+    to_version = bundle_version(db_path)
+    full = {"kind": "full", "to_version": to_version, "path": str(db_path)}
+
+    if to_version is None:
+        return {**full, "reason": "unversioned_bundle"}
+    if from_version == to_version:
+        return {"kind": "current", "to_version": to_version, "path": None, "reason": None}
+
+    delta_path = Path(versions_dir) / "deltas" / f"{from_version}__{to_version}.db"
+    if not delta_path.exists():
+        return {**full, "reason": "no_delta"}
+    if delta_path.stat().st_size > os.path.getsize(db_path) * max_ratio:
+        return {**full, "reason": "delta_too_large"}
+    return {"kind": "delta", "to_version": to_version, "path": str(delta_path), "reason": None}
+
+
+def _data_tables(conn: sqlite3.Connection, schema: str) -> Dict[str, str]:
+    """{name: CREATE statement} of a bundle's tables (virtual tables included, their shadow tables not)."""
+    names = [
+        row[0] for row in conn.execute(
+            "SELECT name FROM pragma_table_list WHERE schema = ? AND type IN ('table', 'virtual') "
+            "AND name NOT LIKE 'sqlite_%'",
+            (schema,)
+        )
+    ]
+    return {
+        name: conn.execute(f"SELECT sql FROM {schema}.sqlite_master WHERE name = ?", (name,)).fetchone()[0]
+        for name in sorted(names)
+    }
+
+
+def _key_columns(conn: sqlite3.Connection, schema: str, table: str) -> List[str]:
+    """Primary key columns in key order ([] for tables without one, e.g. FTS5)."""
+    info = conn.execute(f"PRAGMA {schema}.table_info({_quote(table)})").fetchall()
+    return [row[1] for row in sorted((row for row in info if row[5]), key=lambda row: row[5])]
+
+
+def _row_columns(conn: sqlite3.Connection, schema: str, table: str) -> str:
+    """Columns a table's rows are diffed on: all (*) with a primary key, else rowid first.
+
+    Tables without a primary key (FTS5, R*Tree) do not expose their rowid in SELECT *,
+    and a re-inserted row would get a new one.
+    """
+    if _key_columns(conn, schema, table):
+        return "*"
+    info = conn.execute(f"PRAGMA {schema}.table_info({_quote(table)})").fetchall()
+    return ", ".join(["rowid", *(_quote(row[1]) for row in info)])
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
@@ -1,43 +1,172 @@
 """iOS SQLite database generator with dictionary encoding.
 
 Queries Supabase pattern tables → transforms to iOS-optimized schema → generates gtfs.db.
+The static sync passes its parse output instead (generate_ios_db(data=...)), so the
+bundle is built without reading the freshly loaded tables back out of Supabase.
+
+Supabase tables are exported with keyset pagination over parallel key ranges, selecting
+only EXPORT_COLUMNS (supabase_export). Every table is streamed: source pages (or parse
+output records) → row transformers → chunked executemany into a temp staging table →
+one INSERT … SELECT into the bundle table, one transaction per table. Dictionaries are
+built and applied inside SQLite, against the replaced bundle attached read-side, so
+Python holds one chunk of rows at a time whatever the feed size.
 
 Key optimizations:
-- Dictionary encoding: text IDs (stop_id, route_id, pattern_id) → compact integers (sid, rid, pid)
+- Dictionary encoding: text IDs (stop_id, route_id, pattern_id, trip_id, service_id) and
+  repeated text (trip_headsign, block_id) → compact integers (sid, rid, pid, tid, svc,
+  hid, bid); IDs of the bundle being replaced are kept, so unchanged rows stay identical
+  between versions (ios_db_delta builds row-level deltas from that)
+- Encoded trips/calendar: trip_data, calendar_data and calendar_dates_data hold only
+  integers; trips, calendar and calendar_dates are views with the original text columns,
+  so the app's queries are unchanged
+- Trips clustered by pattern: tids follow (pattern, start time) and start times are
+  stored as offsets from the pattern's first start (patterns.first_start_secs)
 - WITHOUT ROWID: dict tables only (15-20% size reduction)
 - Bit-packed calendar: 7 boolean columns → 1 INTEGER (7 bits)
 - FTS5: Full-text search index for stop names
+- R*Tree: stops_rtree over stop coordinates (id = sid), so nearby/region stop queries
+  probe an index instead of scanning every stop's lat/lon
+- Optional stop_departures (GTFS_IOS_STOP_DEPARTURES): every departure precomputed per
+  stop, clustered by (sid, service day bitmask, hour) WITHOUT ROWID, times delta-encoded,
+  so offline departures are one primary-key range scan instead of a four-table join
 - PRAGMAs: journal_mode=OFF, page_size=8192, VACUUM
+- Optional per-mode packs (GTFS_IOS_PACKS): the finished bundle is also split into a core
+  pack and one pack per mode with shared dictionary IDs (ios_db_packs)
 
 Target: 15-20MB iOS bundle size
 """
 
+import math
 import sqlite3
 import time
 import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from itertools import chain, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Set, Tuple
 
 VAR_DIR = Path(os.getenv("VAR_DIR", Path(__file__).resolve().parent.parent.parent / "var")).resolve()
 DEFAULT_IOS_DB_PATH = VAR_DIR / "data" / "gtfs.db"
 
+from app.config import settings
 from app.db.supabase_client import get_supabase
+from app.services.gtfs_diff import TABLE_PRIMARY_KEYS
+from app.services.gtfs_frequencies import BLOCK_FIELDS, expand_frequencies
+from app.services.gtfs_offset_deltas import decode_varint, encode_varint
+from app.services.ios_db_packs import build_packs
+from app.services.ios_db_query_gate import gate_bundle
+from app.services.supabase_export import export_pages, export_table
 from app.utils.logging import get_logger
+from app.utils.profiling import current_rss_mb, peak_rss_mb, profile_stage
 
 logger = get_logger(__name__)
 
-
-def generate_ios_db(output_path: str = str(DEFAULT_IOS_DB_PATH)) -> Dict[str, Any]:
-    """Generate iOS SQLite database from Supabase pattern tables.
+# Accepted bundle size (full NSW merge is ~74MB; iOS allows 100MB without a WiFi warning)
+MIN_IOS_DB_SIZE_MB = 5
+MAX_IOS_DB_SIZE_MB = 100
+
+# Calendar day columns in bit order (monday = bit 0)
+CALENDAR_DAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Tables read by the generator (from Supabase or from parse output)
+SOURCE_TABLES = ["stops", "routes", "patterns", "pattern_stops", "trips", "calendar", "calendar_dates"]
+
+# Columns the iOS schema is built from (Supabase export selects only these)
+EXPORT_COLUMNS = {
+    "stops": [
+        "stop_id", "stop_code", "stop_name", "stop_desc", "stop_lat", "stop_lon",
+        "location_type", "parent_station", "wheelchair_boarding", "platform_code",
+    ],
+    "routes": ["route_id", "route_short_name", "route_long_name", "route_type", "route_color", "route_text_color"],
+    "patterns": ["pattern_id", "route_id", "direction_id"],
+    "pattern_stops": ["pattern_id", "stop_sequence", "stop_id", "arrival_offset_secs", "departure_offset_secs"],
+    "trips": [
+        "trip_id", "route_id", "service_id", "pattern_id", "trip_headsign", "trip_short_name",
+        "direction_id", "block_id", "wheelchair_accessible", "start_time_secs",
+    ],
+    "calendar": ["service_id"] + CALENDAR_DAYS + ["start_date", "end_date"],
+    "calendar_dates": ["service_id", "date", "exception_type"],
+}
+EXPORT_COLUMNS["trip_frequencies"] = BLOCK_FIELDS + [c for c in EXPORT_COLUMNS["trips"] if c != "trip_id"]
+
+# Temp staging tables per source table: row transformer output, text IDs kept (same
+# column affinities as the bundle tables, so staged values convert the same way)
+STAGING_COLUMNS = {
+    "stops": [
+        "stop_id TEXT NOT NULL", "stop_code TEXT", "stop_name TEXT", "stop_desc TEXT", "stop_lat REAL",
+        "stop_lon REAL", "location_type INTEGER", "parent_station TEXT", "wheelchair_boarding INTEGER",
+        "platform_code TEXT",
+    ],
+    "routes": [
+        "route_id TEXT NOT NULL", "route_short_name TEXT", "route_long_name TEXT", "route_type INTEGER",
+        "route_color TEXT", "route_text_color TEXT",
+    ],
+    "patterns": ["pattern_id TEXT NOT NULL", "route_id TEXT NOT NULL", "direction_id INTEGER"],
+    "pattern_stops": [
+        "pattern_id TEXT NOT NULL", "stop_sequence INTEGER", "stop_id TEXT NOT NULL",
+        "arrival_offset_secs INTEGER", "departure_offset_secs INTEGER",
+    ],
+    "trips": [
+        "trip_id TEXT NOT NULL", "route_id TEXT NOT NULL", "service_id TEXT NOT NULL", "pattern_id TEXT NOT NULL",
+        "trip_headsign TEXT", "trip_short_name TEXT", "direction_id INTEGER", "block_id TEXT",
+        "wheelchair_accessible INTEGER", "start_time_secs INTEGER",
+    ],
+    "calendar": ["service_id TEXT NOT NULL", "days INTEGER", "start_date TEXT", "end_date TEXT"],
+    "calendar_dates": ["service_id TEXT NOT NULL", "date TEXT", "exception_type INTEGER"],
+}
+
+# Dictionaries: name → (table, text column, integer column)
+DICTIONARY_TABLES = {
+    "stop_dict": ("dict_stop", "stop_id", "sid"),
+    "route_dict": ("dict_route", "route_id", "rid"),
+    "pattern_dict": ("dict_pattern", "pattern_id", "pid"),
+    "service_dict": ("dict_service", "service_id", "svc"),
+    "trip_dict": ("dict_trip", "trip_id", "tid"),
+    "headsign_dict": ("dict_headsign", "headsign", "hid"),
+    "block_dict": ("dict_block", "block_id", "bid"),
+}
+
+# Mean Earth radius for stops_within_radius distances
+EARTH_RADIUS_M = 6_371_000
+
+# stop_departures bucket width (one row per stop, service bitmask and hour)
+DEPARTURE_BUCKET_SECS = 3600
+
+
+def generate_ios_db(
+    output_path: str = str(DEFAULT_IOS_DB_PATH),
+    data: Optional[Dict[str, List[Dict]]] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    bundle_version: Optional[str] = None,
+    stop_departures: Optional[bool] = None,
+    query_gate: Optional[bool] = None,
+    packs: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Generate iOS SQLite database from Supabase pattern tables or parse output.
 
     Args:
         output_path: Path for generated gtfs.db (default: var/data/gtfs.db)
+        data: parse_gtfs output (in memory, or the sync checkpoint's cached copy);
+              when given, Supabase is not queried
+        metadata: gtfs_metadata row describing data (feed_version, feed dates); only
+                  used with data (the Supabase path reads gtfs_metadata)
+        bundle_version: Version stored in metadata.bundle_version (default: UTC
+                        timestamp, sorts chronologically)
+        stop_departures: Also build stop_departures (default: GTFS_IOS_STOP_DEPARTURES)
+        query_gate: Benchmark the app's offline queries against the replaced bundle
+                    and fail on regressions (default: GTFS_QUERY_GATE)
+        packs: Also split the bundle into core and per-mode packs next to it
+               (default: GTFS_IOS_PACKS)
 
     Returns:
-        Dict with generation summary: file_size_mb, row_counts, duration_ms
+        Dict with generation summary: file_size_mb, row_counts, duration_ms, bundle_version,
+        query_benchmark (gate result, when run) (+ departures: total departures in
+        stop_departures, when built; packs: packs manifest, when built)
 
     Raises:
-        ValueError: If validation fails (file size >20MB, row count mismatch)
+        ValueError: If validation fails (file size >20MB, row count mismatch) or an
+                    offline query regressed
         Exception: If Supabase query or SQLite write fails
     """
     start_time = time.time()
@@ -46,49 +175,47 @@ def generate_ios_db(output_path: str = str(DEFAULT_IOS_DB_PATH)) -> Dict[str, An
     # Ensure output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    # Delete existing file to ensure fresh schema
-    if os.path.exists(output_path):
-        try:
-            os.remove(output_path)
-            logger.info("ios_db_removed_existing", path=output_path)
-        except OSError as e:
-            logger.warning("ios_db_remove_failed", path=output_path, error=str(e))
+    bundle_version = bundle_version or new_bundle_version()
+    if stop_departures is None:
+        stop_departures = settings.GTFS_IOS_STOP_DEPARTURES
+    if query_gate is None:
+        query_gate = settings.GTFS_QUERY_GATE
+    if packs is None:
+        packs = settings.GTFS_IOS_PACKS
+
+    # Build into a candidate file; the live bundle stays in place (it is attached for
+    # its dictionary IDs and is the query gate baseline) until the candidate has
+    # passed validation and the gate, then the candidate replaces it atomically
+    candidate_path = output_path + ".partial"
+    previous_path = output_path if os.path.exists(output_path) else None
+    if os.path.exists(candidate_path):
+        os.remove(candidate_path)
+    conn = None
 
     try:
-        # Step 1: Query Supabase for all tables
-        logger.info("ios_db_stage_start", stage="fetch_supabase")
+        # Step 1: Open the source tables (Supabase page streams, or the parse output)
+        source_stage = "fetch_supabase" if data is None else "parse_output"
+        logger.info("ios_db_stage_start", stage=source_stage)
         fetch_start = time.time()
-        supabase_data = _fetch_supabase_data()
+        with profile_stage("ios_db_step", step=source_stage):
+            if data is None:
+                supabase_data = _fetch_supabase_data()
+            else:
+                supabase_data = _source_from_parse_output(data, metadata)
         fetch_duration_ms = int((time.time() - fetch_start) * 1000)
         logger.info(
             "ios_db_stage_complete",
-            stage="fetch_supabase",
-            duration_ms=fetch_duration_ms,
-            stops=len(supabase_data["stops"]),
-            routes=len(supabase_data["routes"]),
-            patterns=len(supabase_data["patterns"])
+            stage=source_stage,
+            duration_ms=fetch_duration_ms
         )
 
-        # Step 2: Build dictionaries (text IDs → integers)
-        logger.info("ios_db_stage_start", stage="build_dictionaries")
-        dict_start = time.time()
-        dictionaries = _build_dictionaries(supabase_data)
-        dict_duration_ms = int((time.time() - dict_start) * 1000)
-        logger.info(
-            "ios_db_stage_complete",
-            stage="build_dictionaries",
-            duration_ms=dict_duration_ms,
-            stop_dict_size=len(dictionaries["stop_dict"]),
-            route_dict_size=len(dictionaries["route_dict"]),
-            pattern_dict_size=len(dictionaries["pattern_dict"])
-        )
-
-        # Step 3: Create SQLite file and schema
+        # Step 2: Create SQLite file and schema
         logger.info("ios_db_stage_start", stage="create_schema")
         schema_start = time.time()
-        conn = sqlite3.connect(output_path)
-        _apply_pragmas(conn)
-        _create_schema(conn)
+        with profile_stage("ios_db_step", step="create_schema"):
+            conn = sqlite3.connect(candidate_path)
+            _apply_pragmas(conn)
+            _create_schema(conn, stop_departures=stop_departures)
         schema_duration_ms = int((time.time() - schema_start) * 1000)
         logger.info(
             "ios_db_stage_complete",
@@ -96,26 +223,53 @@ def generate_ios_db(output_path: str = str(DEFAULT_IOS_DB_PATH)) -> Dict[str, An
             duration_ms=schema_duration_ms
         )
 
-        # Step 4: Insert data (dictionaries + main tables)
+        # Step 3: Stream data in (dictionaries + main tables), keeping the replaced
+        # bundle's dictionary IDs so unchanged rows stay identical
         logger.info("ios_db_stage_start", stage="insert_data")
         insert_start = time.time()
-        row_counts = _insert_data(conn, supabase_data, dictionaries)
+        with profile_stage("ios_db_step", step="insert_data") as stage:
+            previous_tables = _attach_previous(conn, previous_path)
+            row_counts = _insert_data(conn, supabase_data, bundle_version, previous_tables)
+            if previous_tables:
+                conn.execute("DETACH DATABASE previous")
+            stage["rows"] = sum(row_counts.values())
         insert_duration_ms = int((time.time() - insert_start) * 1000)
         logger.info(
             "ios_db_stage_complete",
             stage="insert_data",
             duration_ms=insert_duration_ms,
-            total_rows=sum(row_counts.values())
+            total_rows=sum(row_counts.values()),
+            previous_ids=bool(previous_tables),
+            peak_rss_mb=peak_rss_mb()
         )
 
-        # Step 5: VACUUM (critical for size reduction)
+        # Step 3b: Precompute per-stop departures from the inserted tables
+        departures = None
+        if stop_departures:
+            logger.info("ios_db_stage_start", stage="stop_departures")
+            departures_start = time.time()
+            with profile_stage("ios_db_step", step="stop_departures") as stage:
+                departure_counts = _build_stop_departures(conn)
+                departures = departure_counts.pop("departures")
+                row_counts.update(departure_counts)
+                stage["rows"] = row_counts["stop_departures"]
+            logger.info(
+                "ios_db_stage_complete",
+                stage="stop_departures",
+                duration_ms=int((time.time() - departures_start) * 1000),
+                departures=departures,
+                rows=row_counts["stop_departures"]
+            )
+
+        # Step 4: VACUUM (critical for size reduction)
         logger.info("ios_db_stage_start", stage="vacuum")
         vacuum_start = time.time()
-        size_before_mb = os.path.getsize(output_path) / 1024 / 1024
-        conn.execute("VACUUM")
-        conn.commit()
+        size_before_mb = os.path.getsize(candidate_path) / 1024 / 1024
+        with profile_stage("ios_db_step", step="vacuum"):
+            conn.execute("VACUUM")
+            conn.commit()
         vacuum_duration_ms = int((time.time() - vacuum_start) * 1000)
-        size_after_mb = os.path.getsize(output_path) / 1024 / 1024
+        size_after_mb = os.path.getsize(candidate_path) / 1024 / 1024
         reclaimed_mb = size_before_mb - size_after_mb
         logger.info(
             "ios_db_stage_complete",
@@ -126,17 +280,48 @@ def generate_ios_db(output_path: str = str(DEFAULT_IOS_DB_PATH)) -> Dict[str, An
             reclaimed_mb=round(reclaimed_mb, 2)
         )
 
-        # Step 6: Close and validate
+        # Step 5: Close and validate
         conn.close()
+        conn = None
 
         logger.info("ios_db_stage_start", stage="validation")
-        validation_result = _validate_ios_db(output_path, supabase_data, row_counts)
+        with profile_stage("ios_db_step", step="validation"):
+            validation_result = _validate_ios_db(candidate_path, supabase_data, row_counts)
         logger.info(
             "ios_db_stage_complete",
             stage="validation",
             validation_passed=validation_result["passed"]
         )
 
+        # Step 6: Offline query gate (latency vs the replaced bundle)
+        query_benchmark = None
+        if query_gate:
+            logger.info("ios_db_stage_start", stage="query_gate")
+            with profile_stage("ios_db_step", step="query_gate"):
+                query_benchmark = gate_bundle(candidate_path, previous_path)
+            logger.info(
+                "ios_db_stage_complete",
+                stage="query_gate",
+                compared=query_benchmark["previous"] is not None
+            )
+
+        # Step 7: Publish the candidate (only a bundle that passed every check)
+        os.replace(candidate_path, output_path)
+        logger.info("ios_db_published", path=output_path, replaced=previous_path is not None)
+
+        # Step 8: Core + per-mode packs from the published bundle
+        packs_manifest = None
+        if packs:
+            logger.info("ios_db_stage_start", stage="packs")
+            with profile_stage("ios_db_step", step="packs"):
+                packs_manifest = build_packs(output_path, bundle_version)
+            logger.info(
+                "ios_db_stage_complete",
+                stage="packs",
+                duration_ms=packs_manifest["duration_ms"],
+                packs=len(packs_manifest["packs"])
+            )
+
         # Final summary
         total_duration_ms = int((time.time() - start_time) * 1000)
         file_size_mb = os.path.getsize(output_path) / 1024 / 1024
@@ -146,9 +331,15 @@ def generate_ios_db(output_path: str = str(DEFAULT_IOS_DB_PATH)) -> Dict[str, An
             "file_path": output_path,
             "file_size_mb": round(file_size_mb, 2),
             "duration_ms": total_duration_ms,
+            "bundle_version": bundle_version,
             "row_counts": row_counts,
-            "validation": validation_result
+            "validation": validation_result,
+            "query_benchmark": query_benchmark
         }
+        if departures is not None:
+            result["departures"] = departures
+        if packs_manifest is not None:
+            result["packs"] = packs_manifest
 
         logger.info(
             "ios_db_generated",
@@ -172,75 +363,108 @@ def generate_ios_db(output_path: str = str(DEFAULT_IOS_DB_PATH)) -> Dict[str, An
             duration_ms=duration_ms
         )
         raise
+    finally:
+        # A failed candidate is discarded; the live bundle was never touched
+        if conn is not None:
+            conn.close()
+        if os.path.exists(candidate_path):
+            os.remove(candidate_path)
 
 
-def _fetch_supabase_data() -> Dict[str, List[Dict]]:
-    """Fetch all required tables from Supabase.
+def _fetch_supabase_data() -> Dict[str, Any]:
+    """Export all required tables from Supabase.
+
+    Every table comes back as StreamedRows, fetched page by page while it is staged
+    (trip_frequencies, compact by design, is collected and expanded).
 
     Returns:
         Dict with keys: stops, routes, patterns, pattern_stops, trips, calendar, calendar_dates, metadata
     """
     supabase = get_supabase()
+    export_options = {
+        "page_size": settings.GTFS_EXPORT_PAGE_SIZE,
+        "parallelism": settings.GTFS_EXPORT_PARALLELISM,
+    }
 
-    # Fetch all tables with pagination (Supabase default limit is 1000)
     data = {}
+    for table in SOURCE_TABLES:
+        columns, key_columns = EXPORT_COLUMNS[table], TABLE_PRIMARY_KEYS[table]
+        data[table] = StreamedRows(export_pages(supabase, table, columns, key_columns, **export_options))
 
-    tables = ["stops", "routes", "patterns", "pattern_stops", "trips", "calendar", "calendar_dates"]
-
-    for table in tables:
+    frequencies = []
+    if settings.GTFS_FREQUENCY_COMPRESSION:
+        table = "trip_frequencies"
         logger.info("ios_db_fetch_table_start", table=table)
+        frequencies = export_table(supabase, table, EXPORT_COLUMNS[table], TABLE_PRIMARY_KEYS[table], **export_options)
+        logger.info("ios_db_fetch_table_complete", table=table, rows=len(frequencies))
+    if frequencies:
+        data["trips"] = StreamedRows(chain(data["trips"].pages, [expand_frequencies(frequencies)]))
+        logger.info("ios_db_frequencies_expanded", blocks=len(frequencies))
 
-        # Fetch all rows using range pagination
-        # Supabase range is inclusive: range(0, 999) returns rows 0-999 (1000 rows)
-        # But the client seems to return 999, so we adjust
-        all_rows = []
-        offset = 0
-        page_size = 999  # Observed behavior from Supabase client
+    # Fetch metadata separately
+    metadata_response = supabase.table("gtfs_metadata").select("*").limit(1).execute()
+    data["metadata"] = metadata_response.data[0] if metadata_response.data else {}
 
-        while True:
-            end_range = offset + page_size
-            response = supabase.table(table).select("*").range(offset, end_range).execute()
-            if not response.data:
-                break
+    return data
 
-            rows_fetched = len(response.data)
-            all_rows.extend(response.data)
-            logger.info("ios_db_fetch_page", table=table, offset=offset, rows_fetched=rows_fetched)
 
-            # If we got fewer rows than expected, we've reached the end
-            if rows_fetched < page_size:
-                break
+class StreamedRows:
+    """Rows of a table arriving page by page; iterable once, counting rows as they pass."""
 
-            offset += rows_fetched  # Move offset by actual rows fetched
+    def __init__(self, pages: Iterable[List[Dict]]):
+        self.pages = pages
+        self.count = 0
 
-        data[table] = all_rows
-        logger.info("ios_db_fetch_table_complete", table=table, rows=len(all_rows))
+    def __iter__(self) -> Iterator[Dict]:
+        for page in self.pages:
+            self.count += len(page)
+            yield from page
 
-    # Fetch metadata separately
-    metadata_response = supabase.table("gtfs_metadata").select("*").limit(1).execute()
-    data["metadata"] = metadata_response.data[0] if metadata_response.data else {}
 
-    return data
+def _source_rows(rows: Any) -> int:
+    """Rows read from a source table (list, or StreamedRows after it was consumed)."""
+    return rows.count if isinstance(rows, StreamedRows) else len(rows)
 
 
-def _build_dictionaries(data: Dict[str, List[Dict]]) -> Dict[str, Dict[str, int]]:
-    """Build ID dictionaries (text → integer) for dictionary encoding.
+def _source_from_parse_output(
+    parsed: Dict[str, List[Dict]],
+    metadata: Optional[Dict[str, Any]]
+) -> Dict[str, List[Dict]]:
+    """Parse output in the shape _fetch_supabase_data returns.
+
+    Tables are referenced, not copied; values stay as parsed (strings, NaN) and are
+    normalized row by row while inserting (_insert_data). Columns beyond
+    EXPORT_COLUMNS are ignored by the inserts.
 
     Args:
-        data: Supabase data with stops, routes, patterns
+        parsed: parse_gtfs output
+        metadata: gtfs_metadata row for the parsed feed
 
     Returns:
-        Dict with stop_dict, route_dict, pattern_dict mappings
+        Dict with keys: stops, routes, patterns, pattern_stops, trips, calendar, calendar_dates, metadata
     """
-    stop_dict = {stop["stop_id"]: idx + 1 for idx, stop in enumerate(data["stops"])}
-    route_dict = {route["route_id"]: idx + 1 for idx, route in enumerate(data["routes"])}
-    pattern_dict = {pattern["pattern_id"]: idx + 1 for idx, pattern in enumerate(data["patterns"])}
+    data = {table: parsed.get(table) or [] for table in SOURCE_TABLES}
+    data["trips"] = _with_frequency_trips(data["trips"], parsed.get("trip_frequencies") or [])
+    data["metadata"] = metadata or {}
+    logger.info(
+        "ios_db_parse_output_source",
+        **{table: len(rows) for table, rows in data.items() if table != "metadata"}
+    )
+    return data
+
+
+def _with_frequency_trips(trips: List[Dict], frequencies: List[Dict]) -> List[Dict]:
+    """Frequency blocks become plain trips rows again (the app schema has no blocks)."""
+    if not frequencies:
+        return trips
+    expanded = trips + expand_frequencies(frequencies)
+    logger.info("ios_db_frequencies_expanded", blocks=len(frequencies), trips=len(expanded))
+    return expanded
 
-    return {
-        "stop_dict": stop_dict,
-        "route_dict": route_dict,
-        "pattern_dict": pattern_dict
-    }
+
+def new_bundle_version() -> str:
+    """UTC timestamp version (microseconds, so back-to-back bundles differ)."""
+    return datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
 
 
 def _apply_pragmas(conn: sqlite3.Connection):
@@ -252,22 +476,29 @@ def _apply_pragmas(conn: sqlite3.Connection):
     conn.execute("PRAGMA journal_mode=OFF")  # No WAL (read-only DB)
     conn.execute("PRAGMA page_size=8192")    # Larger pages = fewer seeks
     conn.execute("PRAGMA synchronous=OFF")   # Faster writes during generation
+    conn.execute("PRAGMA temp_store=FILE")   # Staging tables spill to disk, not RAM
     conn.commit()
 
-    logger.info("ios_db_pragmas_applied", journal_mode="OFF", page_size=8192)
+    logger.info("ios_db_pragmas_applied", journal_mode="OFF", page_size=8192, temp_store="FILE")
 
 
-def _create_schema(conn: sqlite3.Connection):
+def _create_schema(conn: sqlite3.Connection, stop_departures: bool = False):
     """Create iOS SQLite schema with dictionary encoding.
 
     Schema differences from Supabase:
-    - dict_stop, dict_route, dict_pattern (WITHOUT ROWID)
-    - Main tables use integer FKs (sid, rid, pid)
+    - dict_stop, dict_route, dict_pattern, dict_service, dict_trip, dict_headsign,
+      dict_block (WITHOUT ROWID)
+    - Main tables use integer FKs (sid, rid, pid, svc, tid, hid, bid)
+    - trips, calendar, calendar_dates are views over trip_data, calendar_data,
+      calendar_dates_data that decode them back to the text columns
     - calendar.days is bit-packed INTEGER (7 bits)
     - stops_fts is FTS5 virtual table
+    - stops_rtree is an R*Tree over stop coordinates (id = sid)
+    - Optional stop_departures (see _build_stop_departures)
 
     Args:
         conn: SQLite connection
+        stop_departures: Create stop_departures
     """
     # Dictionary tables (WITHOUT ROWID)
     conn.execute("""
@@ -291,6 +522,34 @@ def _create_schema(conn: sqlite3.Connection):
         ) WITHOUT ROWID
     """)
 
+    conn.execute("""
+        CREATE TABLE dict_service (
+            svc INTEGER PRIMARY KEY,
+            service_id TEXT UNIQUE NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+        CREATE TABLE dict_trip (
+            tid INTEGER PRIMARY KEY,
+            trip_id TEXT UNIQUE NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+        CREATE TABLE dict_headsign (
+            hid INTEGER PRIMARY KEY,
+            headsign TEXT UNIQUE NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+    conn.execute("""
+        CREATE TABLE dict_block (
+            bid INTEGER PRIMARY KEY,
+            block_id TEXT UNIQUE NOT NULL
+        ) WITHOUT ROWID
+    """)
+
     # Main tables (use integer FKs)
     conn.execute("""
         CREATE TABLE stops (
@@ -322,7 +581,8 @@ def _create_schema(conn: sqlite3.Connection):
         CREATE TABLE patterns (
             pid INTEGER PRIMARY KEY,
             rid INTEGER NOT NULL,
-            direction_id INTEGER NOT NULL
+            direction_id INTEGER NOT NULL,
+            first_start_secs INTEGER
         )
     """)
 
@@ -342,24 +602,27 @@ def _create_schema(conn: sqlite3.Connection):
         "CREATE INDEX IF NOT EXISTS idx_pattern_stops_sid_offset ON pattern_stops (sid, departure_offset_secs)"
     )
 
+    # tid order = (pattern, start time), so a pattern's trips share pages;
+    # start_time_secs = patterns.first_start_secs + start_offset_secs
     conn.execute("""
-        CREATE TABLE trips (
-            trip_id TEXT PRIMARY KEY,
-            rid INTEGER NOT NULL,
-            service_id TEXT NOT NULL,
+        CREATE TABLE trip_data (
+            tid INTEGER PRIMARY KEY,
             pid INTEGER NOT NULL,
-            trip_headsign TEXT,
+            start_offset_secs INTEGER,
+            rid INTEGER NOT NULL,
+            svc INTEGER NOT NULL,
+            hid INTEGER,
             trip_short_name TEXT,
             direction_id INTEGER,
-            block_id TEXT,
+            bid INTEGER,
             wheelchair_accessible INTEGER
         )
     """)
 
     # Calendar with bit-packed days
     conn.execute("""
-        CREATE TABLE calendar (
-            service_id TEXT PRIMARY KEY,
+        CREATE TABLE calendar_data (
+            svc INTEGER PRIMARY KEY,
             days INTEGER NOT NULL,
             start_date TEXT NOT NULL,
             end_date TEXT NOT NULL
@@ -367,14 +630,40 @@ def _create_schema(conn: sqlite3.Connection):
     """)
 
     conn.execute("""
-        CREATE TABLE calendar_dates (
-            service_id TEXT NOT NULL,
+        CREATE TABLE calendar_dates_data (
+            svc INTEGER NOT NULL,
             date TEXT NOT NULL,
             exception_type INTEGER NOT NULL,
-            PRIMARY KEY (service_id, date)
+            PRIMARY KEY (svc, date)
         )
     """)
 
+    # Views keep the text-keyed tables the app queries (same columns, same order)
+    conn.execute("""
+        CREATE VIEW trips AS
+        SELECT dt.trip_id, t.rid, ds.service_id, t.pid, dh.headsign AS trip_headsign,
+               t.trip_short_name, t.direction_id, db.block_id, t.wheelchair_accessible,
+               p.first_start_secs + t.start_offset_secs AS start_time_secs
+        FROM trip_data t
+        JOIN dict_trip dt ON dt.tid = t.tid
+        JOIN dict_service ds ON ds.svc = t.svc
+        JOIN patterns p ON p.pid = t.pid
+        LEFT JOIN dict_headsign dh ON dh.hid = t.hid
+        LEFT JOIN dict_block db ON db.bid = t.bid
+    """)
+
+    conn.execute("""
+        CREATE VIEW calendar AS
+        SELECT ds.service_id, c.days, c.start_date, c.end_date
+        FROM calendar_data c JOIN dict_service ds ON ds.svc = c.svc
+    """)
+
+    conn.execute("""
+        CREATE VIEW calendar_dates AS
+        SELECT ds.service_id, cd.date, cd.exception_type
+        FROM calendar_dates_data cd JOIN dict_service ds ON ds.svc = cd.svc
+    """)
+
     # FTS5 search index
     conn.execute("""
         CREATE VIRTUAL TABLE stops_fts USING fts5(
@@ -383,6 +672,16 @@ def _create_schema(conn: sqlite3.Connection):
         )
     """)
 
+    # R*Tree spatial index: one point box per stop (32-bit floats, rounded outwards,
+    # so a box probe is a superset; filter on stops.stop_lat/stop_lon for exact bounds)
+    conn.execute("""
+        CREATE VIRTUAL TABLE stops_rtree USING rtree(
+            sid,
+            min_lat, max_lat,
+            min_lon, max_lon
+        )
+    """)
+
     # Metadata
     conn.execute("""
         CREATE TABLE metadata (
@@ -391,210 +690,609 @@ def _create_schema(conn: sqlite3.Connection):
         )
     """)
 
+    if stop_departures:
+        # departures: zigzag varints, first = secs after hour * 3600, then secs since previous
+        # tids: zigzag varint dict_trip.tid per departure, same order
+        conn.execute("""
+            CREATE TABLE stop_departures (
+                sid INTEGER NOT NULL,
+                days INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                departures BLOB NOT NULL,
+                tids BLOB NOT NULL,
+                PRIMARY KEY (sid, days, hour)
+            ) WITHOUT ROWID
+        """)
+
     conn.commit()
-    logger.info("ios_db_schema_created", tables=12)
+    logger.info("ios_db_schema_created", tables=18 if stop_departures else 17, views=3)
 
 
 def _insert_data(
     conn: sqlite3.Connection,
     data: Dict[str, List[Dict]],
-    dictionaries: Dict[str, Dict[str, int]]
+    bundle_version: str,
+    previous_tables: Optional[Set[str]] = None
 ) -> Dict[str, int]:
     """Insert all data into iOS SQLite.
 
+    Every source table is streamed: rows pass through a row transformer into its temp
+    staging table (_stage, chunked executemany), dictionaries are built from the staged
+    text IDs, and the main table is filled by one INSERT … SELECT joining the dict
+    tables. Each table is one transaction, logged with its memory (_table_stage). Values
+    may come typed from Supabase or as parser strings (parse output); SQLite column
+    affinity, _value and _iso_date make both produce the same rows.
+
     Args:
         conn: SQLite connection
-        data: Supabase data
-        dictionaries: ID mappings (text → int)
+        data: Supabase data or parse output (see _source_from_parse_output)
+        bundle_version: Stored as metadata.bundle_version
+        previous_tables: Dict tables of the replaced bundle, attached as `previous`
+                         (_attach_previous); their IDs are kept
 
     Returns:
-        Dict mapping table names to row counts
+        Dict mapping table names to row counts (trips/calendar/calendar_dates count
+        the rows behind their views)
     """
+    previous_tables = previous_tables or set()
     counts = {}
 
-    # Insert dictionaries
-    stop_dict_rows = [(v, k) for k, v in dictionaries["stop_dict"].items()]
-    conn.executemany("INSERT INTO dict_stop VALUES (?, ?)", stop_dict_rows)
-    counts["dict_stop"] = len(stop_dict_rows)
-    logger.info("ios_db_table_inserted", table="dict_stop", rows=len(stop_dict_rows))
-
-    # Validate dict_stop completeness
-    stops_count = len(data["stops"])
-    dict_stop_count = len(stop_dict_rows)
-    if stops_count != dict_stop_count:
-        logger.error("dict_stop_validation_failed", stops_count=stops_count, dict_stop_count=dict_stop_count)
-        raise ValueError(f"dict_stop validation failed: {stops_count} stops but {dict_stop_count} dict_stop entries")
-    logger.info("dict_stop_validated", stops_count=stops_count, dict_stop_count=dict_stop_count)
-
-    route_dict_rows = [(v, k) for k, v in dictionaries["route_dict"].items()]
-    conn.executemany("INSERT INTO dict_route VALUES (?, ?)", route_dict_rows)
-    counts["dict_route"] = len(route_dict_rows)
-    logger.info("ios_db_table_inserted", table="dict_route", rows=len(route_dict_rows))
-
-    pattern_dict_rows = [(v, k) for k, v in dictionaries["pattern_dict"].items()]
-    conn.executemany("INSERT INTO dict_pattern VALUES (?, ?)", pattern_dict_rows)
-    counts["dict_pattern"] = len(pattern_dict_rows)
-    logger.info("ios_db_table_inserted", table="dict_pattern", rows=len(pattern_dict_rows))
-
-    # Insert stops
-    stops_rows = [
-        (
-            dictionaries["stop_dict"][s["stop_id"]],
-            s.get("stop_code"),
-            s["stop_name"],
-            s.get("stop_desc"),
-            s["stop_lat"],
-            s["stop_lon"],
-            s.get("location_type"),
-            s.get("parent_station"),
-            s.get("wheelchair_boarding"),
-            s.get("platform_code")
+    # Stops (+ dict_stop)
+    with _table_stage(conn, "stops") as stage:
+        staged = _stage(conn, "stops", data["stops"], _stop_row)
+        counts["dict_stop"] = _insert_dictionary(
+            conn, "stop_dict", "SELECT stop_id AS value, 0 AS ord FROM temp.stops_source GROUP BY stop_id",
+            previous_tables
         )
-        for s in data["stops"]
-    ]
-    conn.executemany(
-        "INSERT INTO stops VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        stops_rows
-    )
-    counts["stops"] = len(stops_rows)
-    logger.info("ios_db_table_inserted", table="stops", rows=len(stops_rows))
-
-    # Insert routes
-    routes_rows = [
-        (
-            dictionaries["route_dict"][r["route_id"]],
-            r.get("route_short_name"),
-            r.get("route_long_name"),
-            r["route_type"],
-            r.get("route_color"),
-            r.get("route_text_color")
+
+        # Validate dict_stop completeness
+        if staged != counts["dict_stop"]:
+            logger.error("dict_stop_validation_failed", stops_count=staged, dict_stop_count=counts["dict_stop"])
+            raise ValueError(f"dict_stop validation failed: {staged} stops but {counts['dict_stop']} dict_stop entries")
+        logger.info("dict_stop_validated", stops_count=staged, dict_stop_count=counts["dict_stop"])
+
+        counts["stops"] = stage["rows"] = conn.execute("""
+            INSERT INTO stops
+            SELECT d.sid, s.stop_code, s.stop_name, s.stop_desc, s.stop_lat, s.stop_lon,
+                   s.location_type, s.parent_station, s.wheelchair_boarding, s.platform_code
+            FROM temp.stops_source s
+            JOIN dict_stop d ON d.stop_id = s.stop_id
+            ORDER BY d.sid
+        """).rowcount
+        conn.execute("DROP TABLE temp.stops_source")
+
+    # Routes (+ dict_route)
+    with _table_stage(conn, "routes") as stage:
+        staged = _stage(conn, "routes", data["routes"], _route_row)
+        counts["dict_route"] = _insert_dictionary(
+            conn, "route_dict", "SELECT route_id AS value, 0 AS ord FROM temp.routes_source GROUP BY route_id",
+            previous_tables
         )
-        for r in data["routes"]
-    ]
-    conn.executemany(
-        "INSERT INTO routes VALUES (?, ?, ?, ?, ?, ?)",
-        routes_rows
-    )
-    counts["routes"] = len(routes_rows)
-    logger.info("ios_db_table_inserted", table="routes", rows=len(routes_rows))
-
-    # Insert patterns
-    patterns_rows = [
-        (
-            dictionaries["pattern_dict"][p["pattern_id"]],
-            dictionaries["route_dict"][p["route_id"]],
-            p["direction_id"]
+        counts["routes"] = stage["rows"] = conn.execute("""
+            INSERT INTO routes
+            SELECT d.rid, s.route_short_name, s.route_long_name, s.route_type, s.route_color, s.route_text_color
+            FROM temp.routes_source s
+            JOIN dict_route d ON d.route_id = s.route_id
+            ORDER BY d.rid
+        """).rowcount
+        conn.execute("DROP TABLE temp.routes_source")
+
+    # Patterns (+ dict_pattern)
+    with _table_stage(conn, "patterns") as stage:
+        staged = _stage(conn, "patterns", data["patterns"], _pattern_row)
+        counts["dict_pattern"] = _insert_dictionary(
+            conn, "pattern_dict", "SELECT pattern_id AS value, 0 AS ord FROM temp.patterns_source GROUP BY pattern_id",
+            previous_tables
         )
-        for p in data["patterns"]
+        counts["patterns"] = stage["rows"] = conn.execute("""
+            INSERT INTO patterns (pid, rid, direction_id)
+            SELECT dp.pid, dr.rid, s.direction_id
+            FROM temp.patterns_source s
+            JOIN dict_pattern dp ON dp.pattern_id = s.pattern_id
+            JOIN dict_route dr ON dr.route_id = s.route_id
+            ORDER BY dp.pid
+        """).rowcount
+        _check_translated("patterns", staged, counts["patterns"])
+        conn.execute("DROP TABLE temp.patterns_source")
+
+    # Pattern stops
+    with _table_stage(conn, "pattern_stops") as stage:
+        staged = _stage(conn, "pattern_stops", data["pattern_stops"], _pattern_stop_row)
+        counts["pattern_stops"] = stage["rows"] = conn.execute("""
+            INSERT INTO pattern_stops
+            SELECT dp.pid, s.stop_sequence, ds.sid, s.arrival_offset_secs, s.departure_offset_secs
+            FROM temp.pattern_stops_source s
+            JOIN dict_pattern dp ON dp.pattern_id = s.pattern_id
+            JOIN dict_stop ds ON ds.stop_id = s.stop_id
+            ORDER BY dp.pid, s.stop_sequence
+        """).rowcount
+        _check_translated("pattern_stops", staged, counts["pattern_stops"])
+        conn.execute("DROP TABLE temp.pattern_stops_source")
+
+    # Trips (+ service, trip, headsign and block dictionaries; calendar is staged
+    # first because its service IDs share dict_service)
+    with _table_stage(conn, "trips") as stage:
+        staged = _stage(conn, "trips", data["trips"], _trip_row)
+        _stage(conn, "calendar", data["calendar"], _calendar_row)
+        _stage(conn, "calendar_dates", data["calendar_dates"], _calendar_date_row)
+
+        # Services and headsigns most-used first, so common values get the 1-byte
+        # integers; trips in (pattern, start time) order, so trip_data clusters by pattern
+        counts["dict_service"] = _insert_dictionary(conn, "service_dict", """
+            SELECT service_id AS value, MIN(ord) AS ord FROM (
+                SELECT service_id, -COUNT(*) AS ord FROM temp.trips_source GROUP BY service_id
+                UNION ALL SELECT service_id, 0 FROM temp.calendar_source
+                UNION ALL SELECT service_id, 0 FROM temp.calendar_dates_source
+            )
+            GROUP BY service_id
+        """, previous_tables)
+        counts["dict_trip"] = _insert_dictionary(conn, "trip_dict", """
+            SELECT s.trip_id AS value, ROW_NUMBER() OVER (ORDER BY dp.pid, s.start_time_secs, s.trip_id) AS ord
+            FROM temp.trips_source s
+            JOIN dict_pattern dp ON dp.pattern_id = s.pattern_id
+        """, previous_tables)
+        counts["dict_headsign"] = _insert_dictionary(conn, "headsign_dict", """
+            SELECT trip_headsign AS value, -COUNT(*) AS ord
+            FROM temp.trips_source WHERE trip_headsign IS NOT NULL GROUP BY trip_headsign
+        """, previous_tables)
+        counts["dict_block"] = _insert_dictionary(conn, "block_dict", """
+            SELECT block_id AS value, 0 AS ord
+            FROM temp.trips_source WHERE block_id IS NOT NULL GROUP BY block_id
+        """, previous_tables)
+
+        # Pattern base start times, then trips as offsets in tid (pattern, start) order
+        conn.execute("""
+            UPDATE patterns SET first_start_secs = s.first_start_secs
+            FROM (
+                SELECT dp.pid, MIN(t.start_time_secs) AS first_start_secs
+                FROM temp.trips_source t JOIN dict_pattern dp ON dp.pattern_id = t.pattern_id
+                GROUP BY dp.pid
+            ) AS s
+            WHERE s.pid = patterns.pid
+        """)
+        counts["trips"] = stage["rows"] = conn.execute("""
+            INSERT INTO trip_data
+            SELECT dt.tid, p.pid, s.start_time_secs - p.first_start_secs, dr.rid, ds.svc, dh.hid,
+                   s.trip_short_name, s.direction_id, db.bid, s.wheelchair_accessible
+            FROM temp.trips_source s
+            JOIN dict_trip dt ON dt.trip_id = s.trip_id
+            JOIN dict_service ds ON ds.service_id = s.service_id
+            JOIN dict_pattern dp ON dp.pattern_id = s.pattern_id
+            JOIN patterns p ON p.pid = dp.pid
+            JOIN dict_route dr ON dr.route_id = s.route_id
+            LEFT JOIN dict_headsign dh ON dh.headsign = s.trip_headsign
+            LEFT JOIN dict_block db ON db.block_id = s.block_id
+            ORDER BY dt.tid
+        """).rowcount
+        _check_translated("trips", staged, counts["trips"])
+        conn.execute("DROP TABLE temp.trips_source")
+
+    # Calendar (days bit-packed by the row transformer)
+    with _table_stage(conn, "calendar") as stage:
+        counts["calendar"] = stage["rows"] = conn.execute("""
+            INSERT INTO calendar_data
+            SELECT ds.svc, s.days, s.start_date, s.end_date
+            FROM temp.calendar_source s JOIN dict_service ds ON ds.service_id = s.service_id
+            ORDER BY ds.svc
+        """).rowcount
+        conn.execute("DROP TABLE temp.calendar_source")
+
+    with _table_stage(conn, "calendar_dates") as stage:
+        counts["calendar_dates"] = stage["rows"] = conn.execute("""
+            INSERT INTO calendar_dates_data
+            SELECT ds.svc, s.date, s.exception_type
+            FROM temp.calendar_dates_source s JOIN dict_service ds ON ds.service_id = s.service_id
+            ORDER BY ds.svc, s.date
+        """).rowcount
+        conn.execute("DROP TABLE temp.calendar_dates_source")
+
+    # Populate FTS5 from the inserted stops (rowid = sid: the app joins on rowid)
+    with _table_stage(conn, "stops_fts") as stage:
+        counts["stops_fts"] = stage["rows"] = conn.execute(
+            "INSERT INTO stops_fts (rowid, sid, name) SELECT sid, sid, stop_name FROM stops"
+        ).rowcount
+
+    # Populate R*Tree from the inserted stops (REAL coordinates whatever the source types)
+    with _table_stage(conn, "stops_rtree") as stage:
+        counts["stops_rtree"] = stage["rows"] = conn.execute("""
+            INSERT INTO stops_rtree
+            SELECT sid, stop_lat, stop_lat, stop_lon, stop_lon
+            FROM stops
+            WHERE stop_lat IS NOT NULL AND stop_lon IS NOT NULL
+        """).rowcount
+
+    # Insert metadata
+    metadata = data.get("metadata", {})
+    metadata_rows = [
+        ("feed_version", str(metadata.get("feed_version", "unknown"))),
+        ("feed_start_date", str(_iso_date(metadata.get("feed_start_date", "")))),
+        ("feed_end_date", str(_iso_date(metadata.get("feed_end_date", "")))),
+        ("bundle_version", bundle_version)
     ]
-    conn.executemany(
-        "INSERT INTO patterns VALUES (?, ?, ?)",
-        patterns_rows
+    with _table_stage(conn, "metadata") as stage:
+        counts["metadata"] = stage["rows"] = _executemany(conn, "INSERT INTO metadata VALUES (?, ?)", metadata_rows)
+
+    return counts
+
+
+@contextmanager
+def _table_stage(conn: sqlite3.Connection, table: str) -> Iterator[Dict[str, Any]]:
+    """One table's inserts as one transaction, logged with rows, RSS and peak RSS.
+
+    Yields:
+        Mutable record; set "rows" inside the block
+    """
+    started = time.time()
+    peak_before = peak_rss_mb()
+    with profile_stage("ios_db_table", table=table) as profiled:
+        record = {"rows": 0}
+        yield record
+        conn.commit()
+        profiled["rows"] = record["rows"]
+    peak = peak_rss_mb()
+    logger.info(
+        "ios_db_table_inserted",
+        table=table,
+        rows=record["rows"],
+        duration_ms=int((time.time() - started) * 1000),
+        rss_mb=current_rss_mb(),
+        peak_rss_mb=peak,
+        peak_rss_delta_mb=round(max(0.0, peak - peak_before), 1)
     )
-    counts["patterns"] = len(patterns_rows)
-    logger.info("ios_db_table_inserted", table="patterns", rows=len(patterns_rows))
-
-    # Insert pattern_stops
-    pattern_stops_rows = [
-        (
-            dictionaries["pattern_dict"][ps["pattern_id"]],
-            ps["stop_sequence"],
-            dictionaries["stop_dict"][ps["stop_id"]],
-            ps["arrival_offset_secs"],
-            ps["departure_offset_secs"]
-        )
-        for ps in data["pattern_stops"]
-    ]
-    conn.executemany(
-        "INSERT INTO pattern_stops VALUES (?, ?, ?, ?, ?)",
-        pattern_stops_rows
+
+
+def _stage(
+    conn: sqlite3.Connection,
+    table: str,
+    rows: Iterable[Dict],
+    transform: Callable[[Dict], tuple]
+) -> int:
+    """Stream source rows through a row transformer into temp.<table>_source.
+
+    Returns:
+        Rows staged
+    """
+    columns = STAGING_COLUMNS[table]
+    conn.execute(f"CREATE TEMP TABLE {table}_source ({', '.join(columns)})")
+    placeholders = ", ".join("?" * len(columns))
+    return _executemany(conn, f"INSERT INTO temp.{table}_source VALUES ({placeholders})", map(transform, rows))
+
+
+def _insert_dictionary(
+    conn: sqlite3.Connection,
+    name: str,
+    source_sql: str,
+    previous_tables: Set[str]
+) -> int:
+    """Fill a dict table from distinct (value, ord) rows.
+
+    Values of the replaced bundle keep their integer; new ones are numbered after its
+    maximum (IDs of removed entries are not reused) in (ord, value) order.
+
+    Args:
+        conn: SQLite connection (replaced bundle attached as `previous`, if any)
+        name: DICTIONARY_TABLES entry
+        source_sql: SELECT of distinct `value` with a sort key `ord`
+        previous_tables: Dict tables present in `previous`
+
+    Returns:
+        Dictionary entries inserted
+    """
+    table, text_column, id_column = DICTIONARY_TABLES[name]
+    if table not in previous_tables:
+        sql = f"""
+            INSERT INTO {table} ({id_column}, {text_column})
+            SELECT ROW_NUMBER() OVER (ORDER BY s.ord, s.value), s.value
+            FROM ({source_sql}) AS s
+        """
+    else:
+        sql = f"""
+            INSERT INTO {table} ({id_column}, {text_column})
+            SELECT COALESCE(
+                       p.{id_column},
+                       m.max_id + ROW_NUMBER() OVER (PARTITION BY p.{id_column} IS NULL ORDER BY s.ord, s.value)
+                   ),
+                   s.value
+            FROM ({source_sql}) AS s
+            CROSS JOIN (SELECT COALESCE(MAX({id_column}), 0) AS max_id FROM previous.{table}) AS m
+            LEFT JOIN previous.{table} p ON p.{text_column} = s.value
+        """
+    return conn.execute(sql).rowcount
+
+
+def _check_translated(table: str, staged: int, inserted: int):
+    """Staged rows whose text IDs have no dictionary entry are dropped by the joins."""
+    if staged != inserted:
+        logger.error("ios_db_unknown_references", table=table, staged=staged, inserted=inserted)
+        raise ValueError(f"{table}: {staged - inserted} of {staged} rows reference unknown IDs")
+
+
+def _stop_row(s: Dict) -> tuple:
+    return (
+        s["stop_id"],
+        _value(s.get("stop_code")),
+        s["stop_name"],
+        _value(s.get("stop_desc"), keep_empty=True),
+        s["stop_lat"],
+        s["stop_lon"],
+        _value(s.get("location_type")),
+        _value(s.get("parent_station")),
+        _value(s.get("wheelchair_boarding")),
+        _value(s.get("platform_code"))
     )
-    counts["pattern_stops"] = len(pattern_stops_rows)
-    logger.info("ios_db_table_inserted", table="pattern_stops", rows=len(pattern_stops_rows))
-
-    # Insert trips
-    trips_rows = [
-        (
-            t["trip_id"],
-            dictionaries["route_dict"][t["route_id"]],
-            t["service_id"],
-            dictionaries["pattern_dict"][t["pattern_id"]],
-            t.get("trip_headsign"),
-            t.get("trip_short_name"),
-            t.get("direction_id"),
-            t.get("block_id"),
-            t.get("wheelchair_accessible")
-        )
-        for t in data["trips"]
-    ]
-    conn.executemany(
-        "INSERT INTO trips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-        trips_rows
+
+
+def _route_row(r: Dict) -> tuple:
+    return (
+        r["route_id"],
+        _value(r.get("route_short_name")),
+        _value(r.get("route_long_name")),
+        r["route_type"],
+        _value(r.get("route_color")),
+        _value(r.get("route_text_color"))
     )
-    counts["trips"] = len(trips_rows)
-    logger.info("ios_db_table_inserted", table="trips", rows=len(trips_rows))
-
-    # Insert calendar (bit-pack days)
-    calendar_rows = [
-        (
-            c["service_id"],
-            _pack_calendar_days(c),
-            c["start_date"],
-            c["end_date"]
-        )
-        for c in data["calendar"]
-    ]
-    conn.executemany(
-        "INSERT INTO calendar VALUES (?, ?, ?, ?)",
-        calendar_rows
+
+
+def _pattern_row(p: Dict) -> tuple:
+    return (p["pattern_id"], p["route_id"], p["direction_id"])
+
+
+def _pattern_stop_row(ps: Dict) -> tuple:
+    return (
+        ps["pattern_id"],
+        ps["stop_sequence"],
+        ps["stop_id"],
+        ps["arrival_offset_secs"],
+        ps["departure_offset_secs"]
     )
-    counts["calendar"] = len(calendar_rows)
-    logger.info("ios_db_table_inserted", table="calendar", rows=len(calendar_rows))
-
-    # Insert calendar_dates
-    calendar_dates_rows = [
-        (
-            cd["service_id"],
-            cd["date"],
-            cd["exception_type"]
-        )
-        for cd in data["calendar_dates"]
-    ]
-    if calendar_dates_rows:
-        conn.executemany(
-            "INSERT INTO calendar_dates VALUES (?, ?, ?)",
-            calendar_dates_rows
-        )
-        counts["calendar_dates"] = len(calendar_dates_rows)
-        logger.info("ios_db_table_inserted", table="calendar_dates", rows=len(calendar_dates_rows))
-    else:
-        counts["calendar_dates"] = 0
 
-    # Populate FTS5
-    fts_rows = [
-        (dictionaries["stop_dict"][s["stop_id"]], s["stop_name"])
-        for s in data["stops"]
-    ]
-    conn.executemany("INSERT INTO stops_fts VALUES (?, ?)", fts_rows)
-    counts["stops_fts"] = len(fts_rows)
-    logger.info("ios_db_table_inserted", table="stops_fts", rows=len(fts_rows))
 
-    # Insert metadata
-    metadata = data.get("metadata", {})
-    metadata_rows = [
-        ("feed_version", str(metadata.get("feed_version", "unknown"))),
-        ("feed_start_date", str(metadata.get("feed_start_date", ""))),
-        ("feed_end_date", str(metadata.get("feed_end_date", "")))
-    ]
-    conn.executemany("INSERT INTO metadata VALUES (?, ?)", metadata_rows)
-    counts["metadata"] = len(metadata_rows)
-    logger.info("ios_db_table_inserted", table="metadata", rows=len(metadata_rows))
+def _trip_row(t: Dict) -> tuple:
+    return (
+        t["trip_id"],
+        t["route_id"],
+        t["service_id"],
+        t["pattern_id"],
+        _value(t.get("trip_headsign"), keep_empty=True),
+        _value(t.get("trip_short_name"), keep_empty=True),
+        _value(t.get("direction_id")),
+        _value(t.get("block_id")),
+        _value(t.get("wheelchair_accessible")),
+        _value(t.get("start_time_secs"))
+    )
 
-    conn.commit()
 
+def _calendar_row(c: Dict) -> tuple:
+    return (c["service_id"], _pack_calendar_days(c), _iso_date(c["start_date"]), _iso_date(c["end_date"]))
+
+
+def _calendar_date_row(cd: Dict) -> tuple:
+    return (cd["service_id"], _iso_date(cd["date"]), cd["exception_type"])
+
+
+def _attach_previous(conn: sqlite3.Connection, previous_path: Optional[str]) -> Set[str]:
+    """Attach the replaced bundle as `previous`; returns its dict tables.
+
+    Bundles from before a dictionary existed simply lack its table; it is skipped.
+    Nothing stays attached when there is no usable previous bundle (empty set).
+    """
+    if not previous_path or not os.path.exists(previous_path):
+        return set()
+    try:
+        conn.execute("ATTACH DATABASE ? AS previous", (previous_path,))
+    except sqlite3.Error as e:
+        logger.warning("ios_db_previous_dictionaries_unreadable", path=previous_path, error=str(e))
+        return set()
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM previous.sqlite_master WHERE type = 'table'")}
+    except sqlite3.Error as e:
+        logger.warning("ios_db_previous_dictionaries_unreadable", path=previous_path, error=str(e))
+        existing = set()
+    tables = {table for table, _text_column, _id_column in DICTIONARY_TABLES.values() if table in existing}
+    if not tables:
+        conn.execute("DETACH DATABASE previous")
+    return tables
+
+
+def _build_stop_departures(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Fill stop_departures from the inserted trip_data/patterns/pattern_stops/calendar.
+
+    Departure times are trip start + pattern departure offset (the pattern medians the
+    rest of the bundle uses). Trips of services without a calendar row get days = 0,
+    matching the join query, which skips them. Departures are produced by one SQLite
+    query sorted by the clustering key (SQLite sorts on disk), so only one bucket is
+    held in Python at a time.
+
+    Args:
+        conn: SQLite connection with trips, pattern_stops and calendar inserted
+
+    Returns:
+        Dict with stop_departures (rows) and departures (total departures encoded)
+    """
+    counts = {"departures": 0}
+    departures = conn.execute("""
+        SELECT ps.sid, COALESCE(c.days, 0) AS days,
+               p.first_start_secs + t.start_offset_secs + ps.departure_offset_secs AS secs, t.tid
+        FROM trip_data t
+        JOIN patterns p ON p.pid = t.pid
+        JOIN pattern_stops ps ON ps.pid = t.pid
+        LEFT JOIN calendar_data c ON c.svc = t.svc
+        WHERE t.start_offset_secs IS NOT NULL
+        ORDER BY ps.sid, days, secs, t.tid
+    """)
+
+    def buckets():
+        key, times, tids = None, [], []
+        for sid, days, secs, tid in departures:
+            bucket = (sid, days, secs // DEPARTURE_BUCKET_SECS)
+            if bucket != key:
+                if key is not None:
+                    yield _departure_row(key, times, tids)
+                key, times, tids = bucket, [], []
+            times.append(secs)
+            tids.append(tid)
+            counts["departures"] += 1
+        if key is not None:
+            yield _departure_row(key, times, tids)
+
+    counts["stop_departures"] = _executemany(conn, "INSERT INTO stop_departures VALUES (?, ?, ?, ?, ?)", buckets())
+    conn.commit()
+    logger.info("ios_db_table_inserted", table="stop_departures", rows=counts["stop_departures"], departures=counts["departures"])
     return counts
 
 
+def _departure_row(key: Tuple[int, int, int], times: List[int], tids: List[int]) -> tuple:
+    sid, days, hour = key
+    previous = hour * DEPARTURE_BUCKET_SECS
+    deltas = []
+    for secs in times:
+        deltas.append(secs - previous)
+        previous = secs
+    return sid, days, hour, encode_varint(deltas), encode_varint(tids)
+
+
+def read_stop_departures(
+    conn: sqlite3.Connection,
+    sid: int,
+    weekday: int,
+    start_secs: int,
+    end_secs: int
+) -> List[Tuple[int, int]]:
+    """Departures at a stop in [start_secs, end_secs] on a weekday (reference decoder).
+
+    One range scan of the stop's stop_departures rows; the caller still checks each
+    trip's calendar date range and calendar_dates, as with the join query.
+
+    Args:
+        conn: Bundle connection
+        sid: Stop
+        weekday: Monday = 0 (bit of calendar.days)
+        start_secs: Window start (seconds since service day midnight)
+        end_secs: Window end (inclusive)
+
+    Returns:
+        [(departure_secs, tid)] sorted by time
+    """
+    rows = conn.execute(
+        """
+        SELECT hour, departures, tids FROM stop_departures
+        WHERE sid = ? AND hour BETWEEN ? AND ? AND (days & (1 << ?)) != 0
+        """,
+        (sid, start_secs // DEPARTURE_BUCKET_SECS, end_secs // DEPARTURE_BUCKET_SECS, weekday)
+    )
+    found = []
+    for hour, departures, tids in rows:
+        secs = hour * DEPARTURE_BUCKET_SECS
+        for delta, tid in zip(decode_varint(departures), decode_varint(tids)):
+            secs += delta
+            if start_secs <= secs <= end_secs:
+                found.append((secs, tid))
+    found.sort()
+    return found
+
+
+def stops_within_radius(
+    conn: sqlite3.Connection,
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: Optional[int] = None
+) -> List[Tuple[int, float]]:
+    """Stops within radius_m of a point via stops_rtree (reference for the iOS client).
+
+    The radius becomes a lat/lon box probed in the R*Tree; candidates are then
+    filtered by haversine distance.
+
+    Args:
+        conn: Bundle connection
+        lat: Centre latitude
+        lon: Centre longitude
+        radius_m: Search radius in metres
+        limit: Nearest stops returned (default: all within the radius)
+
+    Returns:
+        [(sid, distance_m)] nearest first
+    """
+    min_lat, max_lat, min_lon, max_lon = _radius_box(lat, lon, radius_m)
+    candidates = conn.execute(
+        """
+        SELECT s.sid, s.stop_lat, s.stop_lon
+        FROM stops_rtree r JOIN stops s ON s.sid = r.sid
+        WHERE r.max_lat >= ? AND r.min_lat <= ? AND r.max_lon >= ? AND r.min_lon <= ?
+        """,
+        (min_lat, max_lat, min_lon, max_lon)
+    )
+    return _nearest(candidates, lat, lon, radius_m, limit)
+
+
+def _radius_box(lat: float, lon: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lon, max_lon) enclosing a radius around a point."""
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    lon_delta = lat_delta / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+def _nearest(
+    candidates: Iterable[Tuple[int, float, float]],
+    lat: float,
+    lon: float,
+    radius_m: float,
+    limit: Optional[int]
+) -> List[Tuple[int, float]]:
+    within = []
+    for sid, stop_lat, stop_lon in candidates:
+        distance = _haversine_m(lat, lon, stop_lat, stop_lon)
+        if distance <= radius_m:
+            within.append((sid, distance))
+    within.sort(key=lambda row: (row[1], row[0]))
+    return within if limit is None else within[:limit]
+
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _executemany(
+    conn: sqlite3.Connection,
+    sql: str,
+    rows: Iterable[tuple],
+    chunk_rows: Optional[int] = None
+) -> int:
+    """executemany over an iterable of row tuples in chunks; returns rows inserted.
+
+    At most chunk_rows (default: GTFS_IOS_INSERT_CHUNK_ROWS) tuples exist at a time.
+    """
+    chunk_rows = chunk_rows or settings.GTFS_IOS_INSERT_CHUNK_ROWS
+    rows = iter(rows)
+    inserted = 0
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return inserted
+        inserted += max(conn.executemany(sql, chunk).rowcount, 0)
+
+
+def _value(value: Any, keep_empty: bool = False) -> Any:
+    """Parser values → Supabase semantics: NaN and (optionally) empty strings are NULL."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value == "" and not keep_empty:
+        return None
+    return value
+
+
+def _iso_date(value: Any) -> Any:
+    """GTFS YYYYMMDD (parse output) → YYYY-MM-DD as Supabase returns DATE columns."""
+    if isinstance(value, str) and len(value) == 8 and value.isdigit():
+        return f"{value[:4]}-{value[4:6]}-{value[6:]}"
+    return value
+
+
 def _pack_calendar_days(cal: Dict[str, Any]) -> int:
     """Bit-pack calendar days into single INTEGER.
 
@@ -602,26 +1300,16 @@ def _pack_calendar_days(cal: Dict[str, Any]) -> int:
     Example: weekdays (M-F) = 0b0011111 = 31
 
     Args:
-        cal: Calendar dict with boolean day fields
+        cal: Calendar dict with boolean (or "1"/"0") day fields
 
     Returns:
         Bit-packed INTEGER (0-127)
     """
     days = 0
-    if cal.get("monday"):
-        days |= 1 << 0
-    if cal.get("tuesday"):
-        days |= 1 << 1
-    if cal.get("wednesday"):
-        days |= 1 << 2
-    if cal.get("thursday"):
-        days |= 1 << 3
-    if cal.get("friday"):
-        days |= 1 << 4
-    if cal.get("saturday"):
-        days |= 1 << 5
-    if cal.get("sunday"):
-        days |= 1 << 6
+    for bit, day in enumerate(CALENDAR_DAYS):
+        # Supabase returns booleans; parse output has "1"/"0" strings
+        if str(cal.get(day)).lower() in ("1", "true"):
+            days |= 1 << bit
 
     return days
 
@@ -636,12 +1324,12 @@ def _validate_ios_db(
     Checks:
     1. File size 15-20MB
     2. Row counts match Supabase
-    3. FTS5 search works
+    3. FTS5 search works, R*Tree covers every located stop
     4. PRAGMAs applied
 
     Args:
         db_path: Path to generated gtfs.db
-        supabase_data: Original Supabase data
+        supabase_data: Original Supabase data (streamed tables already consumed)
         row_counts: Inserted row counts
 
     Returns:
@@ -656,17 +1344,17 @@ def _validate_ios_db(
     # Target was 15-20MB initially, but with complete light rail merge (59K stops, 700K pattern_stops, 263K trips),
     # actual size is ~74MB which is acceptable for offline-first app (iOS allows up to 100MB without WiFi warning)
     file_size_mb = os.path.getsize(db_path) / 1024 / 1024
-    if file_size_mb < 5:
-        issues.append(f"File size too small: {file_size_mb:.2f}MB < 5MB (missing data?)")
-    elif file_size_mb > 100:
-        issues.append(f"File size too large: {file_size_mb:.2f}MB > 100MB (exceeds iOS bundle target)")
+    if file_size_mb < MIN_IOS_DB_SIZE_MB:
+        issues.append(f"File size too small: {file_size_mb:.2f}MB < {MIN_IOS_DB_SIZE_MB}MB (missing data?)")
+    elif file_size_mb > MAX_IOS_DB_SIZE_MB:
+        issues.append(f"File size too large: {file_size_mb:.2f}MB > {MAX_IOS_DB_SIZE_MB}MB (exceeds iOS bundle target)")
 
     # Check 2: Row counts
     conn = sqlite3.connect(db_path)
 
     tables_to_check = ["stops", "routes", "patterns", "trips"]
     for table in tables_to_check:
-        expected = len(supabase_data[table])
+        expected = _source_rows(supabase_data[table])
         actual = row_counts.get(table, 0)
 
         if expected != actual:
@@ -681,13 +1369,23 @@ def _validate_ios_db(
     except Exception as e:
         issues.append(f"FTS5 search failed: {str(e)}")
 
+    # Check 3b: R*Tree covers every stop with coordinates
+    located = conn.execute("SELECT COUNT(*) FROM stops WHERE stop_lat IS NOT NULL AND stop_lon IS NOT NULL").fetchone()[0]
+    indexed = conn.execute("SELECT COUNT(*) FROM stops_rtree").fetchone()[0]
+    if indexed != located:
+        issues.append(f"stops_rtree: expected {located}, got {indexed}")
+
     # Check 4: Page size
     cursor = conn.execute("PRAGMA page_size")
     page_size = cursor.fetchone()[0]
     if page_size != 8192:
         issues.append(f"Page size incorrect: {page_size} (expected 8192)")
 
+    # Size breakdown (report only)
+    table_bytes = _table_bytes(conn)
     conn.close()
+    if table_bytes:
+        logger.info("ios_db_size_breakdown", **table_bytes)
 
     # Determine pass/fail
     passed = len(issues) == 0
@@ -703,5 +1401,33 @@ def _validate_ios_db(
         "passed": passed,
         "issues": issues,
         "file_size_mb": round(file_size_mb, 2),
-        "checks_run": 4
+        "checks_run": 4,
+        "table_bytes": table_bytes
     }
+
+
+def _table_bytes(conn: sqlite3.Connection) -> Dict[str, int]:
+    """On-disk bytes per table, largest first (dbstat).
+
+    Indexes count towards their table and FTS5/R*Tree shadow tables towards their
+    virtual table. Empty if SQLite was built without dbstat.
+    """
+    owners = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')"))
+    virtual = [
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE 'CREATE VIRTUAL TABLE%'")
+    ]
+    for name in owners:
+        for table in virtual:
+            if name.startswith(table + "_"):
+                owners[name] = table
+
+    try:
+        pages = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall()
+    except sqlite3.Error as e:
+        logger.warning("ios_db_size_breakdown_unavailable", error=str(e))
+        return {}
+    sizes = {}
+    for name, size in pages:
+        owner = owners.get(name, name)
+        sizes[owner] = sizes.get(owner, 0) + size
+    return dict(sorted(sizes.items(), key=lambda item: -item[1]))
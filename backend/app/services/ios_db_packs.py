@@ -0,0 +1,303 @@
+"""Modular offline packs split from a generated iOS bundle.
+
+build_packs() splits gtfs.db into a shared core pack and one pack per mode, so clients
+download only the modes they ride:
+
+    core        dict_stop, dict_route, dict_service, dict_headsign, dict_block, stops,
+                routes, calendar_data, calendar_dates_data (+ calendar/calendar_dates
+                views), stops_fts, stops_rtree, metadata
+    <mode>      patterns, pattern_stops, trip_data, and the dict_pattern/dict_trip
+                entries of that mode's routes (MODE_ROUTE_TYPES; anything else goes to
+                "other")
+
+Every pack comes from the same bundle, so all of them share its dictionary IDs (pattern
+and trip IDs are global, just stored with their mode). A client assembles its local
+database from the packs it holds without remapping anything (assemble_packs() shows the
+statements): a copy of core, each mode pack ATTACHed and its tables appended with
+INSERT … SELECT, then the bundle views that span core and mode tables (manifest
+"views"). The app's queries then run against plain tables, as fast as on the full
+bundle; UNION ALL views over live-attached packs were measured instead and multiply out
+in the planner (departures ~25x, trip detail ~400x slower).
+
+Packs are written deterministically (no build time or bundle version inside), so a pack
+whose content did not change keeps its bytes, SHA-256 and version (the bundle version
+it last changed in). packs/manifest.json lists every pack with file, version, sha256,
+bytes and rows; files are named <pack>-<version>.db, get precompressed variants
+(ios_db_variants), and are only removed once the manifest no longer lists them.
+
+stop_departures (GTFS_IOS_STOP_DEPARTURES) mixes modes per stop and stays in the
+monolithic bundle only.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.gtfs_validation import MODE_ROUTE_TYPES
+from app.services.ios_db_variants import file_sha256, remove_variants, write_variants
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+CORE_PACK = "core"
+OTHER_PACK = "other"
+MANIFEST_NAME = "manifest.json"
+
+# Tables copied whole into the core pack (views follow from the bundle's schema)
+CORE_TABLES = [
+    "dict_stop", "dict_route", "dict_service", "dict_headsign", "dict_block",
+    "stops", "routes", "calendar_data", "calendar_dates_data", "stops_fts", "stops_rtree",
+]
+CORE_VIEWS = ["calendar", "calendar_dates"]
+
+# Mode pack tables → the rows of the mode (temp.pack_patterns: the mode's pattern IDs)
+MODE_TABLES = {
+    "dict_pattern": "pid IN (SELECT pid FROM temp.pack_patterns)",
+    "patterns": "pid IN (SELECT pid FROM temp.pack_patterns)",
+    "pattern_stops": "pid IN (SELECT pid FROM temp.pack_patterns)",
+    "trip_data": "pid IN (SELECT pid FROM temp.pack_patterns)",
+    "dict_trip": "tid IN (SELECT tid FROM bundle.trip_data WHERE pid IN (SELECT pid FROM temp.pack_patterns))",
+}
+
+# Columns copied explicitly (FTS5 rowids are the app's join key to stops)
+COPY_COLUMNS = {"stops_fts": "rowid, sid, name"}
+
+# Metadata rows kept in core (bundle_version changes every build; the manifest has it);
+# every pack also records its name under "pack"
+CORE_METADATA_KEYS = ["feed_version", "feed_start_date", "feed_end_date"]
+
+
+def build_packs(
+    db_path: str,
+    bundle_version: str,
+    packs_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """Split a generated bundle into core and per-mode packs and publish their manifest.
+
+    Args:
+        db_path: Generated (validated) gtfs.db
+        bundle_version: Version of the bundle; becomes the version of every pack whose
+                        content changed
+        packs_dir: Output directory (default: packs/ next to db_path)
+
+    Returns:
+        The manifest: bundle_version, packs ({name: file, version, sha256, bytes, rows,
+        route_types}), mode_tables and views (client assembly schema), duration_ms
+    """
+    start_time = time.time()
+    packs_dir = Path(packs_dir) if packs_dir else Path(db_path).parent / "packs"
+    packs_dir.mkdir(parents=True, exist_ok=True)
+    previous = read_packs_manifest(str(packs_dir)) or {"packs": {}}
+
+    packs = {}
+    partial = packs_dir / "pack.db.partial"
+    for name, route_types in _pack_route_types(db_path).items():
+        partial.unlink(missing_ok=True)
+        rows = _write_pack(db_path, str(partial), name, route_types)
+        if name != CORE_PACK and not rows["patterns"]:
+            partial.unlink()
+            continue
+
+        sha256 = file_sha256(partial)
+        known = previous["packs"].get(name)
+        if known and known["sha256"] == sha256 and (packs_dir / known["file"]).exists():
+            partial.unlink()
+            packs[name] = known
+            continue
+
+        target = packs_dir / f"{name}-{bundle_version}.db"
+        os.replace(partial, target)
+        write_variants(str(target), bundle_version)
+        packs[name] = {
+            "file": target.name,
+            "version": bundle_version,
+            "sha256": sha256,
+            "bytes": target.stat().st_size,
+            "rows": rows,
+            "route_types": route_types,
+        }
+
+    manifest = {
+        "bundle_version": bundle_version,
+        "packs": packs,
+        "mode_tables": list(MODE_TABLES),
+        "views": _mode_views(db_path),
+    }
+    _write_manifest(packs_dir, manifest)
+    removed = _remove_unlisted(packs_dir, manifest)
+
+    duration_ms = int((time.time() - start_time) * 1000)
+    logger.info(
+        "ios_db_packs_built",
+        bundle_version=bundle_version,
+        packs={name: pack["bytes"] for name, pack in packs.items()},
+        changed=[name for name, pack in packs.items() if pack["version"] == bundle_version],
+        removed=removed,
+        duration_ms=duration_ms
+    )
+    return {**manifest, "duration_ms": duration_ms}
+
+
+def read_packs_manifest(packs_dir: str) -> Optional[Dict[str, Any]]:
+    """Current packs manifest (None if packs were never built)."""
+    try:
+        return json.loads((Path(packs_dir) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def assemble_packs(
+    core_path: str,
+    mode_packs: Dict[str, str],
+    views: Dict[str, str],
+    output_path: str
+) -> Dict[str, int]:
+    """Build a local gtfs.db from a core pack and mode packs, as the app does.
+
+    Args:
+        core_path: Core pack
+        mode_packs: Pack name → path of each downloaded mode pack
+        views: Manifest "views" (created once the mode tables exist)
+        output_path: Assembled database (replaced atomically)
+
+    Returns:
+        Dict mapping mode tables to rows appended
+    """
+    partial = output_path + ".partial"
+    shutil.copyfile(core_path, partial)
+    conn = sqlite3.connect(partial)
+    try:
+        rows = {table: 0 for table in MODE_TABLES}
+        for name, path in mode_packs.items():
+            conn.execute("ATTACH DATABASE ? AS pack", (path,))
+            for table in MODE_TABLES:
+                if not conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = ?", (table,)).fetchone():
+                    _copy_schema(conn, "pack", table)
+                rows[table] += conn.execute(f"INSERT INTO main.{table} SELECT * FROM pack.{table}").rowcount
+            conn.commit()
+            conn.execute("DETACH DATABASE pack")
+        for sql in views.values():
+            conn.execute(sql)
+        conn.execute("UPDATE metadata SET value = ? WHERE key = 'pack'", (",".join([CORE_PACK, *mode_packs]),))
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(partial, output_path)
+    return rows
+
+
+def _pack_route_types(db_path: str) -> Dict[str, Optional[List[int]]]:
+    """Core (None) plus each mode with the route types it covers; "other" gets the rest."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        present = sorted(row[0] for row in conn.execute("SELECT DISTINCT route_type FROM routes"))
+    finally:
+        conn.close()
+
+    packs = {CORE_PACK: None}
+    claimed = set()
+    for mode, route_types in MODE_ROUTE_TYPES:
+        packs[mode] = list(route_types)
+        claimed.update(route_types)
+    unclaimed = [t for t in present if t not in claimed]
+    if unclaimed:
+        packs[OTHER_PACK] = unclaimed
+    return packs
+
+
+def _write_pack(db_path: str, pack_path: str, name: str, route_types: Optional[List[int]]) -> Dict[str, int]:
+    """Write one pack (route_types None = core) from the attached bundle.
+
+    Returns:
+        Rows per pack table
+    """
+    conn = sqlite3.connect(pack_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA page_size=8192")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("ATTACH DATABASE ? AS bundle", (db_path,))
+
+        if route_types is None:
+            tables = {table: None for table in CORE_TABLES}
+        else:
+            conn.execute(
+                "CREATE TEMP TABLE pack_patterns AS SELECT p.pid FROM bundle.patterns p "
+                f"JOIN bundle.routes r ON r.rid = p.rid WHERE r.route_type IN ({','.join('?' * len(route_types))})",
+                route_types
+            )
+            tables = dict(MODE_TABLES)
+
+        rows = {}
+        for table, where in tables.items():
+            _copy_schema(conn, "bundle", table)
+            columns = COPY_COLUMNS.get(table, "*")
+            into = f"main.{table} ({columns})" if table in COPY_COLUMNS else f"main.{table}"
+            sql = f"INSERT INTO {into} SELECT {columns} FROM bundle.{table}"
+            if where:
+                sql += f" WHERE {where}"
+            rows[table] = conn.execute(sql).rowcount
+        _copy_schema(conn, "bundle", "metadata")
+        if route_types is None:
+            for view in CORE_VIEWS:
+                _copy_schema(conn, "bundle", view)
+            conn.execute(
+                f"INSERT INTO main.metadata SELECT key, value FROM bundle.metadata "
+                f"WHERE key IN ({','.join('?' * len(CORE_METADATA_KEYS))}) ORDER BY key",
+                CORE_METADATA_KEYS
+            )
+        conn.execute("INSERT INTO main.metadata VALUES ('pack', ?)", (name,))
+        conn.commit()
+        conn.execute("DETACH DATABASE bundle")
+        conn.execute("VACUUM")
+        return rows
+    finally:
+        conn.close()
+
+
+def _copy_schema(conn: sqlite3.Connection, schema: str, name: str) -> None:
+    """Create an attached database's table/view (and the table's indexes) in main."""
+    for (sql,) in conn.execute(
+        f"SELECT sql FROM {schema}.sqlite_master WHERE (name = ? OR (tbl_name = ? AND type = 'index')) "
+        "AND sql IS NOT NULL ORDER BY type = 'index'",
+        (name, name)
+    ).fetchall():
+        conn.execute(sql)
+
+
+def _mode_views(db_path: str) -> Dict[str, str]:
+    """Bundle views spanning core and mode tables (created by clients after assembly)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return {
+            name: sql for name, sql in conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'view' ORDER BY name"
+            )
+            if name not in CORE_VIEWS
+        }
+    finally:
+        conn.close()
+
+
+def _write_manifest(packs_dir: Path, manifest: Dict[str, Any]) -> None:
+    path = packs_dir / MANIFEST_NAME
+    partial = path.with_name(path.name + ".partial")
+    partial.write_text(json.dumps(manifest, indent=2))
+    os.replace(partial, path)
+
+
+def _remove_unlisted(packs_dir: Path, manifest: Dict[str, Any]) -> List[str]:
+    """Delete pack files (and variants) the manifest no longer lists."""
+    listed = {pack["file"] for pack in manifest["packs"].values()}
+    removed = []
+    for path in packs_dir.glob("*.db"):
+        if path.name not in listed:
+            path.unlink()
+            remove_variants(str(path))
+            removed.append(path.name)
+    return removed
+
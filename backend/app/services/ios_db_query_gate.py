@@ -0,0 +1,263 @@
+"""Offline query benchmark and regression gate for generated iOS bundles.
+
+run_query_benchmark() opens a gtfs.db read-only and times the queries the app runs
+against it (SQL mirrors SydneyTransit/Core/Database/DatabaseManager.swift and
+Data/Models/Stop.swift):
+
+    departures    next 2h of departures at a stop (pattern_stops ⋈ patterns ⋈ trips ⋈
+                  routes ⋈ calendar), at the busiest stops
+    stop_search   FTS5 prefix search ("cen*") joined to stops
+    nearby_stops  ~2km lat/lon box around a stop
+    trip_detail   a trip's stops in sequence (trips ⋈ pattern_stops ⋈ stops)
+
+Samples are chosen from the new bundle by text ID (stop_id, trip_id), so the previous
+bundle answers the same questions even if its integer IDs differ. Each sample is run
+a few times and its best time kept; p50/p99 are taken over samples.
+
+gate_bundle() benchmarks the new and the previous bundle on the same machine, one
+after the other, and raises ValueError when a query's p50 or p99 grew by more than
+GTFS_QUERY_GATE_MAX_REGRESSION (and by at least GTFS_QUERY_GATE_MIN_MS), the same way
+_validate_ios_db fails generation on size.
+"""
+
+import sqlite3
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Best-of runs per sample
+RUNS_PER_SAMPLE = 3
+
+# getNearbyStops box: 2km at 111km per degree latitude, 92km per degree longitude (Sydney)
+NEARBY_LAT_DELTA = 2.0 / 111.0
+NEARBY_LON_DELTA = 2.0 / 92.0
+
+# Departure window (DatabaseManager.getDepartures: now → now + 2h)
+DEPARTURES_START_SECS = 8 * 3600
+DEPARTURES_WINDOW_SECS = 2 * 3600
+
+QUERIES = {
+    "departures": """
+        SELECT t.trip_id, t.trip_headsign, t.wheelchair_accessible, r.route_short_name, r.route_type,
+               COALESCE(t.start_time_secs, 0) + ps.departure_offset_secs AS secs
+        FROM pattern_stops ps
+        JOIN patterns p ON ps.pid = p.pid
+        JOIN trips t ON t.pid = p.pid
+        JOIN routes r ON p.rid = r.rid
+        JOIN calendar c ON t.service_id = c.service_id
+        WHERE ps.sid = (SELECT sid FROM dict_stop WHERE stop_id = ?)
+          AND c.start_date <= ?
+          AND c.end_date >= ?
+          AND (c.days & (1 << ?)) != 0
+          AND COALESCE(t.start_time_secs, 0) + ps.departure_offset_secs BETWEEN ? AND ?
+        ORDER BY secs ASC
+        LIMIT 20
+    """,
+    "stop_search": """
+        SELECT s.*
+        FROM stops_fts
+        JOIN stops s ON stops_fts.rowid = s.rowid
+        WHERE stops_fts MATCH ?
+        LIMIT 50
+    """,
+    "nearby_stops": """
+        SELECT *
+        FROM stops
+        WHERE stop_lat BETWEEN ? AND ?
+          AND stop_lon BETWEEN ? AND ?
+    """,
+    "trip_detail": """
+        SELECT ps.stop_sequence, d.stop_id, s.stop_name, s.stop_lat, s.stop_lon,
+               COALESCE(t.start_time_secs, 0) + ps.arrival_offset_secs,
+               COALESCE(t.start_time_secs, 0) + ps.departure_offset_secs
+        FROM trips t
+        JOIN pattern_stops ps ON ps.pid = t.pid
+        JOIN stops s ON s.sid = ps.sid
+        JOIN dict_stop d ON d.sid = s.sid
+        WHERE t.trip_id = ?
+        ORDER BY ps.stop_sequence
+    """,
+}
+
+
+def choose_samples(db_path: str, count: Optional[int] = None) -> Dict[str, List[tuple]]:
+    """Query parameters per query, chosen from a bundle.
+
+    Args:
+        db_path: Bundle to sample
+        count: Samples per query (default: GTFS_QUERY_GATE_SAMPLES)
+
+    Returns:
+        Dict mapping query name to a list of parameter tuples
+    """
+    count = count or settings.GTFS_QUERY_GATE_SAMPLES
+    conn = _connect(db_path)
+    try:
+        busy = conn.execute(
+            """
+            SELECT d.stop_id, s.stop_name, s.stop_lat, s.stop_lon
+            FROM (SELECT sid, COUNT(*) AS visits FROM pattern_stops GROUP BY sid) v
+            JOIN dict_stop d ON d.sid = v.sid
+            JOIN stops s ON s.sid = v.sid
+            ORDER BY v.visits DESC, d.stop_id
+            LIMIT ?
+            """,
+            (count,)
+        ).fetchall()
+        service_date = conn.execute("SELECT MAX(start_date) FROM calendar").fetchone()[0]
+        trips = [row[0] for row in conn.execute("SELECT trip_id FROM trips ORDER BY trip_id")]
+    finally:
+        conn.close()
+
+    weekday = date.fromisoformat(service_date).weekday() if service_date else 0
+    step = max(1, len(trips) // count)
+    return {
+        "departures": [
+            (stop_id, service_date, service_date, weekday,
+             DEPARTURES_START_SECS, DEPARTURES_START_SECS + DEPARTURES_WINDOW_SECS)
+            for stop_id, _name, _lat, _lon in busy
+        ],
+        "stop_search": [(_prefix(name),) for _stop_id, name, _lat, _lon in busy if _prefix(name)],
+        "nearby_stops": [
+            (lat - NEARBY_LAT_DELTA, lat + NEARBY_LAT_DELTA, lon - NEARBY_LON_DELTA, lon + NEARBY_LON_DELTA)
+            for _stop_id, _name, lat, lon in busy
+        ],
+        "trip_detail": [(trip_id,) for trip_id in trips[::step][:count]],
+    }
+
+
+def run_query_benchmark(db_path: str, samples: Dict[str, List[tuple]]) -> Dict[str, Dict[str, float]]:
+    """Time every query over its samples.
+
+    Args:
+        db_path: Bundle to benchmark
+        samples: choose_samples() output
+
+    Returns:
+        Dict mapping query name to {p50_ms, p99_ms, samples, rows} (queries the bundle
+        cannot run, e.g. a missing table, are left out)
+    """
+    conn = _connect(db_path)
+    try:
+        results = {}
+        for name, sql in QUERIES.items():
+            params = samples.get(name) or []
+            try:
+                timings, rows = _time_samples(lambda p: conn.execute(sql, p).fetchall(), params)
+            except sqlite3.Error as e:
+                logger.warning("ios_db_query_benchmark_skipped", db_path=db_path, query=name, error=str(e))
+                continue
+            results[name] = {
+                "p50_ms": _percentile(timings, 0.50),
+                "p99_ms": _percentile(timings, 0.99),
+                "samples": len(timings),
+                "rows": rows,
+            }
+        return results
+    finally:
+        conn.close()
+
+
+def gate_bundle(
+    db_path: str,
+    previous_path: Optional[str],
+    max_regression: Optional[float] = None,
+    min_ms: Optional[float] = None
+) -> Dict[str, Any]:
+    """Benchmark a new bundle against the one it replaces and fail on regressions.
+
+    Args:
+        db_path: New bundle
+        previous_path: Replaced bundle (None: benchmark only, nothing to compare)
+        max_regression: Allowed growth of p50/p99 as a fraction (default:
+                        GTFS_QUERY_GATE_MAX_REGRESSION)
+        min_ms: Growth below this many ms is never a regression (default:
+                GTFS_QUERY_GATE_MIN_MS)
+
+    Returns:
+        Dict with current and previous benchmark results, regressions and passed
+
+    Raises:
+        ValueError: If any query regressed
+    """
+    max_regression = settings.GTFS_QUERY_GATE_MAX_REGRESSION if max_regression is None else max_regression
+    min_ms = settings.GTFS_QUERY_GATE_MIN_MS if min_ms is None else min_ms
+
+    samples = choose_samples(db_path)
+    previous = run_query_benchmark(previous_path, samples) if previous_path else None
+    current = run_query_benchmark(db_path, samples)
+    regressions = find_regressions(current, previous or {}, max_regression, min_ms)
+
+    for name, stats in current.items():
+        baseline = (previous or {}).get(name, {})
+        logger.info(
+            "ios_db_query_benchmark",
+            query=name,
+            p50_ms=stats["p50_ms"],
+            p99_ms=stats["p99_ms"],
+            previous_p50_ms=baseline.get("p50_ms"),
+            previous_p99_ms=baseline.get("p99_ms"),
+            samples=stats["samples"]
+        )
+
+    if regressions:
+        logger.error("ios_db_query_gate_failed", regressions=regressions)
+        raise ValueError(f"iOS DB query gate failed: {', '.join(regressions)}")
+
+    logger.info("ios_db_query_gate_passed", queries=len(current), compared=previous is not None)
+    return {"passed": True, "current": current, "previous": previous, "regressions": regressions}
+
+
+def find_regressions(
+    current: Dict[str, Dict[str, float]],
+    previous: Dict[str, Dict[str, float]],
+    max_regression: float,
+    min_ms: float
+) -> List[str]:
+    """Queries whose p50 or p99 grew beyond the allowed fraction and absolute floor."""
+    regressions = []
+    for name, stats in current.items():
+        if name not in previous:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            before, after = previous[name][metric], stats[metric]
+            if after > before * (1 + max_regression) and after - before >= min_ms:
+                regressions.append(f"{name} {metric} {before}ms -> {after}ms")
+    return regressions
+
+
+def _time_samples(run: Callable[[tuple], List], samples: List[tuple]) -> Tuple[List[float], int]:
+    """Best-of-RUNS_PER_SAMPLE ms per sample, and total rows returned."""
+    timings, rows = [], 0
+    for params in samples:
+        best = None
+        for _ in range(RUNS_PER_SAMPLE):
+            started = time.perf_counter()
+            result = run(params)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+        rows += len(result)
+    return timings, rows
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+def _prefix(name: str) -> Optional[str]:
+    """First 3 letters of a stop name's first word, as an FTS5 prefix query."""
+    word = "".join(ch for ch in (name or "").split(" ")[0] if ch.isalnum())
+    return f"{word[:3]}*" if len(word) >= 3 else None
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
@@ -0,0 +1,133 @@
+"""Precompressed variants and SHA-256 manifests for downloadable bundle files.
+
+write_variants(path) writes <path>.zst and <path>.gz next to a bundle (or delta) and a
+<path>.manifest.json describing all three representations:
+
+    {
+      "file": "gtfs.db", "bundle_version": "...",
+      "source": {"bytes": ..., "mtime_ns": ...},
+      "identity": {"bytes": ..., "sha256": "..."},
+      "zstd": {"path": "gtfs.db.zst", "bytes": ..., "sha256": "..."},
+      "gzip": {"path": "gtfs.db.gz", "bytes": ..., "sha256": "..."}
+    }
+
+Compression runs once per published version, so high levels are used. zstd needs the
+zstandard package; without it only the gzip variant is written. read_manifest()
+returns None once the source file no longer matches the manifest (regenerated but not
+republished), so stale variants are never served.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.utils.logging import get_logger
+
+try:
+    import zstandard
+except ImportError:  # Optional: gzip variant only
+    zstandard = None
+
+logger = get_logger(__name__)
+
+ZSTD_LEVEL = 19
+GZIP_LEVEL = 9
+CHUNK_BYTES = 1024 * 1024
+
+# Content-Encoding → variant file suffix, in server preference order
+ENCODING_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def write_variants(path: str, bundle_version: Optional[str] = None) -> Dict[str, Any]:
+    """Compress a file to every available encoding and write its manifest.
+
+    Args:
+        path: Bundle or delta file
+        bundle_version: Stored in the manifest (informational)
+
+    Returns:
+        The manifest dict
+    """
+    source = Path(path)
+    stat = source.stat()
+    manifest = {
+        "file": source.name,
+        "bundle_version": bundle_version,
+        "source": {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "identity": {"bytes": stat.st_size, "sha256": file_sha256(source)},
+    }
+
+    for encoding, suffix in ENCODING_SUFFIXES.items():
+        target = source.with_name(source.name + suffix)
+        if encoding == "zstd" and zstandard is None:
+            target.unlink(missing_ok=True)
+            logger.warning("bundle_variant_skipped", file=source.name, encoding=encoding, reason="zstandard not installed")
+            continue
+        _compress(source, target, encoding)
+        manifest[encoding] = {"path": target.name, "bytes": target.stat().st_size, "sha256": file_sha256(target)}
+
+    _write_json(manifest_path(source), manifest)
+    logger.info(
+        "bundle_variants_written",
+        file=source.name,
+        identity_bytes=stat.st_size,
+        **{f"{encoding}_bytes": manifest[encoding]["bytes"] for encoding in ENCODING_SUFFIXES if encoding in manifest}
+    )
+    return manifest
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Manifest of a file if it still describes it (same size and mtime), else None."""
+    source = Path(path)
+    try:
+        manifest = json.loads(manifest_path(source).read_text())
+        stat = source.stat()
+    except (OSError, ValueError):
+        return None
+    if manifest.get("source") != {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}:
+        return None
+    return manifest
+
+
+def remove_variants(path: str) -> None:
+    """Delete a file's variants and manifest (the file itself is left alone)."""
+    source = Path(path)
+    for suffix in ENCODING_SUFFIXES.values():
+        source.with_name(source.name + suffix).unlink(missing_ok=True)
+    manifest_path(source).unlink(missing_ok=True)
+
+
+def manifest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".manifest.json")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress(source: Path, target: Path, encoding: str) -> None:
+    """Compress to a temporary file, then rename (readers never see a partial variant)."""
+    partial = target.with_name(target.name + ".partial")
+    with open(source, "rb") as src, open(partial, "wb") as dst:
+        if encoding == "zstd":
+            compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1, write_content_size=True)
+            compressor.copy_stream(src, dst, size=source.stat().st_size)
+        else:
+            # mtime=0: identical input gives identical bytes (stable hash)
+            with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as gz:
+                shutil.copyfileobj(src, gz, CHUNK_BYTES)
+    os.replace(partial, target)
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    partial = path.with_name(path.name + ".partial")
+    partial.write_text(json.dumps(data, indent=2))
+    os.replace(partial, path)
@@ -10,19 +10,42 @@ Downloads GTFS ZIP files from NSW Transport API for multiple modes:
 - Complete NSW bundle (coverage)
 - Additional coverage feeds (all ferries, NSW TrainLink, region buses)
 
-Handles rate limiting (5 req/s limit), ZIP validation, and structured logging.
+Feeds download concurrently (GTFS_DOWNLOAD_CONCURRENCY) over one pooled session; a shared
+token bucket caps request starts at GTFS_DOWNLOAD_RATE_PER_SEC (NSW limit: 5 req/s).
+Handles ZIP validation and structured logging. ZIPs are not extracted: the parser
+reads CSV members straight from {mode}/gtfs.zip (CRC-checked during that read).
+
+Downloads stream to {mode}/gtfs.zip.part while hashing (SHA-256) and checking the
+expected length. Interrupted transfers resume with a Range request (If-Range on the
+ETag/Last-Modified recorded next to the .part file), both within a run (retries) and
+across runs.
+
+Conditional downloads (GTFS_CONDITIONAL_DOWNLOADS): a per-mode manifest
+({output_dir}/manifest.json) stores ETag, Last-Modified, size and SHA-256 of the last
+download. Requests send If-None-Match / If-Modified-Since; 304 responses (or a 200 whose
+body hashes to the stored SHA-256) leave the local ZIP untouched.
 """
 
+import contextvars
+import hashlib
+import json
 import os
+import random
+import re
+import threading
 import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 import requests
 from requests import HTTPError
+from requests.adapters import HTTPAdapter
 
 from app.config import settings
 from app.utils.logging import get_logger
+from app.utils.profiling import profile_stage
 
 logger = get_logger(__name__)
 
@@ -54,34 +77,70 @@ OPTIONAL_COVERAGE_MODES = {
     "regionbuses",
 }
 
-# Rate limiting: NSW API limit is 5 req/s, use 250ms delay = 4 req/s (safe margin)
-DELAY_BETWEEN_REQUESTS = 0.25
+# Rate limiting: NSW API limit is 5 req/s; request starts are spaced by a token bucket
+# (GTFS_DOWNLOAD_RATE_PER_SEC, default 4 req/s for a safe margin) with this burst size
+RATE_LIMIT_BURST = 1
 
-# HTTP timeout for downloads (60 seconds per file)
+# HTTP timeout for downloads (connect / between received chunks)
 DOWNLOAD_TIMEOUT = 60
 
+# Retries (resuming via Range) for connection drops and truncated bodies
+DOWNLOAD_MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 2.0
+
+
+# Download manifest (per-mode ETag/Last-Modified/size/SHA-256), stored in output_dir
+MANIFEST_FILENAME = "manifest.json"
+MANIFEST_FORMAT_VERSION = 1
+
+# Streaming chunk size for downloads and hashing
+CHUNK_SIZE = 64 * 1024
+
 
 DEFAULT_GTFS_DIR = Path(os.getenv("VAR_DIR", Path(__file__).resolve().parent.parent.parent / "var")) / "data" / "gtfs-downloads"
 
 
-def download_gtfs_feeds(output_dir: str = str(DEFAULT_GTFS_DIR)) -> Dict[str, str]:
+def download_gtfs_feeds(output_dir: str = str(DEFAULT_GTFS_DIR), conditional: Optional[bool] = None) -> Dict[str, str]:
     """Download all GTFS feeds from NSW API.
 
-    Downloads 6 mode-specific GTFS ZIPs sequentially with rate limiting.
-    Creates temp directory structure: {output_dir}/{mode}/gtfs.zip
-    Unzips each file to {output_dir}/{mode}/*.txt
+    See fetch_gtfs_feeds(); this wrapper returns only the mode directories.
 
     Args:
         output_dir: Base directory for downloads (default: var/data/gtfs-downloads)
+        conditional: Skip feeds unchanged since the last download
+                     (default: settings.GTFS_CONDITIONAL_DOWNLOADS)
 
     Returns:
         Dict mapping mode names to their output directories
+    """
+    return fetch_gtfs_feeds(output_dir, conditional=conditional)["mode_dirs"]
+
+
+def fetch_gtfs_feeds(output_dir: str = str(DEFAULT_GTFS_DIR), conditional: Optional[bool] = None) -> Dict[str, Any]:
+    """Download all GTFS feeds from NSW API, skipping unchanged feeds.
+
+    Downloads mode-specific GTFS ZIPs concurrently; request starts are rate limited.
+    Creates temp directory structure: {output_dir}/{mode}/gtfs.zip
+    Changed ZIPs are validated (central directory) but not extracted; gtfs_service reads
+    members in place.
+
+    Args:
+        output_dir: Base directory for downloads (default: var/data/gtfs-downloads)
+        conditional: Send conditional requests using the manifest
+                     (default: settings.GTFS_CONDITIONAL_DOWNLOADS)
+
+    Returns:
+        Dict with mode_dirs (mode → directory), changed_modes, unchanged_modes,
+        bytes_downloaded, and manifest (mode → etag, last_modified, size, sha256, ...)
 
     Raises:
         ValueError: If NSW_API_KEY is missing or invalid
         requests.HTTPError: If download fails
         zipfile.BadZipFile: If downloaded file is corrupted
     """
+    if conditional is None:
+        conditional = settings.GTFS_CONDITIONAL_DOWNLOADS
+
     # Validate API key
     if not settings.NSW_API_KEY or len(settings.NSW_API_KEY) < 10:
         logger.error("gtfs_download_failed", error="Missing or invalid NSW_API_KEY")
@@ -91,187 +150,538 @@ def download_gtfs_feeds(output_dir: str = str(DEFAULT_GTFS_DIR)) -> Dict[str, st
     base_path = Path(output_dir)
     base_path.mkdir(parents=True, exist_ok=True)
 
-    logger.info("gtfs_download_start", total_modes=len(GTFS_ENDPOINTS), output_dir=output_dir)
+    concurrency = max(1, settings.GTFS_DOWNLOAD_CONCURRENCY)
+    logger.info(
+        "gtfs_download_start",
+        total_modes=len(GTFS_ENDPOINTS),
+        output_dir=output_dir,
+        conditional=conditional,
+        concurrency=concurrency
+    )
 
     start_time = time.time()
+    manifest = load_manifest(output_dir)
+    limiter = _TokenBucket(settings.GTFS_DOWNLOAD_RATE_PER_SEC, RATE_LIMIT_BURST)
+    session = _create_session(concurrency)
+
+    def fetch(mode: str, endpoint: str) -> Optional[Dict[str, Any]]:
+        return _fetch_mode(session, limiter, mode, endpoint, base_path, manifest.get(mode), conditional)
+
+    results = {}
+    failure = None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gtfs-download") as executor:
+            # copy_context: worker threads record profiling stages on the caller's profiler
+            futures = {
+                mode: executor.submit(contextvars.copy_context().run, fetch, mode, endpoint)
+                for mode, endpoint in GTFS_ENDPOINTS.items()
+            }
+            for mode, future in futures.items():
+                try:
+                    results[mode] = future.result()
+                except Exception as e:
+                    failure = failure or e
+    finally:
+        session.close()
+
+    if failure is not None:
+        raise failure
+
     mode_dirs = {}
+    changed_modes = []
+    unchanged_modes = []
     total_size_bytes = 0
 
-    for mode, endpoint in GTFS_ENDPOINTS.items():
-        mode_start_time = time.time()
+    # Results in GTFS_ENDPOINTS order regardless of completion order
+    for mode in GTFS_ENDPOINTS:
+        result = results[mode]
+        if result is None:
+            manifest.pop(mode, None)
+            continue
+        mode_dirs[mode] = result["mode_dir"]
+        manifest[mode] = result["manifest_entry"]
+        total_size_bytes += result["bytes_downloaded"]
+        (changed_modes if result["changed"] else unchanged_modes).append(mode)
 
-        # Download and unzip for this mode
-        mode_dir = base_path / mode
-        mode_dir.mkdir(exist_ok=True)
+    save_manifest(output_dir, manifest)
 
-        zip_path = mode_dir / "gtfs.zip"
+    total_duration_ms = int((time.time() - start_time) * 1000)
+    total_size_mb = total_size_bytes / (1024 * 1024)
 
-        try:
-            # Download ZIP
-            size_bytes = _download_file(mode, endpoint, zip_path)
-            total_size_bytes += size_bytes
+    logger.info(
+        "gtfs_download_all_complete",
+        total_modes=len(mode_dirs),
+        changed_modes=changed_modes,
+        unchanged_modes=len(unchanged_modes),
+        total_size_mb=round(total_size_mb, 2),
+        total_duration_ms=total_duration_ms
+    )
 
-            # Validate and unzip
-            _validate_and_unzip(mode, zip_path, mode_dir)
+    return {
+        "mode_dirs": mode_dirs,
+        "changed_modes": changed_modes,
+        "unchanged_modes": unchanged_modes,
+        "bytes_downloaded": total_size_bytes,
+        "manifest": manifest,
+    }
 
-            mode_dirs[mode] = str(mode_dir)
 
-            mode_duration_ms = int((time.time() - mode_start_time) * 1000)
-            size_mb = size_bytes / (1024 * 1024)
+def _fetch_mode(
+    session: requests.Session,
+    limiter: "_TokenBucket",
+    mode: str,
+    endpoint: str,
+    base_path: Path,
+    previous: Optional[Dict[str, Any]],
+    conditional: bool
+) -> Optional[Dict[str, Any]]:
+    """Download (if changed) and validate one mode's ZIP.
 
-            logger.info(
-                "gtfs_download_complete",
-                mode=mode,
-                size_mb=round(size_mb, 2),
-                duration_ms=mode_duration_ms
-            )
+    Returns:
+        Dict with mode_dir, manifest_entry, bytes_downloaded, changed; None if an optional
+        coverage feed is missing (404)
+    """
+    mode_start_time = time.time()
 
-            # Rate limiting: delay before next request (except after last one)
-            if mode != list(GTFS_ENDPOINTS.keys())[-1]:
-                time.sleep(DELAY_BETWEEN_REQUESTS)
+    # Download and validate for this mode
+    mode_dir = base_path / mode
+    mode_dir.mkdir(exist_ok=True)
 
-        except HTTPError as e:
-            status = e.response.status_code if e.response is not None else None
-            if status == 404 and mode in OPTIONAL_COVERAGE_MODES:
-                # Optional coverage feed not available; log and continue.
-                logger.warning(
-                    "gtfs_optional_coverage_feed_missing",
-                    mode=mode,
-                    endpoint=endpoint,
-                    status_code=status
-                )
-                continue
-            logger.error(
-                "gtfs_download_failed",
-                mode=mode,
-                error=str(e),
-                error_type=type(e).__name__
+    zip_path = mode_dir / "gtfs.zip"
+
+    try:
+        with profile_stage("download_feed", mode=mode) as stage:
+            local_valid = _local_copy_valid(zip_path, previous)
+
+            # Download ZIP (conditional on the previous ETag/Last-Modified if the local copy is intact)
+            download = _download_file(
+                session, limiter, mode, endpoint, zip_path,
+                previous=previous if conditional and local_valid else None
             )
-            raise
-        except Exception as e:
-            logger.error(
-                "gtfs_download_failed",
+            size_bytes = download["bytes_downloaded"]
+
+            # A 200 with identical content (server ignored the validators) is not a change
+            changed = not download["not_modified"] and (previous is None or download["sha256"] != previous.get("sha256"))
+            if changed:
+                _validate_zip(mode, zip_path, mode_dir)
+
+            stage["bytes"] = size_bytes
+            stage["changed"] = changed
+
+    except HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status == 404 and mode in OPTIONAL_COVERAGE_MODES:
+            # Optional coverage feed not available; log and continue.
+            logger.warning(
+                "gtfs_optional_coverage_feed_missing",
                 mode=mode,
-                error=str(e),
-                error_type=type(e).__name__
+                endpoint=endpoint,
+                status_code=status
             )
-            raise
+            return None
+        logger.error(
+            "gtfs_download_failed",
+            mode=mode,
+            error=str(e),
+            error_type=type(e).__name__
+        )
+        raise
+    except Exception as e:
+        logger.error(
+            "gtfs_download_failed",
+            mode=mode,
+            error=str(e),
+            error_type=type(e).__name__
+        )
+        raise
 
-    total_duration_ms = int((time.time() - start_time) * 1000)
-    total_size_mb = total_size_bytes / (1024 * 1024)
+    mode_duration_ms = int((time.time() - mode_start_time) * 1000)
+    size_mb = size_bytes / (1024 * 1024)
 
     logger.info(
-        "gtfs_download_all_complete",
-        total_modes=len(mode_dirs),
-        total_size_mb=round(total_size_mb, 2),
-        total_duration_ms=total_duration_ms
+        "gtfs_download_complete",
+        mode=mode,
+        size_mb=round(size_mb, 2),
+        duration_ms=mode_duration_ms,
+        changed=changed,
+        not_modified=download["not_modified"],
+        resumed_from=download["resumed_from"]
     )
 
-    return mode_dirs
+    return {
+        "mode_dir": str(mode_dir),
+        "manifest_entry": _manifest_entry(endpoint, download, previous, changed),
+        "bytes_downloaded": size_bytes,
+        "changed": changed,
+    }
+
+
+class _TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a request may start."""
 
+    def __init__(self, rate_per_sec: float, capacity: int = 1):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
 
-def _download_file(mode: str, endpoint: str, output_path: Path) -> int:
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _IncompleteDownload(IOError):
+    """Body ended before the advertised length (retried with a Range request)."""
+
+
+def _create_session(pool_size: int) -> requests.Session:
+    """Session with a connection pool sized for the download workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def load_manifest(output_dir: str = str(DEFAULT_GTFS_DIR)) -> Dict[str, Dict[str, Any]]:
+    """Load the per-mode download manifest.
+
+    Args:
+        output_dir: Download base directory
+
+    Returns:
+        Dict mode → {endpoint, etag, last_modified, size, sha256, downloaded_at, checked_at};
+        empty if missing, unreadable or from another format version
+    """
+    path = Path(output_dir) / MANIFEST_FILENAME
+    if not path.exists():
+        return {}
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("gtfs_manifest_unreadable", path=str(path), error=str(e))
+        return {}
+
+    if manifest.get("format_version") != MANIFEST_FORMAT_VERSION:
+        logger.warning("gtfs_manifest_format_mismatch", path=str(path), found=manifest.get("format_version"))
+        return {}
+    return manifest.get("modes", {})
+
+
+def save_manifest(output_dir: str, modes: Dict[str, Dict[str, Any]]) -> None:
+    """Persist the download manifest (atomic write via temp file + rename)."""
+    path = Path(output_dir) / MANIFEST_FILENAME
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"format_version": MANIFEST_FORMAT_VERSION, "modes": modes}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def feed_hashes(manifest: Dict[str, Dict[str, Any]], modes: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+    """SHA-256 per mode from a manifest (all manifest modes by default; None if not downloaded)."""
+    modes = list(manifest) if modes is None else modes
+    return {mode: (manifest.get(mode) or {}).get("sha256") for mode in modes}
+
+
+def _local_copy_valid(zip_path: Path, entry: Optional[Dict[str, Any]]) -> bool:
+    """Whether the local ZIP still matches its manifest entry (cheap size check)."""
+    return bool(entry) and zip_path.exists() and zip_path.stat().st_size == entry.get("size")
+
+
+def _manifest_entry(
+    endpoint: str,
+    download: Dict[str, Any],
+    previous: Optional[Dict[str, Any]],
+    changed: bool
+) -> Dict[str, Any]:
+    """Build the manifest entry after a (possibly conditional) download."""
+    now = datetime.now(timezone.utc).isoformat()
+    if download["not_modified"]:
+        return dict(previous, checked_at=now)
+
+    return {
+        "endpoint": endpoint,
+        "etag": download["etag"],
+        "last_modified": download["last_modified"],
+        "size": download["size"],
+        "sha256": download["sha256"],
+        "downloaded_at": now if changed or not previous else previous.get("downloaded_at", now),
+        "checked_at": now,
+    }
+
+
+def _download_file(
+    session: requests.Session,
+    limiter: _TokenBucket,
+    mode: str,
+    endpoint: str,
+    output_path: Path,
+    previous: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Download a single GTFS ZIP file from NSW API.
 
+    Streams to {output_path}.part while hashing, then renames over output_path. A .part
+    left by an interrupted transfer is resumed with Range/If-Range; connection drops and
+    truncated bodies are retried (resuming) up to DOWNLOAD_MAX_RETRIES times. With a
+    previous manifest entry (and no .part), sends If-None-Match / If-Modified-Since; on
+    304 the local file is kept.
+
     Args:
+        session: Pooled HTTP session
+        limiter: Shared request-rate limiter
         mode: Transport mode name (for logging)
         endpoint: API endpoint path
         output_path: Local file path to save ZIP
+        previous: Manifest entry of the local copy (enables conditional request)
 
     Returns:
-        Size of downloaded file in bytes
+        Dict with not_modified, bytes_downloaded, resumed_from, size, sha256, etag, last_modified
 
     Raises:
         requests.HTTPError: If download fails
     """
     url = f"{NSW_API_BASE}{endpoint}"
+    part_path = output_path.with_suffix(output_path.suffix + ".part")
+    validator_path = part_path.with_suffix(part_path.suffix + ".json")
+
+    attempt = 0
+    bytes_downloaded = 0
+    first_resumed_from = None
+
+    while True:
+        headers = {
+            "Authorization": f"apikey {settings.NSW_API_KEY}",
+            "Accept": "application/zip"
+        }
+
+        part_validator = _read_part_validator(part_path, validator_path)
+        resume_from = part_path.stat().st_size if part_validator else 0
+        if resume_from:
+            headers["Range"] = f"bytes={resume_from}-"
+            headers["If-Range"] = part_validator
+        elif previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        if first_resumed_from is None:
+            first_resumed_from = resume_from
+
+        logger.info(
+            "gtfs_download_start",
+            mode=mode,
+            url=url,
+            conditional=previous is not None and not resume_from,
+            resume_from=resume_from,
+            attempt=attempt + 1
+        )
 
-    headers = {
-        "Authorization": f"apikey {settings.NSW_API_KEY}",
-        "Accept": "application/zip"
-    }
+        limiter.acquire()
+        try:
+            response = session.get(
+                url,
+                headers=headers,
+                timeout=DOWNLOAD_TIMEOUT,
+                stream=True
+            )
+            if response.status_code == 304 and previous and not resume_from:
+                response.close()
+                logger.info("gtfs_download_not_modified", mode=mode, etag=previous.get("etag"))
+                return {
+                    "not_modified": True,
+                    "bytes_downloaded": 0,
+                    "resumed_from": 0,
+                    "size": previous["size"],
+                    "sha256": previous["sha256"],
+                    "etag": previous.get("etag"),
+                    "last_modified": previous.get("last_modified"),
+                }
+            if resume_from and (
+                response.status_code == 416
+                or (response.status_code == 206 and _content_range_start(response.headers) != resume_from)
+            ):
+                # 416: the .part already holds the whole body (interrupted before the
+                # rename); 206 from another offset: cannot append. Start over without Range.
+                response.close()
+                logger.warning(
+                    "gtfs_download_part_discarded",
+                    mode=mode,
+                    status_code=response.status_code,
+                    resume_from=resume_from,
+                    content_range=response.headers.get("Content-Range")
+                )
+                part_path.unlink(missing_ok=True)
+                validator_path.unlink(missing_ok=True)
+                continue
+            response.raise_for_status()
+
+            digest = hashlib.sha256()
+            if response.status_code == 206 and resume_from:
+                # Server honoured Range: hash the bytes we already have, then append
+                _hash_file(part_path, digest)
+                file_mode = "ab"
+                offset = resume_from
+            else:
+                # Full body (first attempt, or the feed changed since the .part was written)
+                file_mode = "wb"
+                offset = 0
+                _write_part_validator(validator_path, response.headers)
+
+            content_length = response.headers.get("Content-Length")
+            expected_size = offset + int(content_length) if content_length is not None else None
+
+            # Write to the .part file while hashing, verifying length before the rename
+            written = 0
+            try:
+                with open(part_path, file_mode) as f:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        written += len(chunk)
+            finally:
+                bytes_downloaded += written
+
+            size_bytes = offset + written
+            if expected_size is not None and size_bytes != expected_size:
+                raise _IncompleteDownload(f"{mode}: received {size_bytes} of {expected_size} bytes")
+
+            os.replace(part_path, output_path)
+            validator_path.unlink(missing_ok=True)
+
+            return {
+                "not_modified": False,
+                "bytes_downloaded": bytes_downloaded,
+                "resumed_from": first_resumed_from,
+                "size": size_bytes,
+                "sha256": digest.hexdigest(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, _IncompleteDownload) as e:
+            attempt += 1
+            if attempt > DOWNLOAD_MAX_RETRIES:
+                if isinstance(e, requests.Timeout):
+                    logger.error("gtfs_download_timeout", mode=mode, url=url, timeout_seconds=DOWNLOAD_TIMEOUT)
+                else:
+                    logger.error(
+                        "gtfs_download_error",
+                        mode=mode,
+                        url=url,
+                        error=str(e),
+                        error_type=type(e).__name__
+                    )
+                raise
+            delay = random.uniform(0, RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)))
+            logger.warning(
+                "gtfs_download_retry",
+                mode=mode,
+                attempt=attempt,
+                delay_ms=int(delay * 1000),
+                partial_bytes=part_path.stat().st_size if part_path.exists() else 0,
+                error=str(e),
+                error_type=type(e).__name__
+            )
+            time.sleep(delay)
+        except requests.HTTPError as e:
+            logger.error(
+                "gtfs_download_http_error",
+                mode=mode,
+                url=url,
+                status_code=e.response.status_code if e.response is not None else None,
+                error=str(e)
+            )
+            raise
+        except Exception as e:
+            logger.error(
+                "gtfs_download_error",
+                mode=mode,
+                url=url,
+                error=str(e),
+                error_type=type(e).__name__
+            )
+            raise
 
-    logger.info("gtfs_download_start", mode=mode, url=url)
 
+def _read_part_validator(part_path: Path, validator_path: Path) -> Optional[str]:
+    """If-Range validator (ETag or Last-Modified) for a resumable .part file, if any."""
+    if not part_path.exists() or part_path.stat().st_size == 0 or not validator_path.exists():
+        return None
     try:
-        response = requests.get(
-            url,
-            headers=headers,
-            timeout=DOWNLOAD_TIMEOUT,
-            stream=True
-        )
-        response.raise_for_status()
+        with open(validator_path, encoding="utf-8") as f:
+            validator = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Weak ETags are not allowed in If-Range
+    etag = validator.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validator.get("last_modified")
 
-        # Write to file
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
 
-        size_bytes = output_path.stat().st_size
-        return size_bytes
+def _content_range_start(headers) -> Optional[int]:
+    """First byte position of a 206 Content-Range ("bytes <start>-<end>/<total>"), if valid."""
+    match = re.match(r"bytes (\d+)-\d+/(?:\d+|\*)$", headers.get("Content-Range") or "")
+    return int(match.group(1)) if match else None
+
+
+def _write_part_validator(validator_path: Path, headers) -> None:
+    """Record the response validators so an interrupted .part can be resumed."""
+    with open(validator_path, "w", encoding="utf-8") as f:
+        json.dump({"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}, f)
+
+
+def _hash_file(path: Path, digest) -> None:
+    """Feed an existing file into a running hash."""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
 
-    except requests.Timeout as e:
-        logger.error("gtfs_download_timeout", mode=mode, url=url, timeout_seconds=DOWNLOAD_TIMEOUT)
-        raise
-    except requests.HTTPError as e:
-        logger.error(
-            "gtfs_download_http_error",
-            mode=mode,
-            url=url,
-            status_code=e.response.status_code,
-            error=str(e)
-        )
-        raise
-    except Exception as e:
-        logger.error(
-            "gtfs_download_error",
-            mode=mode,
-            url=url,
-            error=str(e),
-            error_type=type(e).__name__
-        )
-        raise
 
+def _validate_zip(mode: str, zip_path: Path, output_dir: Path) -> None:
+    """Validate the ZIP's central directory and drop files extracted by older syncs.
 
-def _validate_and_unzip(mode: str, zip_path: Path, output_dir: Path) -> None:
-    """Validate ZIP integrity and extract contents.
+    Member CRCs are verified by gtfs_service while it reads each CSV from the archive,
+    so the ZIP is read once instead of testzip() + extractall() + CSV parse.
 
     Args:
         mode: Transport mode name (for logging)
         zip_path: Path to ZIP file
-        output_dir: Directory to extract files to
+        output_dir: Mode directory holding the ZIP
 
     Raises:
         zipfile.BadZipFile: If ZIP is corrupted
     """
     try:
-        # Validate ZIP integrity by opening it
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # Test ZIP integrity
-            bad_file = zip_ref.testzip()
-            if bad_file is not None:
-                logger.error("gtfs_zip_corrupted", mode=mode, bad_file=bad_file)
-                raise zipfile.BadZipFile(f"Corrupted file in ZIP: {bad_file}")
+            file_list = zip_ref.namelist()
 
-            # Extract all files
-            zip_ref.extractall(output_dir)
+        # Files extracted by older syncs are no longer read; reclaim the disk
+        removed = 0
+        for stale in output_dir.glob("*.txt"):
+            stale.unlink()
+            removed += 1
 
-            file_list = zip_ref.namelist()
-            logger.info(
-                "gtfs_unzip_complete",
-                mode=mode,
-                file_count=len(file_list),
-                files=file_list[:10]  # Log first 10 files only
-            )
+        logger.info(
+            "gtfs_zip_validated",
+            mode=mode,
+            file_count=len(file_list),
+            files=file_list[:10],  # Log first 10 files only
+            stale_files_removed=removed
+        )
 
     except zipfile.BadZipFile as e:
         logger.error("gtfs_zip_invalid", mode=mode, error=str(e))
         raise
-    except Exception as e:
-        logger.error(
-            "gtfs_unzip_error",
-            mode=mode,
-            error=str(e),
-            error_type=type(e).__name__
-        )
-        raise
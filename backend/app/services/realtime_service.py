@@ -161,33 +161,13 @@ def get_realtime_departures(
         # Fetch 3x user limit to ensure delayed trains included, then sort/trim after RT merge
         expanded_limit = max(limit * 3, 30)
 
-        query = f"""
-        SELECT
-            t.trip_id,
-            t.trip_headsign,
-            t.direction_id,
-            t.wheelchair_accessible,
-            t.start_time_secs,
-            r.route_id,
-            r.route_short_name,
-            r.route_long_name,
-            r.route_type,
-            r.route_color,
-            ps.departure_offset_secs,
-            ps.stop_sequence,
-            (t.start_time_secs + ps.departure_offset_secs) as actual_departure_secs
-        FROM pattern_stops ps
-        JOIN patterns p ON ps.pattern_id = p.pattern_id
-        JOIN trips t ON t.pattern_id = p.pattern_id
-        JOIN routes r ON t.route_id = r.route_id
-        JOIN calendar c ON t.service_id = c.service_id
-        WHERE ps.stop_id = ($1->>0)
-          AND c.start_date <= ($1->>1)
-          AND c.end_date >= ($1->>1)
-          AND (t.start_time_secs + ps.departure_offset_secs) {operator} ($1->>2)::integer
-        ORDER BY (t.start_time_secs + ps.departure_offset_secs) {sort_order}
-        LIMIT {expanded_limit}
-        """
+        query = _static_departures_query(
+            operator,
+            sort_order,
+            expanded_limit,
+            include_frequencies=settings.GTFS_FREQUENCY_COMPRESSION,
+            include_offset_deltas=settings.GTFS_TRIP_OFFSET_DELTAS
+        )
 
         params = [stop_id, service_date_gtfs, time_secs_local]
         result = supabase.rpc("exec_raw_sql", {"query": query, "params": params}).execute()
@@ -381,6 +361,116 @@ def get_realtime_departures(
         raise
 
 
+def _static_departures_query(
+    operator: str,
+    sort_order: str,
+    limit: int,
+    include_frequencies: bool = False,
+    include_offset_deltas: bool = False
+) -> str:
+    """Phase 1 static departures SQL (params: $1 = [stop_id, service_date_gtfs, time_secs]).
+
+    With include_frequencies, trips stored as trip_frequencies blocks (headway compression,
+    see gtfs_frequencies) are expanded on the fly: one row per slot, starting at
+    start_time_secs + slot * headway_secs unless exceptions holds the slot's actual start.
+    Blocks whose [start, end] window can't reach the requested time are skipped before
+    expansion.
+
+    With include_offset_deltas, each trip's departure offset is the pattern median plus
+    its offset_deltas entry for the stop (gtfs_offset_deltas), so times are exact.
+
+    Args:
+        operator: ">=" (future) or "<=" (past)
+        sort_order: "ASC" (future) or "DESC" (past)
+        limit: Rows to fetch
+        include_frequencies: Also read trip_frequencies
+        include_offset_deltas: Apply trips/trip_frequencies offset_deltas
+
+    Returns:
+        SQL text for exec_raw_sql
+    """
+    trip_offset = _departure_offset_sql("t", include_offset_deltas)
+    trips_sql = f"""
+        SELECT
+            t.trip_id,
+            t.trip_headsign,
+            t.direction_id,
+            t.wheelchair_accessible,
+            t.start_time_secs,
+            r.route_id,
+            r.route_short_name,
+            r.route_long_name,
+            r.route_type,
+            r.route_color,
+            {trip_offset} AS departure_offset_secs,
+            ps.stop_sequence,
+            (t.start_time_secs + {trip_offset}) as actual_departure_secs
+        FROM pattern_stops ps
+        JOIN patterns p ON ps.pattern_id = p.pattern_id
+        JOIN trips t ON t.pattern_id = p.pattern_id
+        JOIN routes r ON t.route_id = r.route_id
+        JOIN calendar c ON t.service_id = c.service_id
+        WHERE ps.stop_id = ($1->>0)
+          AND c.start_date <= ($1->>1)
+          AND c.end_date >= ($1->>1)
+          AND (t.start_time_secs + {trip_offset}) {operator} ($1->>2)::integer
+        """
+
+    if not include_frequencies:
+        return f"""{trips_sql}
+        ORDER BY (t.start_time_secs + {trip_offset}) {sort_order}
+        LIMIT {limit}
+        """
+
+    # Block window bound: future needs its last trip, past its first trip, on the right side
+    window_col = "f.end_time_secs" if operator == ">=" else "f.start_time_secs"
+    block_offset = _departure_offset_sql("f", include_offset_deltas)
+    frequencies_sql = f"""
+        SELECT
+            f.trip_ids->>s.slot AS trip_id,
+            f.trip_headsign,
+            f.direction_id,
+            f.wheelchair_accessible,
+            fs.start_time_secs,
+            r.route_id,
+            r.route_short_name,
+            r.route_long_name,
+            r.route_type,
+            r.route_color,
+            {block_offset} AS departure_offset_secs,
+            ps.stop_sequence,
+            (fs.start_time_secs + {block_offset}) as actual_departure_secs
+        FROM pattern_stops ps
+        JOIN trip_frequencies f ON f.pattern_id = ps.pattern_id
+        JOIN routes r ON f.route_id = r.route_id
+        JOIN calendar c ON f.service_id = c.service_id
+        CROSS JOIN LATERAL generate_series(0, jsonb_array_length(f.trip_ids) - 1) AS s(slot)
+        CROSS JOIN LATERAL (
+            SELECT COALESCE((f.exceptions->>(s.slot::text))::integer, f.start_time_secs + s.slot * f.headway_secs) AS start_time_secs
+        ) fs
+        WHERE ps.stop_id = ($1->>0)
+          AND c.start_date <= ($1->>1)
+          AND c.end_date >= ($1->>1)
+          AND ({window_col} + {block_offset}) {operator} ($1->>2)::integer
+          AND (fs.start_time_secs + {block_offset}) {operator} ($1->>2)::integer
+        """
+
+    return f"""
+        SELECT * FROM ({trips_sql}
+        UNION ALL
+        {frequencies_sql}) departures
+        ORDER BY actual_departure_secs {sort_order}
+        LIMIT {limit}
+        """
+
+
+def _departure_offset_sql(alias: str, include_offset_deltas: bool) -> str:
+    """Departure offset of pattern stop ps for the trip/block alias (median, or median + delta)."""
+    if not include_offset_deltas:
+        return "ps.departure_offset_secs"
+    return f"(ps.departure_offset_secs + COALESCE({alias}.offset_deltas[ps.stop_index + 1], 0))"
+
+
 def get_stop_earliest_departure(stop_id: str, service_date: str) -> Optional[int]:
     """Get earliest departure time for a stop from GTFS static data.
 
@@ -0,0 +1,287 @@
+"""Keyset-paginated, parallel table export from Supabase (PostgREST).
+
+Replaces range(offset, offset + page_size) paging, which re-scans every skipped row
+(later pages get slower) and runs one page at a time:
+
+- Keyset pagination: each page is ordered by the primary key and starts after the last
+  key already exported (an index range scan, equally fast at any depth)
+- Parallel key ranges: the leading key column is split into N ranges (bounds probed at
+  count/N offsets) and each range is paged by its own worker
+- Column projection: only the requested columns are selected
+- Streaming: pages are yielded as they arrive (bounded queue), so callers can write them
+  out without holding the table in memory
+
+Composite keys (pattern_stops, calendar_dates) are paged on the leading column: a page
+that ends inside a group of equal leading values is cut back to the last complete group
+(the partial group is fetched again by the next page), and a single group larger than a
+page is walked on the second key column. Only eq/gt/gte/lt filters are used, so no
+PostgREST or-filter quoting is involved.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.services.gtfs_batch_writer import DEFAULT_MAX_RETRIES, backoff_delay, is_transient_error
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# PostgREST's default max-rows; larger pages are silently truncated by the server
+DEFAULT_PAGE_SIZE = 1000
+
+# Pages buffered per worker before workers block (bounds export memory)
+QUEUE_PAGES_PER_WORKER = 2
+
+KeyRange = Tuple[Optional[Any], Optional[Any]]
+
+
+def export_pages(
+    supabase,
+    table: str,
+    columns: Sequence[str],
+    key_columns: Sequence[str],
+    page_size: int = DEFAULT_PAGE_SIZE,
+    parallelism: int = 1,
+    ranges: Optional[List[KeyRange]] = None,
+    max_retries: int = DEFAULT_MAX_RETRIES
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield a table's rows page by page (pages of different ranges interleave).
+
+    Args:
+        supabase: Supabase client
+        table: Table to export
+        columns: Columns to select (key columns are added if missing)
+        key_columns: Primary key (one or two columns)
+        page_size: Rows per request (at most PostgREST max-rows)
+        parallelism: Key ranges fetched concurrently
+        ranges: Explicit [(lower, upper)] ranges of the leading key (lower inclusive,
+                upper exclusive, None = unbounded); default: split_key_ranges()
+        max_retries: Retries per page for transient errors
+
+    Yields:
+        Lists of row dicts
+
+    Raises:
+        ValueError: If key_columns has more than two columns
+    """
+    if not 1 <= len(key_columns) <= 2:
+        raise ValueError(f"{table}: keyset export supports one or two key columns, got {list(key_columns)}")
+
+    select = ",".join(list(key_columns) + [c for c in columns if c not in key_columns])
+    if ranges is None:
+        ranges = split_key_ranges(supabase, table, key_columns[0], parallelism)
+
+    start_time = time.time()
+    stats = {"rows": 0, "pages": 0}
+    pages = _range_pages if len(ranges) == 1 else _parallel_pages
+    args = (supabase, table, select, key_columns, page_size, max_retries)
+    source = pages(*args, ranges[0]) if len(ranges) == 1 else pages(*args, ranges, parallelism)
+
+    for page in source:
+        stats["rows"] += len(page)
+        stats["pages"] += 1
+        yield page
+
+    logger.info(
+        "supabase_export_table_complete",
+        table=table,
+        ranges=len(ranges),
+        duration_ms=int((time.time() - start_time) * 1000),
+        **stats
+    )
+
+
+def export_table(supabase, table: str, columns: Sequence[str], key_columns: Sequence[str], **kwargs: Any) -> List[Dict[str, Any]]:
+    """All rows of a table as one list in key order (small tables; see export_pages).
+
+    Sorting makes the result independent of the order parallel ranges finished in.
+    """
+    rows = [row for page in export_pages(supabase, table, columns, key_columns, **kwargs) for row in page]
+    rows.sort(key=lambda row: tuple(row[column] for column in key_columns))
+    return rows
+
+
+def split_key_ranges(supabase, table: str, key: str, parts: int) -> List[KeyRange]:
+    """Split a table into roughly equal ranges of its leading key column.
+
+    One exact count, then the key at each 1/parts offset (parts - 1 single-row requests
+    ordered by the key, served from the primary key index). Falls back to a single
+    unbounded range if parts <= 1, the table is small, or a request fails.
+
+    Args:
+        supabase: Supabase client
+        table: Table name
+        key: Leading key column
+        parts: Number of ranges wanted
+
+    Returns:
+        [(lower, upper)] covering the whole key space
+    """
+    if parts <= 1:
+        return [(None, None)]
+
+    try:
+        total = supabase.table(table).select(key, count="exact").limit(1).execute().count or 0
+        if total < parts * 2:
+            return [(None, None)]
+        bounds = []
+        for part in range(1, parts):
+            offset = total * part // parts
+            rows = supabase.table(table).select(key).order(key).range(offset, offset).execute().data
+            if rows and rows[0][key] is not None:
+                bounds.append(rows[0][key])
+    except Exception as e:
+        logger.warning("supabase_export_split_failed", table=table, error=str(e))
+        return [(None, None)]
+
+    # Equal bounds (composite keys with large groups) would give empty ranges
+    edges = [None] + sorted(set(bounds)) + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _parallel_pages(
+    supabase,
+    table: str,
+    select: str,
+    key_columns: Sequence[str],
+    page_size: int,
+    max_retries: int,
+    ranges: List[KeyRange],
+    parallelism: int
+) -> Iterator[List[Dict[str, Any]]]:
+    """Page every range in worker threads; yield pages in arrival order."""
+    workers = max(1, min(parallelism, len(ranges)))
+    pages: "queue.Queue" = queue.Queue(maxsize=workers * QUEUE_PAGES_PER_WORKER)
+    stop = threading.Event()
+    finished = object()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(key_range: KeyRange) -> None:
+        try:
+            for page in _range_pages(supabase, table, select, key_columns, page_size, max_retries, key_range):
+                if not put(page):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(finished)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"export-{table}") as pool:
+        for key_range in ranges:
+            pool.submit(run, key_range)
+        try:
+            done = 0
+            while done < len(ranges):
+                item = pages.get()
+                if item is finished:
+                    done += 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            # Consumer stopped early or failed: release workers blocked on a full queue
+            stop.set()
+
+
+def _range_pages(
+    supabase,
+    table: str,
+    select: str,
+    key_columns: Sequence[str],
+    page_size: int,
+    max_retries: int,
+    key_range: KeyRange
+) -> Iterator[List[Dict[str, Any]]]:
+    """Keyset-page one range of the leading key."""
+    lead = key_columns[0]
+    lower, upper = key_range
+    cursor = None  # Last leading key value exported completely
+
+    while True:
+        def query():
+            q = supabase.table(table).select(select)
+            if cursor is not None:
+                q = q.gt(lead, cursor)
+            elif lower is not None:
+                q = q.gte(lead, lower)
+            if upper is not None:
+                q = q.lt(lead, upper)
+            for column in key_columns:
+                q = q.order(column)
+            return q.limit(page_size)
+
+        rows = _execute(query, table, max_retries)
+        if len(rows) < page_size:
+            if rows:
+                yield rows
+            return
+
+        if len(key_columns) == 1:
+            yield rows
+            cursor = rows[-1][lead]
+            continue
+
+        # Composite key: the page may end inside the last leading value's group
+        last_lead = rows[-1][lead]
+        complete = [row for row in rows if row[lead] != last_lead]
+        if complete:
+            yield complete
+            cursor = complete[-1][lead]
+        else:
+            yield from _group_pages(supabase, table, select, key_columns, page_size, max_retries, last_lead)
+            cursor = last_lead
+
+
+def _group_pages(
+    supabase,
+    table: str,
+    select: str,
+    key_columns: Sequence[str],
+    page_size: int,
+    max_retries: int,
+    lead_value: Any
+) -> Iterator[List[Dict[str, Any]]]:
+    """Keyset-page the rows of one leading key value on the second key column."""
+    lead, second = key_columns
+    cursor = None
+
+    while True:
+        def query():
+            q = supabase.table(table).select(select).eq(lead, lead_value)
+            if cursor is not None:
+                q = q.gt(second, cursor)
+            return q.order(second).limit(page_size)
+
+        rows = _execute(query, table, max_retries)
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        cursor = rows[-1][second]
+
+
+def _execute(build_query, table: str, max_retries: int) -> List[Dict[str, Any]]:
+    """Run a page request, retrying transient errors with backoff."""
+    attempt = 0
+    while True:
+        try:
+            return build_query().execute().data or []
+        except Exception as e:
+            attempt += 1
+            if attempt > max_retries or not is_transient_error(e):
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("supabase_export_page_retry", table=table, attempt=attempt, delay_s=round(delay, 2), error=str(e))
+            time.sleep(delay)
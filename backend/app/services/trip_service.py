@@ -9,7 +9,10 @@ import json
 import time
 from typing import Dict, Optional
 
+from app.config import settings
 from app.db.supabase_client import get_supabase
+from app.services.gtfs_frequencies import frequency_trip
+from app.services.gtfs_offset_deltas import offset_delta
 from app.services.realtime_service import get_redis_binary, determine_mode
 from app.utils.logging import get_logger
 
@@ -44,17 +47,28 @@ def get_trip_details(trip_id: str) -> dict:
         supabase = get_supabase()
         redis_binary = get_redis_binary()
 
+        # Per-trip offset deltas make scheduled times exact (pattern offsets are medians)
+        with_deltas = settings.GTFS_TRIP_OFFSET_DELTAS
+        trip_columns = "trip_id, trip_headsign, pattern_id, wheelchair_accessible, start_time_secs, route_id"
+        pattern_stop_columns = "stop_sequence, stop_id, arrival_offset_secs"
+        if with_deltas:
+            trip_columns += ", offset_deltas"
+            pattern_stop_columns += ", stop_index"
+
         # Step 1: Query trip metadata + route safely (no raw SQL)
         trip_result = (
             supabase
             .table("trips")
-            .select("trip_id, trip_headsign, pattern_id, wheelchair_accessible, start_time_secs, route_id")
+            .select(trip_columns)
             .eq("trip_id", trip_id)
             .limit(1)
             .execute()
         )
         trip_data = trip_result.data or []
 
+        if not trip_data and settings.GTFS_FREQUENCY_COMPRESSION:
+            trip_data = _frequency_trip_data(supabase, trip_id)
+
         if not trip_data:
             raise ValueError(f"Trip {trip_id} not found")
 
@@ -78,7 +92,7 @@ def get_trip_details(trip_id: str) -> dict:
         pattern_result = (
             supabase
             .table("pattern_stops")
-            .select("stop_sequence, stop_id, arrival_offset_secs")
+            .select(pattern_stop_columns)
             .eq("pattern_id", pattern_id)
             .order("stop_sequence", ascending=True)
             .execute()
@@ -161,7 +175,11 @@ def get_trip_details(trip_id: str) -> dict:
             #
             # Schema guarantee: arrival_offset_secs is "seconds from trip start_time"
             # (see schemas/migrations/001_initial_schema.sql).
-            scheduled_arrival_secs = trip_start_secs + ps["arrival_offset_secs"]
+            scheduled_arrival_secs = (
+                trip_start_secs
+                + ps["arrival_offset_secs"]
+                + offset_delta(trip.get("offset_deltas"), ps.get("stop_index"))
+            )
             delay_s = trip_delays.get(stop_id)  # None if no RT data
 
             # Extract coordinates (PostGIS: lat = Y, lon = X)
@@ -239,3 +257,20 @@ def get_trip_details(trip_id: str) -> dict:
                     error=str(exc),
                     duration_ms=duration_ms)
         raise
+
+
+def _frequency_trip_data(supabase, trip_id: str) -> list:
+    """Trip row of a trip stored in a trip_frequencies block ([] if none holds it)."""
+    block_result = (
+        supabase
+        .table("trip_frequencies")
+        .select("*")
+        .contains("trip_ids", [trip_id])
+        .limit(1)
+        .execute()
+    )
+    for block in block_result.data or []:
+        trip = frequency_trip(block, trip_id)
+        if trip:
+            return [trip]
+    return []
@@ -2,6 +2,29 @@
 
 Orchestrates full pipeline: download GTFS from NSW API → parse pattern model → load to Supabase.
 Handles batch upsert (1000 rows), validates NULL locations = 0, checks DB size.
+Writes go through PostgREST by default (parallel batches with retries), or Postgres COPY
+with GTFS_LOADER_BACKEND=copy.
+
+Incremental mode (default, GTFS_INCREMENTAL_SYNC): diffs the parsed dataset against the
+previous load's snapshot and writes only inserted/updated rows, deleting rows that disappeared.
+
+Unchanged feeds: downloads are conditional (per-mode manifest of ETag/Last-Modified/SHA-256),
+and parse/load are skipped entirely when none of the realtime-aligned feeds (MODE_DIRS)
+differ from those of the last successful load (feed hashes stored in the snapshot).
+Coverage-only changes are picked up with the next realtime-aligned change or force=True.
+
+Resumable runs (GTFS_SYNC_CHECKPOINTS): a checkpoint keyed by the downloaded feed hashes
+(app.services.gtfs_checkpoint) stores the parse output and per-table/per-batch load
+progress. A rerun after a crash reuses the parse output and resumes each table from its
+last committed batch; completed tables and applied deletes are skipped.
+
+iOS bundle (GTFS_IOS_DB_IN_SYNC): after a validated load, gtfs.db is generated straight from
+the parse output (app.services.ios_db_generator), without reading the tables back out of
+Supabase. A bundle failure is reported in the result; the load itself has already succeeded.
+
+Shadow mode (GTFS_SHADOW_LOAD): bulk-loads into the gtfs_staging schema, validates the staging
+copy, then swaps it live in one transaction; replaced tables are archived for rollback
+(see migrations/20251124090000_add_shadow_load_functions.sql).
 
 Usage:
     from app.tasks.gtfs_static_sync import load_gtfs_static
@@ -10,17 +33,36 @@ Usage:
 
 import time
 import math
-from typing import Dict, List, Any
+import re
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
-from app.services.nsw_gtfs_downloader import download_gtfs_feeds, DEFAULT_GTFS_DIR
-from app.services.gtfs_service import parse_gtfs
-from app.db.supabase_client import get_supabase
+from app.config import settings
+from app.services.nsw_gtfs_downloader import fetch_gtfs_feeds, feed_hashes, DEFAULT_GTFS_DIR
+from app.services.gtfs_service import MODE_DIRS, parse_gtfs
+from app.services.gtfs_diff import (
+    TABLE_PRIMARY_KEYS,
+    diff_table,
+    group_deletes,
+    hash_table,
+    load_snapshot,
+    save_snapshot,
+)
+from app.services.gtfs_checkpoint import SyncCheckpoint
+from app.services.gtfs_copy_loader import copy_table
+from app.services.gtfs_batch_writer import write_batches
+from app.services.gtfs_validation import CHECK_ORDER, validate_dataset, validate_loaded_db
+from app.services.ios_db_delta import publish_bundle
+from app.services.ios_db_generator import generate_ios_db
+from app.db.supabase_client import get_supabase, get_supabase_staging, STAGING_SCHEMA
+from app.db.postgres_client import get_postgres_connection
 from app.utils.logging import get_logger
+from app.utils.profiling import PipelineProfiler, profile_stage
 
 logger = get_logger(__name__)
 
-# Batch size for Supabase upsert (1000 recommended limit)
+# Batch size for Supabase upsert (1000 recommended limit); upper bound for the
+# first batch of each table, adapted afterwards by gtfs_batch_writer
 BATCH_SIZE = 1000
 
 # Expected table load order (respects foreign keys)
@@ -35,6 +77,16 @@ LOAD_ORDER = [
     "trips",          # Depends on routes + patterns + calendar
 ]
 
+# Archive schemas: gtfs_staging_swap → gtfs_archive_<YYYYMMDDHHMMSS>, gtfs_rollback →
+# gtfs_archive_rollback_<YYYYMMDDHHMMSS> (the version a rollback displaced)
+ARCHIVE_SCHEMA_PREFIX = "gtfs_archive_"
+ROLLBACK_ARCHIVE_PREFIX = "gtfs_archive_rollback_"
+ARCHIVE_TIMESTAMP_PATTERN = re.compile(r"(\d{14})$")
+
+# Loaded after trips with GTFS_FREQUENCY_COMPRESSION (headway-compressed runs; the table
+# only exists once migration 20251127090000 is applied)
+FREQUENCY_TABLE = "trip_frequencies"
+
 # Schema field mappings (only include fields that exist in Supabase tables)
 SCHEMA_FIELDS = {
     "agencies": ["agency_id", "agency_name", "agency_url", "agency_timezone"],
@@ -43,12 +95,26 @@ SCHEMA_FIELDS = {
     "calendar": ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "start_date", "end_date"],
     "calendar_dates": ["service_id", "date", "exception_type"],
     "patterns": ["pattern_id", "route_id", "direction_id"],  # pattern_name optional, not in parser
-    "pattern_stops": ["pattern_id", "stop_sequence", "stop_id", "arrival_offset_secs", "departure_offset_secs"],
-    "trips": ["trip_id", "route_id", "service_id", "pattern_id", "trip_headsign", "trip_short_name", "direction_id", "block_id", "wheelchair_accessible", "start_time_secs"]
+    "pattern_stops": ["pattern_id", "stop_sequence", "stop_id", "arrival_offset_secs", "departure_offset_secs", "stop_index"],
+    "trips": ["trip_id", "route_id", "service_id", "pattern_id", "trip_headsign", "trip_short_name", "direction_id", "block_id", "wheelchair_accessible", "start_time_secs", "offset_deltas"],
+    "trip_frequencies": ["frequency_id", "route_id", "service_id", "pattern_id", "trip_headsign", "trip_short_name", "direction_id", "block_id", "wheelchair_accessible", "start_time_secs", "end_time_secs", "headway_secs", "trip_ids", "exceptions", "offset_deltas"]
 }
 
 
-def load_gtfs_static(output_dir: str = str(DEFAULT_GTFS_DIR)) -> Dict[str, Any]:
+def _load_order() -> List[str]:
+    """Tables this sync loads, in FK order (LOAD_ORDER + FREQUENCY_TABLE when enabled)."""
+    if settings.GTFS_FREQUENCY_COMPRESSION:
+        return LOAD_ORDER + [FREQUENCY_TABLE]
+    return LOAD_ORDER
+
+
+def load_gtfs_static(
+    output_dir: str = str(DEFAULT_GTFS_DIR),
+    incremental: Optional[bool] = None,
+    shadow: Optional[bool] = None,
+    profile_capture: Optional[str] = None,
+    force: bool = False
+) -> Dict[str, Any]:
     """Load GTFS static data to Supabase.
 
     Orchestrates: download → parse → load pipeline.
@@ -56,106 +122,265 @@ def load_gtfs_static(output_dir: str = str(DEFAULT_GTFS_DIR)) -> Dict[str, Any]:
 
     Args:
         output_dir: Directory for GTFS downloads (default: var/data/gtfs-downloads)
+        incremental: Apply only the delta against the previous snapshot
+                     (default: settings.GTFS_INCREMENTAL_SYNC)
+        shadow: Load into gtfs_staging and atomically swap live; takes precedence over
+                incremental (default: settings.GTFS_SHADOW_LOAD)
+        profile_capture: "off", "tracemalloc" or "cprofile"; captures are written to
+                         var/profiles/ (default: settings.GTFS_PROFILE_CAPTURE)
+        force: Parse and load even if no realtime-aligned feed changed since the last load
 
     Returns:
-        Dict with load summary: counts, duration, validation results
+        Dict with load summary: counts, duration, validation results, download (changed /
+        unchanged modes), "profile" (per-stage wall/CPU time, RSS and row counts; see
+        app.utils.profiling), "resumed" and "checkpoint" (stage/table progress), "ios_db"
+        (bundle summary, or None when GTFS_IOS_DB_IN_SYNC is off).
+        status="skipped" (no counts/validation) when feeds are unchanged.
 
     Raises:
         ValueError: If validation fails (NULL locations, row count mismatch)
         Exception: If download, parse, or load fails
     """
     start_time = time.time()
-    logger.info("gtfs_load_pipeline_start", output_dir=output_dir)
+    if incremental is None:
+        incremental = settings.GTFS_INCREMENTAL_SYNC
+    if shadow is None:
+        shadow = settings.GTFS_SHADOW_LOAD
+    if profile_capture is None:
+        profile_capture = settings.GTFS_PROFILE_CAPTURE
+    logger.info("gtfs_load_pipeline_start", output_dir=output_dir, incremental=incremental, shadow=shadow)
+
+    checkpoint = None
+    with PipelineProfiler(capture=profile_capture) as profiler:
+        try:
+            # Step 1: Download GTFS from NSW API
+            logger.info("gtfs_load_stage_start", stage="download")
+            download_start = time.time()
+            with profile_stage("download") as stage:
+                download_report = fetch_gtfs_feeds(output_dir)
+                mode_dirs = download_report["mode_dirs"]
+                stage["rows"] = len(mode_dirs)
+            download_duration_ms = int((time.time() - download_start) * 1000)
+            download_summary = {
+                "changed_modes": download_report["changed_modes"],
+                "unchanged_modes": download_report["unchanged_modes"],
+                "bytes_downloaded": download_report["bytes_downloaded"],
+            }
+            logger.info(
+                "gtfs_load_stage_complete",
+                stage="download",
+                duration_ms=download_duration_ms,
+                modes_downloaded=len(mode_dirs),
+                changed_modes=download_report["changed_modes"]
+            )
 
-    try:
-        # Step 1: Download GTFS from NSW API
-        logger.info("gtfs_load_stage_start", stage="download")
-        download_start = time.time()
-        mode_dirs = download_gtfs_feeds(output_dir)
-        download_duration_ms = int((time.time() - download_start) * 1000)
-        logger.info(
-            "gtfs_load_stage_complete",
-            stage="download",
-            duration_ms=download_duration_ms,
-            modes_downloaded=len(mode_dirs)
-        )
+            # Skip parse/load when the pattern feeds match the last successful load
+            previous_snapshot = load_snapshot()
+            current_feeds = feed_hashes(download_report["manifest"])
+            if not force and _pattern_feeds_unchanged(previous_snapshot, current_feeds):
+                total_duration_ms = int((time.time() - start_time) * 1000)
+                logger.info(
+                    "gtfs_load_pipeline_skipped",
+                    reason="feeds_unchanged",
+                    feed_version=previous_snapshot.get("feed_version"),
+                    duration_ms=total_duration_ms
+                )
+                return {
+                    "status": "skipped",
+                    "reason": "feeds_unchanged",
+                    "duration_ms": total_duration_ms,
+                    "download_duration_ms": download_duration_ms,
+                    "download": download_summary,
+                    "feed_version": previous_snapshot.get("feed_version"),
+                    "profile": profiler.report()
+                }
+
+            if shadow:
+                load_mode = "shadow"
+            else:
+                load_mode = "incremental" if incremental and previous_snapshot else "full"
+            checkpoint = SyncCheckpoint.open(current_feeds, load_mode, persist=settings.GTFS_SYNC_CHECKPOINTS)
+
+            # Step 2: Parse GTFS → pattern model (reused from an interrupted run's checkpoint)
+            logger.info("gtfs_load_stage_start", stage="parse")
+            parse_start = time.time()
+            with profile_stage("parse") as stage:
+                data = checkpoint.load_parse_output()
+                stage["resumed"] = data is not None
+                if data is None:
+                    data = parse_gtfs(output_dir)
+                    checkpoint.save_parse_output(data)
+                stage["rows"] = sum(len(data[t]) for t in _load_order() if data.get(t) is not None)
+            parse_duration_ms = int((time.time() - parse_start) * 1000)
+            logger.info(
+                "gtfs_load_stage_complete",
+                stage="parse",
+                duration_ms=parse_duration_ms,
+                resumed=stage["resumed"],
+                stops=len(data["stops"]),
+                routes=len(data["routes"]),
+                patterns=len(data["patterns"]),
+                trips=len(data["trips"])
+            )
 
-        # Step 2: Parse GTFS → pattern model
-        logger.info("gtfs_load_stage_start", stage="parse")
-        parse_start = time.time()
-        data = parse_gtfs(output_dir)
-        parse_duration_ms = int((time.time() - parse_start) * 1000)
-        logger.info(
-            "gtfs_load_stage_complete",
-            stage="parse",
-            duration_ms=parse_duration_ms,
-            stops=len(data["stops"]),
-            routes=len(data["routes"]),
-            patterns=len(data["patterns"]),
-            trips=len(data["trips"])
-        )
+            # Step 3: Load to Supabase (in dependency order)
+            logger.info("gtfs_load_stage_start", stage="load", total_tables=len(_load_order()))
+            load_start = time.time()
+            shadow_info = None
+            with profile_stage("load") as stage:
+                if shadow:
+                    load_counts, table_reports, table_hashes, shadow_info = _load_to_shadow(data, checkpoint)
+                else:
+                    load_counts, table_reports, table_hashes = _load_to_supabase(
+                        data, previous_snapshot if incremental else None, checkpoint
+                    )
+                stage["rows"] = sum(r["rows_written"] for r in table_reports.values())
+            load_duration_ms = int((time.time() - load_start) * 1000)
+            logger.info(
+                "gtfs_load_stage_complete",
+                stage="load",
+                duration_ms=load_duration_ms,
+                tables_loaded=len(load_counts),
+                mode=load_mode
+            )
 
-        # Step 3: Load to Supabase (in dependency order)
-        logger.info("gtfs_load_stage_start", stage="load", total_tables=len(LOAD_ORDER))
-        load_start = time.time()
-        load_counts = _load_to_supabase(data)
-        load_duration_ms = int((time.time() - load_start) * 1000)
-        logger.info(
-            "gtfs_load_stage_complete",
-            stage="load",
-            duration_ms=load_duration_ms,
-            tables_loaded=len(load_counts)
-        )
+            # Step 4: Insert metadata
+            logger.info("gtfs_load_stage_start", stage="metadata")
+            metadata = _create_metadata(data)
+            supabase = get_supabase()
+            supabase.table("gtfs_metadata").upsert([metadata]).execute()
+            logger.info("gtfs_metadata_inserted", feed_version=metadata["feed_version"])
 
-        # Step 4: Insert metadata
-        logger.info("gtfs_load_stage_start", stage="metadata")
-        metadata = _create_metadata(data)
-        supabase = get_supabase()
-        supabase.table("gtfs_metadata").upsert([metadata]).execute()
-        logger.info("gtfs_metadata_inserted", feed_version=metadata["feed_version"])
+            # Step 5: Validate
+            logger.info("gtfs_load_stage_start", stage="validation")
+            try:
+                with profile_stage("validation"):
+                    validation_result = _validate_load(data, load_counts)
+            except ValueError:
+                if shadow_info:
+                    # Swapped feed failed live validation: restore the previous version immediately
+                    rollback_gtfs_static(shadow_info["archive_label"])
+                    checkpoint.reset_load()
+                raise
+            logger.info(
+                "gtfs_load_stage_complete",
+                stage="validation",
+                validation_passed=validation_result["passed"]
+            )
 
-        # Step 5: Validate
-        logger.info("gtfs_load_stage_start", stage="validation")
-        validation_result = _validate_load(data, load_counts)
-        logger.info(
-            "gtfs_load_stage_complete",
-            stage="validation",
-            validation_passed=validation_result["passed"]
-        )
+            # Step 6: Persist snapshot only after a validated load (next run diffs against it)
+            save_snapshot(table_hashes, metadata["feed_version"], feed_hashes=current_feeds)
+            checkpoint.finish(feed_version=metadata["feed_version"])
+
+            if shadow_info:
+                shadow_info["archives_pruned"] = _prune_archives(supabase, settings.GTFS_ARCHIVE_KEEP)
+
+            # Step 7: iOS bundle from the parse output (no Supabase read-back)
+            ios_db = _generate_ios_bundle(data, metadata) if settings.GTFS_IOS_DB_IN_SYNC else None
+
+            # Final summary
+            total_duration_ms = int((time.time() - start_time) * 1000)
+            result = {
+                "status": "success",
+                "duration_ms": total_duration_ms,
+                "download_duration_ms": download_duration_ms,
+                "parse_duration_ms": parse_duration_ms,
+                "download": download_summary,
+                "load_duration_ms": load_duration_ms,
+                "counts": load_counts,
+                "load_mode": load_mode,
+                "tables": table_reports,
+                "shadow": shadow_info,
+                "metadata": metadata,
+                "validation": validation_result,
+                "resumed": checkpoint.resumed,
+                "checkpoint": checkpoint.summary(),
+                "ios_db": ios_db,
+                "profile": profiler.report()
+            }
+
+            logger.info(
+                "gtfs_load_pipeline_complete",
+                duration_ms=total_duration_ms,
+                total_stops=load_counts["stops"],
+                total_routes=load_counts["routes"],
+                total_patterns=load_counts["patterns"],
+                total_trips=load_counts["trips"]
+            )
 
-        # Final summary
-        total_duration_ms = int((time.time() - start_time) * 1000)
-        result = {
-            "status": "success",
-            "duration_ms": total_duration_ms,
-            "download_duration_ms": download_duration_ms,
-            "parse_duration_ms": parse_duration_ms,
-            "load_duration_ms": load_duration_ms,
-            "counts": load_counts,
-            "metadata": metadata,
-            "validation": validation_result
-        }
+            return result
 
-        logger.info(
-            "gtfs_load_pipeline_complete",
-            duration_ms=total_duration_ms,
-            total_stops=load_counts["stops"],
-            total_routes=load_counts["routes"],
-            total_patterns=load_counts["patterns"],
-            total_trips=load_counts["trips"]
-        )
+        except Exception as e:
+            duration_ms = int((time.time() - start_time) * 1000)
+            if checkpoint is not None:
+                checkpoint.fail(f"{type(e).__name__}: {e}")
+            logger.error(
+                "gtfs_load_pipeline_failed",
+                error=str(e),
+                error_type=type(e).__name__,
+                duration_ms=duration_ms
+            )
+            raise
+
+
+def _generate_ios_bundle(data: Dict[str, List[Dict]], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Build gtfs.db from the parse output and publish it as a new bundle version.
 
-        return result
+    Args:
+        data: Parse output that was just loaded
+        metadata: gtfs_metadata row written for it
 
+    Returns:
+        Dict with status, file_path, file_size_mb, duration_ms, row_counts,
+        bundle_version, publish (archived version, delta sizes per older version)
+        (status="failed" and error if generation failed; not raised)
+    """
+    logger.info("gtfs_load_stage_start", stage="ios_db")
+    with profile_stage("ios_db") as stage:
+        try:
+            result = generate_ios_db(data=data, metadata=metadata)
+        except Exception as e:
+            logger.error("gtfs_ios_db_failed", error=str(e), error_type=type(e).__name__)
+            return {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        stage["rows"] = sum(result["row_counts"].values())
+
+    # Deltas are an optimization for clients; a failed publish keeps the new bundle
+    try:
+        with profile_stage("ios_db_publish"):
+            publish = publish_bundle(result["file_path"])
     except Exception as e:
-        duration_ms = int((time.time() - start_time) * 1000)
-        logger.error(
-            "gtfs_load_pipeline_failed",
-            error=str(e),
-            error_type=type(e).__name__,
-            duration_ms=duration_ms
-        )
-        raise
+        logger.error("gtfs_ios_db_publish_failed", error=str(e), error_type=type(e).__name__)
+        publish = {"error": f"{type(e).__name__}: {e}"}
+
+    logger.info(
+        "gtfs_load_stage_complete",
+        stage="ios_db",
+        duration_ms=result["duration_ms"],
+        size_mb=result["file_size_mb"],
+        bundle_version=result["bundle_version"]
+    )
+    summary = {key: result[key] for key in ("status", "file_path", "file_size_mb", "duration_ms", "row_counts", "bundle_version")}
+    return {**summary, "publish": publish}
+
+
+def _pattern_feeds_unchanged(previous_snapshot: Optional[Dict[str, Any]], current_feeds: Dict[str, Optional[str]]) -> bool:
+    """Whether every realtime-aligned feed matches the feed hashes of the last successful load.
+
+    Args:
+        previous_snapshot: Snapshot from gtfs_diff.load_snapshot() (None → changed)
+        current_feeds: mode → SHA-256 of the ZIPs just downloaded
+
+    Returns:
+        True if parse/load can be skipped
+    """
+    if not previous_snapshot or not previous_snapshot.get("feeds"):
+        return False
+
+    loaded_feeds = previous_snapshot["feeds"]
+    for mode in MODE_DIRS:
+        if current_feeds.get(mode) != loaded_feeds.get(mode):
+            return False
+    return any(current_feeds.get(mode) for mode in MODE_DIRS)
 
 
 def _cleanup_stale_light_rail_data(supabase) -> None:
@@ -187,6 +412,11 @@ def _cleanup_stale_light_rail_data(supabase) -> None:
         trips_count = len(trips_deleted.data) if trips_deleted.data else 0
         logger.info("gtfs_cleanup_deleted", table="trips", count=trips_count)
 
+        if settings.GTFS_FREQUENCY_COMPRESSION:
+            frequencies_deleted = supabase.table("trip_frequencies").delete().in_("route_id", lr_route_ids).execute()
+            frequencies_count = len(frequencies_deleted.data) if frequencies_deleted.data else 0
+            logger.info("gtfs_cleanup_deleted", table="trip_frequencies", count=frequencies_count)
+
         # Delete pattern_stops for light rail patterns
         patterns_response = supabase.table("patterns").select("pattern_id").in_("route_id", lr_route_ids).execute()
         lr_pattern_ids = [p["pattern_id"] for p in patterns_response.data]
@@ -219,66 +449,422 @@ def _cleanup_stale_light_rail_data(supabase) -> None:
         raise
 
 
-def _load_to_supabase(data: Dict[str, List[Dict]]) -> Dict[str, int]:
+def _load_to_supabase(
+    data: Dict[str, List[Dict]],
+    previous_snapshot: Optional[Dict[str, Any]] = None,
+    checkpoint: Optional[SyncCheckpoint] = None
+) -> Tuple[Dict[str, int], Dict[str, Dict[str, Any]], Dict[str, Dict[str, str]]]:
     """Load all tables to Supabase in dependency order.
 
+    Full mode (no snapshot): clean up stale light rail data, upsert every row.
+    Incremental mode: upsert only inserted/changed rows, then delete rows missing from
+    the new dataset in reverse dependency order (children before parents).
+
+    With a checkpoint, each table's upserts resume after its last committed batch and
+    completed cleanup/deletes are not repeated (upserts are idempotent, so rows of
+    batches committed out of order are simply written again).
+
     Args:
         data: Parsed GTFS data with keys: agencies, routes, stops, etc.
+        previous_snapshot: Snapshot from gtfs_diff.load_snapshot(), or None for a full load
+        checkpoint: Progress of this feed version (default: in-memory, nothing to resume)
 
     Returns:
-        Dict mapping table names to row counts inserted
+        Tuple of:
+            counts: table → rows present after load, from the writes (unchanged + rows
+                    written; _validate_load checks them against the parser)
+            table_reports: table → {inserts, updates, deletes, unchanged, rows_written,
+                           rows_per_sec, apply_ms}
+            table_hashes: table → {primary key → row hash} for the next snapshot
     """
     supabase = get_supabase()
+    checkpoint = checkpoint or SyncCheckpoint.open({}, "full", persist=False)
     counts = {}
+    table_reports = {}
+    table_hashes = {}
+    pending_deletes = {}
+
+    previous_tables = previous_snapshot.get("tables", {}) if previous_snapshot else None
 
-    # Pre-load cleanup: Delete stale light rail data to prevent corruption
-    # (route_type 0/900 patterns/trips may accumulate train platforms from previous loads)
-    _cleanup_stale_light_rail_data(supabase)
+    if previous_tables is None and not checkpoint.stage_done("light_rail_cleanup"):
+        # Pre-load cleanup: Delete stale light rail data to prevent corruption
+        # (route_type 0/900 patterns/trips may accumulate train platforms from previous loads)
+        # Incremental loads delete disappeared rows via the diff instead.
+        # Not repeated on resume: it would delete light rail rows this load already wrote.
+        _cleanup_stale_light_rail_data(supabase)
+        checkpoint.complete_stage("light_rail_cleanup")
 
-    for table_name in LOAD_ORDER:
+    for table_name in _load_order():
         rows = data.get(table_name, [])
 
+        # Clean data: filter to schema fields, convert NaN to None
+        cleaned_rows = _clean_data_for_table(table_name, rows) if rows else []
+
+        diff = diff_table(
+            table_name,
+            cleaned_rows,
+            previous_tables.get(table_name) if previous_tables is not None else None
+        )
+        table_hashes[table_name] = diff["hashes"]
+        pending_deletes[table_name] = diff["deletes"]
+        table_reports[table_name] = {
+            "inserts": diff["inserts"],
+            "updates": diff["updates"],
+            "deletes": len(diff["deletes"]),
+            "unchanged": diff["unchanged"],
+        }
+
         if not rows:
             logger.warning("gtfs_table_empty", table=table_name)
-            counts[table_name] = 0
+
+        upserts = diff["upserts"]
+        resume_from = checkpoint.start_table(table_name, len(upserts))
+        logger.info(
+            "gtfs_table_load_start",
+            table=table_name,
+            total_rows=len(cleaned_rows),
+            upserts=len(upserts),
+            deletes=len(diff["deletes"]),
+            resume_from=resume_from
+        )
+
+        # Batch upsert (PostgREST) or COPY merge, per GTFS_LOADER_BACKEND
+        write_report = _write_table(
+            supabase,
+            table_name,
+            upserts[resume_from:],
+            on_batch_committed=checkpoint.batch_callback(table_name, resume_from)
+        )
+        checkpoint.complete_table(table_name)
+        total_inserted = write_report["rows_written"]
+        # Rows the table holds for this feed: kept unchanged + written (this run or before resume)
+        counts[table_name] = diff["unchanged"] + resume_from + total_inserted
+
+        table_reports[table_name].update(write_report)
+        table_reports[table_name]["apply_ms"] = write_report["write_ms"]
+        table_reports[table_name]["resumed_from"] = resume_from
+        logger.info("gtfs_table_load_complete", table=table_name, rows_inserted=total_inserted)
+
+    # Deletes run after all upserts, children first, so FK references are gone before parents
+    for table_name in reversed(_load_order()):
+        deletes = pending_deletes.get(table_name)
+        if not deletes or checkpoint.deletes_applied(table_name):
             continue
 
-        logger.info("gtfs_table_load_start", table=table_name, total_rows=len(rows))
+        delete_start = time.time()
+        with profile_stage("table_delete", table=table_name) as stage:
+            stage["rows"] = _delete_rows(supabase, table_name, deletes)
+        checkpoint.complete_deletes(table_name)
+        table_reports[table_name]["apply_ms"] += int((time.time() - delete_start) * 1000)
 
-        # Clean data: filter to schema fields, convert NaN to None
-        cleaned_rows = _clean_data_for_table(table_name, rows)
+    logger.info(
+        "gtfs_load_diff_summary",
+        mode="incremental" if previous_tables is not None else "full",
+        tables=table_reports
+    )
 
-        # Batch upsert
-        total_inserted = 0
-        for i in range(0, len(cleaned_rows), BATCH_SIZE):
-            batch = cleaned_rows[i:i + BATCH_SIZE]
-            batch_num = i // BATCH_SIZE
+    return counts, table_reports, table_hashes
 
-            try:
-                response = supabase.table(table_name).upsert(batch).execute()
-                total_inserted += len(batch)
 
-                logger.info(
-                    "gtfs_batch_inserted",
-                    table=table_name,
-                    batch_num=batch_num,
-                    batch_size=len(batch),
-                    total_progress=total_inserted
+def _write_table(
+    client,
+    table_name: str,
+    rows: List[Dict],
+    upsert: bool = True,
+    schema: str = "public",
+    on_batch_committed: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """Write cleaned rows with the configured loader backend.
+
+    postgrest: concurrent, retried JSON batches through the Supabase client
+               (see gtfs_batch_writer; also reports batches/retries/latency).
+    copy: COPY FROM STDIN over a direct Postgres connection (DATABASE_URL).
+
+    Args:
+        client: Supabase client for the target schema (postgrest backend)
+        table_name: Target table
+        rows: Cleaned rows (consistent keys)
+        upsert: Merge on primary key (live tables) vs plain insert (empty staging tables)
+        schema: Target schema (copy backend)
+        on_batch_committed: Called with (row offset, row count) per committed batch
+                            (the copy backend commits the whole table as one batch)
+
+    Returns:
+        Dict with backend, rows_written, write_ms, rows_per_sec (+ batches, retries,
+        final_batch_size, avg_latency_ms, parallelism for postgrest)
+    """
+    backend = settings.GTFS_LOADER_BACKEND
+    write_start = time.time()
+    report = {}
+
+    with profile_stage("table_load", table=table_name, backend=backend, schema=schema) as stage:
+        if not rows:
+            written = 0
+        elif backend == "copy":
+            with get_postgres_connection() as conn:
+                copy_report = copy_table(
+                    conn,
+                    table_name,
+                    rows,
+                    columns=list(rows[0].keys()),
+                    pk_columns=TABLE_PRIMARY_KEYS[table_name],
+                    schema=schema,
+                    upsert=upsert
                 )
+            written = copy_report["rows"]
+            if on_batch_committed is not None:
+                on_batch_committed(0, written)
+        else:
+            report = write_batches(
+                client,
+                table_name,
+                rows,
+                upsert=upsert,
+                parallelism=settings.GTFS_LOAD_TABLE_PARALLELISM.get(table_name, settings.GTFS_LOAD_PARALLELISM),
+                max_retries=settings.GTFS_LOAD_MAX_RETRIES,
+                initial_batch_size=BATCH_SIZE,
+                on_batch_committed=on_batch_committed
+            )
+            written = report["rows_written"]
+        stage["rows"] = written
+
+    write_ms = int((time.time() - write_start) * 1000)
+    rows_per_sec = int(written / (write_ms / 1000)) if write_ms > 0 else written
+
+    logger.info(
+        "gtfs_table_write_throughput",
+        table=table_name,
+        backend=backend,
+        rows=written,
+        duration_ms=write_ms,
+        rows_per_sec=rows_per_sec
+    )
+
+    report.update({
+        "backend": backend,
+        "rows_written": written,
+        "write_ms": write_ms,
+        "rows_per_sec": rows_per_sec,
+    })
+    return report
+
+
+def _load_to_shadow(
+    data: Dict[str, List[Dict]],
+    checkpoint: Optional[SyncCheckpoint] = None
+) -> Tuple[Dict[str, int], Dict[str, Dict[str, Any]], Dict[str, Dict[str, str]], Dict[str, Any]]:
+    """Bulk-load into gtfs_staging, validate the staging copy, then atomically swap it live.
+
+    Live tables keep serving the previous feed until the swap; the replaced tables are
+    kept in gtfs_archive_<label> for rollback_gtfs_static().
+
+    With a checkpoint, a resumed run keeps the staging schema and its fully loaded tables;
+    a partially loaded table is truncated and reloaded (staging writes are plain inserts).
+    If the swap already happened, nothing is written again.
+
+    Args:
+        data: Parsed GTFS data with keys: agencies, routes, stops, etc.
+        checkpoint: Progress of this feed version (default: in-memory, nothing to resume)
+
+    Returns:
+        Tuple of (counts, table_reports, table_hashes, shadow_info) where shadow_info has
+        archive_label, archive_schema, index_build_ms, staging_validation
+
+    Raises:
+        ValueError: If staging validation fails (live tables untouched)
+    """
+    supabase = get_supabase()
+    staging = get_supabase_staging()
+    checkpoint = checkpoint or SyncCheckpoint.open({}, "shadow", persist=False)
+    defer_indexes = settings.GTFS_SHADOW_DEFER_INDEXES
+    counts = {}
+    table_reports = {}
+    table_hashes = {}
+
+    swapped = checkpoint.stage_info("staging_swap")
+    if swapped:
+        # Interrupted after the swap: the new feed is already live (counts as validated in staging)
+        staging_counts = swapped["shadow_info"]["staging_validation"].get("counts", {})
+        for table_name in _load_order():
+            rows = data.get(table_name, [])
+            cleaned_rows = _clean_data_for_table(table_name, rows) if rows else []
+            table_hashes[table_name] = hash_table(table_name, cleaned_rows)
+            counts[table_name] = staging_counts.get(table_name, 0)
+            table_reports[table_name] = {"rows_written": 0, "write_ms": 0, "apply_ms": 0, "resumed_from": len(cleaned_rows)}
+        logger.info("gtfs_shadow_swap_resumed", archive_label=swapped["shadow_info"]["archive_label"])
+        return counts, table_reports, table_hashes, swapped["shadow_info"]
+
+    if not checkpoint.stage_done("staging_prepare"):
+        supabase.rpc("gtfs_staging_prepare", {"p_defer_indexes": defer_indexes}).execute()
+        checkpoint.complete_stage("staging_prepare", defer_indexes=defer_indexes)
+        logger.info("gtfs_shadow_staging_prepared", defer_indexes=defer_indexes)
+
+    for table_name in _load_order():
+        rows = data.get(table_name, [])
+        if not rows:
+            logger.warning("gtfs_table_empty", table=table_name)
+
+        cleaned_rows = _clean_data_for_table(table_name, rows) if rows else []
+        table_hashes[table_name] = hash_table(table_name, cleaned_rows)
+
+        if checkpoint.table_progress(table_name) and not checkpoint.table_complete(table_name):
+            # Interrupted mid-table: in-flight or out-of-order batches may have committed, so start over
+            supabase.rpc("gtfs_staging_truncate", {"p_table": table_name}).execute()
+            checkpoint.reset_table(table_name)
+            logger.info("gtfs_shadow_table_truncated", table=table_name)
+
+        resume_from = checkpoint.start_table(table_name, len(cleaned_rows))
+        logger.info(
+            "gtfs_table_load_start",
+            table=table_name,
+            total_rows=len(cleaned_rows),
+            target="staging",
+            resume_from=resume_from
+        )
+        write_report = _write_table(
+            staging,
+            table_name,
+            cleaned_rows[resume_from:],
+            upsert=False,
+            schema=STAGING_SCHEMA,
+            on_batch_committed=checkpoint.batch_callback(table_name, resume_from)
+        )
+        checkpoint.complete_table(table_name)
+        written = write_report["rows_written"]
+
+        counts[table_name] = resume_from + written
+        table_reports[table_name] = dict(write_report, apply_ms=write_report["write_ms"], resumed_from=resume_from)
+        logger.info("gtfs_table_load_complete", table=table_name, rows_inserted=written, target="staging")
+
+    index_build_ms = 0
+    if defer_indexes:
+        index_start = time.time()
+        index_response = supabase.rpc("gtfs_staging_build_indexes", {}).execute()
+        index_build_ms = int((time.time() - index_start) * 1000)
+        logger.info("gtfs_shadow_indexes_built", duration_ms=index_build_ms, result=index_response.data)
+
+    staging_validation = supabase.rpc("gtfs_staging_validate", {}).execute().data or {}
+    issues = []
+    staging_counts = staging_validation.get("counts", {})
+    for table_name in _load_order():
+        if staging_counts.get(table_name) != counts[table_name]:
+            issues.append(f"staging {table_name}: expected {counts[table_name]}, found {staging_counts.get(table_name)}")
+    for check in ["null_locations", "orphan_trips", "orphan_pattern_stops", "patterns_without_stops"]:
+        if staging_validation.get(check, 0) > 0:
+            issues.append(f"staging {check}: {staging_validation[check]}")
+
+    if issues:
+        logger.error("gtfs_shadow_validation_failed", issues=issues)
+        raise ValueError(f"Staging validation failed (live tables untouched): {', '.join(issues)}")
+
+    archive_label = datetime.now().strftime("%Y%m%d%H%M%S")
+    swap_start = time.time()
+    swap_response = supabase.rpc("gtfs_staging_swap", {"p_archive_label": archive_label}).execute()
+    swap_ms = int((time.time() - swap_start) * 1000)
+    archive_schema = (swap_response.data or {}).get("archive_schema")
+
+    logger.info("gtfs_shadow_swapped", archive_schema=archive_schema, swap_ms=swap_ms)
+
+    shadow_info = {
+        "archive_label": archive_label,
+        "archive_schema": archive_schema,
+        "index_build_ms": index_build_ms,
+        "swap_ms": swap_ms,
+        "staging_validation": staging_validation,
+    }
+    checkpoint.complete_stage("staging_swap", shadow_info=shadow_info)
+    return counts, table_reports, table_hashes, shadow_info
+
+
+def rollback_gtfs_static(archive_label: str) -> Dict[str, Any]:
+    """Restore an archived table version (from a shadow swap) into the live schema.
+
+    Args:
+        archive_label: Label returned as shadow.archive_label by load_gtfs_static
+
+    Returns:
+        Dict with restored_from / displaced_to schema names
+    """
+    supabase = get_supabase()
+    response = supabase.rpc("gtfs_rollback", {"p_archive_label": archive_label}).execute()
+    logger.warning("gtfs_shadow_rolled_back", archive_label=archive_label, result=response.data)
+    return response.data or {}
+
+
+def archives_to_prune(archives: List[str], keep: int) -> List[str]:
+    """Archive schemas to drop: all but the newest `keep` swap archives and the newest
+    rollback archive (older displaced versions are never restored).
+
+    Ranked by the timestamp in the label, not the name ("rollback_" sorts above every
+    timestamp); archives without one rank oldest.
+
+    Args:
+        archives: Archive schema names (gtfs_list_archives)
+        keep: Swap archives to keep (GTFS_ARCHIVE_KEEP)
+
+    Returns:
+        Schema names to drop, oldest first
+    """
+    def newest_first(schema: str) -> Tuple[str, str]:
+        match = ARCHIVE_TIMESTAMP_PATTERN.search(schema)
+        return (match.group(1) if match else "", schema)
+
+    keep = max(keep, 0)
+    swaps = [a for a in archives if a.startswith(ARCHIVE_SCHEMA_PREFIX) and not a.startswith(ROLLBACK_ARCHIVE_PREFIX)]
+    rollbacks = [a for a in archives if a.startswith(ROLLBACK_ARCHIVE_PREFIX)]
+    drop = sorted(swaps, key=newest_first, reverse=True)[keep:]
+    drop += sorted(rollbacks, key=newest_first, reverse=True)[min(keep, 1):]
+    return sorted(drop, key=newest_first)
+
+
+def _prune_archives(supabase, keep: int) -> List[str]:
+    """Drop archive schemas past `keep` (see archives_to_prune); returns those dropped."""
+    archives = supabase.rpc("gtfs_list_archives", {}).execute().data or []
+    drop = archives_to_prune(archives, keep)
+    if not drop:
+        return []
+    response = supabase.rpc("gtfs_drop_archives", {"p_schemas": drop}).execute()
+    dropped = (response.data or {}).get("dropped", [])
+    logger.info("gtfs_shadow_archives_pruned", dropped=dropped, kept=len(archives) - len(dropped))
+    return dropped
+
+
+def _delete_rows(supabase, table_name: str, deletes: List[Dict[str, str]]) -> int:
+    """Delete rows by primary key in batches.
+
+    Args:
+        supabase: Supabase client
+        table_name: Table to delete from
+        deletes: Primary keys as column dicts (from gtfs_diff.diff_table)
+
+    Returns:
+        Number of primary keys submitted for deletion
+    """
+    logger.info("gtfs_table_delete_start", table=table_name, total_rows=len(deletes))
+
+    total_deleted = 0
+    for eq_filters, in_column, values in group_deletes(table_name, deletes):
+        for i in range(0, len(values), BATCH_SIZE):
+            batch = values[i:i + BATCH_SIZE]
+            try:
+                query = supabase.table(table_name).delete()
+                for column, value in eq_filters.items():
+                    query = query.eq(column, value)
+                query.in_(in_column, batch).execute()
+                total_deleted += len(batch)
             except Exception as e:
                 logger.error(
-                    "gtfs_batch_insert_failed",
+                    "gtfs_batch_delete_failed",
                     table=table_name,
-                    batch_num=batch_num,
+                    filters=eq_filters,
+                    batch_size=len(batch),
                     error=str(e),
                     error_type=type(e).__name__
                 )
                 raise
 
-        counts[table_name] = total_inserted
-        logger.info("gtfs_table_load_complete", table=table_name, rows_inserted=total_inserted)
-
-    return counts
+    logger.info("gtfs_table_delete_complete", table=table_name, rows_deleted=total_deleted)
+    return total_deleted
 
 
 def _clean_data_for_table(table_name: str, rows: List[Dict]) -> List[Dict]:
@@ -368,7 +954,10 @@ def _create_metadata(data: Dict[str, List[Dict]]) -> Dict[str, Any]:
         "stops_count": len(data.get("stops", [])),
         "routes_count": len(data.get("routes", [])),
         "patterns_count": len(data.get("patterns", [])),
-        "trips_count": len(data.get("trips", []))
+        # Headway-compressed trips count as trips
+        "trips_count": len(data.get("trips", [])) + sum(
+            len(block["trip_ids"]) for block in data.get("trip_frequencies") or []
+        )
     }
 
     return metadata
@@ -377,6 +966,9 @@ def _create_metadata(data: Dict[str, List[Dict]]) -> Dict[str, Any]:
 def _validate_load(parsed_data: Dict[str, List[Dict]], loaded_counts: Dict[str, int]) -> Dict[str, Any]:
     """Validate loaded data against parser output and database state.
 
+    Dataset checks run in one vectorized pass over the parsed tables; database checks
+    (stops count, NULL locations) are one gtfs_validate_load() RPC (see gtfs_validation).
+
     Args:
         parsed_data: Original parsed data from gtfs_service
         loaded_counts: Row counts from Supabase load
@@ -388,230 +980,15 @@ def _validate_load(parsed_data: Dict[str, List[Dict]], loaded_counts: Dict[str,
         ValueError: If validation fails
     """
     supabase = get_supabase()
-    issues = []
 
-    # Check 1: Row counts match between parser and Supabase
-    for table in ["stops", "routes", "patterns", "trips"]:
-        expected = len(parsed_data.get(table, []))
-        actual = loaded_counts.get(table, 0)
+    with profile_stage("validation_check", check="dataset"):
+        dataset_result = validate_dataset(parsed_data, loaded_counts)
 
-        if expected != actual:
-            issue = f"{table}: expected {expected}, loaded {actual}"
-            issues.append(issue)
-            logger.error("gtfs_validation_count_mismatch", table=table, expected=expected, actual=actual)
+    with profile_stage("validation_check", check="database"):
+        db_result = validate_loaded_db(supabase, loaded_counts.get("stops", 0))
 
-    # Check 2: Verify stops count in Supabase
-    try:
-        stops_response = supabase.table("stops").select("*", count="exact").execute()
-        db_stops_count = stops_response.count
-
-        expected_stops = loaded_counts.get("stops", 0)
-        if db_stops_count < expected_stops:
-            issue = f"DB stops count too low: {db_stops_count} < {expected_stops}"
-            issues.append(issue)
-            logger.error(
-                "gtfs_validation_db_count_too_low",
-                db_count=db_stops_count,
-                expected=expected_stops
-            )
-        elif db_stops_count != expected_stops:
-            # Allow extra rows (e.g. pre-existing data) but log a warning for skew.
-            logger.warning(
-                "gtfs_validation_db_count_skew",
-                db_count=db_stops_count,
-                expected=expected_stops
-            )
-    except Exception as e:
-        issue = f"Failed to query stops count: {str(e)}"
-        issues.append(issue)
-        logger.error("gtfs_validation_query_failed", table="stops", error=str(e))
-
-    # Check 3: NULL locations (CRITICAL - trigger must populate all)
-    try:
-        null_locations_response = supabase.table("stops").select("stop_id").is_("location", "null").execute()
-        null_count = len(null_locations_response.data)
-
-        if null_count > 0:
-            issue = f"Found {null_count} stops with NULL location (trigger failed)"
-            issues.append(issue)
-            logger.error("gtfs_validation_null_locations", null_count=null_count)
-
-            # Log first 5 problem stop_ids for debugging
-            problem_stops = [s["stop_id"] for s in null_locations_response.data[:5]]
-            logger.error("gtfs_validation_null_location_examples", stop_ids=problem_stops)
-    except Exception as e:
-        issue = f"Failed to check NULL locations: {str(e)}"
-        issues.append(issue)
-        logger.error("gtfs_validation_null_check_failed", error=str(e))
-
-    # Check 4: Minimum thresholds (sanity check)
-    min_stops = 10000
-    min_routes = 400
-    if loaded_counts.get("stops", 0) < min_stops:
-        issue = f"Too few stops: {loaded_counts.get('stops', 0)} < {min_stops}"
-        issues.append(issue)
-        logger.error("gtfs_validation_threshold_failed", check="min_stops", actual=loaded_counts.get("stops", 0), threshold=min_stops)
-
-    if loaded_counts.get("routes", 0) < min_routes:
-        issue = f"Too few routes: {loaded_counts.get('routes', 0)} < {min_routes}"
-        issues.append(issue)
-        logger.error("gtfs_validation_threshold_failed", check="min_routes", actual=loaded_counts.get("routes", 0), threshold=min_routes)
-
-    # Check 5: Mode coverage (ensure at least one route for each important mode)
-    try:
-        # NSW uses extended route types; define groups by mode rather than a single code.
-        # Query each mode group directly to avoid pagination issues.
-        mode_checks = [
-            ("rail", [2]),
-            ("bus", [3, 700, 712, 714]),
-            ("ferry", [4]),
-            ("light_rail", [0, 900]),
-            ("metro", [1, 401]),
-        ]
-
-        def require_any(types: list, label: str) -> None:
-            # Check if any route exists with one of the expected types
-            for route_type in types:
-                count_response = supabase.table("routes").select("route_id", count="exact").eq("route_type", route_type).limit(1).execute()
-                if count_response.count > 0:
-                    logger.info(f"gtfs_validation_mode_found", mode=label, route_type=route_type, count=count_response.count)
-                    return
-
-            # If we get here, no routes found for any of the types
-            issue = f"Missing routes for expected mode {label} (types {sorted(types)})"
-            issues.append(issue)
-            logger.error(
-                "gtfs_validation_mode_coverage_failed",
-                mode=label,
-                expected_types=types
-            )
-
-        for label, types in mode_checks:
-            require_any(types, label)
-    except Exception as e:
-        issue = f"Failed to verify mode coverage: {str(e)}"
-        issues.append(issue)
-        logger.error("gtfs_validation_mode_coverage_error", error=str(e))
-
-    # Check 6: Light rail minimum coverage (hardened to catch L2/L3 missing)
-    try:
-        # Count light rail routes (route_type 0 or 900)
-        lr_routes_response = supabase.table("routes").select("route_id", count="exact").in_("route_type", [0, 900]).execute()
-        lr_routes_count = lr_routes_response.count
-
-        # Minimum thresholds (Sydney has L1/L2/L3 at minimum)
-        min_lr_routes = 3
-        min_lr_trips = 6000
-        min_lr_stops = 100
-
-        if lr_routes_count < min_lr_routes:
-            issue = f"Light rail routes too low: {lr_routes_count} < {min_lr_routes} (missing L2/L3?)"
-            issues.append(issue)
-            logger.error("gtfs_validation_light_rail_routes_failed", actual=lr_routes_count, threshold=min_lr_routes)
-
-        # Count light rail trips
-        lr_route_ids = [r["route_id"] for r in lr_routes_response.data]
-        if lr_route_ids:
-            lr_trips_response = supabase.table("trips").select("trip_id", count="exact").in_("route_id", lr_route_ids).execute()
-            lr_trips_count = lr_trips_response.count
-
-            if lr_trips_count < min_lr_trips:
-                issue = f"Light rail trips too low: {lr_trips_count} < {min_lr_trips}"
-                issues.append(issue)
-                logger.error("gtfs_validation_light_rail_trips_failed", actual=lr_trips_count, threshold=min_lr_trips)
-
-            # Count distinct stops in light rail patterns
-            lr_patterns_response = supabase.table("patterns").select("pattern_id").in_("route_id", lr_route_ids).execute()
-            lr_pattern_ids = [p["pattern_id"] for p in lr_patterns_response.data]
-
-            if lr_pattern_ids:
-                # Count distinct stops via pattern_stops
-                lr_stops_response = supabase.rpc("count_distinct_stops_in_patterns", {"pattern_ids": lr_pattern_ids}).execute()
-                lr_stops_count = lr_stops_response.data if lr_stops_response.data else 0
-
-                if lr_stops_count < min_lr_stops:
-                    issue = f"Light rail stops too low: {lr_stops_count} < {min_lr_stops}"
-                    issues.append(issue)
-                    logger.error("gtfs_validation_light_rail_stops_failed", actual=lr_stops_count, threshold=min_lr_stops)
-
-                logger.info(
-                    "gtfs_validation_light_rail_coverage",
-                    routes=lr_routes_count,
-                    trips=lr_trips_count,
-                    stops=lr_stops_count
-                )
-    except Exception as e:
-        # Light rail validation is critical; if RPC fails, use best-effort query
-        logger.warning("gtfs_validation_light_rail_rpc_failed", error=str(e))
-        # Fallback: just check routes and trips (stops check requires RPC)
-        try:
-            lr_routes_response = supabase.table("routes").select("route_id", count="exact").in_("route_type", [0, 900]).execute()
-            lr_routes_count = lr_routes_response.count
-            if lr_routes_count < 3:
-                issue = f"Light rail routes too low: {lr_routes_count} < 3"
-                issues.append(issue)
-        except Exception as e2:
-            issue = f"Failed to verify light rail coverage: {str(e2)}"
-            issues.append(issue)
-            logger.error("gtfs_validation_light_rail_error", error=str(e2))
-
-    # Check 7: Light rail contamination (no train platforms in light rail patterns)
-    try:
-        # Query for train platforms in light rail patterns
-        # This uses a SQL join; if too slow, upgrade to Redis index later
-        contamination_query = """
-            SELECT COUNT(*) as count
-            FROM pattern_stops ps
-            JOIN patterns p ON ps.pattern_id = p.pattern_id
-            JOIN routes r ON p.route_id = r.route_id
-            JOIN stops s ON ps.stop_id = s.stop_id
-            WHERE r.route_type IN (0, 900)
-            AND s.stop_name LIKE '%Platform%'
-        """
-        contamination_response = supabase.rpc("execute_sql", {"query": contamination_query}).execute()
-        contamination_count = contamination_response.data[0]["count"] if contamination_response.data else 0
-
-        # Allow tiny tolerance (1-2 stops) for edge cases, but fail if >5
-        if contamination_count > 5:
-            issue = f"Light rail patterns contaminated with {contamination_count} train platforms"
-            issues.append(issue)
-            logger.error("gtfs_validation_light_rail_contamination", count=contamination_count)
-        elif contamination_count > 0:
-            logger.warning("gtfs_validation_light_rail_contamination_minor", count=contamination_count)
-    except Exception as e:
-        # Contamination check is nice-to-have; log warning but don't fail
-        logger.warning("gtfs_validation_contamination_check_failed", error=str(e))
-
-    # Check 8: Critical stop whitelist (must-exist stops)
-    critical_stops = [
-        # Names/IDs are based on NSW GTFS; update if feed naming changes.
-        {"stop_id": None, "stop_name": "Central Station"},
-        {"stop_id": None, "stop_name": "Central Grand Concourse Light Rail"},
-        {"stop_id": None, "stop_name": "Central Station, Platform 26"},
-        {"stop_id": None, "stop_name": "Davistown, Central RSL Wharf"},
-    ]
-
-    try:
-        for cs in critical_stops:
-            stop_query = supabase.table("stops").select("stop_id, stop_name")
-            if cs["stop_id"]:
-                stop_query = stop_query.eq("stop_id", cs["stop_id"])
-            else:
-                stop_query = stop_query.eq("stop_name", cs["stop_name"])
-
-            result = stop_query.execute()
-            if not result.data:
-                issue = f"Critical stop missing: {cs['stop_name']} ({cs['stop_id'] or 'no explicit stop_id'})"
-                issues.append(issue)
-                logger.error(
-                    "gtfs_validation_critical_stop_missing",
-                    stop_name=cs["stop_name"],
-                    stop_id=cs["stop_id"]
-                )
-    except Exception as e:
-        issue = f"Failed to verify critical stops: {str(e)}"
-        issues.append(issue)
-        logger.error("gtfs_validation_critical_stops_error", error=str(e))
+    checks = dict(dataset_result["issues"], **db_result["issues"])
+    issues = [issue for check in CHECK_ORDER for issue in checks[check]]
 
     # Determine pass/fail
     passed = len(issues) == 0
@@ -621,12 +998,13 @@ def _validate_load(parsed_data: Dict[str, List[Dict]], loaded_counts: Dict[str,
         logger.error("gtfs_validation_failed", total_issues=len(issues), issues=issues)
         raise ValueError(error_msg)
 
-    logger.info("gtfs_validation_passed", checks_passed=8)
+    logger.info("gtfs_validation_passed", checks_passed=len(CHECK_ORDER))
 
     return {
         "passed": passed,
         "issues": issues,
-        "checks_run": 8,
-        "null_locations": 0,
-        "db_stops_count": db_stops_count if 'db_stops_count' in locals() else loaded_counts.get("stops", 0)
+        "checks_run": len(CHECK_ORDER),
+        "null_locations": db_result["null_locations"] or 0,
+        "db_stops_count": db_result["db_stops_count"] if db_result["db_stops_count"] is not None else loaded_counts.get("stops", 0),
+        "light_rail": dataset_result["light_rail"],
     }
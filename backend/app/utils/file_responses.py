@@ -0,0 +1,176 @@
+"""Conditional, range-resumable responses for large static files.
+
+file_response() serves a file with a precomputed manifest (app.services.ios_db_variants):
+
+- Accept-Encoding: picks a precompressed variant (zstd, then gzip) the client accepts
+- If-None-Match: 304 when the client already has this content (any representation)
+- Range / If-Range: single byte ranges (206, 416 if unsatisfiable); a stale If-Range
+  validator gets the whole representation instead
+- ETag per representation ("<sha256>", "<sha256>-zstd", ...), Repr-Digest, Vary
+
+starlette's FileResponse (this FastAPI version) has no Range support, so ranges are
+streamed with StreamingResponse.
+"""
+
+import base64
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+
+CHUNK_BYTES = 256 * 1024
+
+# Precompressed encodings a manifest may list, in server preference order
+ENCODING_PREFERENCE = ["zstd", "gzip"]
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    manifest: Optional[Dict[str, Any]],
+    media_type: str,
+    filename: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Serve a file (or its best precompressed variant) honoring conditional/range headers.
+
+    Args:
+        request: Incoming request (Accept-Encoding, If-None-Match, Range, If-Range)
+        path: Uncompressed file
+        manifest: ios_db_variants.read_manifest(path), or None (identity only, no
+                  validators)
+        media_type: Content-Type of the decoded content
+        filename: Download file name
+        headers: Extra response headers
+
+    Returns:
+        200, 206, 304 or 416 response
+    """
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+    encoding = _negotiate(request.headers.get("accept-encoding", ""), manifest)
+    served_path = path.with_name(manifest[encoding]["path"]) if encoding else path
+    size = served_path.stat().st_size
+
+    if manifest:
+        etag = _etag(manifest, encoding)
+        headers["ETag"] = etag
+        headers["Repr-Digest"] = _repr_digest(manifest[encoding or "identity"]["sha256"])
+        if _matches(request.headers.get("if-none-match"), manifest):
+            return Response(status_code=304, headers=headers)
+    else:
+        etag = None
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    byte_range = _requested_range(request, etag, size)
+    if byte_range == "unsatisfiable":
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = 200
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status_code = 206
+    return StreamingResponse(
+        _read_range(served_path, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def _negotiate(accept_encoding: str, manifest: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Preferred available encoding the client accepts (None = identity)."""
+    if not manifest:
+        return None
+    accepted = _accepted_encodings(accept_encoding)
+    candidates = [e for e in ENCODING_PREFERENCE if e in manifest and accepted.get(e, accepted.get("*", 0)) > 0]
+    if not candidates:
+        return None
+    # Highest q wins; ties keep server preference (zstd first)
+    return max(candidates, key=lambda e: accepted.get(e, accepted.get("*", 0)))
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def _etag(manifest: Dict[str, Any], encoding: Optional[str]) -> str:
+    sha = manifest["identity"]["sha256"]
+    return f'"{sha}-{encoding}"' if encoding else f'"{sha}"'
+
+
+def _matches(if_none_match: Optional[str], manifest: Dict[str, Any]) -> bool:
+    """Weak comparison: any representation of the same content counts as a match."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    current = {_etag(manifest, None)} | {_etag(manifest, e) for e in ENCODING_PREFERENCE if e in manifest}
+    return any(tag.removeprefix("W/") in current for tag in tags)
+
+
+def _requested_range(request: Request, etag: Optional[str], size: int):
+    """(start, end) inclusive, None for the whole file, or "unsatisfiable"."""
+    header = request.headers.get("range")
+    if not header:
+        return None
+    if_range = request.headers.get("if-range")
+    # Only strong ETag validators resume; anything else (dates, old tags) restarts
+    if if_range is not None and (etag is None or if_range.strip() != etag):
+        return None
+
+    match = _RANGE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None  # Multiple or malformed ranges: serve the whole file
+    first, last = match.group(1), match.group(2)
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return "unsatisfiable"
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return "unsatisfiable"
+    return start, end
+
+
+def _read_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _repr_digest(sha256_hex: str) -> str:
+    return f"sha-256=:{base64.b64encode(bytes.fromhex(sha256_hex)).decode()}:"
@@ -0,0 +1,229 @@
+"""Per-stage timing and memory instrumentation for the GTFS static pipeline.
+
+A PipelineProfiler is activated around one pipeline run; code anywhere below it records
+stages with profile_stage() (a no-op when no profiler is active, so services stay usable
+on their own):
+
+    with PipelineProfiler(capture="tracemalloc") as profiler:
+        with profile_stage("csv_read", file="buses/stops.txt") as stage:
+            stops = pd.read_csv(...)
+            stage["rows"] = len(stops)
+    profiler.report()  # {"stages": [...], "profile_files": [...], ...}
+
+Each stage records wall time, CPU time (process-wide), RSS at exit, RSS delta, how much
+the stage raised the process peak RSS, and optional row counts. Stages nest (parent is
+recorded). Optional captures write to var/profiles/:
+- tracemalloc: per-stage traced allocation peak + top allocation sites at exit
+- cprofile: cProfile stats of the calling thread (pstats format)
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.utils.logging import VAR_DIR, get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_DIR = VAR_DIR / "profiles"
+
+CAPTURE_MODES = ("off", "tracemalloc", "cprofile")
+
+# Allocation sites written to the tracemalloc report
+TRACEMALLOC_TOP_N = 50
+
+_active_profiler: ContextVar[Optional["PipelineProfiler"]] = ContextVar("gtfs_active_profiler", default=None)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        # No procfs (macOS): fall back to peak RSS
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0 if unavailable)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(maxrss / divisor, 1)
+
+
+@contextmanager
+def profile_stage(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Record a stage on the active profiler (no-op if none).
+
+    Args:
+        name: Stage name (e.g. "csv_read", "table_load")
+        **attrs: Identifying attributes stored with the stage (mode, file, table, check)
+
+    Yields:
+        Mutable stage record; set "rows" (or other counters) inside the block
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield {}
+        return
+    with profiler.stage(name, **attrs) as record:
+        yield record
+
+
+class PipelineProfiler:
+    """Collects stage records for one pipeline run."""
+
+    def __init__(self, capture: str = "off", output_dir: Path = PROFILE_DIR, run_label: Optional[str] = None):
+        if capture not in CAPTURE_MODES:
+            raise ValueError(f"Unknown profile capture {capture!r}; expected one of {CAPTURE_MODES}")
+
+        self.capture = capture
+        self.output_dir = Path(output_dir)
+        self.run_label = run_label or datetime.now().strftime("%Y%m%d%H%M%S")
+        self.stages: List[Dict[str, Any]] = []
+        self.profile_files: List[str] = []
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._token = None
+        self._cprofile = None
+        self._started_tracemalloc = False
+        self._start_wall = None
+        self._start_rss = None
+
+    def __enter__(self) -> "PipelineProfiler":
+        self._start_wall = time.perf_counter()
+        self._start_rss = current_rss_mb()
+        self._token = _active_profiler.set(self)
+
+        if self.capture == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        elif self.capture == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+        return self
+
+    def __exit__(self, *_exc) -> bool:
+        try:
+            self._finish_capture()
+        finally:
+            _active_profiler.reset(self._token)
+        return False
+
+    @contextmanager
+    def stage(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """Time one stage; see profile_stage()."""
+        stack = self._stack()
+        record = {"stage": name, **attrs, "parent": stack[-1]["record"]["stage"] if stack else None}
+        with self._lock:
+            self.stages.append(record)
+
+        frame = {"record": record, "child_traced_peak": 0}
+        tracing = tracemalloc.is_tracing() and self.capture == "tracemalloc"
+        if tracing:
+            frame["traced_start"], frame["traced_peak_before"] = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        stack.append(frame)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        rss_start = current_rss_mb()
+        peak_start = peak_rss_mb()
+        try:
+            yield record
+        finally:
+            stack.pop()
+            rss_end = current_rss_mb()
+            record.update({
+                "wall_ms": int((time.perf_counter() - wall_start) * 1000),
+                "cpu_ms": int((time.process_time() - cpu_start) * 1000),
+                "rss_mb": rss_end,
+                "rss_delta_mb": round(rss_end - rss_start, 1),
+                "peak_rss_delta_mb": round(max(0.0, peak_rss_mb() - peak_start), 1),
+            })
+
+            if tracing:
+                _current, traced_peak = tracemalloc.get_traced_memory()
+                traced_peak = max(traced_peak, frame["child_traced_peak"])
+                record["traced_peak_mb"] = round((traced_peak - frame["traced_start"]) / 1024 / 1024, 1)
+                if stack:
+                    # Parent's peak spans its own segments before/after this child too
+                    parent = stack[-1]
+                    parent["child_traced_peak"] = max(
+                        parent["child_traced_peak"], traced_peak, frame["traced_peak_before"]
+                    )
+
+            logger.debug("pipeline_stage_complete", **record)
+
+    def report(self) -> Dict[str, Any]:
+        """Summary included in the pipeline result.
+
+        Stops and writes any tracemalloc/cProfile capture first, so call it at the end
+        of the run (stage recording continues to work afterwards).
+        """
+        self._finish_capture()
+        return {
+            "run_label": self.run_label,
+            "capture": self.capture,
+            "wall_ms": int((time.perf_counter() - self._start_wall) * 1000) if self._start_wall else 0,
+            "rss_start_mb": self._start_rss,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": list(self.stages),
+            "profile_files": list(self.profile_files),
+        }
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _finish_capture(self) -> None:
+        """Stop the capture and write it to output_dir (idempotent)."""
+        try:
+            if self._cprofile is not None:
+                self._cprofile.disable()
+                self._write_cprofile()
+            if self.capture == "tracemalloc" and tracemalloc.is_tracing() and not self.profile_files:
+                self._write_tracemalloc()
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+        except OSError as e:
+            logger.warning("profile_write_failed", error=str(e), output_dir=str(self.output_dir))
+        finally:
+            self._cprofile = None
+
+    def _write_cprofile(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"gtfs-static-{self.run_label}.prof"
+        self._cprofile.dump_stats(str(path))
+        self.profile_files.append(str(path))
+        logger.info("profile_written", capture="cprofile", path=str(path))
+
+    def _write_tracemalloc(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / f"gtfs-static-{self.run_label}-tracemalloc.txt"
+        top_stats = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP_N]
+        current, _peak = tracemalloc.get_traced_memory()
+        with open(path, "w") as f:
+            f.write(f"# traced memory at pipeline exit: {current / 1024 / 1024:.1f} MB\n")
+            for stat in top_stats:
+                f.write(f"{stat}\n")
+        self.profile_files.append(str(path))
+        logger.info("profile_written", capture="tracemalloc", path=str(path))
@@ -0,0 +1,12 @@
+"""Offline benchmarks for the GTFS static pipeline.
+
+- synthetic_gtfs: deterministic NSW-shaped GTFS feeds (no live download needed)
+- local_supabase: in-memory stand-in for the Supabase client used by the loaders
+- pipeline: parse → load → iOS bundle run with per-stage time/memory vs stored baselines
+- offset_deltas: storage/lookup cost of per-trip offset deltas vs medians and stop_times
+- bundle_delta: size and apply time of row-level deltas between gtfs.db versions
+- offline_departures: stop_departures table vs the app's join query (size, p50/p99)
+- nearby_stops: stops_rtree radius probe vs the full stops scan (p50/p99)
+
+Run from backend/: python scripts/benchmark_pipeline.py --help
+"""
@@ -0,0 +1,150 @@
+"""Bundle delta benchmark: delta size and apply time between two gtfs.db versions.
+
+run_bundle_delta_benchmark() builds a bundle from a synthetic feed, edits the parse
+output the way a routine feed update does (trips dropped and added, headsigns and stop
+names changed, a new stop, extra calendar_dates), builds the next bundle over the first
+(stable dictionary IDs) and measures:
+
+    full              bytes of the new gtfs.db (raw and gzip)
+    delta             bytes of the row-level delta (raw and gzip), build/apply ms
+    unstable_ids      delta size if the new bundle had been numbered from scratch
+
+The applied bundle is checked row for row against the new one.
+"""
+
+import gzip
+import random
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest import mock
+
+from app.services import ios_db_generator
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_delta import _data_tables, _quote, _row_columns, apply_delta, build_delta
+from app.services.ios_db_generator import generate_ios_db
+from benchmarks.synthetic_gtfs import generate_feed
+
+
+def run_bundle_delta_benchmark(
+    scale: str = "small",
+    seed: int = 0,
+    change_pct: float = 2.0,
+    **feed_params: Any
+) -> Dict[str, Any]:
+    """Build two bundle versions and measure the delta between them.
+
+    Args:
+        scale: synthetic_gtfs.SCALES entry
+        seed: Feed and edit seed
+        change_pct: Share of trips and stops edited for the second version
+        **feed_params: Overrides passed to generate_feed
+
+    Returns:
+        Dict with changes (edited rows), full/delta/unstable_ids sizes (bytes,
+        gzip_bytes), delta tables, build_ms, apply_ms and delta_pct (delta gzip as a
+        share of full gzip)
+    """
+    with tempfile.TemporaryDirectory(prefix="gtfs-delta-") as work_dir:
+        work = Path(work_dir)
+        generate_feed(str(work / "gtfs"), scale=scale, seed=seed, **feed_params)
+        data = parse_gtfs(str(work / "gtfs"))
+        edited, changes = edit_feed(data, random.Random(seed), change_pct)
+
+        # Size bounds target the full NSW bundle; synthetic scales are smaller
+        with mock.patch.object(ios_db_generator, "MIN_IOS_DB_SIZE_MB", 0):
+            generate_ios_db(str(work / "v1.db"), data=data, metadata={}, bundle_version="v1")
+            shutil.copy2(work / "v1.db", work / "current.db")
+            generate_ios_db(str(work / "current.db"), data=edited, metadata={}, bundle_version="v2")
+            generate_ios_db(str(work / "fresh.db"), data=edited, metadata={}, bundle_version="v2")
+
+        delta = build_delta(str(work / "v1.db"), str(work / "current.db"), str(work / "v1_v2.db"))
+        unstable = build_delta(str(work / "v1.db"), str(work / "fresh.db"), str(work / "v1_fresh.db"))
+
+        shutil.copy2(work / "v1.db", work / "client.db")
+        applied = apply_delta(str(work / "client.db"), str(work / "v1_v2.db"))
+        mismatched = bundle_differences(str(work / "client.db"), str(work / "current.db"))
+        if mismatched:
+            raise AssertionError(f"applied delta differs from the new bundle: {mismatched}")
+
+        full_sizes = _sizes(work / "current.db")
+        delta_sizes = _sizes(work / "v1_v2.db")
+        return {
+            "scale": scale,
+            "seed": seed,
+            "change_pct": change_pct,
+            "changes": changes,
+            "full": full_sizes,
+            "delta": {**delta_sizes, "tables": delta["tables"]},
+            "unstable_ids": _sizes(work / "v1_fresh.db"),
+            "unstable_ids_rows": sum(t["deleted"] + t["upserted"] for t in unstable["tables"].values()),
+            "build_ms": delta["duration_ms"],
+            "apply_ms": applied["duration_ms"],
+            "delta_pct": round(delta_sizes["gzip_bytes"] / full_sizes["gzip_bytes"] * 100, 2),
+        }
+
+
+def edit_feed(data: Dict[str, List[Dict]], rng: random.Random, change_pct: float) -> tuple:
+    """Copy of the parse output with a routine update's worth of edits.
+
+    Returns:
+        (edited data, {edit: rows})
+    """
+    edited = dict(data)
+    trips = [dict(t) for t in data["trips"]]
+    stops = [dict(s) for s in data["stops"]]
+    count = max(1, int(len(trips) * change_pct / 100))
+
+    dropped = set(rng.sample(range(len(trips)), count))
+    renamed_trips = rng.sample([i for i in range(len(trips)) if i not in dropped], count)
+    for index in renamed_trips:
+        trips[index]["trip_headsign"] = f"{trips[index].get('trip_headsign') or ''} (via detour)"
+    added = [{**trips[i], "trip_id": f"{trips[i]['trip_id']}_extra"} for i in rng.sample(range(len(trips)), count)]
+    edited["trips"] = [t for i, t in enumerate(trips) if i not in dropped] + added
+
+    renamed_stops = rng.sample(range(len(stops)), max(1, int(len(stops) * change_pct / 100)))
+    for index in renamed_stops:
+        stops[index]["stop_name"] = f"{stops[index]['stop_name']} Interchange"
+    # Inserted mid-file, as new stops land in a real feed (shifts positional numbering)
+    middle = len(stops) // 2
+    edited["stops"] = stops[:middle] + [{**stops[0], "stop_id": "NEW_STOP_1", "stop_name": "New Stop"}] + stops[middle:]
+
+    service_id = data["calendar"][0]["service_id"]
+    edited["calendar_dates"] = list(data["calendar_dates"]) + [
+        {"service_id": service_id, "date": "20991225", "exception_type": "2"}
+    ]
+
+    return edited, {
+        "trips_dropped": len(dropped),
+        "trips_added": len(added),
+        "trips_renamed": len(renamed_trips),
+        "stops_renamed": len(renamed_stops),
+        "stops_added": 1,
+        "calendar_dates_added": 1,
+    }
+
+
+def bundle_differences(path_a: str, path_b: str) -> Dict[str, int]:
+    """{table: rows in one bundle but not the other} over all data tables."""
+    conn = sqlite3.connect(path_a)
+    try:
+        conn.execute("ATTACH DATABASE ? AS other", (path_b,))
+        differences = {}
+        for name in _data_tables(conn, "main"):
+            table, columns = _quote(name), _row_columns(conn, "main", name)
+            count = conn.execute(
+                f"SELECT (SELECT COUNT(*) FROM (SELECT {columns} FROM main.{table} EXCEPT SELECT {columns} FROM other.{table}))"
+                f" + (SELECT COUNT(*) FROM (SELECT {columns} FROM other.{table} EXCEPT SELECT {columns} FROM main.{table}))"
+            ).fetchone()[0]
+            if count:
+                differences[name] = count
+        return differences
+    finally:
+        conn.close()
+
+
+def _sizes(path: Path) -> Dict[str, int]:
+    raw = path.read_bytes()
+    return {"bytes": len(raw), "gzip_bytes": len(gzip.compress(raw, compresslevel=6))}
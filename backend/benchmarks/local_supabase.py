@@ -0,0 +1,222 @@
+"""In-memory stand-in for the Supabase client, for offline pipeline benchmarks.
+
+Covers the PostgREST calls the static loaders and the iOS generator make:
+table().upsert/insert/select/delete with eq/in_/is_/gt/gte/lt filters, range/limit and
+(multi-column) order, and the gtfs_validate_load RPC. Rows are keyed by TABLE_PRIMARY_KEYS
+(upserts merge), and values come back typed like PostgREST returns them (numbers,
+booleans, ISO dates) rather than the parser's strings.
+
+An optional per-request latency approximates the network round trip, so batch sizing
+and parallelism show up in load timings.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.services.gtfs_diff import TABLE_PRIMARY_KEYS
+
+INT_COLUMNS = {
+    "route_type", "location_type", "wheelchair_boarding", "wheelchair_accessible",
+    "direction_id", "exception_type", "stop_sequence", "arrival_offset_secs",
+    "departure_offset_secs", "start_time_secs", "stop_index",
+}
+FLOAT_COLUMNS = {"stop_lat", "stop_lon"}
+BOOL_COLUMNS = {"monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"}
+DATE_COLUMNS = {"start_date", "end_date", "date", "feed_start_date", "feed_end_date"}
+
+
+class LocalResponse:
+    """Mirrors the postgrest APIResponse fields callers read."""
+
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class LocalSupabase:
+    """Thread-safe in-memory tables behind the Supabase client interface."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.tables: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> "LocalQuery":
+        return LocalQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> "LocalRpc":
+        return LocalRpc(self, name, params or {})
+
+    def rows(self, table: str) -> List[Dict[str, Any]]:
+        """Current rows of a table (insertion order)."""
+        with self._lock:
+            return list(self.tables.get(table, {}).values())
+
+    def _round_trip(self) -> None:
+        with self._lock:
+            self.requests += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def _write(self, table: str, rows: List[Dict[str, Any]], upsert: bool) -> List[Dict[str, Any]]:
+        pk = TABLE_PRIMARY_KEYS.get(table)
+        typed = [_typed(row) for row in rows]
+        with self._lock:
+            store = self.tables.setdefault(table, {})
+            for row in typed:
+                key = tuple(row.get(col) for col in pk) if pk else len(store)
+                if key in store and not upsert:
+                    raise ValueError(f"duplicate key value violates unique constraint on {table}: {key}")
+                store[key] = {**store.get(key, {}), **row}
+        return typed
+
+
+class LocalQuery:
+    """One chained PostgREST request against a LocalSupabase table."""
+
+    def __init__(self, client: LocalSupabase, table: str):
+        self.client = client
+        self.table_name = table
+        self._action = "select"
+        self._rows: List[Dict[str, Any]] = []
+        self._columns: Optional[List[str]] = None
+        self._count: Optional[str] = None
+        self._filters = []
+        self._range = None
+        self._order: List[tuple] = []
+
+    def upsert(self, rows, **_kwargs) -> "LocalQuery":
+        self._action, self._rows = "upsert", list(rows) if isinstance(rows, list) else [rows]
+        return self
+
+    def insert(self, rows, **_kwargs) -> "LocalQuery":
+        self._action, self._rows = "insert", list(rows) if isinstance(rows, list) else [rows]
+        return self
+
+    def delete(self) -> "LocalQuery":
+        self._action = "delete"
+        return self
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "LocalQuery":
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        self._count = count
+        return self
+
+    def eq(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _text(row.get(column)) == _text(value))
+        return self
+
+    def in_(self, column: str, values) -> "LocalQuery":
+        wanted = {_text(v) for v in values}
+        self._filters.append(lambda row: _text(row.get(column)) in wanted)
+        return self
+
+    def gt(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _comparable(row.get(column), value) and row.get(column) > value)
+        return self
+
+    def gte(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _comparable(row.get(column), value) and row.get(column) >= value)
+        return self
+
+    def lt(self, column: str, value: Any) -> "LocalQuery":
+        self._filters.append(lambda row: _comparable(row.get(column), value) and row.get(column) < value)
+        return self
+
+    def is_(self, column: str, value: str) -> "LocalQuery":
+        if column == "location":
+            # Location is set by a trigger from stop_lat/stop_lon in the real schema
+            self._filters.append(lambda row: (row.get("stop_lat") is None) == (value == "null"))
+        else:
+            self._filters.append(lambda row: (row.get(column) is None) == (value == "null"))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "LocalQuery":
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start: int, end: int) -> "LocalQuery":
+        self._range = (start, end + 1)
+        return self
+
+    def limit(self, size: int) -> "LocalQuery":
+        self._range = (0, size)
+        return self
+
+    def execute(self) -> LocalResponse:
+        self.client._round_trip()
+        if self._action in ("upsert", "insert"):
+            return LocalResponse(self.client._write(self.table_name, self._rows, upsert=self._action == "upsert"))
+
+        with self.client._lock:
+            store = self.client.tables.get(self.table_name, {})
+            matched = [(key, row) for key, row in store.items() if all(f(row) for f in self._filters)]
+            if self._action == "delete":
+                for key, _row in matched:
+                    del store[key]
+                return LocalResponse([row for _key, row in matched])
+
+        rows = [row for _key, row in matched]
+        total = len(rows)
+        # Stable sorts, last key first, give PostgREST's multi-column ordering
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        if self._range:
+            rows = rows[self._range[0]:self._range[1]]
+        if self._columns:
+            rows = [{col: row.get(col) for col in self._columns} for row in rows]
+        else:
+            rows = [dict(row) for row in rows]
+        return LocalResponse(rows, count=total if self._count else None)
+
+
+class LocalRpc:
+    """SQL functions the benchmarked code calls; others raise like a missing function."""
+
+    def __init__(self, client: LocalSupabase, name: str, params: Dict[str, Any]):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> LocalResponse:
+        self.client._round_trip()
+        if self.name == "gtfs_validate_load":
+            stops = self.client.rows("stops")
+            missing = [row["stop_id"] for row in stops if row.get("stop_lat") is None]
+            return LocalResponse({
+                "stops_count": len(stops),
+                "null_locations": len(missing),
+                "null_location_examples": missing[: self.params.get("p_null_examples", 5)],
+            })
+        raise RuntimeError(f"Could not find the function public.{self.name} in the schema cache")
+
+
+def _typed(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Cast parser strings to the column types PostgREST returns."""
+    typed = {}
+    for column, value in row.items():
+        if value is None or value == "":
+            typed[column] = value
+        elif column in INT_COLUMNS:
+            typed[column] = int(float(value))
+        elif column in FLOAT_COLUMNS:
+            typed[column] = float(value)
+        elif column in BOOL_COLUMNS:
+            typed[column] = str(value) in ("1", "True", "true")
+        elif column in DATE_COLUMNS and isinstance(value, str) and len(value) == 8 and value.isdigit():
+            typed[column] = datetime.strptime(value, "%Y%m%d").date().isoformat()
+        else:
+            typed[column] = value
+    return typed
+
+
+def _comparable(value: Any, bound: Any) -> bool:
+    """NULLs never match a range filter (as in SQL)."""
+    return value is not None and bound is not None
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
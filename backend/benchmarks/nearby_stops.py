@@ -0,0 +1,122 @@
+"""Nearby stops benchmark: stops_rtree probe vs the full stops scan.
+
+run_nearby_stops_benchmark() builds a bundle from a synthetic feed and times "stops
+within R metres of a point" two ways:
+
+    scan    lat/lon box over the stops table (the DatabaseManager.getNearbyStops
+            query; no coordinate index, so every stop is read) + haversine filter
+    rtree   the same box probed in stops_rtree, joined to stops by sid
+            (ios_db_generator.stops_within_radius) + haversine filter
+
+Query points are jittered around random stops, so most queries find something. Both
+paths must return the same stops in the same order.
+"""
+
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from unittest import mock
+
+from app.services import ios_db_generator
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_generator import _nearest, _radius_box, generate_ios_db, stops_within_radius
+from benchmarks.offline_departures import _summary
+from benchmarks.synthetic_gtfs import generate_feed
+
+SCAN_QUERY = """
+    SELECT sid, stop_lat, stop_lon
+    FROM stops
+    WHERE stop_lat BETWEEN ? AND ?
+      AND stop_lon BETWEEN ? AND ?
+"""
+
+# Query point jitter around the sampled stop (degrees, ~1km)
+JITTER_DEGREES = 0.01
+
+
+def run_nearby_stops_benchmark(
+    scale: str = "small",
+    seed: int = 0,
+    queries: int = 1000,
+    radius_m: float = 500.0,
+    **feed_params: Any
+) -> Dict[str, Any]:
+    """Build a bundle and time radius queries with and without the R*Tree.
+
+    Args:
+        scale: synthetic_gtfs.SCALES entry
+        seed: Feed and query seed
+        queries: Random query points timed per path
+        radius_m: Search radius
+        **feed_params: Overrides passed to generate_feed
+
+    Returns:
+        Dict with stops, rtree_bytes (dbstat bytes of stops_rtree and its shadow
+        tables), matches (mean stops per query), latency_us per path (p50, p99, mean)
+        and speedup (scan p50 / rtree p50)
+    """
+    with tempfile.TemporaryDirectory(prefix="gtfs-nearby-") as work_dir:
+        work = Path(work_dir)
+        generate_feed(str(work / "gtfs"), scale=scale, seed=seed, **feed_params)
+        data = parse_gtfs(str(work / "gtfs"))
+
+        # Size bounds target the full NSW bundle; synthetic scales are smaller
+        with mock.patch.object(ios_db_generator, "MIN_IOS_DB_SIZE_MB", 0):
+            built = generate_ios_db(str(work / "gtfs.db"), data=data, metadata={})
+
+        conn = sqlite3.connect(work / "gtfs.db")
+        try:
+            points = _sample_points(conn, random.Random(seed), queries)
+            scan_timings, scan_results = _time_queries(lambda p: scan_within_radius(conn, *p, radius_m), points)
+            rtree_timings, rtree_results = _time_queries(lambda p: stops_within_radius(conn, *p, radius_m), points)
+            mismatched = sum(1 for a, b in zip(scan_results, rtree_results) if a != b)
+            if mismatched:
+                raise AssertionError(f"stops_rtree differs from the full scan on {mismatched} queries")
+            rtree_bytes = conn.execute(
+                "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = 'stops_rtree' OR name LIKE 'stops_rtree\\_%' ESCAPE '\\'"
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    scan, rtree = _summary(scan_timings), _summary(rtree_timings)
+    return {
+        "scale": scale,
+        "seed": seed,
+        "queries": len(points),
+        "radius_m": radius_m,
+        "stops": built["row_counts"]["stops"],
+        "rtree_bytes": rtree_bytes,
+        "matches": round(sum(len(r) for r in rtree_results) / max(len(rtree_results), 1), 1),
+        "latency_us": {"scan": scan, "rtree": rtree},
+        "speedup": round(scan["p50"] / rtree["p50"], 1) if rtree["p50"] else None,
+    }
+
+
+def scan_within_radius(conn: sqlite3.Connection, lat: float, lon: float, radius_m: float) -> List[Tuple[int, float]]:
+    """stops_within_radius without the R*Tree (box filter over every stop)."""
+    candidates = conn.execute(SCAN_QUERY, _radius_box(lat, lon, radius_m))
+    return _nearest(candidates, lat, lon, radius_m, None)
+
+
+def _sample_points(conn: sqlite3.Connection, rng: random.Random, count: int) -> List[Tuple[float, float]]:
+    located = conn.execute("SELECT stop_lat, stop_lon FROM stops WHERE stop_lat IS NOT NULL").fetchall()
+    points = []
+    for _ in range(count):
+        lat, lon = rng.choice(located)
+        points.append((lat + rng.uniform(-JITTER_DEGREES, JITTER_DEGREES), lon + rng.uniform(-JITTER_DEGREES, JITTER_DEGREES)))
+    return points
+
+
+def _time_queries(fn, points: List[Tuple[float, float]]) -> Tuple[List[float], List[Any]]:
+    """Per-query µs and results (one warm-up pass first)."""
+    for point in points:
+        fn(point)
+    timings, results = [], []
+    for point in points:
+        started = time.perf_counter()
+        results.append(fn(point))
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings, results
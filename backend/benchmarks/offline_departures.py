@@ -0,0 +1,187 @@
+"""Offline departures benchmark: stop_departures table vs the app's join query.
+
+run_offline_departures_benchmark() builds the same synthetic feed into two bundles,
+one with the optional stop_departures table (GTFS_IOS_STOP_DEPARTURES) and one
+without, and compares:
+
+    size      bundle bytes (raw and gzip) and the on-disk bytes of the new tables
+    latency   p50/p99 of "next departures at stop S after time T on weekday W":
+              join           pattern_stops ⋈ patterns ⋈ trips ⋈ routes ⋈ calendar
+                             (the DatabaseManager.getDepartures query)
+              stop_departures  range scan + varint decode, then trip/route rows for
+                             the first `limit` departures by trip_data.tid
+
+Both paths must return the same (trip_id, departure) list for every sampled query.
+"""
+
+import gzip
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from unittest import mock
+
+from app.services import ios_db_generator
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_generator import generate_ios_db, read_stop_departures
+from benchmarks.synthetic_gtfs import generate_feed
+
+# Mirrors DatabaseManager.getDepartures (start_time_secs variant), without the
+# calendar date range: both layouts leave that check to the caller
+JOIN_QUERY = """
+    SELECT t.trip_id, t.trip_headsign, r.route_short_name, r.route_type,
+           COALESCE(t.start_time_secs, 0) + ps.departure_offset_secs AS secs
+    FROM pattern_stops ps
+    JOIN patterns p ON ps.pid = p.pid
+    JOIN trips t ON t.pid = p.pid
+    JOIN routes r ON p.rid = r.rid
+    JOIN calendar c ON t.service_id = c.service_id
+    WHERE ps.sid = ?
+      AND (c.days & (1 << ?)) != 0
+      AND COALESCE(t.start_time_secs, 0) + ps.departure_offset_secs BETWEEN ? AND ?
+    ORDER BY secs, t.trip_id
+    LIMIT ?
+"""
+
+TRIP_ROWS_QUERY = """
+    SELECT t.tid, dt.trip_id, dh.headsign, r.route_short_name, r.route_type
+    FROM trip_data t
+    JOIN dict_trip dt ON dt.tid = t.tid
+    LEFT JOIN dict_headsign dh ON dh.hid = t.hid
+    JOIN routes r ON r.rid = t.rid
+    WHERE t.tid IN ({})
+"""
+
+
+def run_offline_departures_benchmark(
+    scale: str = "small",
+    seed: int = 0,
+    queries: int = 500,
+    window_secs: int = 2 * 3600,
+    limit: int = 20,
+    **feed_params: Any
+) -> Dict[str, Any]:
+    """Build bundles with and without stop_departures and time departure queries.
+
+    Args:
+        scale: synthetic_gtfs.SCALES entry
+        seed: Feed and query seed
+        queries: Random (stop, weekday, time) queries timed per layout
+        window_secs: Departure window after the query time
+        limit: Departures returned per query
+        **feed_params: Overrides passed to generate_feed
+
+    Returns:
+        Dict with sizes (without/with: bytes, gzip_bytes), table_bytes (dbstat bytes of
+        stop_departures), rows (stop_departures rows, departures) and
+        latency_us per layout (p50, p99, mean)
+    """
+    with tempfile.TemporaryDirectory(prefix="gtfs-departures-") as work_dir:
+        work = Path(work_dir)
+        generate_feed(str(work / "gtfs"), scale=scale, seed=seed, **feed_params)
+        data = parse_gtfs(str(work / "gtfs"))
+
+        # Size bounds target the full NSW bundle; synthetic scales are smaller
+        with mock.patch.object(ios_db_generator, "MIN_IOS_DB_SIZE_MB", 0):
+            generate_ios_db(str(work / "join.db"), data=data, metadata={}, stop_departures=False)
+            built = generate_ios_db(str(work / "table.db"), data=data, metadata={}, stop_departures=True)
+
+        join_conn = sqlite3.connect(work / "join.db")
+        table_conn = sqlite3.connect(work / "table.db")
+        try:
+            samples = _sample_queries(join_conn, random.Random(seed), queries, window_secs, limit)
+            join_timings, join_results = _time_queries(lambda q: join_departures(join_conn, *q), samples)
+            table_timings, table_results = _time_queries(lambda q: table_departures(table_conn, *q), samples)
+            mismatched = sum(1 for a, b in zip(join_results, table_results) if _keys(a) != _keys(b))
+            if mismatched:
+                raise AssertionError(f"stop_departures differs from the join query on {mismatched} queries")
+            table_bytes = _table_bytes(table_conn, ["stop_departures"])
+        finally:
+            join_conn.close()
+            table_conn.close()
+
+        return {
+            "scale": scale,
+            "seed": seed,
+            "queries": len(samples),
+            "sizes": {"without": _sizes(work / "join.db"), "with": _sizes(work / "table.db")},
+            "table_bytes": table_bytes,
+            "rows": {
+                "stop_departures": built["row_counts"]["stop_departures"],
+                "departures": built["departures"],
+            },
+            "latency_us": {"join": _summary(join_timings), "stop_departures": _summary(table_timings)},
+        }
+
+
+def join_departures(conn: sqlite3.Connection, sid: int, weekday: int, start: int, end: int, limit: int) -> List[Tuple]:
+    """(trip_id, headsign, route_short_name, route_type, secs) via the join query."""
+    return conn.execute(JOIN_QUERY, (sid, weekday, start, end, limit)).fetchall()
+
+
+def table_departures(conn: sqlite3.Connection, sid: int, weekday: int, start: int, end: int, limit: int) -> List[Tuple]:
+    """Same rows as join_departures, from stop_departures plus one trip lookup."""
+    departures = read_stop_departures(conn, sid, weekday, start, end)
+    if len(departures) > limit:
+        # Keep departures tied with the last one: ties are ordered by trip_id below
+        cutoff = departures[limit - 1][0]
+        departures = [d for d in departures if d[0] <= cutoff]
+    tids = [tid for _secs, tid in departures]
+    trips = {row[0]: row[1:] for row in conn.execute(TRIP_ROWS_QUERY.format(",".join("?" * len(tids))), tids)}
+    rows = [(*trips[tid], secs) for secs, tid in departures]
+    return sorted(rows, key=lambda row: (row[-1], row[0]))[:limit]
+
+
+def _sample_queries(conn, rng: random.Random, count: int, window_secs: int, limit: int) -> List[Tuple]:
+    sids = [row[0] for row in conn.execute("SELECT DISTINCT sid FROM pattern_stops ORDER BY sid")]
+    return [
+        (rng.choice(sids), rng.randrange(7), start, start + window_secs, limit)
+        for start in (rng.randrange(5 * 3600, 23 * 3600) for _ in range(count))
+    ]
+
+
+def _time_queries(fn, samples: List[Tuple]) -> Tuple[List[float], List[List[Tuple]]]:
+    """Per-query µs and results (one warm-up pass first)."""
+    for sample in samples:
+        fn(sample)
+    timings, results = [], []
+    for sample in samples:
+        started = time.perf_counter()
+        results.append(fn(sample))
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings, results
+
+
+def _keys(rows: List[Tuple]) -> List[Tuple[str, int]]:
+    return [(row[0], row[-1]) for row in rows]
+
+
+def _table_bytes(conn: sqlite3.Connection, tables: List[str]) -> Dict[str, int]:
+    """On-disk bytes per table and its indexes (dbstat)."""
+    sizes = {}
+    for name in tables:
+        sizes[name] = conn.execute(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = ? OR name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?)",
+            (name, name)
+        ).fetchone()[0]
+    return sizes
+
+
+def _summary(timings: List[float]) -> Dict[str, float]:
+    if not timings:
+        return {"p50": 0.0, "p99": 0.0, "mean": 0.0}
+    ordered = sorted(timings)
+    return {
+        "p50": round(ordered[len(ordered) // 2], 1),
+        "p99": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 1),
+        "mean": round(statistics.fmean(ordered), 1),
+    }
+
+
+def _sizes(path: Path) -> Dict[str, int]:
+    raw = path.read_bytes()
+    return {"bytes": len(raw), "gzip_bytes": len(gzip.compress(raw, compresslevel=6))}
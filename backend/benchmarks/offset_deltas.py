@@ -0,0 +1,147 @@
+"""Offset delta benchmark: storage overhead and lookup cost of exact scheduled times.
+
+run_offset_delta_benchmark() parses a synthetic feed with offset deltas and compares
+four ways of answering "scheduled departure offset of trip T at pattern stop i":
+
+    median        pattern_stops median only (current model; lossy)
+    int16_deltas  median + offset_deltas[i] (SMALLINT[] per deviating trip)
+    varint_deltas median + zigzag-varint deltas, decoded per lookup
+    stop_times    one exact offset per (trip, stop) (full stop_times volume)
+
+Storage is estimated per representation from value counts (4-byte offsets, 2-byte
+int16 deltas, encoded varint length), excluding keys/row headers common to all of them.
+Median error is the exact-vs-median difference over every (trip, stop) pair.
+"""
+
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.services.gtfs_offset_deltas import decode_varint, encode_varint, offset_delta
+from app.services.gtfs_service import parse_gtfs
+from benchmarks.synthetic_gtfs import generate_feed
+
+# Bytes per stored value in the storage estimates
+OFFSET_BYTES = 4
+INT16_BYTES = 2
+
+
+def run_offset_delta_benchmark(
+    scale: str = "small",
+    seed: int = 0,
+    lookups: int = 200_000,
+    **feed_params: Any
+) -> Dict[str, Any]:
+    """Parse a synthetic feed with offset deltas and measure storage and lookups.
+
+    Args:
+        scale: synthetic_gtfs.SCALES entry
+        seed: Feed seed
+        lookups: Random (trip, stop) lookups timed per representation
+        **feed_params: Overrides passed to generate_feed
+
+    Returns:
+        Dict with feed (trips, pattern_stops, stop_times), deltas (attach stats),
+        storage (bytes per representation + overhead_pct vs median), median_error
+        (mean/p99/max abs seconds, share of exact stop times) and lookup_ns per
+        representation
+    """
+    with tempfile.TemporaryDirectory(prefix="gtfs-deltas-") as work_dir:
+        generate_feed(str(Path(work_dir) / "gtfs"), scale=scale, seed=seed, **feed_params)
+        data = parse_gtfs(str(Path(work_dir) / "gtfs"), streaming=False, frequency_compression=False, offset_deltas=True)
+
+    medians = {}
+    for ps in sorted(data["pattern_stops"], key=lambda row: (row["pattern_id"], row["stop_index"])):
+        medians.setdefault(ps["pattern_id"], []).append(ps["departure_offset_secs"])
+
+    trips = [t for t in data["trips"] if t["pattern_id"] in medians]
+    deltas = {t["trip_id"]: t["offset_deltas"] for t in trips if t["offset_deltas"]}
+    varints = {trip_id: encode_varint(values) for trip_id, values in deltas.items()}
+    exact = {}
+    errors = []
+    for trip in trips:
+        trip_deltas = deltas.get(trip["trip_id"])
+        for index, median in enumerate(medians[trip["pattern_id"]]):
+            delta = offset_delta(trip_deltas, index)
+            exact[(trip["trip_id"], index)] = median + delta
+            errors.append(abs(delta))
+
+    stop_time_count = len(exact)
+    median_bytes = len(data["pattern_stops"]) * OFFSET_BYTES
+    int16_bytes = sum(len(values) for values in deltas.values()) * INT16_BYTES
+    varint_bytes = sum(len(encoded) for encoded in varints.values())
+    errors.sort()
+
+    rng = random.Random(seed)
+    samples = [
+        (trip["trip_id"], trip["pattern_id"], rng.randrange(len(medians[trip["pattern_id"]])))
+        for trip in (rng.choice(trips) for _ in range(lookups))
+    ] if trips else []
+
+    lookup_fns: Dict[str, Callable[[str, str, int], int]] = {
+        "median": lambda trip_id, pattern_id, i: medians[pattern_id][i],
+        "int16_deltas": lambda trip_id, pattern_id, i: medians[pattern_id][i] + offset_delta(deltas.get(trip_id), i),
+        "varint_deltas": lambda trip_id, pattern_id, i: medians[pattern_id][i] + _varint_delta(varints.get(trip_id), i),
+        "stop_times": lambda trip_id, pattern_id, i: exact[(trip_id, i)],
+    }
+
+    # Exact representations must agree on every sampled lookup
+    for trip_id, pattern_id, i in samples[:1000]:
+        assert lookup_fns["int16_deltas"](trip_id, pattern_id, i) == exact[(trip_id, i)]
+        assert lookup_fns["varint_deltas"](trip_id, pattern_id, i) == exact[(trip_id, i)]
+
+    return {
+        "scale": scale,
+        "seed": seed,
+        "feed": {
+            "trips": len(trips),
+            "pattern_stops": len(data["pattern_stops"]),
+            "stop_times": stop_time_count,
+        },
+        "deltas": {
+            "trips_with_deltas": len(deltas),
+            "trips_with_deltas_pct": round(len(deltas) / len(trips) * 100, 1) if trips else 0.0,
+            "delta_values": sum(len(values) for values in deltas.values()),
+        },
+        "storage": {
+            "median_bytes": median_bytes,
+            "int16_deltas_bytes": int16_bytes,
+            "varint_deltas_bytes": varint_bytes,
+            "stop_times_bytes": stop_time_count * OFFSET_BYTES,
+            "int16_overhead_pct": _pct(int16_bytes, median_bytes),
+            "varint_overhead_pct": _pct(varint_bytes, median_bytes),
+            "int16_vs_stop_times_pct": _pct(median_bytes + int16_bytes, stop_time_count * OFFSET_BYTES),
+        },
+        "median_error": {
+            "mean_secs": round(statistics.fmean(errors), 1) if errors else 0.0,
+            "p99_secs": errors[int(len(errors) * 0.99)] if errors else 0,
+            "max_secs": errors[-1] if errors else 0,
+            "exact_pct": _pct(sum(1 for e in errors if e == 0), len(errors)),
+        },
+        "lookup_ns": {name: _time_lookups(fn, samples) for name, fn in lookup_fns.items()},
+    }
+
+
+def _varint_delta(encoded: bytes, index: int) -> int:
+    return decode_varint(encoded)[index] if encoded else 0
+
+
+def _time_lookups(fn: Callable[[str, str, int], int], samples: List[Tuple[str, str, int]]) -> float:
+    """Mean ns per lookup (best of three passes)."""
+    if not samples:
+        return 0.0
+    best = None
+    for _ in range(3):
+        start = time.perf_counter_ns()
+        for trip_id, pattern_id, index in samples:
+            fn(trip_id, pattern_id, index)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / len(samples), 1)
+
+
+def _pct(part: float, whole: float) -> float:
+    return round(part / whole * 100, 1) if whole else 0.0
@@ -0,0 +1,285 @@
+"""Static pipeline benchmark: synthetic feed → parse → load → iOS bundle, offline.
+
+run_pipeline_benchmark() generates a synthetic feed (synthetic_gtfs), then runs the real
+pipeline code under a PipelineProfiler:
+
+    generate_feed → parse_gtfs (csv_read, stop_times_stream, bbox_filter, dedup,
+    pattern_extraction) → _load_to_supabase (table_load per table) → generate_ios_db
+    (ios_db_step per step; from the parse output like the sync, or read back from Supabase)
+
+Supabase is replaced by LocalSupabase (in memory, optional per-request latency) and the
+loader is forced to the PostgREST backend; nothing touches the network.
+
+Stage records are summed per stage name (plus table/step), giving wall/CPU time and
+memory per stage. compare_to_baseline() checks them against baselines/pipeline.json,
+keyed by scale and capture mode (tracemalloc slows stages down, so timings are only
+compared within one capture mode).
+"""
+
+import json
+import platform
+import statistics
+import tempfile
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from unittest import mock
+
+from app.config import settings
+from app.services import ios_db_generator
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_generator import generate_ios_db
+from app.tasks import gtfs_static_sync
+from app.tasks.gtfs_static_sync import _create_metadata, _load_to_supabase
+from app.utils.profiling import PipelineProfiler, profile_stage
+from benchmarks.local_supabase import LocalSupabase
+from benchmarks.synthetic_gtfs import generate_feed
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "pipeline.json"
+
+# A stage regresses when it is slower/larger than baseline by the relative tolerance
+# AND by more than the absolute noise floor (short stages jitter by tens of ms)
+WALL_TOLERANCE = 0.25
+WALL_NOISE_FLOOR_MS = 100
+MEMORY_TOLERANCE = 0.20
+MEMORY_NOISE_FLOOR_MB = 5.0
+
+# Stage attributes that split a stage name into separately reported keys
+STAGE_KEY_ATTRS = ("step", "table")
+
+
+def run_pipeline_benchmark(
+    scale: str = "small",
+    seed: int = 0,
+    repeat: int = 1,
+    capture: str = "tracemalloc",
+    latency_ms: float = 0.0,
+    streaming: Optional[bool] = None,
+    ios_source: str = "parse",
+    **feed_params: Any
+) -> Dict[str, Any]:
+    """Run the static pipeline against a synthetic feed and local stand-ins.
+
+    Args:
+        scale: synthetic_gtfs.SCALES entry
+        seed: Feed seed (fixed so runs are comparable)
+        repeat: Runs to aggregate (wall/CPU: median per stage, memory: max)
+        capture: PipelineProfiler capture ("tracemalloc" gives per-stage memory; "off"
+                 reports only process peak RSS growth per stage)
+        latency_ms: Simulated round trip per Supabase request
+        streaming: parse_gtfs streaming mode (default: settings.GTFS_STREAMING_STOP_TIMES)
+        ios_source: "parse" (bundle from the parse output, as the sync does) or
+                    "supabase" (read the loaded tables back)
+        **feed_params: Overrides passed to generate_feed (stops, routes, ...)
+
+    Returns:
+        Dict with scale, seed, capture, feed (generated counts), stages
+        (key → wall_ms, cpu_ms, memory_mb, rows, calls), peak_rss_mb, ios_db_size_mb,
+        environment
+    """
+    runs = []
+    for run_index in range(max(1, repeat)):
+        runs.append(_run_once(scale, seed, capture, latency_ms, streaming, ios_source, feed_params, run_index))
+
+    return {
+        "scale": scale,
+        "seed": seed,
+        "capture": capture,
+        "repeat": len(runs),
+        "latency_ms": latency_ms,
+        "ios_source": ios_source,
+        "feed": runs[0]["feed"],
+        "stages": _merge_runs([run["stages"] for run in runs]),
+        "peak_rss_mb": max(run["peak_rss_mb"] for run in runs),
+        "ios_db_size_mb": runs[0]["ios_db_size_mb"],
+        "environment": _environment(),
+    }
+
+
+def _run_once(
+    scale: str,
+    seed: int,
+    capture: str,
+    latency_ms: float,
+    streaming: Optional[bool],
+    ios_source: str,
+    feed_params: Dict[str, Any],
+    run_index: int
+) -> Dict[str, Any]:
+    supabase = LocalSupabase(latency_ms=latency_ms)
+
+    with tempfile.TemporaryDirectory(prefix="gtfs-bench-") as work_dir:
+        work_path = Path(work_dir)
+        run_label = f"bench-{scale}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{run_index}"
+
+        with _local_backends(supabase), PipelineProfiler(capture=capture, output_dir=work_path / "profiles", run_label=run_label) as profiler:
+            with profile_stage("generate_feed") as stage:
+                feed = generate_feed(str(work_path / "gtfs"), scale=scale, seed=seed, **feed_params)
+                stage["rows"] = feed["totals"]["stop_times"]
+
+            with profile_stage("parse_gtfs") as stage:
+                data = parse_gtfs(str(work_path / "gtfs"), streaming=streaming)
+                stage["rows"] = len(data["trips"])
+
+            with profile_stage("load_to_supabase") as stage:
+                counts, _reports, _hashes = _load_to_supabase(data)
+                stage["rows"] = sum(counts.values())
+            metadata = _create_metadata(data)
+            supabase.table("gtfs_metadata").upsert([metadata]).execute()
+
+            with profile_stage("generate_ios_db") as stage:
+                if ios_source == "parse":
+                    ios = generate_ios_db(str(work_path / "gtfs.db"), data=data, metadata=metadata)
+                else:
+                    ios = generate_ios_db(str(work_path / "gtfs.db"))
+                stage["rows"] = sum(ios["row_counts"].values())
+
+            report = profiler.report()
+
+    return {
+        "feed": feed["totals"],
+        "stages": summarize_stages(report["stages"]),
+        "peak_rss_mb": report["peak_rss_mb"],
+        "ios_db_size_mb": ios["file_size_mb"],
+    }
+
+
+@contextmanager
+def _local_backends(supabase: LocalSupabase) -> Iterator[None]:
+    """Point the loaders and the iOS generator at the stand-in client."""
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(gtfs_static_sync, "get_supabase", lambda: supabase))
+        stack.enter_context(mock.patch.object(ios_db_generator, "get_supabase", lambda: supabase))
+        stack.enter_context(mock.patch.object(settings, "GTFS_LOADER_BACKEND", "postgrest"))
+        # Size bounds target the full NSW bundle; synthetic scales are smaller
+        stack.enter_context(mock.patch.object(ios_db_generator, "MIN_IOS_DB_SIZE_MB", 0))
+        yield
+
+
+def summarize_stages(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Sum profiler stage records per key (stage name, or name:table / name:step).
+
+    Args:
+        records: PipelineProfiler.report()["stages"]
+
+    Returns:
+        Dict of key → wall_ms, cpu_ms, memory_mb (max traced peak, or max peak RSS
+        growth without tracemalloc), rows, calls
+    """
+    summary = {}
+    for record in records:
+        key = record["stage"]
+        for attr in STAGE_KEY_ATTRS:
+            if record.get(attr):
+                key = f"{key}:{record[attr]}"
+                break
+
+        entry = summary.setdefault(key, {"wall_ms": 0, "cpu_ms": 0, "memory_mb": 0.0, "rows": 0, "calls": 0})
+        entry["wall_ms"] += record.get("wall_ms", 0)
+        entry["cpu_ms"] += record.get("cpu_ms", 0)
+        memory = record.get("traced_peak_mb", record.get("peak_rss_delta_mb", 0.0))
+        entry["memory_mb"] = round(max(entry["memory_mb"], memory), 1)
+        entry["rows"] += record.get("rows") or 0
+        entry["calls"] += 1
+    return summary
+
+
+def _merge_runs(runs: List[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Median wall/CPU and max memory per stage across repeated runs."""
+    merged = {}
+    for key in runs[0]:
+        entries = [run[key] for run in runs if key in run]
+        merged[key] = {
+            "wall_ms": int(statistics.median(e["wall_ms"] for e in entries)),
+            "cpu_ms": int(statistics.median(e["cpu_ms"] for e in entries)),
+            "memory_mb": max(e["memory_mb"] for e in entries),
+            "rows": entries[0]["rows"],
+            "calls": entries[0]["calls"],
+        }
+    return merged
+
+
+def _environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(terse=True),
+        "machine": platform.machine(),
+    }
+
+
+def baseline_key(result: Dict[str, Any]) -> str:
+    return f"{result['scale']}:{result['capture']}"
+
+
+def load_baselines(path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    """Stored baselines ({} if the file does not exist yet)."""
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_to_baseline(result: Dict[str, Any], baselines: Dict[str, Any]) -> Dict[str, Any]:
+    """Compare a benchmark result with the stored baseline of its scale/capture.
+
+    Args:
+        result: run_pipeline_benchmark() output
+        baselines: load_baselines() output
+
+    Returns:
+        Dict with baseline_found, recorded_at, stages (key → current/baseline/change_pct
+        for wall_ms and memory_mb) and regressions (human-readable strings)
+    """
+    baseline = baselines.get(baseline_key(result))
+    if baseline is None:
+        return {"baseline_found": False, "recorded_at": None, "stages": {}, "regressions": []}
+
+    stages = {}
+    regressions = []
+    for key, base in baseline["stages"].items():
+        current = result["stages"].get(key)
+        if current is None:
+            continue
+
+        comparison = {}
+        for metric, tolerance, floor in (
+            ("wall_ms", WALL_TOLERANCE, WALL_NOISE_FLOOR_MS),
+            ("memory_mb", MEMORY_TOLERANCE, MEMORY_NOISE_FLOOR_MB),
+        ):
+            now, then = current[metric], base[metric]
+            change_pct = round((now - then) / then * 100, 1) if then else None
+            comparison[metric] = {"current": now, "baseline": then, "change_pct": change_pct}
+            if now > then * (1 + tolerance) and now - then > floor:
+                regressions.append(f"{key} {metric}: {now} vs baseline {then} (+{change_pct}%)")
+        stages[key] = comparison
+
+    return {
+        "baseline_found": True,
+        "recorded_at": baseline.get("recorded_at"),
+        "stages": stages,
+        "regressions": regressions,
+    }
+
+
+def update_baseline(result: Dict[str, Any], path: Path = BASELINE_PATH) -> Dict[str, Any]:
+    """Store result as the baseline for its scale/capture (other entries are kept)."""
+    baselines = load_baselines(path)
+    baselines[baseline_key(result)] = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seed": result["seed"],
+        "repeat": result["repeat"],
+        "latency_ms": result["latency_ms"],
+        "environment": result["environment"],
+        "feed": result["feed"],
+        "ios_db_size_mb": result["ios_db_size_mb"],
+        "stages": {
+            key: {"wall_ms": stage["wall_ms"], "memory_mb": stage["memory_mb"]}
+            for key, stage in result["stages"].items()
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return baselines
@@ -0,0 +1,464 @@
+"""Deterministic synthetic GTFS feeds shaped like the NSW mode downloads.
+
+generate_feed() writes one directory per mode (MODE_DIRS layout, each holding gtfs.zip
+or extracted *.txt files) that parse_gtfs() reads exactly like a real download:
+
+    summary = generate_feed("/tmp/gtfs-synthetic", scale="small", seed=7)
+    data = parse_gtfs("/tmp/gtfs-synthetic")
+
+The same parameters and seed always produce byte-identical files (seeded RNG per mode,
+fixed ZIP timestamps), so benchmark runs are comparable across machines and commits.
+
+What the feeds exercise:
+- stops: parent stations with platforms (train/metro), orphan light rail stops, street
+  stops and wharves; a share of stops outside the Sydney bbox (dropped by the filter);
+  train platforms in the lightrail feed (dropped by the contamination filter)
+- patterns: full, short-working and express variants per route and direction
+- trips: constant headways per pattern/service with a share of irregular departures,
+  peak-hour running times (trips deviate from the pattern median) and after-midnight
+  trips (times past 24:00:00)
+- calendar: weekday/Saturday/Sunday services over service_days, with public holiday
+  exceptions in calendar_dates
+"""
+
+import csv
+import io
+import random
+import zipfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.gtfs_service import FEED_ARCHIVE_NAME, MODE_DIRS
+
+# Named parameter sets; keyword arguments to generate_feed() override them
+SCALES = {
+    "tiny": {
+        "stops": 400,
+        "routes": 12,
+        "patterns_per_route": 2,
+        "trips_per_pattern": 12,
+        "service_days": 14,
+    },
+    "small": {
+        "stops": 3_000,
+        "routes": 80,
+        "patterns_per_route": 4,
+        "trips_per_pattern": 30,
+        "service_days": 28,
+    },
+    "medium": {
+        "stops": 12_000,
+        "routes": 320,
+        "patterns_per_route": 4,
+        "trips_per_pattern": 60,
+        "service_days": 91,
+    },
+}
+
+# Per-mode layout: ID prefix (unique across modes), route_type, share of stops/routes,
+# stop style, inter-stop running time and dwell ranges (seconds)
+MODE_LAYOUTS = {
+    "sydneytrains": {"prefix": "T", "route_type": "2", "weight": 2, "stop_style": "station", "run_secs": (120, 300), "dwell_secs": (30, 60)},
+    "metro": {"prefix": "M", "route_type": "401", "weight": 1, "stop_style": "station", "run_secs": (90, 180), "dwell_secs": (30, 45)},
+    "buses": {"prefix": "B", "route_type": "700", "weight": 10, "stop_style": "street", "run_secs": (45, 180), "dwell_secs": (0, 0)},
+    "sydneyferries": {"prefix": "F", "route_type": "4", "weight": 1, "stop_style": "wharf", "run_secs": (300, 900), "dwell_secs": (60, 120)},
+    "mff": {"prefix": "MF", "route_type": "4", "weight": 1, "stop_style": "wharf", "run_secs": (600, 1200), "dwell_secs": (60, 120)},
+    "lightrail": {"prefix": "L", "route_type": "900", "weight": 1, "stop_style": "light_rail", "run_secs": (60, 150), "dwell_secs": (20, 30)},
+}
+
+# Place names for stop names (includes the names the FTS check searches for)
+PLACE_NAMES = [
+    "Circular Quay", "Central", "Town Hall", "Wynyard", "Martin Place", "Kings Cross",
+    "Bondi Junction", "Redfern", "Newtown", "Strathfield", "Parramatta", "Chatswood",
+    "Epping", "Hornsby", "Burwood", "Ashfield", "Marrickville", "Randwick", "Coogee",
+    "Manly", "Mosman", "Neutral Bay", "Balmain", "Pyrmont", "Glebe", "Leichhardt",
+    "Rockdale", "Hurstville", "Sutherland", "Cronulla", "Liverpool", "Bankstown",
+    "Blacktown", "Penrith", "Castle Hill", "Macquarie Park", "Ryde", "Rhodes",
+    "Olympic Park", "Lidcombe", "Auburn", "Granville", "Kogarah", "Mascot",
+    "Waterloo", "Zetland", "Surry Hills", "Darlinghurst", "Paddington", "Rozelle",
+]
+STREET_NAMES = [
+    "George St", "Pitt St", "Elizabeth St", "Oxford St", "Parramatta Rd", "King St",
+    "Anzac Pde", "Military Rd", "Victoria Rd", "Pacific Hwy", "Princes Hwy", "Church St",
+    "Crown St", "Cleveland St", "Broadway", "Botany Rd", "Epping Rd", "Lane Cove Rd",
+]
+
+# Generated stops fall inside this box (well within SYDNEY_BBOX)
+STOP_AREA = {"lat_min": -34.10, "lat_max": -33.60, "lon_min": 150.80, "lon_max": 151.35}
+# Stops placed outside SYDNEY_BBOX (Newcastle) to exercise the bbox filter
+OUTSIDE_AREA = {"lat_min": -33.00, "lat_max": -32.85, "lon_min": 151.65, "lon_max": 151.80}
+
+# Calendar starts on a Monday so weekday/weekend services line up with dates
+FEED_START_DATE = date(2025, 1, 6)
+# One public holiday exception every HOLIDAY_INTERVAL_DAYS (weekday service replaced by Sunday)
+HOLIDAY_INTERVAL_DAYS = 28
+
+# Service day window (seconds after midnight) and night window for after-midnight trips
+DAY_START_SECS = 5 * 3600
+DAY_END_SECS = 23 * 3600 + 30 * 60
+NIGHT_START_SECS = 24 * 3600 + 15 * 60
+NIGHT_HEADWAY_SECS = 30 * 60
+
+# Peak windows with slower running times (trips deviate from the pattern median)
+PEAK_WINDOWS = [(7 * 3600, 9 * 3600 + 30 * 60), (16 * 3600, 18 * 3600 + 30 * 60)]
+PEAK_RUNNING_FACTOR = 1.15
+
+# Services per mode: (suffix, weekday flags Mon..Sun, share of each pattern's trips)
+SERVICES = [
+    ("WD", (1, 1, 1, 1, 1, 0, 0), 0.6),
+    ("SAT", (0, 0, 0, 0, 0, 1, 0), 0.2),
+    ("SUN", (0, 0, 0, 0, 0, 0, 1), 0.2),
+]
+
+# Train platforms injected into the lightrail feed (NSW feed bug the parser filters out)
+LIGHTRAIL_CONTAMINATION_STOPS = 2
+
+# Fixed member timestamp so archives are byte-identical across runs
+ZIP_DATE_TIME = (2025, 1, 1, 0, 0, 0)
+
+FEED_FILES = {
+    "agency.txt": ["agency_id", "agency_name", "agency_url", "agency_timezone"],
+    "stops.txt": ["stop_id", "stop_code", "stop_name", "stop_lat", "stop_lon", "location_type", "parent_station", "wheelchair_boarding", "platform_code"],
+    "routes.txt": ["route_id", "agency_id", "route_short_name", "route_long_name", "route_type", "route_color", "route_text_color"],
+    "trips.txt": ["route_id", "service_id", "trip_id", "trip_headsign", "trip_short_name", "direction_id", "block_id", "wheelchair_accessible"],
+    "stop_times.txt": ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence", "pickup_type", "drop_off_type"],
+    "calendar.txt": ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday", "start_date", "end_date"],
+    "calendar_dates.txt": ["service_id", "date", "exception_type"],
+}
+
+
+def generate_feed(
+    output_dir: str,
+    scale: str = "small",
+    seed: int = 0,
+    modes: Optional[Sequence[str]] = None,
+    stops: Optional[int] = None,
+    routes: Optional[int] = None,
+    patterns_per_route: Optional[int] = None,
+    trips_per_pattern: Optional[int] = None,
+    service_days: Optional[int] = None,
+    stops_per_pattern: Tuple[int, int] = (8, 30),
+    after_midnight_share: float = 0.1,
+    irregular_share: float = 0.2,
+    outside_bbox_share: float = 0.02,
+    archive: bool = True,
+) -> Dict[str, Any]:
+    """Write a synthetic multi-mode GTFS download to output_dir.
+
+    Counts are totals across modes, split by MODE_LAYOUTS weight (every mode gets at
+    least one route). Pattern variants that would repeat an existing stop sequence are
+    skipped, so actual counts are reported in the summary.
+
+    Args:
+        output_dir: Base directory; one subdirectory per mode is (re)written
+        scale: Named parameter set from SCALES
+        seed: RNG seed (same seed + parameters → identical files)
+        modes: Mode directories to generate (default: all MODE_DIRS)
+        stops: Total boardable stops (overrides scale)
+        routes: Total routes (overrides scale)
+        patterns_per_route: Pattern variants per route, alternating direction (overrides scale)
+        trips_per_pattern: Trips per pattern across all services (overrides scale)
+        service_days: Calendar length in days (overrides scale)
+        stops_per_pattern: (min, max) stops in a route's full pattern
+        after_midnight_share: Share of each pattern's trips departing after 24:00:00
+        irregular_share: Share of daytime trips shifted off the constant headway
+        outside_bbox_share: Share of street stops placed outside the Sydney bbox
+        archive: Write gtfs.zip per mode (as downloaded) instead of extracted *.txt
+
+    Returns:
+        Dict with output_dir, params and per-mode/total counts
+        (stops, routes, patterns, trips, stop_times)
+
+    Raises:
+        ValueError: Unknown scale/mode or non-positive counts
+    """
+    if scale not in SCALES:
+        raise ValueError(f"Unknown scale {scale!r}; expected one of {sorted(SCALES)}")
+    modes = list(modes) if modes is not None else list(MODE_DIRS)
+    unknown = [m for m in modes if m not in MODE_LAYOUTS]
+    if unknown:
+        raise ValueError(f"Unknown modes {unknown}; expected a subset of {list(MODE_LAYOUTS)}")
+
+    params = dict(SCALES[scale])
+    overrides = {
+        "stops": stops,
+        "routes": routes,
+        "patterns_per_route": patterns_per_route,
+        "trips_per_pattern": trips_per_pattern,
+        "service_days": service_days,
+    }
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    for name, value in params.items():
+        if value < 1:
+            raise ValueError(f"{name} must be >= 1, got {value}")
+    params.update({
+        "stops_per_pattern": list(stops_per_pattern),
+        "after_midnight_share": after_midnight_share,
+        "irregular_share": irregular_share,
+        "outside_bbox_share": outside_bbox_share,
+    })
+
+    base_path = Path(output_dir)
+    weights = {mode: MODE_LAYOUTS[mode]["weight"] for mode in modes}
+    stop_counts = _split(params["stops"], weights)
+    route_counts = _split(params["routes"], weights)
+
+    summary = {"output_dir": str(base_path), "scale": scale, "seed": seed, "params": params, "modes": {}}
+    for mode in modes:
+        rng = random.Random(f"{seed}:{mode}")
+        tables = _build_mode(mode, rng, stop_counts[mode], route_counts[mode], params)
+        _write_mode(base_path / mode, tables, archive)
+        summary["modes"][mode] = {
+            "stops": len(tables["stops.txt"]),
+            "routes": len(tables["routes.txt"]),
+            "patterns": tables["pattern_count"],
+            "trips": len(tables["trips.txt"]),
+            "stop_times": len(tables["stop_times.txt"]),
+        }
+
+    summary["totals"] = {
+        key: sum(counts[key] for counts in summary["modes"].values())
+        for key in ("stops", "routes", "patterns", "trips", "stop_times")
+    }
+    return summary
+
+
+def _split(total: int, weights: Dict[str, int]) -> Dict[str, int]:
+    """Split total across modes by weight (at least 1 each, remainder to the largest)."""
+    weight_sum = sum(weights.values())
+    counts = {mode: max(1, total * weight // weight_sum) for mode, weight in weights.items()}
+    largest = max(weights, key=weights.get)
+    counts[largest] = max(1, counts[largest] + total - sum(counts.values()))
+    return counts
+
+
+def _build_mode(mode: str, rng: random.Random, stop_count: int, route_count: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the CSV rows of one mode feed."""
+    layout = MODE_LAYOUTS[mode]
+    prefix = layout["prefix"]
+    agency_id = f"{prefix}A"
+
+    stop_rows, boardable = _build_stops(mode, rng, prefix, stop_count, params["outside_bbox_share"])
+    contamination = []
+    if mode == "lightrail":
+        for n in range(LIGHTRAIL_CONTAMINATION_STOPS):
+            stop_id = f"{prefix}X{n}"
+            stop_rows.append([stop_id, "", f"Central Station Platform {n + 1}", "-33.8832", "151.2070", "0", "", "1", str(n + 1)])
+            contamination.append(stop_id)
+    stop_names = {row[0]: row[2] for row in stop_rows}
+
+    route_rows = []
+    trip_rows = []
+    stop_time_rows = []
+    pattern_count = 0
+    lo, hi = params["stops_per_pattern"]
+
+    for r in range(route_count):
+        route_id = f"{prefix}{r + 1:04d}"
+        short_name = f"{prefix}{r + 1}"
+        trunk = rng.sample(boardable, max(2, min(rng.randint(lo, hi), len(boardable))))
+        route_rows.append([
+            route_id, agency_id, short_name,
+            f"{stop_names[trunk[0]]} to {stop_names[trunk[-1]]}",
+            layout["route_type"], f"{rng.randrange(0x1000000):06X}", "FFFFFF",
+        ])
+
+        seen_sequences = set()
+        for variant in range(params["patterns_per_route"]):
+            direction = variant % 2
+            sequence = _pattern_variant(trunk if direction == 0 else trunk[::-1], variant // 2)
+            if tuple(sequence) in seen_sequences:
+                continue
+            seen_sequences.add(tuple(sequence))
+            if contamination and r == 0 and variant == 0:
+                # Train platforms mid-route, as in the NSW lightrail feed
+                middle = len(sequence) // 2
+                sequence = sequence[:middle] + contamination + sequence[middle:]
+            pattern_count += 1
+
+            runs = [rng.randint(*layout["run_secs"]) for _ in sequence[1:]]
+            dwells = [rng.randint(*layout["dwell_secs"]) for _ in sequence]
+            headsign = stop_names[sequence[-1]]
+
+            for service, starts in _trip_starts(rng, mode, params):
+                for n, start in enumerate(starts):
+                    trip_id = f"{route_id}.{variant}.{service}.{n}"
+                    trip_rows.append([
+                        route_id, service, trip_id, headsign, "", str(direction),
+                        f"{route_id}.B{n % 8}" if layout["stop_style"] == "station" else "", "1",
+                    ])
+                    stop_time_rows.extend(_stop_times(trip_id, sequence, start, runs, dwells))
+
+    return {
+        "agency.txt": [[agency_id, f"Synthetic {mode}", "https://transportnsw.info", "Australia/Sydney"]],
+        "stops.txt": stop_rows,
+        "routes.txt": route_rows,
+        "trips.txt": trip_rows,
+        "stop_times.txt": stop_time_rows,
+        "calendar.txt": _calendar_rows(mode, params["service_days"]),
+        "calendar_dates.txt": _calendar_date_rows(mode, params["service_days"]),
+        "pattern_count": pattern_count,
+    }
+
+
+def _build_stops(
+    mode: str, rng: random.Random, prefix: str, count: int, outside_share: float
+) -> Tuple[List[List[str]], List[str]]:
+    """Stop rows of one mode plus the boardable stop_ids (platforms, not parent stations)."""
+    style = MODE_LAYOUTS[mode]["stop_style"]
+    rows = []
+    boardable = []
+    n = 0
+    while len(boardable) < count:
+        n += 1
+        place = PLACE_NAMES[(n - 1) % len(PLACE_NAMES)]
+        suffix = "" if n <= len(PLACE_NAMES) else f" {(n - 1) // len(PLACE_NAMES) + 1}"
+        lat, lon = _coords(rng, STOP_AREA)
+
+        if style == "station":
+            station_id = f"{prefix}S{n}"
+            station_name = f"{place}{suffix} Station"
+            rows.append([station_id, "", station_name, lat, lon, "1", "", "1", ""])
+            for platform in range(1, 3):
+                stop_id = f"{prefix}{n}P{platform}"
+                rows.append([stop_id, f"{n}{platform}", f"{station_name} Platform {platform}", lat, lon, "0", station_id, "1", str(platform)])
+                boardable.append(stop_id)
+        elif style == "light_rail":
+            stop_id = f"{prefix}{n}"
+            rows.append([stop_id, str(n), f"{place}{suffix} Light Rail", lat, lon, "0", "", "1", ""])
+            boardable.append(stop_id)
+        elif style == "wharf":
+            stop_id = f"{prefix}{n}"
+            rows.append([stop_id, str(n), f"{place}{suffix} Wharf", lat, lon, "0", "", "1", ""])
+            boardable.append(stop_id)
+        else:
+            if rng.random() < outside_share:
+                lat, lon = _coords(rng, OUTSIDE_AREA)
+            stop_id = f"{prefix}{n}"
+            street = STREET_NAMES[rng.randrange(len(STREET_NAMES))]
+            rows.append([stop_id, str(200000 + n), f"{street} at {place}{suffix}", lat, lon, "0", "", rng.choice(["0", "1"]), ""])
+            boardable.append(stop_id)
+
+    return rows, boardable[:count]
+
+
+def _coords(rng: random.Random, area: Dict[str, float]) -> Tuple[str, str]:
+    lat = rng.uniform(area["lat_min"], area["lat_max"])
+    lon = rng.uniform(area["lon_min"], area["lon_max"])
+    return f"{lat:.6f}", f"{lon:.6f}"
+
+
+def _pattern_variant(base: List[str], kind: int) -> List[str]:
+    """Full route (0), short working (1), express (2), later start (3+)."""
+    if kind == 0 or len(base) < 4:
+        return list(base)
+    if kind == 1:
+        return base[: max(2, len(base) * 2 // 3)]
+    if kind == 2:
+        express = base[::2]
+        return express if express[-1] == base[-1] else express + [base[-1]]
+    return base[min(kind - 2, len(base) - 2):]
+
+
+def _trip_starts(rng: random.Random, mode: str, params: Dict[str, Any]):
+    """Yield (service_id, start_secs list) per service for one pattern.
+
+    Each service's trips run at a constant headway across the day (a share shifted off
+    it), plus after-midnight trips at NIGHT_HEADWAY_SECS past 24:00.
+    """
+    total = params["trips_per_pattern"]
+    allocated = 0
+    for index, (suffix, _days, share) in enumerate(SERVICES):
+        # Last service takes the remainder so totals match trips_per_pattern
+        count = total - allocated if index == len(SERVICES) - 1 else int(round(total * share))
+        count = max(0, min(count, total - allocated))
+        allocated += count
+        if count == 0:
+            continue
+
+        night = int(round(count * params["after_midnight_share"]))
+        day = count - night
+        starts = []
+        if day:
+            headway = max(60, (DAY_END_SECS - DAY_START_SECS) // day // 60 * 60)
+            first = DAY_START_SECS + rng.randrange(0, headway, 60)
+            for n in range(day):
+                start = first + n * headway
+                if rng.random() < params["irregular_share"]:
+                    start += rng.choice([-180, -120, -60, 60, 120, 180])
+                starts.append(start)
+        starts.extend(NIGHT_START_SECS + n * NIGHT_HEADWAY_SECS for n in range(night))
+        yield f"{mode}.{suffix}", starts
+
+
+def _stop_times(trip_id: str, sequence: List[str], start: int, runs: List[int], dwells: List[int]) -> List[List[str]]:
+    """stop_times rows of one trip (peak trips run PEAK_RUNNING_FACTOR slower)."""
+    factor = PEAK_RUNNING_FACTOR if any(lo <= start < hi for lo, hi in PEAK_WINDOWS) else 1.0
+    rows = []
+    clock = start
+    for index, stop_id in enumerate(sequence):
+        if index > 0:
+            clock += int(runs[index - 1] * factor)
+        arrival = clock
+        departure = clock + (dwells[index] if 0 < index < len(sequence) - 1 else 0)
+        clock = departure
+        rows.append([
+            trip_id, _gtfs_time(arrival), _gtfs_time(departure), stop_id, str(index + 1),
+            "1" if index == len(sequence) - 1 else "0",
+            "1" if index == 0 else "0",
+        ])
+    return rows
+
+
+def _gtfs_time(secs: int) -> str:
+    """Seconds after midnight → HH:MM:SS (hours may exceed 23)."""
+    return f"{secs // 3600:02d}:{secs % 3600 // 60:02d}:{secs % 60:02d}"
+
+
+def _calendar_rows(mode: str, service_days: int) -> List[List[str]]:
+    end = FEED_START_DATE + timedelta(days=service_days - 1)
+    return [
+        [f"{mode}.{suffix}", *(str(flag) for flag in days), FEED_START_DATE.strftime("%Y%m%d"), end.strftime("%Y%m%d")]
+        for suffix, days, _share in SERVICES
+    ]
+
+
+def _calendar_date_rows(mode: str, service_days: int) -> List[List[str]]:
+    """Public holidays: weekday service removed (2), Sunday service added (1)."""
+    rows = []
+    for offset in range(HOLIDAY_INTERVAL_DAYS - 1, service_days, HOLIDAY_INTERVAL_DAYS):
+        holiday = FEED_START_DATE + timedelta(days=offset)
+        if holiday.weekday() >= 5:
+            holiday -= timedelta(days=holiday.weekday() - 4)
+        day = holiday.strftime("%Y%m%d")
+        rows.append([f"{mode}.WD", day, "2"])
+        rows.append([f"{mode}.SUN", day, "1"])
+    return rows
+
+
+def _write_mode(mode_path: Path, tables: Dict[str, Any], archive: bool) -> None:
+    """Write one mode feed as gtfs.zip (fixed timestamps) or extracted *.txt files."""
+    mode_path.mkdir(parents=True, exist_ok=True)
+    for stale in list(mode_path.glob("*.txt")) + [mode_path / FEED_ARCHIVE_NAME]:
+        if stale.exists():
+            stale.unlink()
+
+    if not archive:
+        for name, header in FEED_FILES.items():
+            with open(mode_path / name, "w", newline="") as f:
+                _write_csv(f, header, tables[name])
+        return
+
+    with zipfile.ZipFile(mode_path / FEED_ARCHIVE_NAME, "w") as zf:
+        for name, header in FEED_FILES.items():
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with zf.open(info, "w") as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+                _write_csv(f, header, tables[name])
+
+
+def _write_csv(handle, header: List[str], rows: List[List[str]]) -> None:
+    writer = csv.writer(handle, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
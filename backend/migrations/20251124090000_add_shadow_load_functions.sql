@@ -0,0 +1,296 @@
+-- Migration: Shadow-schema GTFS load with atomic swap
+-- Date: 2025-11-24
+-- Applied via: Supabase MCP (mcp__supabase__apply_migration)
+-- Status: Pending
+--
+-- Load flow (app.tasks.gtfs_static_sync, GTFS_SHADOW_LOAD=true):
+--   1. gtfs_staging_prepare(defer_indexes)  → empty copies of the pattern tables in gtfs_staging
+--   2. bulk insert into gtfs_staging.*      → via PostgREST (schema must be exposed, see below)
+--   3. gtfs_staging_build_indexes()         → PKs, secondary indexes, FKs (if deferred)
+--   4. gtfs_staging_validate()              → counts / integrity checks against staging copy
+--   5. gtfs_staging_swap(archive_label)     → one transaction: live grants copied to staging,
+--                                             live → gtfs_archive_<label>, staging → public
+--   6. gtfs_drop_archives(schemas)          → drop archive schemas past GTFS_ARCHIVE_KEEP
+--                                             (ranked by the loader from gtfs_list_archives())
+--
+-- Rollback: gtfs_rollback(archive_label) swaps an archived version back into public.
+--
+-- PostgREST: add gtfs_staging to Settings → API → Exposed schemas so the loader can write to it.
+-- Index/constraint names are per-schema, so staging and archive copies keep the live names.
+
+-- Tables managed by the shadow load, in FK load order
+CREATE OR REPLACE FUNCTION gtfs_shadow_tables()
+RETURNS TEXT[] AS $$
+    SELECT ARRAY[
+        'agencies', 'routes', 'stops', 'calendar', 'calendar_dates',
+        'patterns', 'pattern_stops', 'trips'
+    ]::TEXT[];
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Function: Grant on p_to.<table> what roles other than the owner hold on p_from.<table>
+-- (LIKE copies no privileges; anon/authenticated must keep reading the promoted tables)
+CREATE OR REPLACE FUNCTION gtfs_copy_grants(p_table TEXT, p_from TEXT, p_to TEXT)
+RETURNS INT AS $$
+DECLARE
+    g RECORD;
+    copied INT := 0;
+BEGIN
+    FOR g IN
+        SELECT a.privilege_type,
+               CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(r.rolname) END AS grantee
+        FROM pg_class c
+        CROSS JOIN LATERAL aclexplode(c.relacl) a
+        LEFT JOIN pg_roles r ON r.oid = a.grantee
+        WHERE c.oid = format('%I.%I', p_from, p_table)::regclass
+          AND a.grantee <> c.relowner
+    LOOP
+        EXECUTE format('GRANT %s ON %I.%I TO %s', g.privilege_type, p_to, p_table, g.grantee);
+        copied := copied + 1;
+    END LOOP;
+
+    RETURN copied;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Function: Create empty staging copies (columns + defaults only)
+CREATE OR REPLACE FUNCTION gtfs_staging_prepare(p_defer_indexes BOOLEAN DEFAULT TRUE)
+RETURNS JSONB AS $$
+DECLARE
+    t TEXT;
+BEGIN
+    DROP SCHEMA IF EXISTS gtfs_staging CASCADE;
+    CREATE SCHEMA gtfs_staging;
+    GRANT USAGE ON SCHEMA gtfs_staging TO service_role;
+
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        EXECUTE format(
+            'CREATE TABLE gtfs_staging.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING GENERATED)',
+            t, t
+        );
+        EXECUTE format('GRANT ALL ON gtfs_staging.%I TO service_role', t);
+    END LOOP;
+
+    -- stops.location is populated by trigger in live; staging needs the same trigger
+    CREATE TRIGGER stop_location_trigger
+    BEFORE INSERT OR UPDATE ON gtfs_staging.stops
+    FOR EACH ROW
+    EXECUTE FUNCTION public.update_stop_location();
+
+    IF NOT p_defer_indexes THEN
+        PERFORM gtfs_staging_build_indexes();
+    END IF;
+
+    RETURN jsonb_build_object('schema', 'gtfs_staging', 'tables', to_jsonb(gtfs_shadow_tables()),
+                              'indexes_deferred', p_defer_indexes);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Function: Recreate live indexes, primary keys and FKs on the staging copies (idempotent)
+CREATE OR REPLACE FUNCTION gtfs_staging_build_indexes()
+RETURNS JSONB AS $$
+DECLARE
+    t TEXT;
+    idx RECORD;
+    con RECORD;
+    built INT := 0;
+    fks INT := 0;
+BEGIN
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        -- Indexes (including the unique index backing the primary key)
+        FOR idx IN
+            SELECT i.indexname, i.indexdef, c.conname AS pk_name
+            FROM pg_indexes i
+            LEFT JOIN pg_constraint c
+              ON c.conrelid = format('public.%I', t)::regclass
+             AND c.contype = 'p'
+             AND c.conname = i.indexname
+            WHERE i.schemaname = 'public' AND i.tablename = t
+        LOOP
+            IF EXISTS (
+                SELECT 1 FROM pg_indexes
+                WHERE schemaname = 'gtfs_staging' AND tablename = t AND indexname = idx.indexname
+            ) THEN
+                CONTINUE;
+            END IF;
+
+            EXECUTE replace(idx.indexdef, format(' ON public.%s ', t), format(' ON gtfs_staging.%s ', t));
+            IF idx.pk_name IS NOT NULL THEN
+                EXECUTE format('ALTER TABLE gtfs_staging.%I ADD CONSTRAINT %I PRIMARY KEY USING INDEX %I',
+                               t, idx.pk_name, idx.indexname);
+            END IF;
+            built := built + 1;
+        END LOOP;
+    END LOOP;
+
+    -- FKs after all PKs exist (referenced tables need their unique index)
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        FOR con IN
+            SELECT conname, pg_get_constraintdef(oid) AS def
+            FROM pg_constraint
+            WHERE conrelid = format('public.%I', t)::regclass AND contype = 'f'
+        LOOP
+            IF EXISTS (
+                SELECT 1 FROM pg_constraint
+                WHERE conrelid = format('gtfs_staging.%I', t)::regclass AND conname = con.conname
+            ) THEN
+                CONTINUE;
+            END IF;
+
+            EXECUTE format('ALTER TABLE gtfs_staging.%I ADD CONSTRAINT %I %s',
+                           t, con.conname, replace(con.def, 'REFERENCES ', 'REFERENCES gtfs_staging.'));
+            fks := fks + 1;
+        END LOOP;
+    END LOOP;
+
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        EXECUTE format('ANALYZE gtfs_staging.%I', t);
+    END LOOP;
+
+    RETURN jsonb_build_object('indexes_built', built, 'foreign_keys_built', fks);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Function: Validate staging copy before it goes live
+CREATE OR REPLACE FUNCTION gtfs_staging_validate()
+RETURNS JSONB AS $$
+DECLARE
+    t TEXT;
+    counts JSONB := '{}'::JSONB;
+    n BIGINT;
+BEGIN
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        EXECUTE format('SELECT COUNT(*) FROM gtfs_staging.%I', t) INTO n;
+        counts := counts || jsonb_build_object(t, n);
+    END LOOP;
+
+    RETURN jsonb_build_object(
+        'counts', counts,
+        'null_locations', (SELECT COUNT(*) FROM gtfs_staging.stops WHERE location IS NULL),
+        'orphan_trips', (
+            SELECT COUNT(*) FROM gtfs_staging.trips t
+            WHERE NOT EXISTS (SELECT 1 FROM gtfs_staging.patterns p WHERE p.pattern_id = t.pattern_id)
+        ),
+        'orphan_pattern_stops', (
+            SELECT COUNT(*) FROM gtfs_staging.pattern_stops ps
+            WHERE NOT EXISTS (SELECT 1 FROM gtfs_staging.stops s WHERE s.stop_id = ps.stop_id)
+        ),
+        'patterns_without_stops', (
+            SELECT COUNT(*) FROM gtfs_staging.patterns p
+            WHERE NOT EXISTS (SELECT 1 FROM gtfs_staging.pattern_stops ps WHERE ps.pattern_id = p.pattern_id)
+        )
+    );
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Function: Atomically archive live tables and promote staging (single transaction)
+CREATE OR REPLACE FUNCTION gtfs_staging_swap(p_archive_label TEXT)
+RETURNS JSONB AS $$
+DECLARE
+    t TEXT;
+    archive_schema TEXT := 'gtfs_archive_' || regexp_replace(p_archive_label, '\W', '_', 'g');
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = 'gtfs_staging') THEN
+        RAISE EXCEPTION 'gtfs_staging schema does not exist (run gtfs_staging_prepare first)';
+    END IF;
+
+    -- Take all locks up front in a fixed order so readers queue instead of deadlocking
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        EXECUTE format('LOCK TABLE public.%I IN ACCESS EXCLUSIVE MODE', t);
+    END LOOP;
+
+    EXECUTE format('CREATE SCHEMA %I', archive_schema);
+
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        PERFORM gtfs_copy_grants(t, 'public', 'gtfs_staging');
+        EXECUTE format('ALTER TABLE public.%I SET SCHEMA %I', t, archive_schema);
+        EXECUTE format('ALTER TABLE gtfs_staging.%I SET SCHEMA public', t);
+    END LOOP;
+
+    DROP SCHEMA gtfs_staging;
+
+    RETURN jsonb_build_object('archive_schema', archive_schema);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Function: Restore an archived version into public (current live is archived in turn)
+CREATE OR REPLACE FUNCTION gtfs_rollback(p_archive_label TEXT)
+RETURNS JSONB AS $$
+DECLARE
+    t TEXT;
+    source_schema TEXT := 'gtfs_archive_' || regexp_replace(p_archive_label, '\W', '_', 'g');
+    displaced_schema TEXT := 'gtfs_archive_rollback_' || to_char(clock_timestamp(), 'YYYYMMDDHH24MISS');
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_namespace WHERE nspname = source_schema) THEN
+        RAISE EXCEPTION 'Archive % does not exist', source_schema;
+    END IF;
+
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        EXECUTE format('LOCK TABLE public.%I IN ACCESS EXCLUSIVE MODE', t);
+    END LOOP;
+
+    EXECUTE format('CREATE SCHEMA %I', displaced_schema);
+
+    FOREACH t IN ARRAY gtfs_shadow_tables() LOOP
+        EXECUTE format('ALTER TABLE public.%I SET SCHEMA %I', t, displaced_schema);
+        EXECUTE format('ALTER TABLE %I.%I SET SCHEMA public', source_schema, t);
+    END LOOP;
+
+    EXECUTE format('DROP SCHEMA %I', source_schema);
+
+    RETURN jsonb_build_object('restored_from', source_schema, 'displaced_to', displaced_schema);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Function: List archived versions (by name; the loader ranks them by label timestamp,
+-- see app.tasks.gtfs_static_sync.archives_to_prune)
+CREATE OR REPLACE FUNCTION gtfs_list_archives()
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(nspname ORDER BY nspname DESC), '[]'::JSONB)
+    FROM pg_namespace
+    WHERE nspname LIKE 'gtfs\_archive\_%';
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Function: Drop the given archive schemas (chosen by the loader; anything that is not
+-- an existing gtfs_archive_* schema is ignored)
+CREATE OR REPLACE FUNCTION gtfs_drop_archives(p_schemas TEXT[])
+RETURNS JSONB AS $$
+DECLARE
+    s TEXT;
+    dropped JSONB := '[]'::JSONB;
+BEGIN
+    FOR s IN
+        SELECT nspname FROM pg_namespace
+        WHERE nspname LIKE 'gtfs\_archive\_%' AND nspname = ANY(p_schemas)
+        ORDER BY nspname
+    LOOP
+        EXECUTE format('DROP SCHEMA %I CASCADE', s);
+        dropped := dropped || to_jsonb(s);
+    END LOOP;
+
+    RETURN jsonb_build_object('dropped', dropped);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Backend-only (service role); never exposed to anon
+REVOKE ALL ON FUNCTION gtfs_copy_grants(TEXT, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_staging_prepare(BOOLEAN) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_staging_build_indexes() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_staging_validate() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_staging_swap(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_rollback(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_list_archives() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION gtfs_drop_archives(TEXT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION gtfs_copy_grants(TEXT, TEXT, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_staging_prepare(BOOLEAN) TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_staging_build_indexes() TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_staging_validate() TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_staging_swap(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_rollback(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_list_archives() TO service_role;
+GRANT EXECUTE ON FUNCTION gtfs_drop_archives(TEXT[]) TO service_role;
+
+-- Rollback (of this migration):
+-- DROP FUNCTION IF EXISTS gtfs_drop_archives(TEXT[]), gtfs_list_archives(), gtfs_rollback(TEXT),
+--     gtfs_staging_swap(TEXT), gtfs_staging_validate(), gtfs_staging_build_indexes(),
+--     gtfs_staging_prepare(BOOLEAN), gtfs_copy_grants(TEXT, TEXT, TEXT), gtfs_shadow_tables();
+-- DROP SCHEMA IF EXISTS gtfs_staging CASCADE;
@@ -0,0 +1,29 @@
+-- Migration: Truncate one staging table (resumable shadow loads)
+-- Date: 2025-11-25
+-- Applied via: Supabase MCP (mcp__supabase__apply_migration)
+-- Status: Pending
+--
+-- A resumed shadow load (app.services.gtfs_checkpoint) keeps the staging tables that were
+-- fully loaded and reloads the table that was interrupted mid-way. Staging writes are
+-- plain inserts, so that table is emptied first. CASCADE only reaches child staging
+-- tables, which are loaded later in FK order and therefore still empty.
+
+CREATE OR REPLACE FUNCTION gtfs_staging_truncate(p_table TEXT)
+RETURNS JSONB AS $$
+BEGIN
+    IF NOT p_table = ANY(gtfs_shadow_tables()) THEN
+        RAISE EXCEPTION 'Not a shadow-load table: %', p_table;
+    END IF;
+
+    EXECUTE format('TRUNCATE gtfs_staging.%I CASCADE', p_table);
+
+    RETURN jsonb_build_object('truncated', p_table);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Backend-only (service role); never exposed to anon
+REVOKE ALL ON FUNCTION gtfs_staging_truncate(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION gtfs_staging_truncate(TEXT) TO service_role;
+
+-- Rollback (of this migration):
+-- DROP FUNCTION IF EXISTS gtfs_staging_truncate(TEXT);
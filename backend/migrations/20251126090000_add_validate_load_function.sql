@@ -0,0 +1,35 @@
+-- Migration: Single-call post-load validation
+-- Date: 2025-11-26
+-- Applied via: Supabase MCP (mcp__supabase__apply_migration)
+-- Status: Pending
+--
+-- app.services.gtfs_validation checks the parsed dataset in memory and reads the loaded
+-- database once through this function (instead of one PostgREST query per check):
+--   stops_count             rows in public.stops
+--   null_locations          stops the location trigger did not populate
+--   null_location_examples  first p_null_examples such stop_ids (debugging)
+
+CREATE OR REPLACE FUNCTION gtfs_validate_load(p_null_examples INT DEFAULT 5)
+RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'stops_count', counts.total,
+        'null_locations', counts.null_locations,
+        'null_location_examples', COALESCE((
+            SELECT jsonb_agg(stop_id ORDER BY stop_id)
+            FROM (
+                SELECT stop_id FROM stops WHERE location IS NULL ORDER BY stop_id LIMIT p_null_examples
+            ) examples
+        ), '[]'::jsonb)
+    )
+    FROM (
+        SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE location IS NULL) AS null_locations
+        FROM stops
+    ) counts;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Backend-only (service role); never exposed to anon
+REVOKE ALL ON FUNCTION gtfs_validate_load(INT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION gtfs_validate_load(INT) TO service_role;
+
+-- Rollback (of this migration):
+-- DROP FUNCTION IF EXISTS gtfs_validate_load(INT);
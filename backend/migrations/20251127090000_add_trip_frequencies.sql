@@ -0,0 +1,49 @@
+-- Migration: Headway-compressed trips (trip_frequencies)
+-- Date: 2025-11-27
+-- Applied via: Supabase MCP (mcp__supabase__apply_migration)
+-- Status: Pending
+--
+-- With GTFS_FREQUENCY_COMPRESSION=true, app.services.gtfs_frequencies folds runs of
+-- constant-headway trips (same pattern, service and trip attributes) into one row here
+-- instead of one trips row each:
+--   slot k departs at start_time_secs + k * headway_secs, unless exceptions->>'k'
+--   holds its actual start; trip_ids->>k is the GTFS trip_id of slot k (GTFS-RT key).
+-- Trips outside any block stay in trips. Apply before enabling the flag.
+
+CREATE TABLE IF NOT EXISTS trip_frequencies (
+    frequency_id TEXT PRIMARY KEY,
+    route_id TEXT REFERENCES routes(route_id) ON DELETE CASCADE,
+    service_id TEXT NOT NULL,
+    pattern_id TEXT REFERENCES patterns(pattern_id) ON DELETE CASCADE,
+    trip_headsign TEXT,
+    trip_short_name TEXT,
+    direction_id INTEGER,
+    block_id TEXT,
+    wheelchair_accessible INTEGER,
+    start_time_secs INTEGER NOT NULL,
+    end_time_secs INTEGER NOT NULL,
+    headway_secs INTEGER NOT NULL CHECK (headway_secs > 0),
+    trip_ids JSONB NOT NULL,
+    exceptions JSONB NOT NULL DEFAULT '{}'::JSONB
+);
+
+-- Departures join on pattern/service; trip details look up a trip_id inside trip_ids
+CREATE INDEX IF NOT EXISTS idx_trip_frequencies_pattern ON trip_frequencies(pattern_id, start_time_secs);
+CREATE INDEX IF NOT EXISTS idx_trip_frequencies_service ON trip_frequencies(service_id);
+CREATE INDEX IF NOT EXISTS idx_trip_frequencies_trip_ids ON trip_frequencies USING GIN (trip_ids jsonb_path_ops);
+
+-- Shadow load manages trip_frequencies with the other pattern tables (FK load order)
+CREATE OR REPLACE FUNCTION gtfs_shadow_tables()
+RETURNS TEXT[] AS $$
+    SELECT ARRAY[
+        'agencies', 'routes', 'stops', 'calendar', 'calendar_dates',
+        'patterns', 'pattern_stops', 'trips', 'trip_frequencies'
+    ]::TEXT[];
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Rollback (of this migration):
+-- CREATE OR REPLACE FUNCTION gtfs_shadow_tables() RETURNS TEXT[] AS $$
+--     SELECT ARRAY['agencies', 'routes', 'stops', 'calendar', 'calendar_dates',
+--                  'patterns', 'pattern_stops', 'trips']::TEXT[];
+-- $$ LANGUAGE sql IMMUTABLE;
+-- DROP TABLE IF EXISTS trip_frequencies;
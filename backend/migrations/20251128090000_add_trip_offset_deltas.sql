@@ -0,0 +1,20 @@
+-- Migration: Per-trip offset deltas against pattern median offsets
+-- Date: 2025-11-28
+-- Applied via: Supabase MCP (mcp__supabase__apply_migration)
+-- Status: Pending
+--
+-- pattern_stops offsets are medians across a pattern's trips. With
+-- GTFS_TRIP_OFFSET_DELTAS=true (app.services.gtfs_offset_deltas) trips that deviate carry
+-- one int16 delta per pattern stop; trips that run to the medians keep NULL:
+--   exact offset = ps.departure_offset_secs + COALESCE(t.offset_deltas[ps.stop_index + 1], 0)
+-- stop_index is the 0-based position of the stop in its pattern (by stop_sequence).
+-- Apply before enabling the flag.
+
+ALTER TABLE pattern_stops ADD COLUMN IF NOT EXISTS stop_index SMALLINT;
+ALTER TABLE trips ADD COLUMN IF NOT EXISTS offset_deltas SMALLINT[];
+ALTER TABLE trip_frequencies ADD COLUMN IF NOT EXISTS offset_deltas SMALLINT[];
+
+-- Rollback (of this migration):
+-- ALTER TABLE trip_frequencies DROP COLUMN IF EXISTS offset_deltas;
+-- ALTER TABLE trips DROP COLUMN IF EXISTS offset_deltas;
+-- ALTER TABLE pattern_stops DROP COLUMN IF EXISTS stop_index;
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Benchmark row-level deltas between two gtfs.db bundle versions.
+
+Usage:
+    python scripts/benchmark_bundle_delta.py --scale small
+    python scripts/benchmark_bundle_delta.py --scale medium --change-pct 5 --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root (backend/) to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import structlog
+
+from benchmarks.bundle_delta import run_bundle_delta_benchmark
+from benchmarks.synthetic_gtfs import SCALES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--change-pct", type=float, default=2.0, help="share of trips and stops edited between versions")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show parser/generator logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    result = run_bundle_delta_benchmark(scale=args.scale, seed=args.seed, change_pct=args.change_pct)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print("Edits: " + ", ".join(f"{name} {rows}" for name, rows in result["changes"].items()) + "\n")
+    print(f"{'download':<14} {'bytes':>12} {'gzip_bytes':>12}")
+    for name in ("full", "delta", "unstable_ids"):
+        print(f"{name:<14} {result[name]['bytes']:>12} {result[name]['gzip_bytes']:>12}")
+    print(f"\nDelta: {result['delta_pct']}% of the full download (gzip), "
+          f"built in {result['build_ms']}ms, applied in {result['apply_ms']}ms")
+    for table, rows in result["delta"]["tables"].items():
+        print(f"  {table:<16} -{rows['deleted']:<6} +{rows['upserted']}")
+
+
+if __name__ == "__main__":
+    main()
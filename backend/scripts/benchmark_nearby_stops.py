@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Benchmark the stops R*Tree index against the full stops scan for radius queries.
+
+Usage:
+    python scripts/benchmark_nearby_stops.py --scale small
+    python scripts/benchmark_nearby_stops.py --scale medium --radius 2000 --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root (backend/) to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import structlog
+
+from benchmarks.nearby_stops import run_nearby_stops_benchmark
+from benchmarks.synthetic_gtfs import SCALES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=1000, help="random query points per path")
+    parser.add_argument("--radius", type=float, default=500.0, help="search radius in metres")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show parser/generator logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    result = run_nearby_stops_benchmark(scale=args.scale, seed=args.seed, queries=args.queries, radius_m=args.radius)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{result['stops']} stops, stops_rtree {result['rtree_bytes']} bytes, "
+          f"{result['matches']} stops per {result['radius_m']:.0f}m query\n")
+    print(f"{'query':<8} {'p50_us':>10} {'p99_us':>10} {'mean_us':>10}")
+    for name, latency in result["latency_us"].items():
+        print(f"{name:<8} {latency['p50']:>10} {latency['p99']:>10} {latency['mean']:>10}")
+    print(f"\n{result['queries']} queries, identical results, R*Tree {result['speedup']}x faster (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Benchmark the stop_departures table against the offline departures join query.
+
+Usage:
+    python scripts/benchmark_offline_departures.py --scale small
+    python scripts/benchmark_offline_departures.py --scale medium --queries 2000 --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root (backend/) to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import structlog
+
+from benchmarks.offline_departures import run_offline_departures_benchmark
+from benchmarks.synthetic_gtfs import SCALES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=500, help="random (stop, weekday, time) queries per layout")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show parser/generator logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    result = run_offline_departures_benchmark(scale=args.scale, seed=args.seed, queries=args.queries)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{'bundle':<18} {'bytes':>12} {'gzip_bytes':>12}")
+    for name in ("without", "with"):
+        sizes = result["sizes"][name]
+        print(f"{name + ' table':<18} {sizes['bytes']:>12} {sizes['gzip_bytes']:>12}")
+    print("\n" + ", ".join(f"{table} {size} bytes" for table, size in result["table_bytes"].items())
+          + f" ({result['rows']['departures']} departures in {result['rows']['stop_departures']} rows)\n")
+    print(f"{'query':<18} {'p50_us':>10} {'p99_us':>10} {'mean_us':>10}")
+    for name, latency in result["latency_us"].items():
+        print(f"{name:<18} {latency['p50']:>10} {latency['p99']:>10} {latency['mean']:>10}")
+    print(f"\n{result['queries']} queries, identical results")
+
+
+if __name__ == "__main__":
+    main()
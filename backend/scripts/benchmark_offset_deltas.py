@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Benchmark per-trip offset deltas against median-only offsets and full stop_times.
+
+Usage:
+    python scripts/benchmark_offset_deltas.py --scale small
+    python scripts/benchmark_offset_deltas.py --scale medium --json
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root (backend/) to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import structlog
+
+from benchmarks.offset_deltas import run_offset_delta_benchmark
+from benchmarks.synthetic_gtfs import SCALES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lookups", type=int, default=200_000, help="random (trip, stop) lookups timed")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show parser logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    result = run_offset_delta_benchmark(scale=args.scale, seed=args.seed, lookups=args.lookups)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    feed, deltas, storage, error = result["feed"], result["deltas"], result["storage"], result["median_error"]
+    print(f"Feed: {feed['trips']} trips, {feed['pattern_stops']} pattern_stops, {feed['stop_times']} stop_times")
+    print(f"Deviating trips: {deltas['trips_with_deltas']} ({deltas['trips_with_deltas_pct']}%), "
+          f"{deltas['delta_values']} delta values")
+    print(f"Median-only error: mean {error['mean_secs']}s, p99 {error['p99_secs']}s, max {error['max_secs']}s "
+          f"({error['exact_pct']}% exact)\n")
+
+    print(f"{'representation':<16} {'bytes':>12} {'lookup_ns':>10}")
+    print(f"{'median':<16} {storage['median_bytes']:>12} {result['lookup_ns']['median']:>10}")
+    print(f"{'int16_deltas':<16} {storage['median_bytes'] + storage['int16_deltas_bytes']:>12} "
+          f"{result['lookup_ns']['int16_deltas']:>10}")
+    print(f"{'varint_deltas':<16} {storage['median_bytes'] + storage['varint_deltas_bytes']:>12} "
+          f"{result['lookup_ns']['varint_deltas']:>10}")
+    print(f"{'stop_times':<16} {storage['stop_times_bytes']:>12} {result['lookup_ns']['stop_times']:>10}")
+    print(f"\nDelta overhead vs median: int16 +{storage['int16_overhead_pct']}%, "
+          f"varint +{storage['varint_overhead_pct']}%; median+int16 is "
+          f"{storage['int16_vs_stop_times_pct']}% of full stop_times")
+
+
+if __name__ == "__main__":
+    main()
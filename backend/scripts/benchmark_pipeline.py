@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Benchmark the GTFS static pipeline offline against stored baselines.
+
+Generates a deterministic synthetic feed, runs parse → load → iOS bundle against an
+in-memory Supabase stand-in and prints time/memory per stage next to the baseline in
+benchmarks/baselines/pipeline.json.
+
+Usage:
+    python scripts/benchmark_pipeline.py --scale small
+    python scripts/benchmark_pipeline.py --scale small --check            # exit 1 on regression
+    python scripts/benchmark_pipeline.py --scale small --update-baseline  # record new baseline
+"""
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Add project root (backend/) to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import structlog
+
+from benchmarks.pipeline import compare_to_baseline, load_baselines, run_pipeline_benchmark, update_baseline
+from benchmarks.synthetic_gtfs import SCALES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="runs to aggregate (median wall time)")
+    parser.add_argument("--capture", choices=["tracemalloc", "off"], default="tracemalloc")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated Supabase round trip")
+    parser.add_argument("--no-streaming", action="store_true", help="parse stop_times in memory")
+    parser.add_argument("--ios-source", choices=["parse", "supabase"], default="parse",
+                        help="build gtfs.db from the parse output (as the sync does) or read back from Supabase")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any stage regressed")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show pipeline logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    print(f"Benchmarking static pipeline: scale={args.scale} seed={args.seed} capture={args.capture}\n")
+    result = run_pipeline_benchmark(
+        scale=args.scale,
+        seed=args.seed,
+        repeat=args.repeat,
+        capture=args.capture,
+        latency_ms=args.latency_ms,
+        streaming=False if args.no_streaming else None,
+        ios_source=args.ios_source,
+    )
+    comparison = compare_to_baseline(result, load_baselines())
+
+    if args.json:
+        print(json.dumps({"result": result, "comparison": comparison}, indent=2))
+    else:
+        _print_report(result, comparison)
+
+    if args.update_baseline:
+        update_baseline(result)
+        print(f"\nBaseline updated for {args.scale}:{args.capture}")
+    elif args.check and comparison["regressions"]:
+        print(f"\n❌ {len(comparison['regressions'])} regression(s):")
+        for regression in comparison["regressions"]:
+            print(f"   {regression}")
+        sys.exit(1)
+
+
+def _print_report(result, comparison):
+    feed = result["feed"]
+    print(f"Feed: {feed['stops']} stops, {feed['routes']} routes, {feed['patterns']} patterns, "
+          f"{feed['trips']} trips, {feed['stop_times']} stop_times")
+    print(f"iOS bundle: {result['ios_db_size_mb']} MB, process peak RSS: {result['peak_rss_mb']} MB")
+    if comparison["baseline_found"]:
+        print(f"Baseline: recorded {comparison['recorded_at']}\n")
+    else:
+        print("Baseline: none for this scale/capture (use --update-baseline)\n")
+
+    print(f"{'stage':<40} {'wall_ms':>9} {'base':>9} {'Δ%':>7} {'mem_mb':>8} {'base':>8} {'Δ%':>7}")
+    for key, stage in result["stages"].items():
+        compared = comparison["stages"].get(key, {})
+        wall = compared.get("wall_ms", {})
+        memory = compared.get("memory_mb", {})
+        print(
+            f"{key:<40} {stage['wall_ms']:>9} {_fmt(wall.get('baseline')):>9} {_fmt(wall.get('change_pct')):>7} "
+            f"{stage['memory_mb']:>8} {_fmt(memory.get('baseline')):>8} {_fmt(memory.get('change_pct')):>7}"
+        )
+
+    if comparison["baseline_found"] and not comparison["regressions"]:
+        print("\n✅ No regressions against baseline")
+
+
+def _fmt(value):
+    return "-" if value is None else value
+
+
+if __name__ == "__main__":
+    main()
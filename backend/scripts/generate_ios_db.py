@@ -2,8 +2,15 @@
 """Generate iOS SQLite bundle from Supabase.
 
 Generates gtfs.db → var/data/gtfs.db, then copies to iOS Resources.
+
+Usage:
+    python scripts/generate_ios_db.py                                       # from Supabase
+    python scripts/generate_ios_db.py --from-gtfs var/data/gtfs-downloads   # parse locally, no Supabase
+    python scripts/generate_ios_db.py --publish                             # also archive + build deltas
+    python scripts/generate_ios_db.py --packs                               # also core + per-mode packs
 """
 
+import argparse
 import sys
 import os
 import shutil
@@ -12,19 +19,40 @@ from pathlib import Path
 # Add parent to path for imports
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_delta import publish_bundle
 from app.services.ios_db_generator import generate_ios_db
+from app.tasks.gtfs_static_sync import _create_metadata
 
 # iOS bundle destination
 IOS_BUNDLE_PATH = Path(__file__).resolve().parent.parent.parent / "SydneyTransit" / "SydneyTransit" / "Resources" / "gtfs.db"
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate iOS SQLite bundle")
+    parser.add_argument("--from-gtfs", metavar="DIR", help="parse downloaded feeds in DIR instead of querying Supabase")
+    parser.add_argument("--publish", action="store_true", help="archive the bundle version and build deltas from older versions")
+    parser.add_argument("--no-query-gate", action="store_true", help="skip the offline query latency check against the previous gtfs.db")
+    parser.add_argument("--packs", action="store_true", help="also split gtfs.db into a core pack and per-mode packs (var/data/packs)")
+    args = parser.parse_args()
+
     print("Starting iOS SQLite generation...")
-    print("This will query Supabase pattern tables and generate gtfs.db")
+    if args.from_gtfs:
+        print(f"This will parse GTFS feeds in {args.from_gtfs} and generate gtfs.db (no Supabase access)")
+    else:
+        print("This will query Supabase pattern tables and generate gtfs.db")
     print("Expected duration: 30-60 seconds\n")
 
     try:
         # Generate iOS database
-        result = generate_ios_db()
+        options = {
+            "query_gate": False if args.no_query_gate else None,
+            "packs": True if args.packs else None,
+        }
+        if args.from_gtfs:
+            data = parse_gtfs(args.from_gtfs)
+            result = generate_ios_db(data=data, metadata=_create_metadata(data), **options)
+        else:
+            result = generate_ios_db(**options)
 
         if result["status"] == "success":
             src_path = result["file_path"]
@@ -35,6 +63,17 @@ def main():
             print(f"   Routes: {result['row_counts']['routes']}")
             print(f"   Patterns: {result['row_counts']['patterns']}")
             print(f"   Trips: {result['row_counts']['trips']}")
+            print(f"   Version: {result['bundle_version']}")
+            if result.get("query_benchmark"):
+                for name, stats in result["query_benchmark"]["current"].items():
+                    print(f"   Query {name}: p50 {stats['p50_ms']}ms, p99 {stats['p99_ms']}ms")
+            if result.get("packs"):
+                for name, pack in result["packs"]["packs"].items():
+                    print(f"   Pack {name}: {pack['bytes'] / 1024 / 1024:.2f} MB, version {pack['version']}")
+
+            if args.publish:
+                published = publish_bundle(src_path)
+                print(f"\n✅ Published {published['version']} (deltas from {len(published['deltas'])} older versions)")
 
             # Copy to iOS Resources
             print(f"\nCopying to iOS bundle: {IOS_BUNDLE_PATH}")
@@ -20,7 +20,12 @@ if __name__ == "__main__":
     print("Expected duration: 3-5 minutes\n")
 
     try:
-        result = load_gtfs_static()
+        result = load_gtfs_static(force="--force" in sys.argv)
+        if result["status"] == "skipped":
+            print("\n⏭️  GTFS feeds unchanged since last load; skipped parse/load (use --force to reload)")
+            print(f"Feed version: {result['feed_version']}")
+            sys.exit(0)
+
         print("\n✅ GTFS Load Complete!")
         print(f"Duration: {result['duration_ms'] / 1000:.1f}s")
         print(f"Stops: {result['counts']['stops']}")
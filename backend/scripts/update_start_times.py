@@ -6,7 +6,9 @@ Parses stop_times.txt to calculate trip start times and updates DB.
 
 import csv
 from collections import defaultdict
+import io
 import os
+import zipfile
 from pathlib import Path
 from supabase import create_client, Client
 
@@ -42,13 +44,20 @@ trip_start_times = {}  # {trip_id: start_time_secs}
 modes = ["sydneytrains", "metro", "buses", "lightrail", "mff", "sydneyferries"]
 
 for mode in modes:
+    # Feeds are kept as gtfs.zip (read in place); older syncs extracted stop_times.txt
+    zip_path = GTFS_DIR / mode / "gtfs.zip"
     filepath = GTFS_DIR / mode / "stop_times.txt"
-    if not os.path.exists(filepath):
+    if zip_path.exists():
+        archive = zipfile.ZipFile(zip_path)
+        f = io.TextIOWrapper(archive.open("stop_times.txt"), encoding="utf-8-sig")
+    elif os.path.exists(filepath):
+        f = open(filepath, 'r')
+    else:
         print(f"  Skipping {mode} (file not found)")
         continue
 
     print(f"  Processing {mode}...")
-    with open(filepath, 'r') as f:
+    with f:
         reader = csv.DictReader(f)
         for row in reader:
             trip_id = f"{mode}_{row['trip_id']}"  # Prefixed in parser
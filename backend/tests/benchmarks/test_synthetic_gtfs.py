@@ -0,0 +1,107 @@
+"""Unit tests for the synthetic GTFS generator and the pipeline benchmark."""
+
+import zipfile
+
+import pytest
+
+from app.services.gtfs_service import FEED_ARCHIVE_NAME, parse_gtfs
+from benchmarks.pipeline import compare_to_baseline, run_pipeline_benchmark, update_baseline
+from benchmarks.synthetic_gtfs import LIGHTRAIL_CONTAMINATION_STOPS, generate_feed
+
+
+def _archives(base_path):
+    return {p.parent.name: p.read_bytes() for p in sorted(base_path.glob(f"*/{FEED_ARCHIVE_NAME}"))}
+
+
+class TestGenerateFeed:
+    """Test deterministic synthetic feeds."""
+
+    def test_same_seed_is_byte_identical(self, tmp_path):
+        """Same parameters and seed produce identical archives; another seed does not."""
+        generate_feed(str(tmp_path / "a"), scale="tiny", seed=3)
+        generate_feed(str(tmp_path / "b"), scale="tiny", seed=3)
+        generate_feed(str(tmp_path / "c"), scale="tiny", seed=4)
+
+        assert _archives(tmp_path / "a") == _archives(tmp_path / "b")
+        assert _archives(tmp_path / "a") != _archives(tmp_path / "c")
+
+    def test_parse_gtfs_reads_generated_feed(self, tmp_path):
+        """All modes parse; after-midnight trips, bbox and contamination filters are exercised."""
+        summary = generate_feed(str(tmp_path), scale="tiny", seed=1, outside_bbox_share=0.2)
+
+        data = parse_gtfs(str(tmp_path))
+
+        assert len(data["trips"]) == summary["totals"]["trips"]
+        assert len(data["patterns"]) == summary["totals"]["patterns"]
+        assert {r["route_type"] for r in data["routes"]} == {"2", "401", "700", "4", "900"}
+        assert max(t["start_time_secs"] for t in data["trips"]) > 24 * 3600
+        # Outside-bbox street stops and lightrail train platforms are dropped
+        assert len(data["stops"]) < summary["totals"]["stops"] - LIGHTRAIL_CONTAMINATION_STOPS
+        assert not {"LX0", "LX1"} & {s["stop_id"] for s in data["stops"]}
+        assert {c["service_id"] for c in data["calendar"]} >= {"buses.WD", "buses.SAT", "buses.SUN"}
+
+    def test_overrides_and_extracted_layout(self, tmp_path):
+        """Count overrides apply and archive=False writes extracted *.txt files."""
+        summary = generate_feed(
+            str(tmp_path), scale="tiny", modes=["buses"], routes=3, patterns_per_route=1,
+            trips_per_pattern=10, archive=False
+        )
+
+        assert summary["modes"]["buses"]["routes"] == 3
+        assert summary["totals"]["trips"] == 30
+        assert (tmp_path / "buses" / "stop_times.txt").exists()
+        assert not (tmp_path / "buses" / FEED_ARCHIVE_NAME).exists()
+
+    def test_archive_members_are_plain_gtfs(self, tmp_path):
+        generate_feed(str(tmp_path), scale="tiny", modes=["lightrail"])
+
+        with zipfile.ZipFile(tmp_path / "lightrail" / FEED_ARCHIVE_NAME) as zf:
+            assert "stop_times.txt" in zf.namelist()
+            assert zf.read("calendar.txt").decode().startswith("service_id,monday")
+
+    def test_invalid_parameters(self, tmp_path):
+        with pytest.raises(ValueError, match="Unknown scale"):
+            generate_feed(str(tmp_path), scale="huge")
+        with pytest.raises(ValueError, match="Unknown modes"):
+            generate_feed(str(tmp_path), modes=["trams"])
+        with pytest.raises(ValueError, match="routes must be >= 1"):
+            generate_feed(str(tmp_path), routes=0)
+
+
+class TestPipelineBenchmark:
+    """Test the offline pipeline run and baseline comparison."""
+
+    def test_runs_full_pipeline_offline(self):
+        result = run_pipeline_benchmark(scale="tiny", capture="off")
+
+        for key in ("parse_gtfs", "pattern_extraction", "load_to_supabase", "table_load:trips", "generate_ios_db"):
+            assert key in result["stages"]
+        assert result["stages"]["table_load:trips"]["rows"] == result["feed"]["trips"]
+        assert result["ios_db_size_mb"] > 0
+
+    def test_regression_needs_tolerance_and_noise_floor(self, tmp_path):
+        """Slower beyond tolerance and noise floor regresses; small absolute jitter does not."""
+        baseline_result = {
+            "scale": "tiny", "seed": 0, "capture": "off", "repeat": 1, "latency_ms": 0.0,
+            "environment": {}, "feed": {}, "ios_db_size_mb": 0.1,
+            "stages": {
+                "parse_gtfs": {"wall_ms": 1000, "memory_mb": 50.0},
+                "dedup": {"wall_ms": 10, "memory_mb": 1.0},
+            },
+        }
+        baselines = update_baseline(baseline_result, tmp_path / "pipeline.json")
+
+        current = dict(baseline_result, stages={
+            "parse_gtfs": {"wall_ms": 1500, "memory_mb": 52.0},
+            "dedup": {"wall_ms": 40, "memory_mb": 1.0},
+        })
+        comparison = compare_to_baseline(current, baselines)
+
+        assert comparison["baseline_found"]
+        assert comparison["regressions"] == ["parse_gtfs wall_ms: 1500 vs baseline 1000 (+50.0%)"]
+        assert comparison["stages"]["dedup"]["wall_ms"]["change_pct"] == 300.0
+
+    def test_missing_baseline(self):
+        comparison = compare_to_baseline({"scale": "tiny", "capture": "off", "stages": {}}, {})
+
+        assert comparison == {"baseline_found": False, "recorded_at": None, "stages": {}, "regressions": []}
@@ -0,0 +1,142 @@
+"""Unit tests for gtfs_batch_writer.py - concurrent batch upserts with retries."""
+
+import threading
+
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from app.services import gtfs_batch_writer
+from app.services.gtfs_batch_writer import BatchWriteError, is_transient_error, is_unapplied_error, write_batches
+
+
+class _FakeQuery:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+
+    def execute(self):
+        return self.client.execute(self.rows)
+
+
+class _FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, rows):
+        return _FakeQuery(self.client, rows)
+
+    def insert(self, rows):
+        return _FakeQuery(self.client, rows)
+
+
+class _FakeSupabase:
+    """Records written rows; fails the first `transient_failures` calls."""
+
+    def __init__(self, transient_failures=0, permanent_error=None, transient_error=None):
+        self.transient_failures = transient_failures
+        self.permanent_error = permanent_error
+        self.transient_error = transient_error or httpx.ReadTimeout("timed out")
+        self.written = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def table(self, _name):
+        return _FakeTable(self)
+
+    def execute(self, rows):
+        with self._lock:
+            self.calls += 1
+            if self.permanent_error is not None:
+                raise self.permanent_error
+            if self.transient_failures > 0:
+                self.transient_failures -= 1
+                raise self.transient_error
+            self.written.extend(rows)
+
+
+@pytest.fixture(autouse=True)
+def _no_sleep(monkeypatch):
+    monkeypatch.setattr(gtfs_batch_writer.time, "sleep", lambda _s: None)
+
+
+def _rows(n):
+    return [{"trip_id": f"t{i}", "pattern_id": "P1"} for i in range(n)]
+
+
+class TestWriteBatches:
+    def test_parallel_writes_every_row_once(self):
+        client = _FakeSupabase()
+        report = write_batches(client, "trips", _rows(2500), parallelism=4, initial_batch_size=500)
+
+        assert report["rows_written"] == 2500
+        assert sorted(r["trip_id"] for r in client.written) == sorted(f"t{i}" for i in range(2500))
+        assert report["retries"] == 0
+        assert report["parallelism"] == 4
+
+    def test_transient_failures_are_retried(self):
+        client = _FakeSupabase(transient_failures=2)
+        report = write_batches(client, "trips", _rows(300), initial_batch_size=100)
+
+        assert report["rows_written"] == 300
+        assert report["retries"] == 2
+
+    def test_permanent_failure_raises(self):
+        client = _FakeSupabase(permanent_error=APIError({"code": "23503", "message": "fk violation"}))
+        with pytest.raises(BatchWriteError):
+            write_batches(client, "trips", _rows(300), parallelism=2, initial_batch_size=100)
+
+    def test_plain_insert_not_retried_after_possible_commit(self):
+        client = _FakeSupabase(transient_failures=1)
+        with pytest.raises(BatchWriteError):
+            write_batches(client, "trips", _rows(10), upsert=False)
+        assert client.calls == 1
+
+    def test_plain_insert_retried_when_not_applied(self):
+        client = _FakeSupabase(transient_failures=2, transient_error=APIError({"code": "40001", "message": "serialization"}))
+        report = write_batches(client, "trips", _rows(300), upsert=False, initial_batch_size=100)
+
+        assert report["rows_written"] == 300
+        assert report["retries"] == 2
+        assert len(client.written) == 300
+
+    def test_retries_exhausted_raises(self):
+        client = _FakeSupabase(transient_failures=10)
+        with pytest.raises(BatchWriteError):
+            write_batches(client, "trips", _rows(10), max_retries=2)
+        assert client.calls == 3
+
+    def test_committed_batches_reported(self):
+        committed = []
+        lock = threading.Lock()
+
+        def on_batch(offset, count):
+            with lock:
+                committed.append((offset, count))
+
+        write_batches(_FakeSupabase(), "trips", _rows(2500), parallelism=4, initial_batch_size=500,
+                      on_batch_committed=on_batch)
+
+        covered = sorted(committed)
+        assert covered[0][0] == 0
+        assert all(a[0] + a[1] == b[0] for a, b in zip(covered, covered[1:]))
+        assert sum(count for _, count in covered) == 2500
+
+    def test_empty_rows(self):
+        report = write_batches(_FakeSupabase(), "trips", [])
+        assert report["rows_written"] == 0
+        assert report["batches"] == 0
+
+
+class TestTransientClassification:
+    def test_classification(self):
+        assert is_transient_error(httpx.ConnectError("reset"))
+        assert is_transient_error(APIError({"code": "40P01", "message": "deadlock"}))
+        assert not is_transient_error(APIError({"code": "23505", "message": "duplicate"}))
+        assert not is_transient_error(ValueError("bad row"))
+
+    def test_unapplied_classification(self):
+        assert is_unapplied_error(httpx.ConnectError("refused"))
+        assert is_unapplied_error(APIError({"code": "40P01", "message": "deadlock"}))
+        assert not is_unapplied_error(httpx.ReadTimeout("timed out"))
+        assert not is_unapplied_error(APIError({"code": "504", "message": "gateway timeout"}))
@@ -0,0 +1,160 @@
+"""Unit tests for gtfs_checkpoint.py - resumable static sync progress."""
+
+import pytest
+
+from app.services.gtfs_batch_writer import BatchWriteError, write_batches
+from app.services.gtfs_copy_loader import copy_table
+from app.services.gtfs_checkpoint import (
+    PARSE_OUTPUT_FILENAME,
+    SyncCheckpoint,
+    checkpoint_key,
+    checkpoint_status,
+)
+
+from tests.services.test_gtfs_copy_loader import _FakePostgres
+
+FEEDS = {"sydneytrains": "aa" * 32, "metro": "bb" * 32}
+
+
+class _FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, rows):
+        self.client.pending = rows
+        return self
+
+    def execute(self):
+        return self.client.execute()
+
+
+class _FakeSupabase:
+    """Records upserted rows; fails permanently on the batch containing `fail_on`."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.written = []
+        self.pending = None
+
+    def table(self, _name):
+        return _FakeTable(self)
+
+    def execute(self):
+        rows = self.pending
+        if self.fail_on is not None and any(r["trip_id"] == self.fail_on for r in rows):
+            raise ValueError("worker killed")
+        self.written.extend(rows)
+
+
+def _rows(n):
+    return [{"trip_id": f"t{i}"} for i in range(n)]
+
+
+class TestSyncCheckpoint:
+    """Test stage and batch progress persistence."""
+
+    def test_key_depends_on_feed_hashes(self):
+        assert checkpoint_key(FEEDS) == checkpoint_key(dict(reversed(list(FEEDS.items()))))
+        assert checkpoint_key(FEEDS) != checkpoint_key(dict(FEEDS, metro="cc" * 32))
+
+    def test_resume_from_watermark(self, tmp_path):
+        checkpoint = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+        assert not checkpoint.resumed
+        assert checkpoint.start_table("trips", 1000) == 0
+        checkpoint.batch_committed("trips", 0, 200)
+        checkpoint.batch_committed("trips", 400, 200)  # committed out of order
+        checkpoint.batch_committed("trips", 200, 100)
+
+        reopened = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+
+        assert reopened.resumed
+        assert reopened.start_table("trips", 1000) == 300
+        progress = reopened.summary()["tables"]["trips"]
+        assert progress["rows_committed"] == 500
+        assert progress["batches_committed"] == 3
+
+    def test_changed_row_count_restarts_table(self, tmp_path):
+        checkpoint = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+        checkpoint.start_table("trips", 1000)
+        checkpoint.batch_committed("trips", 0, 500)
+
+        assert SyncCheckpoint.open(FEEDS, "full", root=tmp_path).start_table("trips", 999) == 0
+
+    def test_other_load_mode_keeps_only_parse_output(self, tmp_path):
+        checkpoint = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+        checkpoint.save_parse_output({"trips": _rows(3)})
+        checkpoint.start_table("trips", 3)
+        checkpoint.complete_table("trips")
+
+        shadow = SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path)
+
+        assert shadow.load_parse_output() == {"trips": _rows(3)}
+        assert not shadow.table_complete("trips")
+
+    def test_finish_drops_stage_output_and_old_checkpoints(self, tmp_path):
+        stale = SyncCheckpoint.open(dict(FEEDS, metro="cc" * 32), "full", root=tmp_path)
+        stale.complete_stage("light_rail_cleanup")
+        checkpoint = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+        checkpoint.save_parse_output({"trips": _rows(3)})
+
+        checkpoint.finish(feed_version="20251125")
+
+        assert not (checkpoint.path / PARSE_OUTPUT_FILENAME).exists()
+        status = checkpoint_status(tmp_path)
+        assert [s["key"] for s in status] == [checkpoint.key]
+        assert status[0]["status"] == "complete"
+        # A finished checkpoint is not resumed
+        assert not SyncCheckpoint.open(FEEDS, "full", root=tmp_path).resumed
+
+    def test_not_persisted(self, tmp_path):
+        checkpoint = SyncCheckpoint.open(FEEDS, "full", root=tmp_path, persist=False)
+        checkpoint.save_parse_output({"trips": _rows(3)})
+        checkpoint.start_table("trips", 3)
+        checkpoint.batch_committed("trips", 0, 3)
+
+        assert checkpoint.load_parse_output() is None
+        assert not any(tmp_path.iterdir())
+
+
+class TestResumedWrite:
+    """A write killed mid-table resumes from its last committed batch."""
+
+    def test_rerun_writes_remaining_rows(self, tmp_path):
+        rows = _rows(1000)
+        client = _FakeSupabase(fail_on="t650")
+        checkpoint = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+        skip = checkpoint.start_table("trips", len(rows))
+        with pytest.raises(BatchWriteError):
+            write_batches(client, "trips", rows[skip:], initial_batch_size=100,
+                          on_batch_committed=checkpoint.batch_callback("trips", skip))
+
+        first_run = len(client.written)
+        client.fail_on = None
+        client.written = []
+        resumed = SyncCheckpoint.open(FEEDS, "full", root=tmp_path)
+        skip = resumed.start_table("trips", len(rows))
+        write_batches(client, "trips", rows[skip:], initial_batch_size=100,
+                      on_batch_committed=resumed.batch_callback("trips", skip))
+        resumed.complete_table("trips")
+
+        assert 0 < skip == first_run <= 650
+        assert client.written == rows[skip:]
+        assert resumed.summary()["tables"]["trips"]["complete"]
+
+    def test_resumed_copy_writes_offset_deltas_as_arrays(self, tmp_path):
+        SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path).save_parse_output({
+            "trips": [{"trip_id": "t1", "offset_deltas": (0, 60, -30)}, {"trip_id": "t2", "offset_deltas": None}],
+            "trip_frequencies": [{"frequency_id": "f1", "trip_ids": ["a", "b"], "offset_deltas": (0, 15)}],
+        })
+
+        data = SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path).load_parse_output()
+        db = _FakePostgres()
+        copy_table(db, "trips", data["trips"], ["trip_id", "offset_deltas"], schema="gtfs_staging", upsert=False)
+        copy_table(db, "trip_frequencies", data["trip_frequencies"], ["frequency_id", "trip_ids", "offset_deltas"],
+                   schema="gtfs_staging", upsert=False)
+
+        trips = list(db.tables["gtfs_staging.trips"].values())
+        assert [t["offset_deltas"] for t in trips] == ["{0,60,-30}", None]
+        [block] = db.tables["gtfs_staging.trip_frequencies"].values()
+        assert block["trip_ids"] == '["a", "b"]'
+        assert block["offset_deltas"] == "{0,15}"
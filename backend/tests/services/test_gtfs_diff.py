@@ -0,0 +1,81 @@
+"""Unit tests for gtfs_diff.py - incremental sync diffing."""
+
+from app.services.gtfs_diff import (
+    diff_table,
+    group_deletes,
+    hash_table,
+    load_snapshot,
+    save_snapshot,
+)
+
+
+class TestDiffTable:
+    """Test per-table insert/update/delete computation."""
+
+    def test_no_previous_snapshot_inserts_everything(self):
+        rows = [{"trip_id": "t1", "pattern_id": "P1"}, {"trip_id": "t2", "pattern_id": "P1"}]
+        diff = diff_table("trips", rows, None)
+
+        assert diff["inserts"] == 2
+        assert diff["updates"] == 0
+        assert diff["deletes"] == []
+        assert len(diff["upserts"]) == 2
+
+    def test_insert_update_delete_unchanged(self):
+        old_rows = [
+            {"trip_id": "t1", "pattern_id": "P1"},
+            {"trip_id": "t2", "pattern_id": "P1"},
+            {"trip_id": "t3", "pattern_id": "P2"},
+        ]
+        previous = hash_table("trips", old_rows)
+
+        new_rows = [
+            {"trip_id": "t1", "pattern_id": "P1"},  # unchanged
+            {"trip_id": "t2", "pattern_id": "P9"},  # updated
+            {"trip_id": "t4", "pattern_id": "P2"},  # inserted (t3 deleted)
+        ]
+        diff = diff_table("trips", new_rows, previous)
+
+        assert diff["inserts"] == 1
+        assert diff["updates"] == 1
+        assert diff["unchanged"] == 1
+        assert [r["trip_id"] for r in diff["upserts"]] == ["t2", "t4"]
+        assert diff["deletes"] == [{"trip_id": "t3"}]
+
+    def test_composite_key_deletes(self):
+        previous = hash_table("pattern_stops", [
+            {"pattern_id": "P1", "stop_sequence": 1, "stop_id": "A"},
+            {"pattern_id": "P1", "stop_sequence": 2, "stop_id": "B"},
+            {"pattern_id": "P2", "stop_sequence": 1, "stop_id": "C"},
+        ])
+        diff = diff_table("pattern_stops", [{"pattern_id": "P1", "stop_sequence": 1, "stop_id": "A"}], previous)
+
+        groups = sorted(group_deletes("pattern_stops", diff["deletes"]), key=lambda g: g[0]["pattern_id"])
+        assert groups == [
+            ({"pattern_id": "P1"}, "stop_sequence", ["2"]),
+            ({"pattern_id": "P2"}, "stop_sequence", ["1"]),
+        ]
+
+
+class TestSnapshot:
+    """Test snapshot persistence round trip."""
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "snapshot.json.gz")
+        hashes = {"trips": hash_table("trips", [{"trip_id": "t1", "pattern_id": "P1"}])}
+
+        save_snapshot(hashes, "2025-11-20", path)
+        snapshot = load_snapshot(path)
+
+        assert snapshot["feed_version"] == "2025-11-20"
+        assert snapshot["tables"] == hashes
+        assert snapshot["feeds"] == {}
+
+    def test_feed_hashes_round_trip(self, tmp_path):
+        path = str(tmp_path / "snapshot.json.gz")
+        save_snapshot({}, "2025-11-20", path, feed_hashes={"buses": "ab12", "metro": None})
+
+        assert load_snapshot(path)["feeds"] == {"buses": "ab12", "metro": None}
+
+    def test_missing_snapshot(self, tmp_path):
+        assert load_snapshot(str(tmp_path / "missing.json.gz")) is None
@@ -0,0 +1,146 @@
+"""Unit tests for gtfs_frequencies.py - headway compression of trips."""
+
+from unittest import mock
+
+import pandas as pd
+
+from app.config import settings
+
+from app.services.gtfs_frequencies import compress_trips, expand_frequencies, frequency_trip
+from app.services.gtfs_service import _extract_patterns
+from app.services.realtime_service import _static_departures_query
+from app.tasks.gtfs_static_sync import LOAD_ORDER, _load_order
+
+
+def _trips(starts, pattern_id="P1", service_id="S1", headsign="City", prefix="t"):
+    return [
+        {
+            "trip_id": f"{prefix}{i}",
+            "route_id": "R1",
+            "service_id": service_id,
+            "pattern_id": pattern_id,
+            "trip_headsign": headsign,
+            "direction_id": 0,
+            "start_time_secs": start,
+        }
+        for i, start in enumerate(starts)
+    ]
+
+
+def _by_id(trips):
+    return {t["trip_id"]: t for t in trips}
+
+
+class TestCompressTrips:
+    """Test folding constant-headway runs into blocks."""
+
+    def test_constant_headway_becomes_one_block(self):
+        trips = _trips([21600 + i * 600 for i in range(10)])
+
+        result = compress_trips(trips)
+
+        assert result["trips"] == []
+        [block] = result["frequencies"]
+        assert block["start_time_secs"] == 21600
+        assert block["end_time_secs"] == 21600 + 9 * 600
+        assert block["headway_secs"] == 600
+        assert block["trip_ids"] == [f"t{i}" for i in range(10)]
+        assert block["exceptions"] == {}
+        assert block["frequency_id"].startswith("F")
+        assert result["stats"]["trips_compressed"] == 10
+
+    def test_round_trip_is_lossless(self):
+        """Expanded blocks plus remaining trips reproduce the input exactly."""
+        starts = [21600, 22200, 22800, 23460, 24000, 24600, 30000, 31000]
+        trips = _trips(starts) + _trips([3600, 7200], prefix="x")
+
+        result = compress_trips(trips)
+        restored = expand_frequencies(result["frequencies"]) + result["trips"]
+
+        assert _by_id(restored) == _by_id(trips)
+
+    def test_small_shift_stored_as_exception(self):
+        trips = _trips([21600, 22200, 22800, 23460, 24000, 24600])
+
+        [block] = compress_trips(trips)["frequencies"]
+
+        assert block["exceptions"] == {"3": 23460}
+        assert len(block["trip_ids"]) == 6
+
+    def test_gap_splits_runs_and_short_runs_stay_trips(self):
+        """A headway break ends the block; fewer than MIN_FREQUENCY_TRIPS stay plain rows."""
+        trips = _trips([21600, 22200, 22800, 23400, 30000, 30600, 31200])
+
+        result = compress_trips(trips)
+
+        assert [b["trip_ids"] for b in result["frequencies"]] == [["t0", "t1", "t2", "t3"]]
+        assert {t["trip_id"] for t in result["trips"]} == {"t4", "t5", "t6"}
+
+    def test_differing_attributes_are_not_merged(self):
+        """Trips only share a block when service and trip fields match."""
+        weekday = _trips([21600 + i * 600 for i in range(4)], service_id="WD", prefix="w")
+        saturday = _trips([21600 + i * 600 for i in range(4)], service_id="SAT", prefix="s")
+        mixed = _trips([21600 + i * 600 for i in range(4)], prefix="m")
+        mixed[2]["trip_headsign"] = "Airport"
+
+        result = compress_trips(weekday + saturday + mixed)
+
+        assert sorted(b["service_id"] for b in result["frequencies"]) == ["SAT", "WD"]
+        assert {t["trip_id"] for t in result["trips"]} == {"m0", "m1", "m2", "m3"}
+
+    def test_frequency_trip(self):
+        trips = _trips([21600, 22200, 22800, 23460, 24000, 24600])
+        [block] = compress_trips(trips)["frequencies"]
+
+        assert frequency_trip(block, "t3") == trips[3]
+        assert frequency_trip(block, "t4")["start_time_secs"] == 24000
+        assert frequency_trip(block, "missing") is None
+
+
+class TestExtractPatternsCompression:
+    """Test compression wired into pattern extraction."""
+
+    def test_blocks_replace_trip_rows(self):
+        trips_rows = [[f"t{i}", "R1", "S1", "City", "0"] for i in range(5)]
+        stop_times_rows = []
+        for i in range(5):
+            hour = 6 + i
+            stop_times_rows.append([f"t{i}", f"{hour:02d}:00:00", f"{hour:02d}:00:00", "A", "1"])
+            stop_times_rows.append([f"t{i}", f"{hour:02d}:05:00", f"{hour:02d}:05:00", "B", "2"])
+        trips = pd.DataFrame(trips_rows, columns=["trip_id", "route_id", "service_id", "trip_headsign", "direction_id"])
+        stop_times = pd.DataFrame(
+            stop_times_rows, columns=["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"]
+        )
+
+        plain = _extract_patterns({"trips": trips, "stop_times": stop_times})
+        compressed = _extract_patterns({"trips": trips, "stop_times": stop_times}, compress_frequencies=True)
+
+        assert plain["trip_frequencies"] == []
+        assert compressed["trips"] == []
+        [block] = compressed["trip_frequencies"]
+        assert block["headway_secs"] == 3600
+        assert block["pattern_id"] == plain["trips"][0]["pattern_id"]
+
+
+class TestStaticDeparturesQuery:
+    """Test the departures SQL with and without frequency blocks."""
+
+    def test_frequencies_branch_only_when_enabled(self):
+        plain = _static_departures_query(">=", "ASC", 30)
+        with_blocks = _static_departures_query(">=", "ASC", 30, include_frequencies=True)
+
+        assert "trip_frequencies" not in plain
+        assert "UNION ALL" in with_blocks
+        assert "f.end_time_secs + ps.departure_offset_secs) >=" in with_blocks
+        assert _static_departures_query("<=", "DESC", 30, True).count("f.start_time_secs + ps.departure_offset_secs) <=") == 1
+
+
+class TestLoadOrder:
+    """Test trip_frequencies is only loaded with compression enabled."""
+
+    def test_frequency_table_only_when_enabled(self):
+        with mock.patch.object(settings, "GTFS_FREQUENCY_COMPRESSION", False):
+            assert _load_order() == LOAD_ORDER
+            assert "trip_frequencies" not in _load_order()
+        with mock.patch.object(settings, "GTFS_FREQUENCY_COMPRESSION", True):
+            assert _load_order()[-2:] == ["trips", "trip_frequencies"]
@@ -0,0 +1,108 @@
+"""Unit tests for gtfs_offset_deltas.py - per-trip offsets on top of pattern medians."""
+
+from app.services.gtfs_offset_deltas import (
+    INT16_MAX,
+    attach_offset_deltas,
+    decode_varint,
+    encode_varint,
+    offset_delta,
+)
+from app.services.gtfs_service import parse_gtfs
+from app.services.realtime_service import _static_departures_query
+from benchmarks.offset_deltas import run_offset_delta_benchmark
+from benchmarks.synthetic_gtfs import generate_feed
+
+
+def _pattern_stops(pattern_id, medians, first_sequence=1):
+    return [
+        {"pattern_id": pattern_id, "stop_sequence": first_sequence + i * 10, "departure_offset_secs": m}
+        for i, m in enumerate(medians)
+    ]
+
+
+class TestAttachOffsetDeltas:
+    """Test delta assignment against median offsets."""
+
+    def test_only_deviating_trips_get_deltas(self):
+        pattern_stops = _pattern_stops("P1", [0, 120, 300])
+        trips = [{"trip_id": "a", "pattern_id": "P1"}, {"trip_id": "b", "pattern_id": "P1"}]
+        offsets = {"a": (0, 120, 300), "b": (0, 180, 420)}
+
+        stats = attach_offset_deltas(trips, pattern_stops, offsets)
+
+        assert [ps["stop_index"] for ps in pattern_stops] == [0, 1, 2]
+        assert trips[0]["offset_deltas"] is None
+        assert trips[1]["offset_deltas"] == (0, 60, 120)
+        assert stats["trips_with_deltas"] == 1
+        assert stats["nonzero_deltas"] == 2
+
+    def test_exact_offsets_reconstructed(self):
+        pattern_stops = _pattern_stops("P1", [0, 100, 200])
+        trips = [{"trip_id": "b", "pattern_id": "P1"}]
+        attach_offset_deltas(trips, pattern_stops, {"b": (0, 90, 260)})
+
+        exact = [ps["departure_offset_secs"] + offset_delta(trips[0]["offset_deltas"], ps["stop_index"]) for ps in pattern_stops]
+
+        assert exact == [0, 90, 260]
+
+    def test_clamped_and_mismatched(self):
+        pattern_stops = _pattern_stops("P1", [0, 100])
+        trips = [{"trip_id": "far", "pattern_id": "P1"}, {"trip_id": "short", "pattern_id": "P1"}]
+
+        stats = attach_offset_deltas(trips, pattern_stops, {"far": (0, 100 + 40000), "short": (0,)})
+
+        assert trips[0]["offset_deltas"] == (0, INT16_MAX)
+        assert trips[1]["offset_deltas"] is None
+        assert stats["clamped"] == 1
+        assert stats["mismatched"] == 1
+
+    def test_offset_delta_defaults_to_zero(self):
+        assert offset_delta(None, 2) == 0
+        assert offset_delta((1, 2), None) == 0
+        assert offset_delta((1, 2), 5) == 0
+        assert offset_delta((1, -2), 1) == -2
+
+
+class TestVarint:
+    """Test zigzag varint encoding."""
+
+    def test_round_trip(self):
+        values = (0, 1, -1, 63, -64, 64, 300, -8192, INT16_MAX, -32768)
+        assert decode_varint(encode_varint(values)) == values
+
+    def test_small_deltas_take_one_byte(self):
+        assert len(encode_varint([0, 5, -30, 63])) == 4
+
+
+class TestParseWithDeltas:
+    """Test offset deltas through parse_gtfs."""
+
+    def test_streaming_matches_in_memory(self, tmp_path):
+        generate_feed(str(tmp_path), scale="tiny", seed=2, modes=["buses", "metro"])
+
+        in_memory = parse_gtfs(str(tmp_path), streaming=False, offset_deltas=True)
+        streamed = parse_gtfs(str(tmp_path), streaming=True, offset_deltas=True)
+
+        assert streamed["trips"] == in_memory["trips"]
+        assert streamed["pattern_stops"] == in_memory["pattern_stops"]
+        assert any(t["offset_deltas"] for t in in_memory["trips"])
+
+    def test_departures_sql_applies_deltas(self):
+        query = _static_departures_query(">=", "ASC", 30, include_frequencies=True, include_offset_deltas=True)
+
+        assert "COALESCE(t.offset_deltas[ps.stop_index + 1], 0)" in query
+        assert "COALESCE(f.offset_deltas[ps.stop_index + 1], 0)" in query
+        assert "offset_deltas" not in _static_departures_query(">=", "ASC", 30)
+
+
+class TestOffsetDeltaBenchmark:
+    """Test the storage/lookup benchmark."""
+
+    def test_reports_storage_and_lookups(self):
+        result = run_offset_delta_benchmark(scale="tiny", lookups=2000)
+
+        storage = result["storage"]
+        assert result["deltas"]["trips_with_deltas"] > 0
+        assert storage["median_bytes"] + storage["int16_deltas_bytes"] < storage["stop_times_bytes"]
+        assert result["median_error"]["max_secs"] > 0
+        assert set(result["lookup_ns"]) == {"median", "int16_deltas", "varint_deltas", "stop_times"}
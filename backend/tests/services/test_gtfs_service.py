@@ -0,0 +1,191 @@
+"""Unit tests for gtfs_service.py - pattern extraction."""
+
+import zipfile
+
+import pandas as pd
+import pytest
+
+from app.config import settings
+from app.services.gtfs_service import _extract_patterns, _pattern_id, parse_gtfs
+
+
+def _make_data(trips_rows, stop_times_rows):
+    trips = pd.DataFrame(trips_rows, columns=["trip_id", "route_id", "service_id", "trip_headsign", "direction_id"])
+    stop_times = pd.DataFrame(
+        stop_times_rows,
+        columns=["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"]
+    )
+    return {"trips": trips, "stop_times": stop_times}
+
+
+class TestPatternId:
+    """Test content-derived pattern IDs."""
+
+    def test_deterministic(self):
+        """Same content always yields the same ID."""
+        assert _pattern_id("T1", "0", "A|B|C") == _pattern_id("T1", "0", "A|B|C")
+        assert _pattern_id("T1", "0", "A|B|C").startswith("P")
+
+    def test_content_sensitive(self):
+        """Route, direction and stop order all change the ID."""
+        base = _pattern_id("T1", "0", "A|B|C")
+        assert _pattern_id("T2", "0", "A|B|C") != base
+        assert _pattern_id("T1", "1", "A|B|C") != base
+        assert _pattern_id("T1", "0", "C|B|A") != base
+
+    def test_missing_direction_defaults_to_zero(self):
+        """Empty/NaN direction_id is treated as direction 0."""
+        assert _pattern_id("T1", "", "A|B") == _pattern_id("T1", "0", "A|B")
+        assert _pattern_id("T1", float("nan"), "A|B") == _pattern_id("T1", "0", "A|B")
+
+    def test_stable_when_other_routes_added(self):
+        """Adding an unrelated route must not change existing pattern IDs."""
+        trips = [["t1", "R2", "S1", "", "0"]]
+        stop_times = [
+            ["t1", "08:00:00", "08:00:00", "A", "1"],
+            ["t1", "08:05:00", "08:05:00", "B", "2"],
+        ]
+        before = _extract_patterns(_make_data(trips, stop_times))
+
+        trips_more = [["t0", "R1", "S1", "", "0"]] + trips
+        stop_times_more = [
+            ["t0", "07:00:00", "07:00:00", "X", "1"],
+            ["t0", "07:05:00", "07:05:00", "Y", "2"],
+        ] + stop_times
+        after = _extract_patterns(_make_data(trips_more, stop_times_more))
+
+        before_id = before["trips"][0]["pattern_id"]
+        after_ids = {t["trip_id"]: t["pattern_id"] for t in after["trips"]}
+        assert after_ids["t1"] == before_id
+
+
+def _write_csv(path, header, rows):
+    path.write_text("\n".join([",".join(header)] + [",".join(r) for r in rows]) + "\n")
+
+
+def _write_feed(mode_path, trips_rows, stop_times_rows):
+    mode_path.mkdir(parents=True)
+    _write_csv(mode_path / "agency.txt", ["agency_id", "agency_name"], [["A1", "Agency"]])
+    _write_csv(
+        mode_path / "stops.txt",
+        ["stop_id", "stop_name", "stop_lat", "stop_lon", "location_type", "parent_station"],
+        [
+            ["A", "Stop A", "-33.87", "151.20", "0", ""],
+            ["B", "Stop B", "-33.88", "151.21", "0", ""],
+            ["C", "Stop C", "-33.89", "151.22", "0", ""],
+            ["Z", "Outside", "-35.50", "149.10", "0", ""],  # outside Sydney bbox
+        ]
+    )
+    _write_csv(mode_path / "routes.txt", ["route_id", "agency_id", "route_type"], [["R1", "A1", "2"], ["R2", "A1", "2"]])
+    _write_csv(mode_path / "trips.txt", ["trip_id", "route_id", "service_id", "trip_headsign", "direction_id"], trips_rows)
+    _write_csv(
+        mode_path / "stop_times.txt",
+        ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"],
+        stop_times_rows
+    )
+    _write_csv(mode_path / "calendar.txt", ["service_id", "monday"], [["S1", "1"]])
+
+
+def _zip_feed(mode_path, nested=False):
+    """Replace a mode directory's extracted files with gtfs.zip."""
+    with zipfile.ZipFile(mode_path / "gtfs.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in sorted(mode_path.glob("*.txt")):
+            zf.write(path, f"feed/{path.name}" if nested else path.name)
+            path.unlink()
+
+
+class TestStreamingStopTimes:
+    """Streaming stop_times aggregation must reproduce the in-memory pattern model."""
+
+    TRIPS = [
+        ["t1", "R1", "S1", "Central", "0"],
+        ["t2", "R1", "S1", "Central", "0"],
+        ["t3", "R1", "S1", "Central", ""],
+        ["t4", "R1", "S1", "", "0"],
+        ["t5", "R2", "S1", "Late", "1"],
+    ]
+    STOP_TIMES = [
+        # t1..t4 share A|B|C with different running times (even count → averaged median)
+        ["t1", "08:00:00", "08:00:00", "A", "1"],
+        ["t1", "08:04:00", "08:05:00", "B", "2"],
+        ["t1", "08:10:00", "08:10:00", "C", "3"],
+        ["t2", "09:00:00", "09:00:00", "A", "1"],
+        ["t2", "09:05:00", "09:06:00", "B", "2"],
+        ["t2", "09:11:00", "09:11:00", "C", "3"],
+        # t3 listed out of stop_sequence order within the trip
+        ["t3", "10:13:00", "10:13:00", "C", "3"],
+        ["t3", "10:00:00", "10:00:00", "A", "1"],
+        ["t3", "10:07:00", "10:07:00", "B", "2"],
+        ["t4", "11:00:00", "11:00:00", "Z", "0"],  # dropped by bbox filter
+        ["t4", "11:05:00", "11:05:00", "A", "1"],
+        ["t4", "11:09:00", "11:09:00", "B", "2"],
+        ["t4", "11:14:00", "11:15:00", "C", "3"],
+        # After-midnight trip on another route
+        ["t5", "24:50:00", "24:50:00", "C", "1"],
+        ["t5", "25:02:00", "25:02:00", "A", "2"],
+        # Trip only outside Sydney, and a trip missing from trips.txt
+        ["t6", "12:00:00", "12:00:00", "Z", "1"],
+        ["t7", "12:00:00", "12:00:00", "A", "1"],
+    ]
+
+    def _parse_both(self, tmp_path, monkeypatch, stop_times_rows, chunk_rows):
+        _write_feed(tmp_path / "sydneytrains", self.TRIPS, stop_times_rows)
+        in_memory = parse_gtfs(str(tmp_path), streaming=False)
+        monkeypatch.setattr(settings, "GTFS_STOP_TIMES_CHUNK_ROWS", chunk_rows)
+        streamed = parse_gtfs(str(tmp_path), streaming=True)
+        return in_memory, streamed
+
+    def test_matches_in_memory(self, tmp_path, monkeypatch):
+        # 2-row chunks split every trip across reads
+        in_memory, streamed = self._parse_both(tmp_path, monkeypatch, self.STOP_TIMES, chunk_rows=2)
+
+        for table in ("patterns", "pattern_stops", "trips", "stops", "routes", "calendar"):
+            assert streamed[table] == in_memory[table], table
+
+        offsets = {(r["stop_id"], r["stop_sequence"]): r for r in streamed["pattern_stops"]}
+        assert offsets[("B", 2)]["departure_offset_secs"] == 330  # median of 240, 300, 360, 420
+        assert any(t["start_time_secs"] == 24 * 3600 + 50 * 60 for t in streamed["trips"])
+
+    def test_ungrouped_file_falls_back(self, tmp_path, monkeypatch):
+        ungrouped = self.STOP_TIMES[:3] + self.STOP_TIMES[3:6][::-1] + [self.STOP_TIMES[0]] + self.STOP_TIMES[6:]
+        ungrouped[6] = ["t1", "08:15:00", "08:15:00", "A", "4"]  # t1 resumes after t2
+
+        in_memory, streamed = self._parse_both(tmp_path, monkeypatch, ungrouped, chunk_rows=4)
+
+        assert streamed["pattern_stops"] == in_memory["pattern_stops"]
+        assert streamed["trips"] == in_memory["trips"]
+
+
+class TestZipFeeds:
+    """Feeds are read straight from gtfs.zip with CRC checks."""
+
+    def test_zip_matches_extracted(self, tmp_path):
+        trips, stop_times = TestStreamingStopTimes.TRIPS, TestStreamingStopTimes.STOP_TIMES
+        _write_feed(tmp_path / "extracted" / "sydneytrains", trips, stop_times)
+        _write_feed(tmp_path / "zipped" / "sydneytrains", trips, stop_times)
+        _zip_feed(tmp_path / "zipped" / "sydneytrains", nested=True)
+
+        expected = parse_gtfs(str(tmp_path / "extracted"), streaming=False)
+        for streaming in (False, True):
+            result = parse_gtfs(str(tmp_path / "zipped"), streaming=streaming)
+            for table in ("patterns", "pattern_stops", "trips", "stops", "routes", "calendar"):
+                assert result[table] == expected[table], (streaming, table)
+
+    def test_corrupt_member_fails_crc(self, tmp_path):
+        mode_path = tmp_path / "sydneytrains"
+        _write_feed(mode_path, TestStreamingStopTimes.TRIPS, TestStreamingStopTimes.STOP_TIMES)
+        with zipfile.ZipFile(mode_path / "gtfs.zip", "w", zipfile.ZIP_STORED) as zf:
+            for path in sorted(mode_path.glob("*.txt")):
+                zf.write(path, path.name)
+                path.unlink()
+
+        # Flip one byte of the (stored) trips.txt payload, leaving the headers intact
+        data = bytearray((mode_path / "gtfs.zip").read_bytes())
+        with zipfile.ZipFile(mode_path / "gtfs.zip") as zf:
+            info = zf.getinfo("trips.txt")
+        offset = info.header_offset + 30 + len(info.filename) + len(info.extra) + 20
+        data[offset] = ord("X") if data[offset] != ord("X") else ord("Y")
+        (mode_path / "gtfs.zip").write_bytes(bytes(data))
+
+        with pytest.raises(zipfile.BadZipFile):
+            parse_gtfs(str(tmp_path), streaming=False)
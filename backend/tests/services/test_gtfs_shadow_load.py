@@ -0,0 +1,273 @@
+"""Unit tests for the shadow load in gtfs_static_sync.py - staging, swap, resume, rollback."""
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.config import settings
+from app.services.gtfs_checkpoint import SyncCheckpoint
+from app.tasks import gtfs_static_sync
+from app.tasks.gtfs_static_sync import LOAD_ORDER, _load_to_shadow, archives_to_prune, load_gtfs_static
+
+FEEDS = {"sydneytrains": "aa" * 32}
+
+
+def _data():
+    return {
+        "agencies": [{"agency_id": "A1", "agency_name": "Transport", "agency_url": "https://x", "agency_timezone": "Australia/Sydney"}],
+        "routes": [{"route_id": "T1", "agency_id": "A1", "route_short_name": "T1", "route_type": 2}],
+        "stops": [{"stop_id": f"S{i}", "stop_name": f"Stop {i}", "stop_lat": -33.8, "stop_lon": 151.2} for i in range(3)],
+        "calendar": [{"service_id": "WD", "monday": 1, "start_date": "20250101", "end_date": "20251231"}],
+        "calendar_dates": [{"service_id": "WD", "date": "20250126", "exception_type": 2}],
+        "patterns": [{"pattern_id": "P1", "route_id": "T1", "direction_id": 0}],
+        "pattern_stops": [
+            {"pattern_id": "P1", "stop_sequence": i, "stop_id": f"S{i}", "arrival_offset_secs": 60 * i, "departure_offset_secs": 60 * i}
+            for i in range(3)
+        ],
+        "trips": [
+            {"trip_id": f"t{i}", "route_id": "T1", "service_id": "WD", "pattern_id": "P1", "start_time_secs": 60 * i}
+            for i in range(300)
+        ],
+    }
+
+
+class _FakeResponse:
+    def __init__(self, data=None):
+        self.data = data
+
+
+class _FakeQuery:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self):
+        return _FakeResponse(self._run())
+
+
+class _FakeTable:
+    def __init__(self, db, schema, name):
+        self.db = db
+        self.schema = schema
+        self.name = name
+
+    def insert(self, rows):
+        return _FakeQuery(lambda: self.db.write(self.schema, self.name, rows, "insert"))
+
+    def upsert(self, rows):
+        return _FakeQuery(lambda: self.db.write(self.schema, self.name, rows, "upsert"))
+
+
+class _FakeClient:
+    def __init__(self, db, schema):
+        self.db = db
+        self.schema = schema
+
+    def table(self, name):
+        return _FakeTable(self.db, self.schema, name)
+
+    def rpc(self, name, params):
+        return _FakeQuery(lambda: self.db.rpc(name, params))
+
+
+class _FakeDatabase:
+    """Live + gtfs_staging stand-in recording writes and RPCs in call order."""
+
+    def __init__(self):
+        self.calls = []
+        self.params = {}
+        self.staging = {}
+        self.live_writes = []
+        self.archives = ["gtfs_archive_20250101000000"]
+        self.fail_on_trip = None
+        self.count_overrides = {}
+
+    def write(self, schema, table, rows, op):
+        if schema == gtfs_static_sync.STAGING_SCHEMA:
+            if self.fail_on_trip is not None and any(r.get("trip_id") == self.fail_on_trip for r in rows):
+                raise APIError({"code": "XX000", "message": "worker killed"})
+            self.staging.setdefault(table, []).extend(rows)
+        else:
+            self.live_writes.append(table)
+        self.calls.append(f"{op}:{table}")
+
+    def rpc(self, name, params):
+        self.calls.append(name)
+        self.params[name] = params
+        if name == "gtfs_staging_prepare":
+            self.staging = {}
+            return {"schema": "gtfs_staging"}
+        if name == "gtfs_staging_truncate":
+            self.staging[params["p_table"]] = []
+            return {}
+        if name == "gtfs_staging_validate":
+            counts = {table: len(rows) for table, rows in self.staging.items()}
+            counts.update(self.count_overrides)
+            return {"counts": counts, "null_locations": 0, "orphan_trips": 0,
+                    "orphan_pattern_stops": 0, "patterns_without_stops": 0}
+        if name == "gtfs_staging_swap":
+            schema = "gtfs_archive_" + params["p_archive_label"]
+            self.archives.append(schema)
+            return {"archive_schema": schema}
+        if name == "gtfs_list_archives":
+            return sorted(self.archives, reverse=True)
+        if name == "gtfs_drop_archives":
+            self.archives = [a for a in self.archives if a not in params["p_schemas"]]
+            return {"dropped": params["p_schemas"]}
+        if name == "gtfs_rollback":
+            return {"restored_from": "gtfs_archive_" + params["p_archive_label"]}
+        return {}
+
+    def call_order(self):
+        """calls with consecutive repeats (one per batch) collapsed."""
+        return [c for i, c in enumerate(self.calls) if i == 0 or self.calls[i - 1] != c]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = _FakeDatabase()
+    monkeypatch.setattr(gtfs_static_sync, "get_supabase", lambda: _FakeClient(db, "public"))
+    monkeypatch.setattr(gtfs_static_sync, "get_supabase_staging", lambda: _FakeClient(db, gtfs_static_sync.STAGING_SCHEMA))
+    monkeypatch.setattr(gtfs_static_sync, "BATCH_SIZE", 100)
+    monkeypatch.setattr(gtfs_static_sync.time, "sleep", lambda _s: None)
+    monkeypatch.setattr(settings, "GTFS_LOADER_BACKEND", "postgrest")
+    monkeypatch.setattr(settings, "GTFS_LOAD_PARALLELISM", 1)
+    monkeypatch.setattr(settings, "GTFS_SHADOW_DEFER_INDEXES", True)
+    monkeypatch.setattr(settings, "GTFS_FREQUENCY_COMPRESSION", False)
+    return db
+
+
+@pytest.fixture
+def pipeline(db, monkeypatch):
+    """load_gtfs_static with download/parse/snapshot/bundle stubbed out (shadow mode)."""
+    data = _data()
+    monkeypatch.setattr(gtfs_static_sync, "fetch_gtfs_feeds", lambda _dir: {
+        "mode_dirs": {}, "changed_modes": [], "unchanged_modes": [], "bytes_downloaded": 0, "manifest": {}
+    })
+    monkeypatch.setattr(gtfs_static_sync, "feed_hashes", lambda _manifest: FEEDS)
+    monkeypatch.setattr(gtfs_static_sync, "load_snapshot", lambda: None)
+    monkeypatch.setattr(gtfs_static_sync, "save_snapshot", lambda *args, **kwargs: None)
+    monkeypatch.setattr(gtfs_static_sync, "parse_gtfs", lambda _dir: data)
+    monkeypatch.setattr(gtfs_static_sync, "_create_metadata", lambda _data: {"feed_version": "v1"})
+    monkeypatch.setattr(settings, "GTFS_SYNC_CHECKPOINTS", False)
+    monkeypatch.setattr(settings, "GTFS_IOS_DB_IN_SYNC", False)
+    monkeypatch.setattr(settings, "GTFS_ARCHIVE_KEEP", 1)
+
+    def run(validate):
+        monkeypatch.setattr(gtfs_static_sync, "_validate_load", validate)
+        return load_gtfs_static(shadow=True, profile_capture="off", force=True)
+    return run
+
+
+def _passed(_data, _counts):
+    return {"passed": True, "issues": []}
+
+
+class TestShadowLoad:
+    """Test the staging → validate → swap sequence and its failure paths."""
+
+    def test_rpc_order(self, db, pipeline):
+        result = pipeline(_passed)
+
+        archive = result["shadow"]["archive_schema"]
+        assert db.call_order() == [
+            "gtfs_staging_prepare",
+            *[f"insert:{table}" for table in LOAD_ORDER],
+            "gtfs_staging_build_indexes",
+            "gtfs_staging_validate",
+            "gtfs_staging_swap",
+            "upsert:gtfs_metadata",
+            "gtfs_list_archives",
+            "gtfs_drop_archives",
+        ]
+        assert db.live_writes == ["gtfs_metadata"]
+        assert result["shadow"]["archives_pruned"] == ["gtfs_archive_20250101000000"]
+        assert db.archives == [archive]
+        assert result["counts"]["trips"] == 300
+
+    def test_live_validation_failure_rolls_back_swap(self, db, pipeline):
+        def failed(_data, _counts):
+            raise ValueError("GTFS validation failed: Too few stops")
+
+        with pytest.raises(ValueError, match="Too few stops"):
+            pipeline(failed)
+
+        assert db.call_order()[-3:] == ["gtfs_staging_swap", "upsert:gtfs_metadata", "gtfs_rollback"]
+        assert db.params["gtfs_rollback"] == {"p_archive_label": db.params["gtfs_staging_swap"]["p_archive_label"]}
+        assert "gtfs_list_archives" not in db.calls
+
+    def test_staging_count_mismatch_leaves_live_untouched(self, db):
+        db.count_overrides = {"stops": 2}
+
+        with pytest.raises(ValueError, match="staging stops: expected 3, found 2"):
+            _load_to_shadow(_data())
+
+        assert "gtfs_staging_swap" not in db.calls
+        assert db.live_writes == []
+        assert db.call_order()[-1] == "gtfs_staging_validate"
+
+    def test_resume_after_swap_writes_nothing(self, db, tmp_path):
+        shadow_info = {
+            "archive_label": "20250102000000",
+            "archive_schema": "gtfs_archive_20250102000000",
+            "index_build_ms": 5,
+            "swap_ms": 1,
+            "staging_validation": {"counts": {table: len(rows) for table, rows in _data().items()}},
+        }
+        checkpoint = SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path)
+        checkpoint.complete_stage("staging_swap", shadow_info=shadow_info)
+
+        counts, reports, hashes, info = _load_to_shadow(_data(), SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path))
+
+        assert info == shadow_info
+        assert db.calls == []
+        assert counts["trips"] == 300 and counts["stops"] == 3
+        assert all(report["rows_written"] == 0 for report in reports.values())
+        assert set(hashes) == set(LOAD_ORDER)
+
+    def test_interrupted_table_is_truncated_and_reloaded(self, db, tmp_path):
+        db.fail_on_trip = "t250"
+        with pytest.raises(Exception, match="worker killed"):
+            _load_to_shadow(_data(), SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path))
+        assert 0 < len(db.staging["trips"]) < 300
+
+        db.fail_on_trip = None
+        db.calls = []
+        counts, _reports, _hashes, info = _load_to_shadow(_data(), SyncCheckpoint.open(FEEDS, "shadow", root=tmp_path))
+
+        assert db.call_order() == [
+            "gtfs_staging_truncate",
+            "insert:trips",
+            "gtfs_staging_build_indexes",
+            "gtfs_staging_validate",
+            "gtfs_staging_swap",
+        ]
+        assert sorted(r["trip_id"] for r in db.staging["trips"]) == sorted(f"t{i}" for i in range(300))
+        assert counts["trips"] == 300
+        assert info["archive_schema"].startswith("gtfs_archive_")
+
+
+class TestArchivesToPrune:
+    """Test archive ranking: newest swap archives plus the newest rollback archive."""
+
+    def test_keeps_newest_swaps_and_one_rollback(self):
+        archives = [
+            "gtfs_archive_rollback_20250105000000",
+            "gtfs_archive_rollback_20250103000000",
+            "gtfs_archive_20250106000000",
+            "gtfs_archive_20250104000000",
+            "gtfs_archive_20250102000000",
+            "gtfs_archive_20250101000000",
+        ]
+
+        assert archives_to_prune(archives, keep=2) == [
+            "gtfs_archive_20250101000000",
+            "gtfs_archive_20250102000000",
+            "gtfs_archive_rollback_20250103000000",
+        ]
+
+    def test_unlabelled_archives_rank_oldest(self):
+        archives = ["gtfs_archive_manual", "gtfs_archive_20250101000000", "gtfs_archive_20250102000000"]
+
+        assert archives_to_prune(archives, keep=2) == ["gtfs_archive_manual"]
+        assert archives_to_prune(archives, keep=0) == [
+            "gtfs_archive_manual", "gtfs_archive_20250101000000", "gtfs_archive_20250102000000"
+        ]
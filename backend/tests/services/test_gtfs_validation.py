@@ -0,0 +1,132 @@
+"""Unit tests for gtfs_validation.py - single-pass post-load validation."""
+
+import pytest
+
+from app.services import gtfs_validation
+from app.services.gtfs_validation import CHECK_ORDER, validate_dataset, validate_loaded_db
+
+
+def _dataset():
+    """Small dataset passing every check (thresholds lowered by the fixture)."""
+    stops = [
+        {"stop_id": "S1", "stop_name": "Central Station"},
+        {"stop_id": "S2", "stop_name": "Central Grand Concourse Light Rail"},
+        {"stop_id": "S3", "stop_name": "Central Station, Platform 26"},
+        {"stop_id": "S4", "stop_name": "Davistown, Central RSL Wharf"},
+        {"stop_id": "L1", "stop_name": "Central Grand Concourse Light Rail Platform 1"},
+    ]
+    routes = [
+        {"route_id": "T1", "route_type": "2"},
+        {"route_id": "B1", "route_type": "700"},
+        {"route_id": "F1", "route_type": "4"},
+        {"route_id": "L1", "route_type": "900"},
+        {"route_id": "M1", "route_type": "401"},
+    ]
+    patterns = [{"pattern_id": "PL", "route_id": "L1"}, {"pattern_id": "PT", "route_id": "T1"}]
+    pattern_stops = [
+        {"pattern_id": "PL", "stop_id": "S2"},
+        {"pattern_id": "PL", "stop_id": "L1"},
+        {"pattern_id": "PT", "stop_id": "S3"},
+    ]
+    trips = [{"trip_id": "t1", "route_id": "L1"}, {"trip_id": "t2", "route_id": "T1"}]
+    return {"stops": stops, "routes": routes, "patterns": patterns, "pattern_stops": pattern_stops, "trips": trips}
+
+
+def _counts(data):
+    return {table: len(rows) for table, rows in data.items()}
+
+
+@pytest.fixture(autouse=True)
+def small_thresholds(monkeypatch):
+    monkeypatch.setattr(gtfs_validation, "MIN_STOPS", 5)
+    monkeypatch.setattr(gtfs_validation, "MIN_ROUTES", 5)
+    monkeypatch.setattr(gtfs_validation, "MIN_LIGHT_RAIL_ROUTES", 1)
+    monkeypatch.setattr(gtfs_validation, "MIN_LIGHT_RAIL_TRIPS", 1)
+    monkeypatch.setattr(gtfs_validation, "MIN_LIGHT_RAIL_STOPS", 2)
+    monkeypatch.setattr(gtfs_validation, "LIGHT_RAIL_CONTAMINATION_TOLERANCE", 0)
+
+
+def _flatten(result):
+    return [issue for check in CHECK_ORDER for issue in result["issues"].get(check, [])]
+
+
+class TestValidateDataset:
+    def test_passing_dataset(self):
+        data = _dataset()
+        result = validate_dataset(data, _counts(data))
+
+        assert _flatten(result) == []
+        assert result["light_rail"] == {"routes": 1, "trips": 1, "stops": 2}
+
+    def test_issues_in_check_order(self):
+        data = _dataset()
+        data["routes"] = [r for r in data["routes"] if r["route_id"] != "F1"]
+        data["stops"] = [s for s in data["stops"] if s["stop_id"] != "S4"]
+        # Train platform in a light rail pattern
+        data["pattern_stops"].append({"pattern_id": "PL", "stop_id": "S3"})
+        counts = dict(_counts(data), trips=1)
+
+        issues = _flatten(validate_dataset(data, counts))
+
+        assert issues == [
+            "trips: expected 2, loaded 1",
+            "Too few stops: 4 < 5",
+            "Too few routes: 4 < 5",
+            "Missing routes for expected mode ferry (types [4])",
+            "Light rail patterns contaminated with 1 train platforms",
+            "Critical stop missing: Davistown, Central RSL Wharf (no explicit stop_id)",
+        ]
+
+    def test_light_rail_coverage(self):
+        data = _dataset()
+        data["pattern_stops"] = [ps for ps in data["pattern_stops"] if ps["stop_id"] != "L1"]
+        issues = _flatten(validate_dataset(data, _counts(data)))
+        assert issues == ["Light rail stops too low: 1 < 2"]
+
+
+class _FakeRpc:
+    def __init__(self, data, error=None):
+        self.data = data
+        self.error = error
+
+    def execute(self):
+        if self.error:
+            raise self.error
+        return self
+
+
+class _FakeSupabase:
+    def __init__(self, stats=None, error=None):
+        self.stats = stats
+        self.error = error
+        self.rpc_calls = []
+
+    def rpc(self, name, params):
+        self.rpc_calls.append(name)
+        return _FakeRpc(self.stats, self.error)
+
+
+class TestValidateLoadedDb:
+    def test_single_rpc(self):
+        client = _FakeSupabase({"stops_count": 4, "null_locations": 2, "null_location_examples": ["S1", "S2"]})
+
+        result = validate_loaded_db(client, expected_stops=5)
+
+        assert client.rpc_calls == ["gtfs_validate_load"]
+        assert result["issues"] == {
+            "stops_count": ["DB stops count too low: 4 < 5"],
+            "null_locations": ["Found 2 stops with NULL location (trigger failed)"],
+        }
+        assert result["db_stops_count"] == 4
+
+    def test_rpc_unavailable_falls_back(self, monkeypatch):
+        client = _FakeSupabase(error=RuntimeError("function gtfs_validate_load does not exist"))
+        monkeypatch.setattr(
+            gtfs_validation, "_validate_loaded_db_queries",
+            lambda supabase, expected: {"issues": {"stops_count": [], "null_locations": []},
+                                        "db_stops_count": expected, "null_locations": 0}
+        )
+
+        result = validate_loaded_db(client, expected_stops=5)
+
+        assert result["db_stops_count"] == 5
@@ -0,0 +1,156 @@
+"""Unit tests for ios_db_delta.py - row-level deltas between gtfs.db versions."""
+
+import random
+import shutil
+import sqlite3
+from unittest import mock
+
+import pytest
+
+from app.services import ios_db_generator
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_delta import DeltaUnavailable, apply_delta, build_delta, publish_bundle, resolve_update
+from app.services.ios_db_generator import generate_ios_db
+from app.services.ios_db_variants import read_manifest
+from benchmarks.bundle_delta import bundle_differences, edit_feed, run_bundle_delta_benchmark
+from benchmarks.synthetic_gtfs import generate_feed
+
+
+@pytest.fixture
+def feeds(tmp_path):
+    generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=3)
+    data = parse_gtfs(str(tmp_path / "gtfs"))
+    edited, _changes = edit_feed(data, random.Random(3), change_pct=5.0)
+    return data, edited
+
+
+@pytest.fixture(autouse=True)
+def _small_bundles():
+    with mock.patch.object(ios_db_generator, "MIN_IOS_DB_SIZE_MB", 0):
+        yield
+
+
+def _sids(path):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT stop_id, sid FROM dict_stop"))
+    finally:
+        conn.close()
+
+
+class TestPublishAndApply:
+    """Test archiving versions and applying their deltas."""
+
+    def test_delta_turns_old_bundle_into_new(self, tmp_path, feeds):
+        data, edited = feeds
+        bundle, versions = str(tmp_path / "gtfs.db"), tmp_path / "versions"
+
+        generate_ios_db(bundle, data=data, metadata={}, bundle_version="20250101000000000000")
+        publish_bundle(bundle, versions, keep=3)
+        shutil.copy2(bundle, tmp_path / "client.db")
+        generate_ios_db(bundle, data=edited, metadata={}, bundle_version="20250102000000000000")
+        published = publish_bundle(bundle, versions, keep=3)
+
+        assert published["deltas"]["20250101000000000000"] > 0
+        assert read_manifest(bundle)["identity"]["sha256"] == published["sha256"]
+        update = resolve_update("20250101000000000000", bundle, versions, max_ratio=1.0)
+        assert update["kind"] == "delta"
+
+        applied = apply_delta(str(tmp_path / "client.db"), update["path"])
+
+        assert applied["version"] == "20250102000000000000"
+        assert bundle_differences(str(tmp_path / "client.db"), bundle) == {}
+
+    def test_search_finds_new_and_renamed_stops_after_apply(self, tmp_path, feeds):
+        data, edited = feeds
+        bundle = str(tmp_path / "gtfs.db")
+        generate_ios_db(bundle, data=data, metadata={}, bundle_version="a")
+        shutil.copy2(bundle, tmp_path / "client.db")
+        generate_ios_db(bundle, data=edited, metadata={}, bundle_version="b")
+        build_delta(str(tmp_path / "client.db"), bundle, str(tmp_path / "a_b.db"))
+
+        apply_delta(str(tmp_path / "client.db"), str(tmp_path / "a_b.db"))
+
+        conn = sqlite3.connect(str(tmp_path / "client.db"))
+        try:
+            def search(term):
+                return {
+                    row[0] for row in conn.execute(
+                        "SELECT d.stop_id FROM stops_fts JOIN stops s ON stops_fts.rowid = s.rowid "
+                        "JOIN dict_stop d ON d.sid = s.sid WHERE stops_fts MATCH ?",
+                        (term,)
+                    )
+                }
+
+            assert "NEW_STOP_1" in search('"new stop"')
+            renamed = {stop["stop_id"] for stop in edited["stops"] if stop["stop_name"].endswith(" Interchange")}
+            assert renamed and renamed <= search("interchange")
+        finally:
+            conn.close()
+
+    def test_dictionary_ids_kept_across_versions(self, tmp_path, feeds):
+        data, edited = feeds
+        bundle = str(tmp_path / "gtfs.db")
+
+        generate_ios_db(bundle, data=data, metadata={})
+        before = _sids(bundle)
+        generate_ios_db(bundle, data=edited, metadata={})
+        after = _sids(bundle)
+
+        assert all(after[stop_id] == sid for stop_id, sid in before.items())
+        assert after["NEW_STOP_1"] == max(before.values()) + 1
+
+    def test_delta_rejected_for_other_version(self, tmp_path, feeds):
+        data, edited = feeds
+        generate_ios_db(str(tmp_path / "a.db"), data=data, metadata={}, bundle_version="a")
+        generate_ios_db(str(tmp_path / "b.db"), data=edited, metadata={}, bundle_version="b")
+        build_delta(str(tmp_path / "a.db"), str(tmp_path / "b.db"), str(tmp_path / "a_b.db"))
+
+        with pytest.raises(DeltaUnavailable):
+            apply_delta(str(tmp_path / "b.db"), str(tmp_path / "a_b.db"))
+
+    def test_old_versions_pruned(self, tmp_path, feeds):
+        data, _edited = feeds
+        bundle, versions = str(tmp_path / "gtfs.db"), tmp_path / "versions"
+        for day in range(1, 4):
+            generate_ios_db(bundle, data=data, metadata={}, bundle_version=f"2025010{day}")
+            published = publish_bundle(bundle, versions, keep=2)
+
+        assert published["pruned"] == ["20250101"]
+        assert sorted(p.stem for p in versions.glob("*.db")) == ["20250102", "20250103"]
+
+
+class TestResolveUpdate:
+    """Test the /gtfs/delta fallback decisions."""
+
+    @pytest.fixture
+    def published(self, tmp_path, feeds):
+        data, edited = feeds
+        bundle, versions = str(tmp_path / "gtfs.db"), tmp_path / "versions"
+        generate_ios_db(bundle, data=data, metadata={}, bundle_version="v1")
+        publish_bundle(bundle, versions)
+        generate_ios_db(bundle, data=edited, metadata={}, bundle_version="v2")
+        publish_bundle(bundle, versions)
+        return bundle, versions
+
+    def test_current_version(self, published):
+        assert resolve_update("v2", *published)["kind"] == "current"
+
+    def test_unknown_version_gets_full_bundle(self, published):
+        update = resolve_update("v0", *published)
+        assert (update["kind"], update["reason"]) == ("full", "no_delta")
+
+    def test_large_delta_gets_full_bundle(self, published):
+        update = resolve_update("v1", *published, max_ratio=0.0001)
+        assert (update["kind"], update["reason"]) == ("full", "delta_too_large")
+
+
+class TestBundleDeltaBenchmark:
+    """Test the delta size/apply benchmark."""
+
+    def test_reports_sizes(self):
+        result = run_bundle_delta_benchmark(scale="tiny")
+
+        assert result["delta"]["gzip_bytes"] < result["full"]["gzip_bytes"]
+        assert result["delta"]["gzip_bytes"] <= result["unstable_ids"]["gzip_bytes"]
+        assert "trip_data" in result["delta"]["tables"]
@@ -0,0 +1,307 @@
+"""Unit tests for ios_db_generator.py - bundle generation from Supabase or parse output."""
+
+import sqlite3
+
+import pytest
+
+from app.services.gtfs_service import parse_gtfs
+from app.services import ios_db_generator
+from app.services.ios_db_generator import (
+    StreamedRows, _executemany, _fetch_supabase_data, _iso_date, _pack_calendar_days, _value,
+    generate_ios_db, stops_within_radius
+)
+from app.utils.profiling import PipelineProfiler
+from benchmarks.nearby_stops import scan_within_radius
+from benchmarks.offline_departures import join_departures, table_departures
+from app.tasks.gtfs_static_sync import _create_metadata, _load_to_supabase
+from benchmarks.local_supabase import LocalSupabase
+from benchmarks.pipeline import _local_backends
+from benchmarks.synthetic_gtfs import generate_feed
+
+# Bundle contents keyed by text IDs (integer dictionary IDs depend on row order)
+CONTENT_QUERIES = {
+    "stops": """
+        SELECT d.stop_id, s.stop_code, s.stop_name, s.stop_desc, s.stop_lat, s.stop_lon,
+               s.location_type, s.parent_station, s.wheelchair_boarding, s.platform_code
+        FROM stops s JOIN dict_stop d ON d.sid = s.sid
+    """,
+    "routes": """
+        SELECT d.route_id, r.route_short_name, r.route_long_name, r.route_type, r.route_color, r.route_text_color
+        FROM routes r JOIN dict_route d ON d.rid = r.rid
+    """,
+    "pattern_stops": """
+        SELECT dp.pattern_id, ps.stop_sequence, ds.stop_id, ps.arrival_offset_secs, ps.departure_offset_secs
+        FROM pattern_stops ps JOIN dict_pattern dp ON dp.pid = ps.pid JOIN dict_stop ds ON ds.sid = ps.sid
+    """,
+    "trips": """
+        SELECT t.trip_id, dr.route_id, t.service_id, dp.pattern_id, t.trip_headsign, t.trip_short_name,
+               t.direction_id, t.block_id, t.wheelchair_accessible, t.start_time_secs
+        FROM trips t JOIN dict_route dr ON dr.rid = t.rid JOIN dict_pattern dp ON dp.pid = t.pid
+    """,
+    "calendar": "SELECT service_id, days, start_date, end_date FROM calendar",
+    "calendar_dates": "SELECT service_id, date, exception_type FROM calendar_dates",
+    "metadata": "SELECT key, value FROM metadata WHERE key != 'bundle_version'",
+}
+
+
+def _contents(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {name: sorted(conn.execute(sql).fetchall(), key=repr) for name, sql in CONTENT_QUERIES.items()}
+    finally:
+        conn.close()
+
+
+class TestGenerateFromParseOutput:
+    """Test that the parse-output path builds the same bundle as the Supabase path."""
+
+    @pytest.fixture
+    def parsed(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=5)
+        return parse_gtfs(str(tmp_path / "gtfs"))
+
+    def test_same_bundle_as_supabase_path(self, tmp_path, parsed):
+        supabase = LocalSupabase()
+        metadata = _create_metadata(parsed)
+        with _local_backends(supabase):
+            _load_to_supabase(parsed)
+            supabase.table("gtfs_metadata").upsert([metadata]).execute()
+            from_supabase = generate_ios_db(str(tmp_path / "supabase.db"))
+            requests_before = supabase.requests
+            from_parse = generate_ios_db(str(tmp_path / "parse.db"), data=parsed, metadata=metadata)
+
+        assert supabase.requests == requests_before
+        assert from_parse["row_counts"] == from_supabase["row_counts"]
+        assert _contents(tmp_path / "parse.db") == _contents(tmp_path / "supabase.db")
+
+    def test_frequency_blocks_expanded(self, tmp_path, parsed):
+        compressed = parse_gtfs(str(tmp_path / "gtfs"), frequency_compression=True)
+        assert compressed["trip_frequencies"]
+
+        with _local_backends(LocalSupabase()):
+            plain = generate_ios_db(str(tmp_path / "plain.db"), data=parsed, metadata={})
+            blocks = generate_ios_db(str(tmp_path / "blocks.db"), data=compressed, metadata={})
+
+        assert blocks["row_counts"]["trips"] == plain["row_counts"]["trips"]
+        assert _contents(tmp_path / "blocks.db")["trips"] == _contents(tmp_path / "plain.db")["trips"]
+
+
+class TestDictionaryEncoding:
+    """Test trips and calendar are integer-encoded behind text-keyed views."""
+
+    @pytest.fixture
+    def parsed(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=11)
+        return parse_gtfs(str(tmp_path / "gtfs"))
+
+    def test_services_shared_and_trips_clustered(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            result = generate_ios_db(path, data=parsed, metadata={})
+
+        conn = sqlite3.connect(path)
+        try:
+            text_columns = conn.execute(
+                "SELECT COUNT(*) FROM pragma_table_info('trip_data') WHERE type = 'TEXT' AND name != 'trip_short_name'"
+            ).fetchone()[0]
+            assert text_columns == 0
+            orphans = conn.execute(
+                "SELECT COUNT(*) FROM trip_data t LEFT JOIN dict_service ds ON ds.svc = t.svc WHERE ds.svc IS NULL"
+            ).fetchone()[0]
+            assert orphans == 0
+            assert conn.execute(
+                "SELECT COUNT(*) FROM calendar_data c JOIN dict_service ds ON ds.svc = c.svc"
+            ).fetchone()[0] == result["row_counts"]["calendar"]
+            pids = [row[0] for row in conn.execute("SELECT pid FROM trip_data ORDER BY tid")]
+            assert pids == sorted(pids)
+            starts = dict(conn.execute("SELECT trip_id, start_time_secs FROM trips"))
+        finally:
+            conn.close()
+
+        assert starts == {t["trip_id"]: int(t["start_time_secs"]) for t in parsed["trips"]}
+        assert result["row_counts"]["dict_trip"] == result["row_counts"]["trips"]
+        assert result["validation"]["table_bytes"]["trip_data"] > 0
+        assert "stops_fts_data" not in result["validation"]["table_bytes"]
+
+    def test_dictionaries_kept_across_regeneration(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            generate_ios_db(path, data=parsed, metadata={})
+            first = _dictionary(path, "SELECT headsign, hid FROM dict_headsign")
+            parsed["trips"] = [{**t, "trip_headsign": "Depot"} for t in parsed["trips"][:5]] + parsed["trips"][5:]
+            generate_ios_db(path, data=parsed, metadata={})
+            second = _dictionary(path, "SELECT headsign, hid FROM dict_headsign")
+
+        assert all(second[h] == first[h] for h in set(first) & set(second))
+        assert second["Depot"] > max(first.values())
+
+
+class TestStopDepartures:
+    """Test the optional stop_departures table answers like the join query."""
+
+    @pytest.fixture
+    def parsed(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=7)
+        return parse_gtfs(str(tmp_path / "gtfs"))
+
+    def test_same_departures_as_join(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            result = generate_ios_db(path, data=parsed, metadata={}, stop_departures=True)
+
+        assert result["row_counts"]["dict_trip"] == result["row_counts"]["trips"]
+        assert result["departures"] > result["row_counts"]["stop_departures"] > 0
+        conn = sqlite3.connect(path)
+        try:
+            sids = [row[0] for row in conn.execute("SELECT DISTINCT sid FROM pattern_stops")]
+            for sid in sids[:10]:
+                for weekday in (0, 5, 6):
+                    query = (sid, weekday, 6 * 3600, 10 * 3600, 1000)
+                    expected = join_departures(conn, *query)
+                    assert table_departures(conn, *query) == expected
+        finally:
+            conn.close()
+
+    def test_trip_ids_kept_across_regeneration(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            generate_ios_db(path, data=parsed, metadata={}, stop_departures=True)
+            first = _dictionary(path, "SELECT trip_id, tid FROM dict_trip")
+            parsed["trips"] = parsed["trips"][1:] + [{**parsed["trips"][0], "trip_id": "NEW_TRIP"}]
+            generate_ios_db(path, data=parsed, metadata={}, stop_departures=True)
+            second = _dictionary(path, "SELECT trip_id, tid FROM dict_trip")
+
+        kept = set(first) & set(second)
+        assert all(first[trip_id] == second[trip_id] for trip_id in kept)
+        assert second["NEW_TRIP"] > max(first.values())
+
+    def test_disabled_by_default(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            result = generate_ios_db(path, data=parsed, metadata={})
+
+        assert "stop_departures" not in result["row_counts"]
+        conn = sqlite3.connect(path)
+        try:
+            assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'stop_departures'").fetchone()
+        finally:
+            conn.close()
+
+
+class TestStreamingGeneration:
+    """Test tables are streamed through chunked inserts, one logged stage per table."""
+
+    @pytest.fixture
+    def parsed(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=13)
+        return parse_gtfs(str(tmp_path / "gtfs"))
+
+    def test_executemany_in_chunks(self):
+        chunks = []
+
+        class _CountingConnection(sqlite3.Connection):
+            def executemany(self, sql, rows):
+                chunks.append(len(rows))
+                return super().executemany(sql, rows)
+
+        conn = sqlite3.connect(":memory:", factory=_CountingConnection)
+        conn.execute("CREATE TABLE t (n INTEGER)")
+        assert _executemany(conn, "INSERT INTO t VALUES (?)", ((n,) for n in range(10)), chunk_rows=4) == 10
+        assert chunks == [4, 4, 2]
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 10
+
+    def test_supabase_tables_streamed(self, parsed):
+        supabase = LocalSupabase()
+        with _local_backends(supabase):
+            _load_to_supabase(parsed)
+            requests_before = supabase.requests
+            data = _fetch_supabase_data()
+            # Nothing is read until a table is iterated
+            assert supabase.requests == requests_before + 1  # gtfs_metadata
+            assert all(isinstance(data[table], StreamedRows) for table in ios_db_generator.SOURCE_TABLES)
+
+    def test_table_stages_profiled(self, tmp_path, parsed):
+        with _local_backends(LocalSupabase()), PipelineProfiler() as profiler:
+            result = generate_ios_db(str(tmp_path / "gtfs.db"), data=parsed, metadata={})
+
+        stages = {s["table"]: s for s in profiler.report()["stages"] if s["stage"] == "ios_db_table"}
+        for table in ("stops", "routes", "patterns", "pattern_stops", "trips", "calendar", "stops_fts"):
+            assert stages[table]["rows"] == result["row_counts"][table]
+            assert stages[table]["parent"] == "ios_db_step"
+            assert "peak_rss_delta_mb" in stages[table]
+
+    def test_fts_rowids_follow_sids_across_regeneration(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            generate_ios_db(path, data=parsed, metadata={})
+            # Dropping a stop leaves a gap in the kept sids
+            unused = {s["stop_id"] for s in parsed["stops"]} - {ps["stop_id"] for ps in parsed["pattern_stops"]}
+            dropped = sorted(unused)[0]
+            parsed["stops"] = [s for s in parsed["stops"] if s["stop_id"] != dropped]
+            generate_ios_db(path, data=parsed, metadata={})
+
+        conn = sqlite3.connect(path)
+        try:
+            mismatched = conn.execute(
+                "SELECT COUNT(*) FROM stops_fts JOIN stops s ON stops_fts.rowid = s.rowid WHERE stops_fts.name != s.stop_name"
+            ).fetchone()[0]
+            assert mismatched == 0
+            assert conn.execute("SELECT COUNT(*) FROM stops_fts").fetchone()[0] == len(parsed["stops"])
+        finally:
+            conn.close()
+
+    def test_unknown_references_fail(self, tmp_path, parsed):
+        parsed["pattern_stops"] = parsed["pattern_stops"] + [{**parsed["pattern_stops"][0], "stop_id": "NO_SUCH_STOP"}]
+        with _local_backends(LocalSupabase()):
+            with pytest.raises(ValueError, match="pattern_stops"):
+                generate_ios_db(str(tmp_path / "gtfs.db"), data=parsed, metadata={})
+
+
+class TestStopsRtree:
+    """Test the stops R*Tree index answers radius queries like a full scan."""
+
+    def test_radius_query_matches_scan(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=3)
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            result = generate_ios_db(path, data=parse_gtfs(str(tmp_path / "gtfs")), metadata={})
+
+        assert result["row_counts"]["stops_rtree"] == result["row_counts"]["stops"]
+        conn = sqlite3.connect(path)
+        try:
+            points = conn.execute("SELECT stop_lat + 0.001, stop_lon - 0.002 FROM stops LIMIT 20").fetchall()
+            for lat, lon in points:
+                for radius_m in (100, 1000, 5000):
+                    expected = scan_within_radius(conn, lat, lon, radius_m)
+                    assert stops_within_radius(conn, lat, lon, radius_m) == expected
+            lat, lon = points[0]
+            nearest = stops_within_radius(conn, lat, lon, 5000, limit=3)
+            assert len(nearest) == 3
+            assert [d for _sid, d in nearest] == sorted(d for _sid, d in nearest)
+        finally:
+            conn.close()
+
+
+def _dictionary(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute(sql))
+    finally:
+        conn.close()
+
+
+class TestValueNormalization:
+    """Test parser values are stored like their Supabase equivalents."""
+
+    def test_calendar_days_from_strings_and_booleans(self):
+        weekdays = {day: "1" for day in ("monday", "tuesday", "wednesday", "thursday", "friday")}
+        assert _pack_calendar_days({**weekdays, "saturday": "0", "sunday": "0"}) == 31
+        assert _pack_calendar_days({"saturday": True, "sunday": False, "monday": False}) == 32
+
+    def test_dates_and_missing_values(self):
+        assert _iso_date("20251117") == "2025-11-17"
+        assert _iso_date("2025-11-17") == "2025-11-17"
+        assert _value(float("nan")) is None
+        assert _value("") is None
+        assert _value("", keep_empty=True) == ""
+        assert _value("0") == "0"
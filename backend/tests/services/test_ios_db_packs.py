@@ -0,0 +1,92 @@
+"""Unit tests for ios_db_packs.py - core and per-mode packs split from a bundle."""
+
+import sqlite3
+
+import pytest
+
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_generator import generate_ios_db
+from app.services.ios_db_packs import CORE_PACK, assemble_packs, read_packs_manifest
+from app.services.ios_db_query_gate import QUERIES, choose_samples
+from benchmarks.local_supabase import LocalSupabase
+from benchmarks.pipeline import _local_backends
+from benchmarks.synthetic_gtfs import generate_feed
+
+
+def _assemble(tmp_path, manifest, modes):
+    packs_dir = tmp_path / "out" / "packs"
+    output = str(tmp_path / "assembled.db")
+    assemble_packs(
+        str(packs_dir / manifest["packs"][CORE_PACK]["file"]),
+        {name: str(packs_dir / manifest["packs"][name]["file"]) for name in modes},
+        manifest["views"],
+        output
+    )
+    return output
+
+
+class TestBuildPacks:
+    """Test packs assemble back into the bundle and keep versions while unchanged."""
+
+    @pytest.fixture
+    def parsed(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=17)
+        return parse_gtfs(str(tmp_path / "gtfs"))
+
+    @pytest.fixture
+    def generate(self, tmp_path):
+        def run(parsed, **options):
+            with _local_backends(LocalSupabase()):
+                return generate_ios_db(str(tmp_path / "out" / "gtfs.db"), data=parsed, metadata={}, **options)
+        return run
+
+    def test_all_packs_answer_like_the_bundle(self, tmp_path, parsed, generate):
+        result = generate(parsed, packs=True)
+        manifest = result["packs"]
+        assert manifest == {**read_packs_manifest(str(tmp_path / "out" / "packs")), "duration_ms": manifest["duration_ms"]}
+        modes = [name for name in manifest["packs"] if name != CORE_PACK]
+        assert {"rail", "bus", "ferry"} <= set(modes)
+
+        assembled = _assemble(tmp_path, manifest, modes)
+        bundle_path = str(tmp_path / "out" / "gtfs.db")
+        samples = choose_samples(bundle_path)
+        bundle, local = sqlite3.connect(bundle_path), sqlite3.connect(assembled)
+        try:
+            for name, sql in QUERIES.items():
+                for params in samples[name]:
+                    expected = sorted(bundle.execute(sql, params).fetchall(), key=repr)
+                    assert sorted(local.execute(sql, params).fetchall(), key=repr) == expected
+        finally:
+            bundle.close()
+            local.close()
+        assert sum(manifest["packs"][name]["rows"]["trip_data"] for name in modes) == result["row_counts"]["trips"]
+
+    def test_subset_holds_only_its_modes(self, tmp_path, parsed, generate):
+        manifest = generate(parsed, packs=True)["packs"]
+
+        conn = sqlite3.connect(_assemble(tmp_path, manifest, ["rail", "ferry"]))
+        try:
+            route_types = {row[0] for row in conn.execute("SELECT DISTINCT r.route_type FROM trips t JOIN routes r ON r.rid = t.rid")}
+            trips = conn.execute("SELECT COUNT(*) FROM trips").fetchone()[0]
+        finally:
+            conn.close()
+
+        assert route_types == {2, 4}
+        assert trips == manifest["packs"]["rail"]["rows"]["trip_data"] + manifest["packs"]["ferry"]["rows"]["trip_data"]
+
+    def test_unchanged_packs_keep_version(self, tmp_path, parsed, generate):
+        first = generate(parsed, packs=True)["packs"]["packs"]
+        bus_routes = {r["route_id"] for r in parsed["routes"] if str(r["route_type"]) == "700"}
+        bus_trip = next(t for t in parsed["trips"] if t["route_id"] in bus_routes)
+        parsed["trips"] = [t for t in parsed["trips"] if t is not bus_trip]
+        second = generate(parsed, packs=True)["packs"]["packs"]
+
+        assert second["bus"]["version"] != first["bus"]["version"]
+        for name in set(first) - {"bus"}:
+            assert second[name] == first[name]
+        files = {path.name for path in (tmp_path / "out" / "packs").glob("*.db")}
+        assert files == {pack["file"] for pack in second.values()}
+
+    def test_disabled_by_default(self, tmp_path, parsed, generate):
+        assert "packs" not in generate(parsed)
+        assert not (tmp_path / "out" / "packs").exists()
@@ -0,0 +1,91 @@
+"""Unit tests for ios_db_query_gate.py - offline query benchmark and regression gate."""
+
+import os
+import sqlite3
+
+import pytest
+
+from app.services import ios_db_query_gate
+from app.services.gtfs_service import parse_gtfs
+from app.services.ios_db_generator import generate_ios_db
+from app.services.ios_db_query_gate import QUERIES, find_regressions, gate_bundle
+from benchmarks.local_supabase import LocalSupabase
+from benchmarks.pipeline import _local_backends
+from benchmarks.synthetic_gtfs import generate_feed
+
+
+def _stats(p50, p99):
+    return {"p50_ms": p50, "p99_ms": p99, "samples": 20, "rows": 100}
+
+
+class TestFindRegressions:
+    """Test regression thresholds (relative growth and absolute floor)."""
+
+    def test_relative_and_absolute_thresholds(self):
+        previous = {"departures": _stats(10.0, 20.0), "stop_search": _stats(0.1, 0.2)}
+        current = {"departures": _stats(16.0, 25.0), "stop_search": _stats(0.5, 0.9)}
+
+        regressions = find_regressions(current, previous, max_regression=0.5, min_ms=2.0)
+
+        # departures p50 grew 60% and 6ms; p99 only 25%; stop_search is below the floor
+        assert regressions == ["departures p50_ms 10.0ms -> 16.0ms"]
+
+    def test_queries_missing_from_previous_are_not_compared(self):
+        assert find_regressions({"trip_detail": _stats(50.0, 90.0)}, {}, 0.5, 2.0) == []
+
+
+class TestGateBundle:
+    """Test the gate inside generate_ios_db."""
+
+    @pytest.fixture
+    def parsed(self, tmp_path):
+        generate_feed(str(tmp_path / "gtfs"), scale="tiny", seed=9)
+        return parse_gtfs(str(tmp_path / "gtfs"))
+
+    def test_compares_against_replaced_bundle(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            first = generate_ios_db(path, data=parsed, metadata={}, query_gate=True)
+            second = generate_ios_db(path, data=parsed, metadata={}, query_gate=True)
+
+        assert first["query_benchmark"]["previous"] is None
+        assert set(second["query_benchmark"]["current"]) == set(QUERIES)
+        assert set(second["query_benchmark"]["previous"]) == set(QUERIES)
+        assert second["query_benchmark"]["current"]["departures"]["rows"] > 0
+        assert not os.path.exists(path + ".partial")
+
+    def test_regression_keeps_live_bundle(self, tmp_path, parsed, monkeypatch):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            live = generate_ios_db(path, data=parsed, metadata={}, query_gate=False)
+            with open(path, "rb") as f:
+                live_bytes = f.read()
+
+            def fake_benchmark(db_path, samples):
+                slow = db_path.endswith(".partial")
+                return {"departures": _stats(40.0, 80.0) if slow else _stats(4.0, 8.0)}
+
+            monkeypatch.setattr(ios_db_query_gate, "run_query_benchmark", fake_benchmark)
+            with pytest.raises(ValueError, match="query gate failed: departures p50_ms"):
+                generate_ios_db(path, data=parsed, metadata={}, query_gate=True, packs=True)
+
+        # The regressed candidate is discarded; clients keep getting the old bundle
+        with open(path, "rb") as f:
+            assert f.read() == live_bytes
+        conn = sqlite3.connect(path)
+        try:
+            version = conn.execute("SELECT value FROM metadata WHERE key = 'bundle_version'").fetchone()[0]
+        finally:
+            conn.close()
+        assert version == live["bundle_version"]
+        assert not os.path.exists(path + ".partial")
+        assert not (tmp_path / "packs").exists()
+
+    def test_benchmark_only_without_previous(self, tmp_path, parsed):
+        path = str(tmp_path / "gtfs.db")
+        with _local_backends(LocalSupabase()):
+            generate_ios_db(path, data=parsed, metadata={}, query_gate=False)
+
+        result = gate_bundle(path, None)
+        assert result["passed"] and result["regressions"] == []
+        assert result["current"]["stop_search"]["samples"] > 0
@@ -0,0 +1,240 @@
+"""Tests for nsw_gtfs_downloader.py - conditional, parallel and resumable downloads."""
+
+import hashlib
+import io
+import json
+import time
+import zipfile
+
+import pytest
+
+from app.config import settings
+from app.services import nsw_gtfs_downloader
+from app.services.nsw_gtfs_downloader import feed_hashes, fetch_gtfs_feeds, load_manifest
+
+
+def _member(tmp_path, mode, name="stops.txt"):
+    with zipfile.ZipFile(tmp_path / mode / "gtfs.zip") as zf:
+        return zf.read(name).decode()
+
+
+def _zip_bytes(stops_csv):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("stops.txt", stops_csv)
+    return buffer.getvalue()
+
+
+class _FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None, fail_after=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._body = body
+        self._fail_after = fail_after
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise nsw_gtfs_downloader.HTTPError(f"{self.status_code}", response=self)
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self._body), chunk_size):
+            if self._fail_after is not None and i >= self._fail_after:
+                raise nsw_gtfs_downloader.requests.ConnectionError("connection reset")
+            yield self._body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class _FakeNswApi:
+    """Session stand-in: one ZIP per endpoint with ETags; honours If-None-Match and Range/If-Range."""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.requests = []
+        self.drop_after = {}  # endpoint → bytes sent before the next response is cut off
+        self.range_start = {}  # endpoint → offset the next 206 starts at (ignoring Range)
+
+    def get(self, url, headers, timeout, stream):
+        endpoint = url[len(nsw_gtfs_downloader.NSW_API_BASE):]
+        self.requests.append((endpoint, dict(headers)))
+        body = self.bodies[endpoint]
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        fail_after = self.drop_after.pop(endpoint, None)
+        if headers.get("If-None-Match") == etag:
+            return _FakeResponse(304)
+        if "Range" in headers and headers.get("If-Range") == etag:
+            start = self.range_start.pop(endpoint, int(headers["Range"][len("bytes="):-1]))
+            if start >= len(body):
+                return _FakeResponse(416, headers={"Content-Range": f"bytes */{len(body)}"})
+            return _FakeResponse(206, body[start:], {
+                "ETag": etag,
+                "Content-Length": str(len(body) - start),
+                "Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}",
+            }, fail_after)
+        return _FakeResponse(
+            200, body,
+            {"ETag": etag, "Last-Modified": "Mon, 24 Nov 2025 00:00:00 GMT", "Content-Length": str(len(body))},
+            fail_after
+        )
+
+    def close(self):
+        pass
+
+    def requests_for(self, endpoint):
+        return [headers for e, headers in self.requests if e == endpoint]
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    endpoints = {"sydneytrains": "/v1/trains", "metro": "/v2/metro"}
+    api = _FakeNswApi({
+        "/v1/trains": _zip_bytes("stop_id\nA\n"),
+        "/v2/metro": _zip_bytes("stop_id\nM\n"),
+    })
+    monkeypatch.setattr(nsw_gtfs_downloader, "GTFS_ENDPOINTS", endpoints)
+    monkeypatch.setattr(nsw_gtfs_downloader, "RETRY_BACKOFF_SECONDS", 0)
+    monkeypatch.setattr(nsw_gtfs_downloader, "CHUNK_SIZE", 16)
+    monkeypatch.setattr(settings, "GTFS_DOWNLOAD_RATE_PER_SEC", 1000.0)
+    monkeypatch.setattr(nsw_gtfs_downloader, "_create_session", lambda pool_size: api)
+    return api
+
+
+class TestConditionalDownloads:
+    """Test manifest-driven conditional requests."""
+
+    def test_first_download_populates_manifest(self, tmp_path, fake_api):
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        assert report["changed_modes"] == ["sydneytrains", "metro"]
+        assert _member(tmp_path, "metro") == "stop_id\nM\n"
+        manifest = load_manifest(str(tmp_path))
+        body = fake_api.bodies["/v1/trains"]
+        assert manifest["sydneytrains"]["sha256"] == hashlib.sha256(body).hexdigest()
+        assert manifest["sydneytrains"]["size"] == len(body)
+        assert manifest["sydneytrains"]["etag"]
+        assert not any("If-None-Match" in headers for _, headers in fake_api.requests)
+
+    def test_unchanged_feeds_not_refetched(self, tmp_path, fake_api):
+        first = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+        fake_api.bodies["/v2/metro"] = _zip_bytes("stop_id\nM\nM2\n")
+
+        second = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        assert second["changed_modes"] == ["metro"]
+        assert second["unchanged_modes"] == ["sydneytrains"]
+        assert second["bytes_downloaded"] == len(fake_api.bodies["/v2/metro"])
+        assert "If-None-Match" in fake_api.requests_for("/v1/trains")[-1]
+        assert _member(tmp_path, "metro") == "stop_id\nM\nM2\n"
+        assert feed_hashes(second["manifest"])["sydneytrains"] == feed_hashes(first["manifest"])["sydneytrains"]
+
+    def test_zip_not_extracted(self, tmp_path, fake_api):
+        (tmp_path / "metro").mkdir()
+        (tmp_path / "metro" / "stops.txt").write_text("stale\n")  # left by an older sync
+
+        fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        assert sorted(p.name for p in (tmp_path / "metro").iterdir()) == ["gtfs.zip"]
+
+    def test_missing_local_zip_forces_full_request(self, tmp_path, fake_api):
+        fetch_gtfs_feeds(str(tmp_path), conditional=True)
+        (tmp_path / "sydneytrains" / "gtfs.zip").unlink()
+
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        trains_headers = fake_api.requests_for("/v1/trains")[-1]
+        assert "If-None-Match" not in trains_headers
+        # Same content re-downloaded → not treated as a change
+        assert report["changed_modes"] == []
+
+
+class TestResumableDownloads:
+    """Test Range resume after dropped connections."""
+
+    def test_dropped_connection_resumes_with_range(self, tmp_path, fake_api):
+        body = fake_api.bodies["/v1/trains"]
+        fake_api.drop_after["/v1/trains"] = 48
+
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        retry_headers = fake_api.requests_for("/v1/trains")[-1]
+        assert retry_headers["Range"] == "bytes=48-"
+        assert retry_headers["If-Range"] == report["manifest"]["sydneytrains"]["etag"]
+        assert report["manifest"]["sydneytrains"]["sha256"] == hashlib.sha256(body).hexdigest()
+        assert _member(tmp_path, "sydneytrains") == "stop_id\nA\n"
+        assert not (tmp_path / "sydneytrains" / "gtfs.zip.part").exists()
+
+    def test_partial_file_from_previous_run_resumes(self, tmp_path, fake_api, monkeypatch):
+        monkeypatch.setattr(nsw_gtfs_downloader, "DOWNLOAD_MAX_RETRIES", 0)
+        fake_api.drop_after["/v2/metro"] = 32
+        with pytest.raises(nsw_gtfs_downloader.requests.ConnectionError):
+            fetch_gtfs_feeds(str(tmp_path), conditional=True)
+        assert (tmp_path / "metro" / "gtfs.zip.part").stat().st_size == 32
+
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        assert fake_api.requests_for("/v2/metro")[-1]["Range"] == "bytes=32-"
+        # Trains is fetched again (the failed run saved no manifest); metro only sends the rest
+        assert report["bytes_downloaded"] == len(fake_api.bodies["/v1/trains"]) + len(fake_api.bodies["/v2/metro"]) - 32
+        assert _member(tmp_path, "metro") == "stop_id\nM\n"
+
+    def test_complete_partial_file_restarts_after_416(self, tmp_path, fake_api):
+        # Previous run died after the last chunk but before the rename
+        body = fake_api.bodies["/v2/metro"]
+        part_path = tmp_path / "metro" / "gtfs.zip.part"
+        part_path.parent.mkdir(parents=True)
+        part_path.write_bytes(body)
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        (tmp_path / "metro" / "gtfs.zip.part.json").write_text(json.dumps({"etag": etag, "last_modified": None}))
+
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        metro_requests = fake_api.requests_for("/v2/metro")
+        assert metro_requests[0]["Range"] == f"bytes={len(body)}-"
+        assert "Range" not in metro_requests[1]
+        assert report["manifest"]["metro"]["sha256"] == hashlib.sha256(body).hexdigest()
+        assert _member(tmp_path, "metro") == "stop_id\nM\n"
+        assert not part_path.exists()
+        assert not (tmp_path / "metro" / "gtfs.zip.part.json").exists()
+
+    def test_mismatched_content_range_falls_back_to_full_download(self, tmp_path, fake_api, monkeypatch):
+        monkeypatch.setattr(nsw_gtfs_downloader, "DOWNLOAD_MAX_RETRIES", 0)
+        fake_api.drop_after["/v2/metro"] = 32
+        with pytest.raises(nsw_gtfs_downloader.requests.ConnectionError):
+            fetch_gtfs_feeds(str(tmp_path), conditional=True)
+        fake_api.range_start["/v2/metro"] = 16
+
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        metro_requests = fake_api.requests_for("/v2/metro")
+        assert metro_requests[-2]["Range"] == "bytes=32-"
+        assert "Range" not in metro_requests[-1]
+        body = fake_api.bodies["/v2/metro"]
+        assert report["manifest"]["metro"]["sha256"] == hashlib.sha256(body).hexdigest()
+        assert _member(tmp_path, "metro") == "stop_id\nM\n"
+
+    def test_changed_feed_restarts_partial_download(self, tmp_path, fake_api, monkeypatch):
+        monkeypatch.setattr(nsw_gtfs_downloader, "DOWNLOAD_MAX_RETRIES", 0)
+        fake_api.drop_after["/v2/metro"] = 32
+        with pytest.raises(nsw_gtfs_downloader.requests.ConnectionError):
+            fetch_gtfs_feeds(str(tmp_path), conditional=True)
+        fake_api.bodies["/v2/metro"] = _zip_bytes("stop_id\nM\nM3\n")
+
+        report = fetch_gtfs_feeds(str(tmp_path), conditional=True)
+
+        # If-Range mismatch → full 200 body replaces the stale .part
+        new_body = fake_api.bodies["/v2/metro"]
+        assert report["manifest"]["metro"]["sha256"] == hashlib.sha256(new_body).hexdigest()
+        assert _member(tmp_path, "metro") == "stop_id\nM\nM3\n"
+
+
+class TestTokenBucket:
+    """Test the shared request-rate limiter."""
+
+    def test_spaces_requests_at_rate(self):
+        bucket = nsw_gtfs_downloader._TokenBucket(rate_per_sec=50.0, capacity=1)
+        start = time.monotonic()
+        for _ in range(6):
+            bucket.acquire()
+        # First token is immediate; the other five wait 1/50 s each
+        assert time.monotonic() - start >= 5 / 50 * 0.9
@@ -0,0 +1,108 @@
+"""Unit tests for supabase_export.py - keyset-paginated, parallel table export."""
+
+import httpx
+import pytest
+
+from app.services.supabase_export import export_pages, export_table, split_key_ranges
+from benchmarks.local_supabase import LocalSupabase
+
+
+def _supabase_with(table, rows):
+    supabase = LocalSupabase()
+    supabase.table(table).upsert(rows).execute()
+    return supabase
+
+
+class _FlakySupabase(LocalSupabase):
+    """Fails the first select with a transient error."""
+
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    def table(self, name):
+        query = super().table(name)
+        execute = query.execute
+
+        def flaky_execute():
+            if query._action == "select" and self.failures:
+                self.failures -= 1
+                raise httpx.ReadTimeout("timed out")
+            return execute()
+
+        query.execute = flaky_execute
+        return query
+
+
+class TestKeysetPagination:
+    """Test single-column and composite-key paging."""
+
+    def test_single_key_pages(self):
+        rows = [{"stop_id": f"S{i:03d}", "stop_name": f"Stop {i}", "stop_lat": 1.0, "stop_lon": 2.0} for i in range(25)]
+        supabase = _supabase_with("stops", rows)
+
+        pages = list(export_pages(supabase, "stops", ["stop_name"], ["stop_id"], page_size=10))
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert [row["stop_id"] for page in pages for row in page] == [row["stop_id"] for row in rows]
+        assert set(pages[0][0]) == {"stop_id", "stop_name"}
+
+    def test_composite_key_groups_larger_than_page(self):
+        rows = [
+            {"pattern_id": pattern, "stop_sequence": seq, "stop_id": f"{pattern}-{seq}"}
+            for pattern, count in (("A", 3), ("B", 12), ("C", 4), ("D", 7))
+            for seq in range(1, count + 1)
+        ]
+        supabase = _supabase_with("pattern_stops", rows)
+
+        exported = export_table(supabase, "pattern_stops", ["stop_id"], ["pattern_id", "stop_sequence"], page_size=5)
+
+        assert [(r["pattern_id"], r["stop_sequence"]) for r in exported] == [
+            (r["pattern_id"], r["stop_sequence"]) for r in rows
+        ]
+
+    def test_more_than_two_key_columns_rejected(self):
+        with pytest.raises(ValueError):
+            list(export_pages(LocalSupabase(), "t", ["a"], ["a", "b", "c"]))
+
+    def test_transient_errors_retried(self, monkeypatch):
+        monkeypatch.setattr("app.services.supabase_export.time.sleep", lambda _s: None)
+        supabase = _FlakySupabase()
+        supabase.table("routes").upsert([{"route_id": "R1", "route_type": 3}]).execute()
+
+        assert export_table(supabase, "routes", ["route_type"], ["route_id"]) == [{"route_id": "R1", "route_type": 3}]
+
+
+class TestParallelRanges:
+    """Test key range splitting and concurrent export."""
+
+    @pytest.fixture
+    def supabase(self):
+        rows = [{"trip_id": f"T{i:04d}", "route_id": f"R{i % 7}", "service_id": "WK", "pattern_id": "P"} for i in range(503)]
+        return _supabase_with("trips", rows)
+
+    def test_ranges_cover_key_space(self, supabase):
+        ranges = split_key_ranges(supabase, "trips", "trip_id", 4)
+
+        assert len(ranges) == 4
+        assert ranges[0][0] is None and ranges[-1][1] is None
+        assert all(upper == lower for (_, upper), (lower, _) in zip(ranges, ranges[1:]))
+
+    def test_parallel_export_has_every_row_once(self, supabase):
+        ids = [
+            row["trip_id"]
+            for page in export_pages(supabase, "trips", ["route_id"], ["trip_id"], page_size=50, parallelism=4)
+            for row in page
+        ]
+
+        assert len(ids) == 503
+        assert set(ids) == {f"T{i:04d}" for i in range(503)}
+
+    def test_early_stop_releases_workers(self, supabase):
+        pages = export_pages(supabase, "trips", ["route_id"], ["trip_id"], page_size=10, parallelism=4)
+        assert len(next(pages)) == 10
+        pages.close()
+
+    def test_small_table_single_range(self):
+        supabase = _supabase_with("routes", [{"route_id": "R1", "route_type": 3}])
+        assert split_key_ranges(supabase, "routes", "route_id", 4) == [(None, None)]
@@ -0,0 +1,103 @@
+"""Unit tests for file_responses.py - negotiated, conditional, range-resumable downloads."""
+
+import gzip
+import os
+
+import pytest
+import zstandard
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.services.ios_db_variants import read_manifest, write_variants
+from app.utils.file_responses import file_response
+
+CONTENT = os.urandom(40_000) + b"\0" * 200_000
+
+
+@pytest.fixture
+def bundle(tmp_path):
+    path = tmp_path / "gtfs.db"
+    path.write_bytes(CONTENT)
+    write_variants(str(path), "v1")
+    return path
+
+
+@pytest.fixture
+def client(bundle):
+    app = FastAPI()
+
+    @app.get("/download")
+    async def download(request: Request):
+        return file_response(request, bundle, read_manifest(str(bundle)), "application/x-sqlite3", "gtfs.db")
+
+    return TestClient(app)
+
+
+def _raw(client, headers):
+    with client.stream("GET", "/download", headers=headers) as response:
+        return response, b"".join(response.iter_raw())
+
+
+class TestNegotiation:
+    """Test Accept-Encoding selection of precompressed variants."""
+
+    def test_zstd_preferred(self, client):
+        response, body = _raw(client, {"Accept-Encoding": "gzip, zstd"})
+
+        assert response.headers["content-encoding"] == "zstd"
+        assert zstandard.ZstdDecompressor().decompress(body) == CONTENT
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    def test_gzip_when_zstd_not_accepted(self, client):
+        response, body = _raw(client, {"Accept-Encoding": "gzip;q=0.8, zstd;q=0"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(body) == CONTENT
+
+    def test_identity_without_accept_encoding(self, client):
+        response, body = _raw(client, {"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert body == CONTENT
+
+
+class TestConditionalAndRange:
+    """Test If-None-Match, Range and If-Range handling."""
+
+    def test_not_modified_for_any_representation(self, client):
+        etag = client.get("/download", headers={"Accept-Encoding": "zstd"}).headers["etag"]
+
+        response = client.get("/download", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+
+        assert response.status_code == 304
+
+    def test_resume_with_matching_if_range(self, client):
+        first, _ = _raw(client, {"Accept-Encoding": "identity"})
+
+        response, body = _raw(client, {
+            "Accept-Encoding": "identity", "Range": "bytes=1000-", "If-Range": first.headers["etag"]
+        })
+
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 1000-{len(CONTENT) - 1}/{len(CONTENT)}"
+        assert body == CONTENT[1000:]
+
+    def test_stale_if_range_restarts(self, client):
+        response, body = _raw(client, {"Accept-Encoding": "identity", "Range": "bytes=1000-", "If-Range": '"old"'})
+
+        assert response.status_code == 200
+        assert body == CONTENT
+
+    def test_unsatisfiable_range(self, client):
+        response = client.get("/download", headers={"Accept-Encoding": "identity", "Range": f"bytes={len(CONTENT)}-"})
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+    def test_stale_manifest_ignored(self, client, bundle):
+        bundle.write_bytes(CONTENT + b"changed")
+
+        response, body = _raw(client, {"Accept-Encoding": "zstd"})
+
+        assert "etag" not in response.headers
+        assert body == CONTENT + b"changed"
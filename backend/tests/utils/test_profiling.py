@@ -0,0 +1,60 @@
+"""Unit tests for profiling.py - pipeline stage instrumentation."""
+
+from pathlib import Path
+
+from app.utils.profiling import PipelineProfiler, profile_stage
+
+
+class TestPipelineProfiler:
+    """Test stage recording and optional captures."""
+
+    def test_no_active_profiler_is_noop(self):
+        with profile_stage("csv_read", file="buses/stops.txt") as stage:
+            stage["rows"] = 10
+        assert stage == {"rows": 10}
+
+    def test_records_nested_stages(self, tmp_path):
+        with PipelineProfiler(output_dir=tmp_path) as profiler:
+            with profile_stage("parse"):
+                with profile_stage("csv_read", file="buses/stops.txt") as stage:
+                    stage["rows"] = 3
+            report = profiler.report()
+
+        parse, csv_read = report["stages"]
+        assert parse["stage"] == "parse" and parse["parent"] is None
+        assert csv_read["parent"] == "parse"
+        assert csv_read["file"] == "buses/stops.txt"
+        assert csv_read["rows"] == 3
+        for key in ("wall_ms", "cpu_ms", "rss_mb", "rss_delta_mb", "peak_rss_delta_mb"):
+            assert key in csv_read
+        assert report["profile_files"] == []
+
+    def test_stage_recorded_on_failure(self, tmp_path):
+        with PipelineProfiler(output_dir=tmp_path) as profiler:
+            try:
+                with profile_stage("table_load", table="trips"):
+                    raise RuntimeError("boom")
+            except RuntimeError:
+                pass
+
+        assert "wall_ms" in profiler.stages[0]
+
+    def test_tracemalloc_capture(self, tmp_path):
+        with PipelineProfiler(capture="tracemalloc", output_dir=tmp_path, run_label="t") as profiler:
+            with profile_stage("pattern_extraction"):
+                with profile_stage("alloc"):
+                    buffer = bytearray(4 * 1024 * 1024)
+                del buffer
+            report = profiler.report()
+
+        outer, inner = report["stages"]
+        assert inner["traced_peak_mb"] >= 4
+        assert outer["traced_peak_mb"] >= inner["traced_peak_mb"]
+        assert [Path(p).name for p in report["profile_files"]] == ["gtfs-static-t-tracemalloc.txt"]
+
+    def test_cprofile_capture(self, tmp_path):
+        with PipelineProfiler(capture="cprofile", output_dir=tmp_path, run_label="t") as profiler:
+            with profile_stage("parse"):
+                sum(range(1000))
+        assert (tmp_path / "gtfs-static-t.prof").exists()
+        assert profiler.profile_files == [str(tmp_path / "gtfs-static-t.prof")]